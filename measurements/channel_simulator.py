@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from measurement_files import summary_records
+from measurements import measurement_path
+from performance_model import default_num_sync_symbols, ipv6_udp_header_bytes
+from vlc_decoder import decode_edges, vlc_receiver_tolerance
+from vlc_frame import build_frame, check_frame, encode_frames
+
+# Stochastic channel simulator of the VLC link
+#
+# The edges of the sender (vlc_frame.encode_frames) are perturbed like on the way LED -> photodiode -> comparator -> ISR:
+#   - delay of the receiver circuit: the photodiode signal ramps over the rise and fall time of the receiver
+#     (receiver_rise_time_us, receiver_fall_time_us of max_data_rate_receiver_sketch.py) and the comparator switches
+#     when the ramp crosses its threshold (edge_delays_us), so rising edges are delayed by rise_delay_us and falling
+#     edges by fall_delay_us
+#   - Gaussian jitter and heavy tailed jitter (Student's t distribution) of a fraction of the edges
+#   - missed edges
+#   - spurious edge pairs (short pulses) of ambient light, Poisson distributed in time
+#   - the ISR: interrupt latency (exponential jitter) and a service time, while the ISR is running one edge can be
+#     pending, further edges are lost. An edge at least 3/4 of a symbol after the last bit edge reads a bit and takes
+#     isr_duration_us (or a duration drawn from a measured isr_duration_distribution), the edges in between (between
+#     two equal bits, every second sync edge) only update the timing and take isr_skip_duration_us.
+# Only the difference fall_delay_us - rise_delay_us shortens or stretches the time between two data edges, it uses up
+# the receiver tolerance at high data rates.
+# The ISR reads the timer with a resolution of 1 us. The resulting timestamps are decoded by the
+# receiver model (vlc_decoder) and checked like in vlc_netif (length and CRC).
+#
+# The threshold, the short ISR and the latency jitter are not measured, the defaults are bounded by the deployed
+# operating point: 30 - 35 kbit/s (DATARATE_BITS_PER_SECOND of vlc_netif.c, the datarate sweep) deliver at a short
+# distance, which the self test checks (--self-test). A late boundary edge is read as a bit edge, so the tail of the
+# latency jitter and the long ISR before a boundary edge have to fit into 0.2 symbols. calibrate_threshold fits the
+# threshold to the measured runs of a datarate sweep:
+#
+#   python3 channel_simulator.py --calibrate datarate_and_reliability_more_runs
+
+# time of the receiver output to follow a rising and a falling edge of the light completely
+receiver_rise_time_us = 9.44
+receiver_fall_time_us = 19.8
+# threshold of the comparator as a fraction of the signal swing
+default_threshold = 0.65
+# ISR of an edge which does not read a bit (not measured, the ISR returns after the tolerance check)
+default_isr_skip_duration_us = 6.0
+
+# data rates of the deployed operating point, the simulation must deliver at noise 0
+operating_point_data_rates_bps = [30000, 32000, 35000]
+operating_point_min_reliability = 0.95
+
+# coefficients of the noise level, a proxy for the distance and the light conditions (uncalibrated)
+# noise 0: no jitter and no disturbances, noise 1: about the distance where the reliability starts to drop
+noise_jitter_us = 0.75
+noise_heavy_tail_probability = 0.00005
+noise_miss_probability = 0.00001
+noise_spurious_rate_per_s = 2.0
+
+
+# delays of the rising and the falling edge at the comparator output, the signal ramps linearly from low to high
+# over the rise time (high to low over the fall time) and crosses the threshold on the way
+def edge_delays_us(threshold=default_threshold, rise_time_us=receiver_rise_time_us, fall_time_us=receiver_fall_time_us):
+    assert 0 <= threshold <= 1, "threshold is a fraction of the signal swing"
+    return threshold * rise_time_us, (1 - threshold) * fall_time_us
+
+
+class ChannelModel:
+    # rise_delay_us, fall_delay_us: delays of the edges, the crossing of the threshold if None
+    def __init__(self, rise_delay_us=None, fall_delay_us=None, threshold=default_threshold, jitter_us=0.0,
+                 heavy_tail_probability=0.0, heavy_tail_scale_us=5.0, heavy_tail_df=2, miss_probability=0.0,
+                 spurious_rate_per_s=0.0, spurious_width_us=3.0, isr_latency_us=2.0, isr_latency_jitter_us=0.2,
+                 isr_duration_us=16.0, isr_skip_duration_us=default_isr_skip_duration_us, isr_duration_distribution=None):
+        crossing_rise_us, crossing_fall_us = edge_delays_us(threshold)
+        self.rise_delay_us = crossing_rise_us if rise_delay_us == None else rise_delay_us
+        self.fall_delay_us = crossing_fall_us if fall_delay_us == None else fall_delay_us
+        self.jitter_us = jitter_us
+        self.heavy_tail_probability = heavy_tail_probability
+        self.heavy_tail_scale_us = heavy_tail_scale_us
+        self.heavy_tail_df = heavy_tail_df
+        self.miss_probability = miss_probability
+        self.spurious_rate_per_s = spurious_rate_per_s
+        self.spurious_width_us = spurious_width_us
+        self.isr_latency_us = isr_latency_us
+        self.isr_latency_jitter_us = isr_latency_jitter_us
+        self.isr_duration_us = isr_duration_us
+        self.isr_skip_duration_us = isr_skip_duration_us
+        # (durations in us, probabilities) of measured ISR durations, replaces the constant isr_duration_us of the
+        # edges which read a bit
+        self.isr_duration_distribution = isr_duration_distribution
+
+
+# channel of a noise level, see the noise coefficients
+def noise_channel(noise, **kwargs):
+    return ChannelModel(
+        jitter_us=noise * noise_jitter_us,
+        heavy_tail_probability=noise * noise_heavy_tail_probability,
+        miss_probability=noise * noise_miss_probability,
+        spurious_rate_per_s=noise * noise_spurious_rate_per_s,
+        **kwargs
+    )
+
+
+# arrival times of the edges at the interrupt controller
+# lead_in_us: time before the frame in which spurious edges can occur
+# returns (arrival times, offsets of the lanes)
+def _arrival_times(encoded, channel, rng, lead_in_us):
+    times = encoded.edge_times_us.astype(float)
+    times += np.where(encoded.edge_levels == 1, channel.rise_delay_us, channel.fall_delay_us)
+    if channel.jitter_us > 0:
+        times += rng.normal(0, channel.jitter_us, len(times))
+    if channel.heavy_tail_probability > 0:
+        heavy = rng.random(len(times)) < channel.heavy_tail_probability
+        times[heavy] += rng.standard_t(channel.heavy_tail_df, np.count_nonzero(heavy)) * channel.heavy_tail_scale_us
+
+    lanes = np.repeat(np.arange(len(encoded)), np.diff(encoded.edge_offsets))
+    if channel.miss_probability > 0:
+        kept = rng.random(len(times)) >= channel.miss_probability
+        times = times[kept]
+        lanes = lanes[kept]
+
+    if channel.spurious_rate_per_s > 0:
+        window_us = encoded.air_time_us + lead_in_us
+        num_pulses = rng.poisson(channel.spurious_rate_per_s * window_us / 1000000)
+        pulse_lanes = np.repeat(np.arange(len(encoded)), num_pulses)
+        starts = rng.uniform(0, 1, len(pulse_lanes)) * window_us[pulse_lanes] - lead_in_us
+        widths = rng.exponential(channel.spurious_width_us, len(pulse_lanes))
+        times = np.concatenate([times, starts, starts + widths])
+        lanes = np.concatenate([lanes, pulse_lanes, pulse_lanes])
+
+    order = np.lexsort((times, lanes))
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(lanes, minlength=len(encoded)), out=offsets[1:])
+
+    return times[order] + lead_in_us, offsets
+
+
+# timer values read by the ISR for the arriving edges, lanes in lockstep
+# an edge which arrives while the ISR is running is pending, the interrupt flag can only store one edge
+# half_period_us: half a symbol of the sender, separates the bit edges from the edges in between
+def _isr_timestamps(arrivals, offsets, channel, rng, half_period_us):
+    n = len(offsets) - 1
+    lengths = np.diff(offsets)
+    max_length = int(lengths.max()) if n > 0 else 0
+    lane_index = np.repeat(np.arange(n), lengths)
+    column = np.arange(len(arrivals)) - offsets[lane_index]
+    padded = np.zeros((n, max_length))
+    padded[lane_index, column] = arrivals
+
+    busy_until = np.full(n, -np.inf)
+    last_bit_edge = np.full(n, -np.inf)
+    pending = np.zeros(n, dtype=bool)
+    served_lanes = []
+    served_times = []
+
+    def serve(mask, start):
+        lanes = np.flatnonzero(mask)
+        served_lanes.append(lanes)
+        served_times.append(start[lanes])
+        reads_bit = start[lanes] - last_bit_edge[lanes] >= 1.5 * half_period_us
+        last_bit_edge[lanes[reads_bit]] = start[lanes[reads_bit]]
+        if channel.isr_duration_distribution != None:
+            durations_us, probabilities = channel.isr_duration_distribution
+            bit_durations_us = rng.choice(durations_us, len(lanes), p=probabilities)
+        else:
+            bit_durations_us = channel.isr_duration_us
+        busy_until[lanes] = start[lanes] + np.where(reads_bit, bit_durations_us, channel.isr_skip_duration_us)
+
+    for j in range(max_length + 1):
+        active = lengths > j
+        t = padded[:, j] if j < max_length else np.full(n, np.inf)
+
+        # pending edge is served when the ISR returns
+        finished = pending & (busy_until <= t)
+        serve(finished, busy_until.copy())
+        pending &= ~finished
+
+        idle = active & (busy_until <= t)
+        serve(idle, t)
+        pending |= active & ~idle & ~pending
+
+    lanes = np.concatenate(served_lanes)
+    times = np.concatenate(served_times) + channel.isr_latency_us
+    if channel.isr_latency_jitter_us > 0:
+        times += rng.exponential(channel.isr_latency_jitter_us, len(times))
+    order = np.lexsort((times, lanes))
+    served_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(lanes, minlength=n), out=served_offsets[1:])
+
+    return np.floor(times[order]).astype(np.int64), served_offsets
+
+
+# perturb a batch of encoded frames, returns the ISR timestamps and the offsets of the lanes (one lane per frame)
+def simulate_channel(encoded, channel, rng, lead_in_us=5000):
+    arrivals, offsets = _arrival_times(encoded, channel, rng, lead_in_us)
+    return _isr_timestamps(arrivals, offsets, channel, rng, encoded.half_period_us)
+
+
+# delivery of random frames of one sweep point
+# payload_size_bytes: udp payload, the frame contains the IPv6 packet (payload + 48 bytes)
+def simulate_delivery(data_rate_bps, tolerance, channel, num_frames=500, payload_size_bytes=100,
+                      num_sync_symbols=default_num_sync_symbols, seed=None, chunk_size=2000):
+    rng = np.random.default_rng(seed)
+
+    delivered = 0
+    exact = 0
+    timeouts = 0
+    for start in range(0, num_frames, chunk_size):
+        count = min(chunk_size, num_frames - start)
+        frames = [build_frame(rng.integers(0, 256, payload_size_bytes + ipv6_udp_header_bytes).astype(np.uint8).tobytes())
+                  for _ in range(count)]
+        encoded = encode_frames(frames, data_rate_bps, num_sync_symbols)
+        times, offsets = simulate_channel(encoded, channel, rng)
+        decoded = decode_edges(times, offsets, tolerance, num_sync_symbols)
+
+        received = decoded.first_frames(count)
+        delivered += sum(1 for f in received if f != None and check_frame(f))
+        exact += sum(1 for f, sent in zip(received, frames) if f == sent)
+        timeouts += int(decoded.timeouts.sum())
+
+    return {
+        "frames": num_frames,
+        "delivered": delivered,
+        "reliability_link": delivered / num_frames,
+        "exact": exact,
+        "timeouts_per_frame": timeouts / num_frames,
+    }
+
+
+def _simulate_point(point):
+    data_rate_bps, tolerance, noise, num_frames, payload_size_bytes, seed = point
+    result = simulate_delivery(data_rate_bps, tolerance, noise_channel(noise), num_frames, payload_size_bytes, seed=seed)
+    result.update({
+        "data_rate_bps": data_rate_bps,
+        "data_rate_kbps": data_rate_bps / 1000,
+        "tolerance": tolerance,
+        "noise": noise,
+        "payload_size_bytes": payload_size_bytes,
+    })
+    return result
+
+
+# simulate the grid data rate x tolerance x noise in worker processes
+def run_sweep(data_rates_bps, tolerances, noises, num_frames=500, payload_size_bytes=100, seed=0, jobs=None):
+    grid = [(r, t, n) for r in data_rates_bps for t in tolerances for n in noises]
+    seeds = np.random.SeedSequence(seed).spawn(len(grid))
+    points = [(r, t, n, num_frames, payload_size_bytes, s) for (r, t, n), s in zip(grid, seeds)]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(_simulate_point, points))
+
+
+# link layer delivery rates of the runs of a measured directory: [(data rate in bit/s, payload in bytes, reliability)]
+def measured_delivery(directory, jobs=None):
+    records = summary_records(directory, jobs)
+    return [(r["data_rate_bps"], r["payload_size_bytes"], r["reliability_link"]) for r in records
+            if r["data_rate_bps"] != None and r["reliability_link"] != -1]
+
+
+def _calibration_point(point):
+    threshold, data_rate_bps, payload_size_bytes, tolerance, noise, num_frames, seed = point
+    return simulate_delivery(data_rate_bps, tolerance, noise_channel(noise, threshold=threshold), num_frames,
+                             payload_size_bytes, seed=seed)["reliability_link"]
+
+
+# fit the comparator threshold to measured delivery rates (see measured_delivery) on a grid of thresholds
+# returns (threshold, rms error) with the smallest squared error of the simulated to the measured reliability
+def calibrate_threshold(measured, thresholds=np.linspace(0.4, 0.9, 21), tolerance=vlc_receiver_tolerance, noise=0,
+                        num_frames=200, seed=0, jobs=None):
+    assert len(measured) > 0, "no measured runs with a data rate"
+    points = sorted(set((r, p) for r, p, _ in measured))
+    grid = [(t, r, p) for t in thresholds for r, p in points]
+    seeds = np.random.SeedSequence(seed).spawn(len(grid))
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        simulated = list(executor.map(_calibration_point, [(t, r, p, tolerance, noise, num_frames, s)
+                                                           for (t, r, p), s in zip(grid, seeds)]))
+
+    errors = []
+    for i, threshold in enumerate(thresholds):
+        predicted = dict(zip(points, simulated[i * len(points):(i + 1) * len(points)]))
+        errors.append(np.sqrt(np.mean([(predicted[(r, p)] - reliability) ** 2 for r, p, reliability in measured])))
+    best = int(np.argmin(errors))
+    return float(thresholds[best]), float(errors[best])
+
+
+# the default channel without noise delivers at the deployed operating point
+def self_test(num_frames=400, seed=0):
+    for data_rate_bps in operating_point_data_rates_bps:
+        reliability = simulate_delivery(data_rate_bps, vlc_receiver_tolerance, noise_channel(0), num_frames, seed=seed)["reliability_link"]
+        assert reliability >= operating_point_min_reliability, \
+            f"reliability {reliability} at {data_rate_bps} bit/s and noise 0 below {operating_point_min_reliability}"
+    print(f"noise 0 delivers >= {operating_point_min_reliability} at {operating_point_data_rates_bps} bit/s")
+
+
+surface_columns = ["data_rate_bps", "data_rate_kbps", "tolerance", "noise", "payload_size_bytes",
+                   "frames", "delivered", "reliability_link", "exact", "timeouts_per_frame"]
+
+
+# predicted delivery rates, one row per sweep point (same separator as the measurement files)
+def write_surface(results, path):
+    with open(path, 'w') as file:
+        file.write(";".join(surface_columns) + "\n")
+        for result in results:
+            file.write(";".join(str(result[c]) for c in surface_columns) + "\n")
+
+    print("Saved surface in file: " + path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predict the link layer delivery rate with the channel simulator")
+    parser.add_argument("-r", "--data-rates", type=int, nargs="+", default=list(range(18000, 40000 + 2000, 2000)), help="data rates in bit/s")
+    parser.add_argument("-t", "--tolerances", type=int, nargs="+", default=[vlc_receiver_tolerance], help="receiver tolerances in percent")
+    parser.add_argument("--noise", type=float, nargs="+", default=[0, 0.5, 1, 2], help="noise levels")
+    parser.add_argument("-n", "--frames", type=int, default=500, help="frames per sweep point")
+    parser.add_argument("-p", "--payload", type=int, default=100, help="udp payload size in bytes")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the random generators")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("-o", "--output", default="simulated_delivery.csv", help="output csv file")
+    parser.add_argument("--calibrate", help="fit the comparator threshold to the runs of a measured directory and exit")
+    parser.add_argument("--self-test", action="store_true", help="check the operating point and exit")
+    args = parser.parse_args()
+
+    self_test()
+    if args.self_test:
+        sys.exit(0)
+
+    if args.calibrate:
+        directory = args.calibrate if os.path.isabs(args.calibrate) else os.path.join(measurement_path, args.calibrate)
+        threshold, error = calibrate_threshold(measured_delivery(directory, args.jobs), tolerance=args.tolerances[0],
+                                               seed=args.seed, jobs=args.jobs)
+        rise_delay_us, fall_delay_us = edge_delays_us(threshold)
+        print(f"threshold {threshold:.3f} (rise delay {rise_delay_us:.2f} us, fall delay {fall_delay_us:.2f} us), "
+              f"rms error of the reliability {error:.3f}")
+        sys.exit(0)
+
+    start = time.time()
+    results = run_sweep(args.data_rates, args.tolerances, args.noise, args.frames, args.payload, args.seed, args.jobs)
+    print(f"Simulated {len(results)} sweep points in {time.time() - start:.1f}s")
+    write_surface(results, args.output)
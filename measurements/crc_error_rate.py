@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from channel_simulator import noise_channel, simulate_channel
+from performance_model import default_num_sync_symbols, ipv6_udp_header_bytes, vlc_crc_bytes, vlc_mac_header_bytes
+from vlc_crc import bit_syndromes, crc8_batch, vlc_crc_polynom
+from vlc_decoder import decode_edges, vlc_receiver_tolerance
+from vlc_frame import build_frame, encode_frames
+
+# Undetected error rate of the CRC-8 frame trailer
+#
+# Frames are sent through the channel simulator and decoded. A received frame which differs from the sent frame
+# is corrupted, it is undetected if it still passes the check of _netif_recv (length and CRC).
+# Corrupted frames of the sent length have bit errors, the others lost or gained bits (slips, truncated frames).
+# Undetected frames are rare, so the rate is also estimated with the 1/256 of a random CRC.
+#
+# The CRC is linear, the error patterns it misses follow from the syndromes of single bit errors (vlc_crc.bit_syndromes).
+# Two bit errors are undetected if their syndromes are equal, i.e. their distance is a multiple of the period
+# of the polynom. The period of 0xAB is much shorter than a frame.
+
+
+# period of the single bit syndromes (order of x modulo the polynom)
+def syndrome_period(polynom=vlc_crc_polynom):
+    syndromes = bit_syndromes(256, polynom)
+    repeats = np.flatnonzero(syndromes[1:] == syndromes[0])
+    return int(repeats[0]) + 1 if len(repeats) > 0 else None
+
+
+# fraction of the two bit errors in a frame of num_bytes (including the trailer) that the CRC does not detect
+def undetected_two_bit_fraction(num_bytes, polynom=vlc_crc_polynom):
+    num_bits = 8 * num_bytes
+    counts = np.bincount(bit_syndromes(num_bits, polynom), minlength=256).astype(np.float64)
+    return (counts * (counts - 1) / 2).sum() / (num_bits * (num_bits - 1) / 2)
+
+
+# simulate one sweep point and classify the received frames
+def simulate_errors(data_rate_bps, tolerance, noise, num_frames=1000, payload_size_bytes=100,
+                    num_sync_symbols=default_num_sync_symbols, seed=None, chunk_size=2000):
+    rng = np.random.default_rng(seed)
+    channel = noise_channel(noise)
+
+    result = {"frames": 0, "received": 0, "corrupted": 0, "bit_errors": 0, "length_errors": 0, "undetected": 0,
+              "error_bits": []}
+    for start in range(0, num_frames, chunk_size):
+        count = min(chunk_size, num_frames - start)
+        frames = [build_frame(rng.integers(0, 256, payload_size_bytes + ipv6_udp_header_bytes).astype(np.uint8).tobytes())
+                  for _ in range(count)]
+        encoded = encode_frames(frames, data_rate_bps, num_sync_symbols)
+        times, offsets = simulate_channel(encoded, channel, rng)
+        decoded = decode_edges(times, offsets, tolerance, num_sync_symbols)
+
+        pairs = [(r, s) for r, s in zip(decoded.first_frames(count), frames) if r != None]
+        corrupted = [(r, s) for r, s in pairs if r != s]
+        long_enough = [r for r, _ in corrupted if len(r) > vlc_mac_header_bytes + vlc_crc_bytes]
+        passed = crc8_batch([r[:-vlc_crc_bytes] for r in long_enough]) == np.array([r[-1] for r in long_enough], dtype=np.uint8)
+
+        result["frames"] += count
+        result["received"] += len(pairs)
+        result["corrupted"] += len(corrupted)
+        result["undetected"] += int(np.count_nonzero(passed))
+        for r, s in corrupted:
+            if len(r) == len(s):
+                result["bit_errors"] += 1
+                flipped = np.frombuffer(r, dtype=np.uint8) ^ np.frombuffer(s, dtype=np.uint8)
+                result["error_bits"].append(int(np.unpackbits(flipped).sum()))
+            else:
+                result["length_errors"] += 1
+
+    return result
+
+
+def _simulate_point(point):
+    data_rate_bps, tolerance, noise, num_frames, payload_size_bytes, packets_per_s, seed = point
+    result = simulate_errors(data_rate_bps, tolerance, noise, num_frames, payload_size_bytes, seed=seed)
+    frame_bytes = vlc_mac_header_bytes + payload_size_bytes + ipv6_udp_header_bytes + vlc_crc_bytes
+    corrupted_rate = result["corrupted"] / result["frames"]
+    error_bits = result.pop("error_bits")
+    result.update({
+        "data_rate_bps": data_rate_bps,
+        "tolerance": tolerance,
+        "noise": noise,
+        "payload_size_bytes": payload_size_bytes,
+        "corrupted_rate": corrupted_rate,
+        "mean_error_bits": np.mean(error_bits) if len(error_bits) > 0 else 0,
+        "undetected_rate": result["undetected"] / result["frames"],
+        "undetected_rate_random_crc": corrupted_rate / 256,
+        "undetected_two_bit_fraction": undetected_two_bit_fraction(frame_bytes),
+        "undetected_per_hour": packets_per_s * 3600 * max(result["undetected"] / result["frames"], corrupted_rate / 256),
+    })
+    return result
+
+
+def run_sweep(data_rates_bps, tolerances, noises, num_frames=1000, payload_size_bytes=100, packets_per_s=10, seed=0, jobs=None):
+    grid = [(r, t, n) for r in data_rates_bps for t in tolerances for n in noises]
+    seeds = np.random.SeedSequence(seed).spawn(len(grid))
+    points = [(r, t, n, num_frames, payload_size_bytes, packets_per_s, s) for (r, t, n), s in zip(grid, seeds)]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(_simulate_point, points))
+
+
+error_columns = ["data_rate_bps", "tolerance", "noise", "payload_size_bytes", "frames", "received", "corrupted", "bit_errors",
+                 "length_errors", "undetected", "corrupted_rate", "mean_error_bits", "undetected_rate",
+                 "undetected_rate_random_crc", "undetected_two_bit_fraction", "undetected_per_hour"]
+
+
+def write_errors(results, path):
+    with open(path, 'w') as file:
+        file.write(";".join(error_columns) + "\n")
+        for result in results:
+            file.write(";".join(str(result[c]) for c in error_columns) + "\n")
+
+    print("Saved error rates in file: " + path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Undetected error rate of the CRC-8 trailer on the simulated channel")
+    parser.add_argument("-r", "--data-rates", type=int, nargs="+", default=[20000, 30000, 35000], help="data rates in bit/s")
+    parser.add_argument("-t", "--tolerances", type=int, nargs="+", default=[vlc_receiver_tolerance], help="receiver tolerances in percent")
+    parser.add_argument("--noise", type=float, nargs="+", default=[0.5, 1, 2, 4], help="noise levels")
+    parser.add_argument("-n", "--frames", type=int, default=2000, help="frames per sweep point")
+    parser.add_argument("-p", "--payload", type=int, default=100, help="udp payload size in bytes")
+    parser.add_argument("--packet-rate", type=float, default=10, help="packets per second for the undetected frames per hour")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the random generators")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("-o", "--output", help="output csv file")
+    args = parser.parse_args()
+
+    frame_bytes = vlc_mac_header_bytes + args.payload + ipv6_udp_header_bytes + vlc_crc_bytes
+    print(f"syndrome period of polynom {vlc_crc_polynom:#x}: {syndrome_period()} bits, "
+          f"{undetected_two_bit_fraction(frame_bytes) * 100:.2f}% of the two bit errors in a {frame_bytes} byte frame undetected")
+
+    start = time.time()
+    results = run_sweep(args.data_rates, args.tolerances, args.noise, args.frames, args.payload, args.packet_rate, args.seed, args.jobs)
+    print(f"Simulated {len(results)} sweep points in {time.time() - start:.1f}s")
+    for r in results:
+        print(f"{r['data_rate_bps']:6d} bit/s, tolerance {r['tolerance']}%, noise {r['noise']}: {r['corrupted']} of {r['received']} "
+              f"received frames corrupted ({r['bit_errors']} bit errors, {r['length_errors']} length), {r['undetected']} undetected, "
+              f"about {r['undetected_per_hour']:.2f} undetected frames per hour")
+    if args.output:
+        write_errors(results, args.output)
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+
+import argparse
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from performance_model import (PerformanceModel, corpus_model_file, default_num_sync_symbols, effective_data_rate_bps,
+                               end_flag_bits, ipv6_udp_header_bytes, load_performance_model, symbol_half_period_us,
+                               vlc_crc_bytes, vlc_mac_header_bytes)
+from vlc_crc import crc8_batch
+from vlc_frame import stuffed_bits_per_byte
+from vlc_pcap import (all_nodes_multicast, ipv6_udp_packet, link_local_address, measurement_destination_port,
+                      measurement_source_port, read_ipv6_packets)
+
+# Encoding overhead of the Manchester sender for payload corpora
+#
+# _send_callback stuffs a 0 after six ones and resets the count of ones at every byte boundary, so the stuffed bits
+# of a frame are the sum of the stuffed bits of its bytes (vlc_frame.stuffed_bits_per_byte): one for the byte values
+# 0x7E, 0x7F and 0xFC..0xFF, none for the others. The air time depends on the content of the frame, while the
+# performance model has a constant extra_overhead_bytes.
+#
+# Corpora of UDP payloads are sent like udp_latency_client sends them: IPv6/UDP to the all nodes multicast address,
+# UDP checksum and CRC trailer of every frame are computed.
+#   random             random bytes, marker and packet number (random_payload=True)
+#   test               the test payload of measurements.c, bytes i % 256, marker and packet number (random_payload=False)
+#   zeros              zero bytes
+#   file:<path>        consecutive blocks of a file
+#   compressed:<path>  consecutive blocks of the zlib compressed file
+#   pcap:<path>        the IPv6 packets of a capture (pcap or pcapng), sent unchanged with their own sizes
+# The frames are processed in batches of whole arrays. Only the histograms of the stuffed bits and of the sent bits
+# per frame are kept, the distributions of the air time and the goodput of every data rate follow exactly from them.
+# The predictions use the performance model of the corpus (corpus_model), whose extra overhead holds the mean stuffing
+# of the corpus. --save-models stores it as performance_model_<corpus>.json, plots and sweeps select it with --model.
+
+corpus_names = ["random", "test", "zeros", "file", "compressed", "pcap"]
+
+_source = bytes([2, 0, 0, 0, 0, 1])
+_destination = bytes(6)
+_udp_offset = vlc_mac_header_bytes + 40
+
+
+# histograms of the stuffed and sent bits per frame of a corpus
+class OverheadAnalysis:
+    def __init__(self, name):
+        self.name = name
+        self.frames = 0
+        self.link_payload_bytes = 0
+        self.udp_payload_bytes = 0
+        self.stuffed_histogram = np.zeros(1, dtype=np.int64)
+        self.sent_bits_histogram = np.zeros(1, dtype=np.int64)
+
+    def __add_histogram(self, histogram, values):
+        counts = np.bincount(values)
+        if len(counts) > len(histogram):
+            histogram = np.concatenate([histogram, np.zeros(len(counts) - len(histogram), dtype=np.int64)])
+        histogram[:len(counts)] += counts
+        return histogram
+
+    # stuffed: stuffed bits per frame, frame_bytes: bytes of the frames including header and trailer
+    def add(self, stuffed, frame_bytes, udp_payload_bytes):
+        self.frames += len(stuffed)
+        self.link_payload_bytes += int(np.sum(frame_bytes)) - len(stuffed) * (vlc_mac_header_bytes + vlc_crc_bytes)
+        self.udp_payload_bytes += int(np.sum(udp_payload_bytes))
+        self.stuffed_histogram = self.__add_histogram(self.stuffed_histogram, stuffed)
+        self.sent_bits_histogram = self.__add_histogram(self.sent_bits_histogram, 8 * np.asarray(frame_bytes) + stuffed)
+
+    def mean_stuffed_bits(self):
+        return float(np.arange(len(self.stuffed_histogram)) @ self.stuffed_histogram / self.frames)
+
+    def stuffed_quantile(self, q):
+        cumulative = np.cumsum(self.stuffed_histogram) / self.frames
+        return int(np.searchsorted(cumulative, q))
+
+    # air times in us and their probabilities
+    def air_time_distribution_us(self, data_rate_bps, num_sync_symbols=default_num_sync_symbols):
+        bits = np.flatnonzero(self.sent_bits_histogram)
+        ticks = 2 * num_sync_symbols + 2 * bits + 2 * end_flag_bits + 1
+        return ticks * symbol_half_period_us(data_rate_bps), self.sent_bits_histogram[bits] / self.frames
+
+    # air time, goodput and prediction of one data rate, model: usually corpus_model(self, ...)
+    # the period of a frame is limited by the interval or by the busy link like in PerformanceModel.packet_period_s
+    def data_rate_summary(self, data_rate_bps, model, interval_us=0, num_sync_symbols=default_num_sync_symbols):
+        air_time_us, probabilities = self.air_time_distribution_us(data_rate_bps, num_sync_symbols)
+        mean_air_time_us = float(air_time_us @ probabilities)
+        cumulative = np.cumsum(probabilities)
+        period_us = np.maximum(interval_us + model.send_overhead_ms * 1000, air_time_us + model.link_gap_ms * 1000)
+        total_period_s = float(period_us @ probabilities) * self.frames / 1e6
+
+        # prediction of the model for the mean frame of the corpus
+        mean_udp_payload = self.udp_payload_bytes / self.frames
+        mean_link_payload = self.link_payload_bytes / self.frames
+        predicted_air_time_us = float(model.air_time_s(data_rate_bps, mean_link_payload, num_sync_symbols)) * 1e6
+        predicted_link_bps = float(mean_link_payload * 8 / model.packet_period_s(data_rate_bps, mean_udp_payload, interval_us,
+                                                                               num_sync_symbols))
+        goodput_link_bps = self.link_payload_bytes * 8 / total_period_s
+        return {
+            "corpus": self.name,
+            "data_rate_bps": data_rate_bps,
+            "frames": self.frames,
+            "mean_link_payload_bytes": mean_link_payload,
+            "mean_stuffed_bits": self.mean_stuffed_bits(),
+            "p99_stuffed_bits": self.stuffed_quantile(0.99),
+            "max_stuffed_bits": len(self.stuffed_histogram) - 1,
+            "mean_air_time_us": mean_air_time_us,
+            "p99_air_time_us": float(air_time_us[np.searchsorted(cumulative, 0.99)]),
+            "max_air_time_us": float(air_time_us[-1]),
+            "predicted_air_time_us": predicted_air_time_us,
+            "encoding_efficiency": mean_link_payload * 8 / (mean_air_time_us / 1e6 * effective_data_rate_bps(data_rate_bps)),
+            "goodput_link_bps": goodput_link_bps,
+            "goodput_udp_bps": self.udp_payload_bytes * 8 / total_period_s,
+            "predicted_goodput_link_bps": predicted_link_bps,
+            "prediction_error": predicted_link_bps / goodput_link_bps - 1,
+        }
+
+
+# performance model for the frames of a corpus: the constant extra overhead is replaced by the mean stuffed bits
+# reference: analysis of the payloads the base model was fitted with (random payloads of the measurements), its stuffed
+#            bits are part of the fitted extra overhead. None if base contains no stuffing.
+def corpus_model(analysis, base=None, reference=None):
+    if base == None:
+        base = PerformanceModel()
+    parameters = base.parameters()
+    other_overhead = base.extra_overhead_bytes
+    if reference != None:
+        other_overhead = max(other_overhead - reference.mean_stuffed_bits() / 8, 0.0)
+    parameters["extra_overhead_bytes"] = other_overhead + analysis.mean_stuffed_bits() / 8
+    return PerformanceModel(**parameters)
+
+
+## corpora ##
+
+# frames of udp payloads (2D uint8 array, one payload per row) as sent by udp_latency_client, one frame per row
+def udp_frames(payloads):
+    num_frames, payload_size = payloads.shape
+    template = (_source + _destination + ipv6_udp_packet(bytes(payload_size), link_local_address(_source), all_nodes_multicast,
+                                                          measurement_source_port, measurement_destination_port))
+    frames = np.empty((num_frames, len(template) + vlc_crc_bytes), dtype=np.uint8)
+    frames[:, :len(template)] = np.frombuffer(template, dtype=np.uint8)
+    frames[:, _udp_offset + 8:len(template)] = payloads
+
+    # UDP checksum: the template has the checksum of the zero payload, add the 16 bit words of the payload
+    base = ~struct.unpack(">H", template[_udp_offset + 6:_udp_offset + 8])[0] & 0xFFFF
+    words = payloads if payload_size % 2 == 0 else np.pad(payloads, ((0, 0), (0, 1)))
+    words = words.astype(np.uint64)
+    total = base + (words[:, 0::2] << 8).sum(axis=1) + words[:, 1::2].sum(axis=1)
+    while np.any(total > 0xFFFF):
+        total = (total & 0xFFFF) + (total >> 16)
+    checksum = ~total & 0xFFFF
+    checksum[checksum == 0] = 0xFFFF
+    frames[:, _udp_offset + 6] = checksum >> 8
+    frames[:, _udp_offset + 7] = checksum & 0xFF
+
+    frames[:, -1] = crc8_batch(frames[:, :-1])
+    return frames
+
+
+# marker 'M' and package number (4 bytes, little endian) at the end of the payloads, see measurements.c
+def _mark(payloads, first_packet):
+    numbers = (np.arange(len(payloads), dtype=np.uint64) + first_packet) & 0xFFFFFFFF
+    payloads[:, -5] = ord("M")
+    payloads[:, -4:] = numbers.astype("<u4").view(np.uint8).reshape(-1, 4)
+    return payloads
+
+
+def _file_blocks(path, block_size, compressed):
+    compressor = zlib.compressobj(9) if compressed else None
+    pending = b""
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(1024 * 1024)
+            if len(chunk) == 0:
+                break
+            pending += compressor.compress(chunk) if compressed else chunk
+            usable = len(pending) // block_size * block_size
+            if usable > 0:
+                yield np.frombuffer(pending[:usable], dtype=np.uint8).reshape(-1, block_size)
+                pending = pending[usable:]
+    if compressed:
+        pending += compressor.flush()
+    usable = len(pending) // block_size * block_size
+    if usable > 0:
+        yield np.frombuffer(pending[:usable], dtype=np.uint8).reshape(-1, block_size)
+
+
+# payload batches (2D uint8 arrays) of a corpus of udp payloads
+def _payload_batches(corpus, path, num_frames, payload_size_bytes, rng, batch_size):
+    if corpus in ("file", "compressed"):
+        sent = 0
+        for blocks in _file_blocks(path, payload_size_bytes, corpus == "compressed"):
+            for start in range(0, len(blocks), batch_size):
+                if sent >= num_frames:
+                    return
+                batch = blocks[start:start + min(batch_size, num_frames - sent)]
+                sent += len(batch)
+                yield batch
+        if sent == 0:
+            print(f"[WARNING] {path} is shorter than one payload of {payload_size_bytes} bytes")
+        return
+
+    assert corpus in ("random", "test", "zeros"), "unknown corpus: " + corpus
+    assert corpus == "zeros" or payload_size_bytes >= 5, "payload too small for the marker and package number"
+    for start in range(0, num_frames, batch_size):
+        count = min(batch_size, num_frames - start)
+        if corpus == "random":
+            yield _mark(rng.integers(0, 256, (count, payload_size_bytes), dtype=np.uint8), start)
+        elif corpus == "test":
+            test_payload = (np.arange(payload_size_bytes) % 256).astype(np.uint8)
+            yield _mark(np.tile(test_payload, (count, 1)), start)
+        else:
+            yield np.zeros((count, payload_size_bytes), dtype=np.uint8)
+
+
+def _analyze_packets(analysis, packets):
+    frames = [_source + _destination + p for p in packets]
+    crcs = crc8_batch(frames)
+    lengths = np.array([len(f) + vlc_crc_bytes for f in frames], dtype=np.int64)
+    data = np.frombuffer(b"".join(frames), dtype=np.uint8)
+    stuffed = stuffed_bits_per_byte[data].astype(np.int64)
+    starts = np.cumsum(lengths - vlc_crc_bytes) - (lengths - vlc_crc_bytes)
+    stuffed = np.add.reduceat(stuffed, starts) + stuffed_bits_per_byte[crcs]
+    # payload of UDP packets, 0 for other protocols
+    udp = np.array([p[6] == 17 for p in packets])
+    analysis.add(stuffed, lengths, np.where(udp, lengths - vlc_mac_header_bytes - vlc_crc_bytes - ipv6_udp_header_bytes, 0))
+
+
+# analysis of a corpus, spec: name of the corpus or name:path
+def analyze_corpus(spec, num_frames=100000, payload_size_bytes=100, seed=0, batch_size=50000):
+    corpus, _, path = spec.partition(":")
+    assert corpus in corpus_names, "unknown corpus: " + corpus
+    assert corpus not in ("file", "compressed", "pcap") or path != "", "corpus " + corpus + " needs a file: " + corpus + ":<path>"
+    analysis = OverheadAnalysis(spec)
+
+    if corpus == "pcap":
+        packets = []
+        for packet in read_ipv6_packets(path):
+            packets.append(packet)
+            if len(packets) >= batch_size:
+                _analyze_packets(analysis, packets)
+                packets = []
+            if analysis.frames + len(packets) >= num_frames:
+                break
+        if len(packets) > 0:
+            _analyze_packets(analysis, packets)
+        assert analysis.frames > 0, "no IPv6 packets in " + path
+        return analysis
+
+    rng = np.random.default_rng(seed)
+    for payloads in _payload_batches(corpus, path, num_frames, payload_size_bytes, rng, batch_size):
+        frames = udp_frames(payloads)
+        stuffed = stuffed_bits_per_byte[frames].sum(axis=1, dtype=np.int64)
+        analysis.add(stuffed, np.full(len(frames), frames.shape[1]), np.full(len(frames), payload_size_bytes))
+    assert analysis.frames > 0, "empty corpus: " + spec
+    return analysis
+
+
+overhead_columns = ["corpus", "data_rate_bps", "frames", "mean_link_payload_bytes", "mean_stuffed_bits", "p99_stuffed_bits",
+                    "max_stuffed_bits", "mean_air_time_us", "p99_air_time_us", "max_air_time_us", "predicted_air_time_us",
+                    "encoding_efficiency", "goodput_link_bps", "goodput_udp_bps", "predicted_goodput_link_bps",
+                    "prediction_error"]
+
+
+def write_overhead(results, path):
+    with open(path, 'w') as file:
+        file.write(";".join(overhead_columns) + "\n")
+        for result in results:
+            file.write(";".join(str(result[c]) for c in overhead_columns) + "\n")
+
+    print("Saved encoding overhead in file: " + path)
+
+
+# histogram of the stuffed bits per frame of every corpus (stuffed_bits;<corpus>...)
+def write_stuffing_histograms(analyses, path):
+    length = max(len(a.stuffed_histogram) for a in analyses)
+    with open(path, 'w') as file:
+        file.write(";".join(["stuffed_bits"] + [a.name for a in analyses]) + "\n")
+        for bits in range(length):
+            counts = [a.stuffed_histogram[bits] if bits < len(a.stuffed_histogram) else 0 for a in analyses]
+            file.write(";".join(str(v) for v in [bits] + counts) + "\n")
+
+    print("Saved stuffing histograms in file: " + path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bit stuffing overhead, air time and goodput of payload corpora")
+    parser.add_argument("corpora", nargs="*", default=["random", "test", "zeros"],
+                        help="corpora: random, test, zeros, file:<path>, compressed:<path>, pcap:<path>")
+    parser.add_argument("-n", "--frames", type=int, default=1000000, help="maximum number of frames per corpus")
+    parser.add_argument("-p", "--payload", type=int, default=100, help="udp payload size in bytes")
+    parser.add_argument("-r", "--data-rates", type=int, nargs="+", default=[10000, 20000, 30000, 35000], help="data rates in bit/s")
+    parser.add_argument("-i", "--interval", type=int, default=0, help="send interval in us, 0 for a saturated link")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the random payloads")
+    parser.add_argument("-o", "--output", help="output csv file, the histograms are written to <output>_stuffing.csv")
+    parser.add_argument("--save-models", action="store_true",
+                        help="save the performance model of every corpus as performance_model_<corpus>.json")
+    args = parser.parse_args()
+
+    base = load_performance_model()
+    # the fitted extra overhead contains the stuffing of the random payloads of the measurements
+    reference = analyze_corpus("random", 100000, args.payload, args.seed)
+
+    analyses = []
+    results = []
+    for spec in args.corpora:
+        start = time.time()
+        analysis = analyze_corpus(spec, args.frames, args.payload, args.seed)
+        analyses.append(analysis)
+        print(f"{spec}: {analysis.frames} frames in {time.time() - start:.1f}s, stuffed bits per frame: "
+              f"mean {analysis.mean_stuffed_bits():.2f}, 99% {analysis.stuffed_quantile(0.99)}, "
+              f"max {len(analysis.stuffed_histogram) - 1}")
+
+        model = corpus_model(analysis, base, reference)
+        print(f"  extra_overhead_bytes for this corpus: {model.extra_overhead_bytes:.3f} (model: {base.extra_overhead_bytes:.3f})")
+        if args.save_models:
+            model.save(corpus_model_file(spec))
+            print("  Saved model of the corpus in file: " + corpus_model_file(spec))
+        for rate in args.data_rates:
+            r = analysis.data_rate_summary(rate, model, args.interval)
+            results.append(r)
+            print(f"  {rate:6d} bit/s: air time {r['mean_air_time_us'] / 1000:7.3f} ms (99% {r['p99_air_time_us'] / 1000:7.3f} ms), "
+                  f"goodput link {r['goodput_link_bps'] / 1000:6.2f} kbit/s, udp {r['goodput_udp_bps'] / 1000:6.2f} kbit/s, "
+                  f"model {r['predicted_goodput_link_bps'] / 1000:6.2f} kbit/s ({r['prediction_error'] * 100:+.2f}%)")
+
+    if args.output:
+        write_overhead(results, args.output)
+        write_stuffing_histograms(analyses, args.output.rsplit(".", 1)[0] + "_stuffing.csv")
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import measurement_catalog
+import measurement_files
+import measurement_validation
+import measurements
+import performance_model
+import plot_engine
+import time_series
+from plot_engine import TableSpec, input_files, render_figure, render_table
+
+# Incremental build of the figures and derived tables
+#
+# Every figure or table is a node of the build graph. A node depends on
+#   - the content of its measurement files (the directory listing is part of it, added or removed runs count),
+#   - its spec (all parameters of the FigureSpec/TableSpec),
+#   - the code version of the engine (loader, aggregation and rendering modules),
+#   - its output files.
+# The dependencies of the last successful build are stored in the output directory.
+# Only stale nodes are rendered again, independent nodes in parallel worker processes.
+
+build_state_file = ".build_state.json"
+
+# modules whose source defines how a node is rendered
+_engine_modules = [plot_engine, measurement_files, measurements, performance_model, time_series, measurement_catalog, measurement_validation]
+
+
+# sha256 of a file
+def _file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# stable description of a spec and its inputs and layers
+def _describe(value):
+    if isinstance(value, dict):
+        return {str(k): _describe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_describe(v) for v in value]
+    if hasattr(value, "__dict__"):
+        return {type(value).__name__: {k: _describe(v) for k, v in sorted(vars(value).items())}}
+    if value == None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+def spec_hash(spec):
+    description = json.dumps(_describe(spec), sort_keys=True)
+    return hashlib.sha256(description.encode('UTF-8')).hexdigest()
+
+
+# hash of the engine sources and the performance model of the expected values
+def code_hash(model_file=performance_model.default_model_file):
+    h = hashlib.sha256()
+    for path in [m.__file__ for m in _engine_modules] + [model_file]:
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                h.update(file.read())
+    return h.hexdigest()
+
+
+# render one node in a worker process
+def _render_node(spec, measurement_path, output_dir, formats, model_file):
+    plot_engine.set_performance_model(model_file)
+    if isinstance(spec, TableSpec):
+        return render_table(spec, measurement_path, output_dir)
+    return render_figure(spec, measurement_path, output_dir, formats)
+
+
+class FigureBuild:
+
+    # specs: FigureSpecs and TableSpecs, names must be unique
+    # model_file: performance model of the expected values, e.g. performance_model_<corpus>.json
+    def __init__(self, specs, measurement_path, output_dir, formats=("pdf",), model_file=performance_model.default_model_file):
+        names = [s.name for s in specs]
+        assert len(names) == len(set(names)), "node names must be unique"
+
+        self.__specs = specs
+        self.__measurement_path = measurement_path
+        self.__output_dir = output_dir
+        self.__formats = tuple(formats)
+        self.__model_file = model_file
+
+        self.__state_path = os.path.join(output_dir, build_state_file)
+        # nodes: name -> recorded dependencies of the last successful build
+        # files: path -> [size, mtime_ns, sha256], avoids hashing unchanged files again
+        self.__state = {"nodes": {}, "files": {}}
+        if os.path.exists(self.__state_path):
+            with open(self.__state_path, 'r') as file:
+                self.__state = json.load(file)
+
+        self.__code_hash = code_hash(model_file)
+
+    # content hash of a measurement file, only rehashed if size or modification time changed
+    def __input_hash(self, path):
+        stat = os.stat(path)
+        cached = self.__state["files"].get(path)
+        if cached != None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        digest = _file_hash(path)
+        self.__state["files"][path] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def __output_paths(self, spec):
+        if isinstance(spec, TableSpec):
+            return [os.path.join(self.__output_dir, spec.name + ".csv")]
+        return [os.path.join(self.__output_dir, spec.name + "." + f) for f in self.__formats]
+
+    # current dependencies of a node
+    def dependencies(self, spec):
+        inputs = {}
+        for path, _, _ in input_files(spec, self.__measurement_path):
+            inputs[path] = self.__input_hash(path)
+
+        return {
+            "inputs": inputs,
+            "spec": spec_hash(spec),
+            "code": self.__code_hash,
+            "outputs": self.__output_paths(spec),
+        }
+
+    # reason why a node must be rebuilt, None if it is up to date
+    def stale_reason(self, spec, dependencies):
+        recorded = self.__state["nodes"].get(spec.name)
+        if recorded == None:
+            return "new"
+        if recorded["code"] != dependencies["code"]:
+            return "code changed"
+        if recorded["spec"] != dependencies["spec"]:
+            return "spec changed"
+        for path in dependencies["outputs"]:
+            if path not in recorded["outputs"] or not os.path.exists(path):
+                return "output missing"
+
+        added = [p for p in dependencies["inputs"] if p not in recorded["inputs"]]
+        removed = [p for p in recorded["inputs"] if p not in dependencies["inputs"]]
+        changed = [p for p in dependencies["inputs"] if p in recorded["inputs"] and recorded["inputs"][p] != dependencies["inputs"][p]]
+        if added or removed or changed:
+            return f"inputs changed ({len(added)} added, {len(removed)} removed, {len(changed)} modified)"
+
+        return None
+
+    def __save_state(self):
+        os.makedirs(self.__output_dir, exist_ok=True)
+        tmp_path = self.__state_path + ".tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(self.__state, file)
+        os.replace(tmp_path, self.__state_path)
+
+    # render all stale nodes, force rebuilds all nodes
+    # jobs: number of worker processes, None uses all cores
+    # returns (rebuilt names, failed names, up to date names)
+    def build(self, jobs=None, force=False):
+        if jobs == None:
+            jobs = os.cpu_count()
+
+        stale = []
+        up_to_date = []
+        rebuilt = []
+        failed = []
+        for spec in self.__specs:
+            try:
+                dependencies = self.dependencies(spec)
+            except OSError as e:
+                print("[ERROR] cannot read inputs of " + spec.name)
+                print(e)
+                failed.append(spec.name)
+                continue
+
+            reason = "forced" if force else self.stale_reason(spec, dependencies)
+            if reason == None:
+                up_to_date.append(spec.name)
+            else:
+                print(f"[INFO] {spec.name}: {reason}")
+                stale.append((spec, dependencies))
+
+        if len(stale) > 0:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(stale))) as executor:
+                futures = {}
+                for spec, dependencies in stale:
+                    future = executor.submit(_render_node, spec, self.__measurement_path, self.__output_dir, self.__formats,
+                                             self.__model_file)
+                    futures[future] = (spec, dependencies)
+
+                for future in as_completed(futures):
+                    spec, dependencies = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print("[ERROR] cannot render " + spec.name)
+                        print(e)
+                        failed.append(spec.name)
+                        # render again on the next build
+                        self.__state["nodes"].pop(spec.name, None)
+                        continue
+
+                    self.__state["nodes"][spec.name] = dependencies
+                    rebuilt.append(spec.name)
+                    print("[INFO] rendered " + spec.name)
+
+        self.__save_state()
+
+        return rebuilt, failed, up_to_date
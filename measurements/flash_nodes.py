@@ -8,27 +8,50 @@ from threading import Thread, Lock
 flash_failed = False
 status_lock = Lock()
 
-def build_source():
+# RIOT application of the measurement firmware (measurements/mcu)
+flash_dir = "/home/tim/Bachelorarbeit/Code/measurements"
+
+# stack: network stack of the nodes (see measurements.network_stacks), 6LoWPAN adds the module gnrc_sixlowpan_default
+# (IPHC and fragmentation) to the USEMODULE of the application Makefile
+def build_source(stack="ipv6"):
     cmd = [
         "make", "all", "-j", "2"
     ]
 
-    print("Start compiling...")
-    flash_dir = "/home/tim/Bachelorarbeit/Code/measurements"
-    p = subprocess.Popen(cmd, cwd=flash_dir, stdout=open(os.devnull, "w"))
+    env = dict(os.environ)
+    if stack == "sixlowpan":
+        env["USEMODULE"] = (env.get("USEMODULE", "") + " gnrc_sixlowpan_default").strip()
+
+    print(f"Start compiling ({stack})...")
+    p = subprocess.Popen(cmd, cwd=flash_dir, stdout=open(os.devnull, "w"), env=env)
     p.wait()
 
     assert p.returncode == 0, "compile error"
     print("Compiled successfully")
 
 
+# git commit of the firmware sources (short hash, "-dirty" with uncommitted changes), None if not available
+def firmware_hash():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short=12", "HEAD"], cwd=flash_dir, capture_output=True, text=True)
+        if commit.returncode != 0:
+            return None
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=flash_dir,
+                                capture_output=True, text=True)
+    except OSError:
+        return None
+
+    if status.stdout.strip() != "":
+        return commit.stdout.strip() + "-dirty"
+    return commit.stdout.strip()
+
+
 # returns return code of make flash 
 def flash_node(number):
     device = "r"
     if (number == 0):
         device = "s"
 
-    flash_dir = "/home/tim/Bachelorarbeit/Code/measurements"
     cmd = [
         "make", "flash", "-j", "2"
         "PORT=\"/dev/ttyACM" + str(number) + "\"",
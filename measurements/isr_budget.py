@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from channel_simulator import (ChannelModel, default_isr_skip_duration_us, default_threshold, measured_delivery,
+                               simulate_delivery)
+from logic_capture import analyze_capture, isr_claim_us
+from measurements import measurement_path
+from performance_model import default_num_sync_symbols, ipv6_udp_header_bytes
+from vlc_decoder import vlc_receiver_tolerance
+from vlc_frame import build_frame, encode_frames
+
+# Timing budget of the receiver ISR (_interrupt_changing_edge) per data rate
+#
+# The ISR duration is a distribution: measured with logic_capture (capture or histogram file), estimated from a
+# cycle count of the ISR, or the 16 us of the comment in vlc_manchester_receive.c.
+# The edges arrive at the ISR with the delays of the receiver circuit (rise_delay_us, fall_delay_us of the channel),
+# the densest edges are the sync symbols and the edges at bit boundaries (half a symbol apart). The edge intervals
+# are taken from encoded frames, so the sync edges and the bits stuffed into the payload are counted.
+#
+# worst case:    the edges of the frames are served like in the channel simulator, the edges which read a bit take the
+#                longest ISR of the distribution, the others the short path of the channel (isr_skip_duration_us). An
+#                edge which arrives while the ISR is running is timestamped late, relative to the last bit edge it
+#                must stay in the tolerance window: a bit edge within tolerance * symbol, an edge in between below
+#                (1 - tolerance) * symbol, both less |fall - rise| and the 1 us timer resolution. An overrun is an edge
+#                which is later or lost (two edges during one ISR), the worst case is ok without overruns.
+# probabilistic: the frame error rate of the channel simulator with ISR durations drawn from the distribution. The
+#                simulation also adds the interrupt latency jitter, which is not bounded and therefore not in the
+#                worst case.
+# The maximum data rate is the highest rate of the sweep whose simulated frame error rate meets the target. It is
+# only recommended for the firmware if the model reproduces a measured datarate sweep (--measured), the rms error of
+# the simulated reliability must be at most max_calibration_error.
+
+timer_resolution_us = 1
+max_calibration_error = 0.05
+
+
+# ISR duration distribution: (durations in us, probabilities)
+def constant_distribution(duration_us):
+    return np.array([float(duration_us)]), np.array([1.0])
+
+
+# from cycles of the ISR (e.g. counted in the disassembly) and the CPU clock, jitter in cycles is uniform
+def cycle_distribution(cycles, cpu_mhz, jitter_cycles=0):
+    cycles = np.arange(cycles, cycles + jitter_cycles + 1)
+    return cycles / cpu_mhz, np.full(len(cycles), 1 / len(cycles))
+
+
+# from a logic_capture.WidthHistogram, every bin is represented by its center
+def histogram_distribution(histogram):
+    used = np.flatnonzero(histogram.counts)
+    assert len(used) > 0, "no ISR pulses in the histogram"
+    return (used + 0.5) * histogram.bin_us, histogram.counts[used] / histogram.counts[used].sum()
+
+
+# from a histogram file written by logic_capture.py (width_us;count)
+def read_histogram_distribution(path):
+    data = np.loadtxt(path, delimiter=";", skiprows=1, ndmin=2)
+    bin_us = np.min(np.diff(data[:, 0]))
+    data = data[data[:, 1] > 0]
+    assert len(data) > 0, "no ISR pulses in " + path
+    return data[:, 0] + bin_us / 2, data[:, 1] / data[:, 1].sum()
+
+
+# intervals between the edges at the ISR of a batch of encoded frames
+def edge_intervals_us(encoded, rise_delay_us, fall_delay_us):
+    times = encoded.edge_times_us + np.where(encoded.edge_levels == 1, rise_delay_us, fall_delay_us)
+    intervals = np.diff(times)
+    # drop the intervals between two frames
+    first = encoded.edge_offsets[1:-1]
+    return np.delete(intervals, first[first < len(intervals)] - 1)
+
+
+def frame_batch(num_frames, payload_size_bytes, rng):
+    # random payloads and one payload of stuffed bits only
+    frames = [build_frame(rng.integers(0, 256, payload_size_bytes + ipv6_udp_header_bytes).astype(np.uint8).tobytes())
+              for _ in range(num_frames - 1)]
+    return frames + [build_frame(bytes([0xFF] * (payload_size_bytes + ipv6_udp_header_bytes)))]
+
+
+# lateness of the edges of a batch of encoded frames in the worst case, lanes in lockstep
+# returns (lateness relative to the last bit edge in us, inf for a lost edge; edge reads a bit)
+def worst_case_lateness(encoded, channel, isr_max_us):
+    arrivals = encoded.edge_times_us + np.where(encoded.edge_levels == 1, channel.rise_delay_us, channel.fall_delay_us)
+    n = len(encoded)
+    lengths = np.diff(encoded.edge_offsets)
+    max_length = int(lengths.max()) if n > 0 else 0
+    lane_index = np.repeat(np.arange(n), lengths)
+    column = np.arange(len(arrivals)) - encoded.edge_offsets[lane_index]
+    padded = np.zeros((n, max_length))
+    padded[lane_index, column] = arrivals
+
+    late = np.full((n, max_length), np.inf)
+    reads_bit = np.zeros((n, max_length), dtype=bool)
+    busy_until = np.full(n, -np.inf)
+    last_bit_edge = np.full(n, -np.inf)
+    last_bit_late = np.zeros(n)
+    pending = np.full(n, -1)
+
+    def serve(lanes, columns, start):
+        bit = start - last_bit_edge[lanes] >= 1.5 * encoded.half_period_us
+        delay = start - padded[lanes, columns]
+        late[lanes, columns] = delay - last_bit_late[lanes]
+        reads_bit[lanes, columns] = bit
+        last_bit_edge[lanes[bit]] = start[bit]
+        last_bit_late[lanes[bit]] = delay[bit]
+        busy_until[lanes] = start + np.where(bit, isr_max_us, channel.isr_skip_duration_us)
+
+    for j in range(max_length + 1):
+        active = lengths > j
+        t = padded[:, j] if j < max_length else np.full(n, np.inf)
+
+        # pending edge is served when the ISR returns
+        lanes = np.flatnonzero((pending >= 0) & (busy_until <= t))
+        serve(lanes, pending[lanes], busy_until[lanes].copy())
+        pending[lanes] = -1
+
+        idle = active & (busy_until <= t)
+        lanes = np.flatnonzero(idle)
+        serve(lanes, np.full(len(lanes), j), t[lanes])
+        # a further edge during the ISR is lost (stays inf)
+        pending[active & ~idle & (pending < 0)] = j
+
+    return late[lane_index, column], reads_bit[lane_index, column]
+
+
+# analytical budget of one data rate
+def timing_budget(data_rate_bps, distribution, channel, tolerance=vlc_receiver_tolerance,
+                  num_sync_symbols=default_num_sync_symbols, frames=None):
+    durations_us, probabilities = distribution
+    encoded = encode_frames(frames, data_rate_bps, num_sync_symbols)
+    intervals = edge_intervals_us(encoded, channel.rise_delay_us, channel.fall_delay_us)
+    symbol_us = 2 * encoded.half_period_us
+
+    distortion_us = abs(channel.fall_delay_us - channel.rise_delay_us) + timer_resolution_us
+    bit_slack_us = tolerance / 100 * symbol_us - distortion_us
+    between_slack_us = (0.5 - tolerance / 100) * symbol_us - distortion_us
+    late_us, reads_bit = worst_case_lateness(encoded, channel, durations_us.max())
+    overruns = np.count_nonzero(late_us > np.where(reads_bit, bit_slack_us, between_slack_us))
+    served_bits = late_us[reads_bit & np.isfinite(late_us)]
+
+    return {
+        "data_rate_bps": data_rate_bps,
+        "symbol_us": symbol_us,
+        "edges_per_frame": len(encoded.edge_times_us) / len(encoded),
+        "stuffed_bits_per_frame": encoded.stuffed_bits.mean(),
+        "min_interval_us": float(intervals.min()),
+        "isr_max_us": float(durations_us.max()),
+        "max_bit_lateness_us": float(served_bits.max()) if len(served_bits) > 0 else 0.0,
+        "tolerance_slack_us": float(bit_slack_us),
+        "delayed_edges_per_frame": np.count_nonzero(late_us > 0) / len(encoded),
+        "overruns_per_frame": overruns / len(encoded),
+        "worst_case_ok": bool(overruns == 0),
+    }
+
+
+def _budget_point(point):
+    data_rate_bps, distribution, channel, tolerance, num_sync_symbols, num_frames, payload_size_bytes, seed = point
+    rng = np.random.default_rng(seed)
+    result = timing_budget(data_rate_bps, distribution, channel, tolerance, num_sync_symbols,
+                           frame_batch(min(num_frames, 100), payload_size_bytes, rng))
+    delivery = simulate_delivery(data_rate_bps, tolerance, channel, num_frames, payload_size_bytes, num_sync_symbols, seed=rng)
+    result["frame_error_rate"] = 1 - delivery["reliability_link"]
+    return result
+
+
+# budget and simulated frame error rate of every data rate, in worker processes
+def run_budget(data_rates_bps, distribution, channel, tolerance=vlc_receiver_tolerance, num_sync_symbols=default_num_sync_symbols,
+               num_frames=500, payload_size_bytes=100, seed=0, jobs=None):
+    seeds = np.random.SeedSequence(seed).spawn(len(data_rates_bps))
+    points = [(r, distribution, channel, tolerance, num_sync_symbols, num_frames, payload_size_bytes, s)
+              for r, s in zip(data_rates_bps, seeds)]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(_budget_point, points))
+
+
+def _measured_point(point):
+    data_rate_bps, payload_size_bytes, channel, tolerance, num_frames, seed = point
+    return simulate_delivery(data_rate_bps, tolerance, channel, num_frames, payload_size_bytes, seed=seed)["reliability_link"]
+
+
+# rms error of the simulated reliability of the channel to a measured datarate sweep (see measured_delivery)
+def calibration_error(measured, channel, tolerance=vlc_receiver_tolerance, num_frames=200, seed=0, jobs=None):
+    assert len(measured) > 0, "no measured runs with a data rate"
+    seeds = np.random.SeedSequence(seed).spawn(len(measured))
+    points = [(r, p, channel, tolerance, num_frames, s) for (r, p, _), s in zip(measured, seeds)]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        simulated = list(executor.map(_measured_point, points))
+    return float(np.sqrt(np.mean([(s - reliability) ** 2 for s, (_, _, reliability) in zip(simulated, measured)])))
+
+
+# highest data rate with a frame error rate <= target, None if no rate meets it
+def max_data_rate(results, target_frame_error_rate):
+    passing = [r["data_rate_bps"] for r in results if r["frame_error_rate"] <= target_frame_error_rate]
+    return max(passing) if len(passing) > 0 else None
+
+
+budget_columns = ["data_rate_bps", "symbol_us", "edges_per_frame", "stuffed_bits_per_frame", "min_interval_us", "isr_max_us",
+                  "max_bit_lateness_us", "tolerance_slack_us", "delayed_edges_per_frame", "overruns_per_frame", "worst_case_ok",
+                  "frame_error_rate"]
+
+
+def write_budget(results, path):
+    with open(path, 'w') as file:
+        file.write(";".join(budget_columns) + "\n")
+        for result in results:
+            file.write(";".join(str(result[c]) for c in budget_columns) + "\n")
+
+    print("Saved budget in file: " + path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Timing budget of the receiver ISR and maximum data rate")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--capture", help="logic analyzer capture with DEBUG_OUT_PIN_INTERRUPT_RECV")
+    source.add_argument("--histogram", help="ISR histogram file of logic_capture.py")
+    source.add_argument("--cycles", type=int, help="cycles of the ISR")
+    source.add_argument("--isr-us", type=float, default=isr_claim_us, help="constant ISR duration in us")
+    parser.add_argument("--pin", default="D0", help="channel of the ISR pin in the capture")
+    parser.add_argument("--cpu-mhz", type=float, default=64, help="CPU clock for --cycles")
+    parser.add_argument("--jitter-cycles", type=int, default=0, help="jitter of the ISR in cycles for --cycles")
+    parser.add_argument("--threshold", type=float, default=default_threshold, help="comparator threshold of the receiver")
+    parser.add_argument("--rise", type=float, help="rise delay of the receiver in us (default from the threshold)")
+    parser.add_argument("--fall", type=float, help="fall delay of the receiver in us (default from the threshold)")
+    parser.add_argument("--isr-skip-us", type=float, default=default_isr_skip_duration_us, help="ISR of an edge which does not read a bit in us")
+    parser.add_argument("--latency-jitter", type=float, default=0.2, help="mean interrupt latency jitter in us")
+    parser.add_argument("-t", "--tolerance", type=int, default=vlc_receiver_tolerance, help="receiver tolerance in percent")
+    parser.add_argument("-r", "--data-rates", type=int, nargs="+", default=list(range(10000, 50000 + 2000, 2000)), help="data rates in bit/s")
+    parser.add_argument("-f", "--target-fer", type=float, default=0.01, help="target frame error rate")
+    parser.add_argument("-n", "--frames", type=int, default=500, help="simulated frames per data rate")
+    parser.add_argument("-p", "--payload", type=int, default=100, help="udp payload size in bytes")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the random generators")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("-m", "--measured", help="measured datarate sweep the model has to reproduce for a recommendation")
+    parser.add_argument("-o", "--output", help="output csv file")
+    args = parser.parse_args()
+
+    if args.capture:
+        distribution = histogram_distribution(analyze_capture(args.capture, {"interrupt_recv": args.pin}).isr_widths["interrupt_recv"])
+    elif args.histogram:
+        distribution = read_histogram_distribution(args.histogram)
+    elif args.cycles:
+        distribution = cycle_distribution(args.cycles, args.cpu_mhz, args.jitter_cycles)
+    else:
+        distribution = constant_distribution(args.isr_us)
+    channel = ChannelModel(rise_delay_us=args.rise, fall_delay_us=args.fall, threshold=args.threshold,
+                           isr_skip_duration_us=args.isr_skip_us, isr_latency_jitter_us=args.latency_jitter,
+                           isr_duration_distribution=distribution)
+
+    start = time.time()
+    results = run_budget(args.data_rates, distribution, channel, args.tolerance, num_frames=args.frames,
+                         payload_size_bytes=args.payload, seed=args.seed, jobs=args.jobs)
+    print(f"Analyzed {len(results)} data rates in {time.time() - start:.1f}s")
+    for r in results:
+        print(f"{r['data_rate_bps']:6d} bit/s: bit edge late {r['max_bit_lateness_us']:5.1f} us of {r['tolerance_slack_us']:5.1f} us, "
+              f"{r['delayed_edges_per_frame']:7.1f} delayed edges/frame, {r['overruns_per_frame']:7.1f} overruns/frame, "
+              f"worst case {'ok' if r['worst_case_ok'] else 'fails'}, FER {r['frame_error_rate']:.3f}")
+    if args.output:
+        write_budget(results, args.output)
+
+    rate = max_data_rate(results, args.target_fer)
+    if rate == None:
+        print(f"no data rate meets the frame error rate {args.target_fer}")
+        sys.exit(0)
+    print(f"maximum simulated data rate with frame error rate <= {args.target_fer}: {rate} bit/s")
+
+    if args.measured == None:
+        print("no recommendation for the firmware: the model is not checked against a measured sweep (--measured)")
+        sys.exit(0)
+    directory = args.measured if os.path.isabs(args.measured) else os.path.join(measurement_path, args.measured)
+    error = calibration_error(measured_delivery(directory, args.jobs), channel, args.tolerance, seed=args.seed, jobs=args.jobs)
+    if error > max_calibration_error:
+        print(f"no recommendation for the firmware: rms error {error:.3f} of the reliability of {args.measured} "
+              f"> {max_calibration_error}, calibrate the channel first (channel_simulator.py --calibrate)")
+    else:
+        print(f"model reproduces {args.measured} (rms error {error:.3f}): #define DATARATE_BITS_PER_SECOND {rate}")
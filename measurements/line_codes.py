@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+
+import argparse
+import copy
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from channel_simulator import default_isr_skip_duration_us, default_threshold, noise_channel, simulate_channel
+from performance_model import default_num_sync_symbols, ipv6_udp_header_bytes, symbol_half_period_us, vlc_crc_bytes, vlc_mac_header_bytes
+from vlc_decoder import decode_edges, vlc_receiver_tolerance
+from vlc_frame import build_frame, check_frame, encode_frames, encode_levels
+
+# Line codes for the VLC PHY, evaluated with the same channel simulator
+#
+# The baseline is the firmware: Manchester with bit stuffing and end flag (vlc_frame, vlc_decoder), two ticks per bit.
+# The alternatives send the chips of a block or run length limited code, one tick per chip, as levels (NRZ) or as
+# transitions (NRZI, a 1 toggles the LED):
+#   4b5b      4B5B of 100BASE-FX with NRZI, 1.25 chips per bit, runs of 1..4 chips. The LED is on or off, so the
+#             three level MLT-3 of 100BASE-TX is not possible, NRZI is its two level counterpart.
+#   8b10b     8b10b with running disparity, NRZ, 1.25 chips per bit, runs of 1..5 chips, DC balanced
+#   rll27     (2,7) RLL of IBM with NRZI, 2 chips per bit, runs of 3..8 chips: a chip is a third of the shortest pulse
+# The codes are compared at the same shortest pulse of the LED (pulse_us, the half symbol of Manchester at a data
+# rate), the chip of a code is pulse_us / min_run truncated to whole us like the sender timer.
+# Frame of the alternatives: preamble (2 * num_sync_symbols runs of min_run chips), start delimiter of the code,
+# the coded length (2 bytes) and the frame of vlc_netif (mac header, payload, crc). The LED is switched off after a
+# final pulse, so the last run ends with an edge.
+#
+# The reference receiver of the alternatives only uses the edge timestamps of the ISR like _interrupt_changing_edge:
+# the preamble gives the length of the high and low pulses, their difference is the asymmetric delay of the receiver
+# circuit which is subtracted from all runs. Every interval is rounded to a number of chips, it must be within the
+# tolerance (percent of a chip) and the run limits of the code. The chips are searched for the delimiter and decoded.
+# Decoder cost: ISR calls per byte (edges) and the size of the decoder tables.
+
+_length_bytes = 2
+
+
+class LineCode:
+    name = None
+    # chips are transitions instead of levels
+    nrzi = False
+    # shortest and longest run of equal levels in chips (including preamble and delimiter)
+    min_run = 1
+    max_run = 1
+    # bytes of the lookup tables of a decoder
+    table_bytes = 0
+    delimiter = ""
+    # every edge carries chips, so the ISR of every edge takes the long path (isr_duration_us of the channel)
+    every_edge_decoded = True
+
+    def preamble(self, num_sync_symbols):
+        if self.nrzi:
+            return ("1" + "0" * (self.min_run - 1)) * 2 * num_sync_symbols
+        return ("1" * self.min_run + "0" * self.min_run) * num_sync_symbols
+
+    # chips of bytes (uint8 array)
+    def encode_bytes(self, data):
+        raise NotImplementedError
+
+    # bytes of chips (uint8 array), stops at the first invalid code word
+    def decode_chips(self, chips):
+        raise NotImplementedError
+
+    # batch of frames -> EncodedFrames
+    def encode(self, frames, pulse_us, num_sync_symbols=default_num_sync_symbols):
+        chip_us = int(pulse_us) // self.min_run
+        assert chip_us > 0, "pulse too short for timer clocked at 1MHz"
+        head = _chips(self.preamble(num_sync_symbols) + self.delimiter)
+
+        levels = []
+        for frame in frames:
+            stream = np.frombuffer(len(frame).to_bytes(_length_bytes, "big") + bytes(frame), dtype=np.uint8)
+            chips = np.concatenate([head, self.encode_bytes(stream)])
+            frame_levels = (np.cumsum(chips) % 2).astype(np.uint8) if self.nrzi else chips
+            # final pulse so the last run ends with an edge, then the LED is off
+            tail = np.ones(self.min_run, dtype=np.uint8) if frame_levels[-1] == 0 else np.zeros(0, dtype=np.uint8)
+            levels.append(np.concatenate([frame_levels, tail, [0]]).astype(np.uint8))
+
+        tick_offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+        np.cumsum([len(l) for l in levels], out=tick_offsets[1:])
+        return encode_levels(np.concatenate(levels), tick_offsets, chip_us)
+
+    # ISR timestamps of the lanes -> (frame or None, synchronized) of every lane
+    def decode(self, edge_times_us, edge_offsets, tolerance=vlc_receiver_tolerance, num_sync_symbols=default_num_sync_symbols):
+        results = []
+        for lane in range(len(edge_offsets) - 1):
+            times = edge_times_us[edge_offsets[lane]:edge_offsets[lane + 1]].astype(float)
+            results.append(self.__decode_lane(times, tolerance, num_sync_symbols))
+        return results
+
+    def __decode_lane(self, times, tolerance, num_sync_symbols):
+        intervals = np.diff(times)
+        num_preamble = 2 * num_sync_symbols - 1
+        for start in range(len(intervals) - num_preamble + 1):
+            high = intervals[start:start + num_preamble:2]
+            low = intervals[start + 1:start + num_preamble:2]
+            pulse_us = (high.mean() + low.mean()) / 2
+            window_us = tolerance / 100 * pulse_us
+            if np.all(np.abs(high - high.mean()) <= window_us) and np.all(np.abs(low - low.mean()) <= window_us):
+                break
+        else:
+            return None, False
+
+        # runs of chips, high runs are stretched by the asymmetric delay, low runs shortened
+        asymmetry_us = (high.mean() - low.mean()) / 2
+        chip_us = pulse_us / self.min_run
+        runs_us = intervals[start:] - np.where(np.arange(len(intervals) - start) % 2 == 0, asymmetry_us, -asymmetry_us)
+        runs = np.rint(runs_us / chip_us).astype(np.int64)
+        invalid = (runs < self.min_run) | (runs > self.max_run) | (np.abs(runs_us - runs * chip_us) > tolerance / 100 * chip_us)
+        if np.any(invalid):
+            runs = runs[:np.argmax(invalid)]
+
+        if self.nrzi:
+            chips = np.zeros(runs.sum(), dtype=np.uint8)
+            chips[np.cumsum(runs) - runs] = 1
+        else:
+            chips = np.repeat((np.arange(len(runs)) % 2 == 0).astype(np.uint8), runs)
+
+        search = len(self.preamble(num_sync_symbols)) + 2 * len(self.delimiter)
+        position = chips[:search].tobytes().find(_chips(self.delimiter).tobytes())
+        if position < 0:
+            return None, False
+        data = self.decode_chips(chips[position + len(self.delimiter):])
+        if len(data) < _length_bytes:
+            return None, True
+        length = int.from_bytes(data[:_length_bytes].tobytes(), "big")
+        if len(data) < _length_bytes + length:
+            return None, True
+        return data[_length_bytes:_length_bytes + length].tobytes(), True
+
+
+def _chips(text):
+    return np.frombuffer(text.encode(), dtype=np.uint8) - ord("0")
+
+
+def _bits_to_int(chips, width):
+    return chips[:len(chips) // width * width].reshape(-1, width) @ (1 << np.arange(width - 1, -1, -1))
+
+
+class Code4b5b(LineCode):
+    name = "4b5b"
+    nrzi = True
+    min_run = 1
+    max_run = 4
+    table_bytes = 32
+    # J K
+    delimiter = "1100010001"
+    code_words = ["11110", "01001", "10100", "10101", "01010", "01011", "01110", "01111",
+                  "10010", "10011", "10110", "10111", "11010", "11011", "11100", "11101"]
+
+    def __init__(self):
+        self.__encode = np.array([_chips(w) for w in self.code_words])
+        self.__decode = np.full(32, -1, dtype=np.int64)
+        for value, word in enumerate(self.code_words):
+            self.__decode[int(word, 2)] = value
+
+    def encode_bytes(self, data):
+        nibbles = np.column_stack([data >> 4, data & 0xF]).ravel()
+        return self.__encode[nibbles].ravel().astype(np.uint8)
+
+    def decode_chips(self, chips):
+        nibbles = self.__decode[_bits_to_int(chips, 5)]
+        if np.any(nibbles < 0):
+            nibbles = nibbles[:np.argmax(nibbles < 0)]
+        nibbles = nibbles[:len(nibbles) // 2 * 2]
+        return (nibbles[0::2] << 4 | nibbles[1::2]).astype(np.uint8)
+
+
+# 5b/6b and 3b/4b code words (abcdei, fghj) for running disparity -1, the words for +1 are the complements
+# of the unbalanced words, D.07 and D.x.3 have two balanced words
+_code_5b6b = ["100111", "011101", "101101", "110001", "110101", "101001", "011001", "111000",
+              "111001", "100101", "010101", "110100", "001101", "101100", "011100", "010111",
+              "011011", "100011", "010011", "110010", "001011", "101010", "011010", "111010",
+              "110011", "100110", "010110", "110110", "001110", "101110", "011110", "101011"]
+_code_3b4b = ["1011", "1001", "0101", "1100", "1101", "1010", "0110", "1110"]
+_code_alternate_7 = "0111"
+
+
+def _complement(word):
+    return "".join("1" if c == "0" else "0" for c in word)
+
+
+def _disparity(word):
+    return 2 * word.count("1") - len(word)
+
+
+# word for the running disparity rd
+def _word(word, rd):
+    if rd < 0 or (_disparity(word) == 0 and word not in ("111000", "1100")):
+        return word
+    return _complement(word)
+
+
+class Code8b10b(LineCode):
+    name = "8b10b"
+    nrzi = False
+    min_run = 1
+    max_run = 5
+    table_bytes = 2 * 256 * 2 + 1024
+    # K28.5 (rd -1), the comma
+    delimiter = "0011111010"
+
+    def __init__(self):
+        # code words of (running disparity before the byte, byte), running disparity after the byte
+        self.__encode = {}
+        self.__decode = np.full(1024, -1, dtype=np.int64)
+        for rd in (-1, 1):
+            for value in range(256):
+                x, y = value & 0x1F, value >> 5
+                six = _word(_code_5b6b[x], rd)
+                rd_six = rd if _disparity(six) == 0 else -rd
+                four = _code_3b4b[y]
+                if y == 7 and ((rd_six < 0 and x in (17, 18, 20)) or (rd_six > 0 and x in (11, 13, 14))):
+                    four = _code_alternate_7
+                four = _word(four, rd_six)
+                rd_four = rd_six if _disparity(four) == 0 else -rd_six
+                self.__encode[rd, value] = (_chips(six + four), rd_four)
+                self.__decode[int(six + four, 2)] = value
+
+    def encode_bytes(self, data):
+        # the delimiter K28.5 (rd -1) leaves the running disparity +1
+        rd = 1
+        words = []
+        for value in data.tolist():
+            word, rd = self.__encode[rd, value]
+            words.append(word)
+        return np.concatenate(words)
+
+    def decode_chips(self, chips):
+        values = self.__decode[_bits_to_int(chips, 10)]
+        if np.any(values < 0):
+            values = values[:np.argmax(values < 0)]
+        return values.astype(np.uint8)
+
+
+class CodeRll27(LineCode):
+    name = "rll27"
+    nrzi = True
+    min_run = 3
+    # 8 in the data, 10 in the delimiter
+    max_run = 10
+    table_bytes = 7 * 2
+    # a run of 10 chips which the code cannot produce, then a run of 3 chips
+    delimiter = "1" + "0" * 9 + "100"
+    # data bits -> code word
+    code_words = {"10": "0100", "11": "1000", "000": "000100", "010": "100100", "011": "001000",
+                  "0010": "00100100", "0011": "00001000"}
+
+    def __init__(self):
+        self.__decode = {word: bits for bits, word in self.code_words.items()}
+
+    def encode_bytes(self, data):
+        bits = "".join(format(value, "08b") for value in data.tolist())
+        words = []
+        position = 0
+        while position < len(bits):
+            for length in (2, 3, 4):
+                part = bits[position:position + length]
+                # the last bits are padded with zeros
+                part = part + "0" * (length - len(part))
+                if part in self.code_words:
+                    words.append(self.code_words[part])
+                    position += length
+                    break
+        return _chips("".join(words))
+
+    def decode_chips(self, chips):
+        text = chips.tobytes().translate(bytes.maketrans(b"\x00\x01", b"01")).decode()
+        bits = []
+        position = 0
+        while position < len(text):
+            for length in (4, 6, 8):
+                if text[position:position + length] in self.__decode:
+                    bits.append(self.__decode[text[position:position + length]])
+                    position += length
+                    break
+            else:
+                break
+        bits = _chips("".join(bits))
+        return np.packbits(bits[:len(bits) // 8 * 8])
+
+
+# baseline of the firmware, frames and decoder of vlc_frame and vlc_decoder
+class ManchesterCode(LineCode):
+    name = "manchester"
+    every_edge_decoded = False
+
+    def encode(self, frames, pulse_us, num_sync_symbols=default_num_sync_symbols):
+        # data rate whose truncated half period is pulse_us
+        return encode_frames(frames, 1000000 / (2 * pulse_us + 1), num_sync_symbols)
+
+    def decode(self, edge_times_us, edge_offsets, tolerance=vlc_receiver_tolerance, num_sync_symbols=default_num_sync_symbols):
+        decoded = decode_edges(edge_times_us, edge_offsets, tolerance, num_sync_symbols)
+        synchronized = np.zeros(len(edge_offsets) - 1, dtype=bool)
+        synchronized[np.asarray(decoded.lanes, dtype=np.int64)] = True
+        return list(zip(decoded.first_frames(len(edge_offsets) - 1), synchronized))
+
+
+line_codes = {code.name: code for code in [ManchesterCode, Code4b5b, Code8b10b, CodeRll27]}
+
+
+# one code at one pulse width and noise level
+def evaluate_code(code, pulse_us, channel, tolerance=vlc_receiver_tolerance, num_frames=500, payload_size_bytes=100,
+                  num_sync_symbols=default_num_sync_symbols, seed=None, chunk_size=500):
+    rng = np.random.default_rng(seed)
+    link_payload_bytes = payload_size_bytes + ipv6_udp_header_bytes
+    if code.every_edge_decoded:
+        channel = copy.copy(channel)
+        channel.isr_skip_duration_us = channel.isr_duration_us
+
+    air_time_us = 0
+    edges = 0
+    min_interval_us = np.inf
+    synchronized = 0
+    delivered = 0
+    exact = 0
+    for start in range(0, num_frames, chunk_size):
+        count = min(chunk_size, num_frames - start)
+        frames = [build_frame(rng.integers(0, 256, link_payload_bytes).astype(np.uint8).tobytes()) for _ in range(count)]
+        encoded = code.encode(frames, pulse_us, num_sync_symbols)
+        times, offsets = simulate_channel(encoded, channel, rng)
+        received = code.decode(times, offsets, tolerance, num_sync_symbols)
+
+        air_time_us += float(encoded.air_time_us.sum())
+        edges += len(encoded.edge_times_us)
+        intervals = np.diff(encoded.edge_times_us)
+        min_interval_us = min(min_interval_us, float(intervals[intervals > 0].min()))
+        synchronized += sum(1 for _, s in received if s)
+        delivered += sum(1 for f, _ in received if f != None and check_frame(f))
+        exact += sum(1 for (f, _), sent in zip(received, frames) if f == sent)
+
+    frame_bytes = vlc_mac_header_bytes + link_payload_bytes + vlc_crc_bytes
+    return {
+        "code": code.name,
+        "pulse_us": pulse_us,
+        "manchester_data_rate_bps": 1000000 / (2 * pulse_us),
+        "frames": num_frames,
+        "air_time_ms": air_time_us / num_frames / 1000,
+        "line_rate_bps": frame_bytes * 8 * num_frames / (air_time_us / 1e6),
+        "synchronized": synchronized / num_frames,
+        "reliability_link": delivered / num_frames,
+        "exact": exact,
+        "goodput_link_bps": link_payload_bytes * 8 * delivered / (air_time_us / 1e6),
+        "edges_per_byte": edges / (frame_bytes * num_frames),
+        "min_edge_interval_us": min_interval_us,
+        "table_bytes": code.table_bytes,
+    }
+
+
+def _evaluate_point(point):
+    name, data_rate_bps, noise, channel_parameters, tolerance, num_frames, payload_size_bytes, seed = point
+    result = evaluate_code(line_codes[name](), int(symbol_half_period_us(data_rate_bps)), noise_channel(noise, **channel_parameters),
+                           tolerance, num_frames, payload_size_bytes, seed=seed)
+    result["noise"] = noise
+    result["tolerance"] = tolerance
+    return result
+
+
+# grid codes x data rates (pulse of Manchester) x noise levels in worker processes
+# channel_parameters: further parameters of the ChannelModel (delays, ISR)
+def run_comparison(names, data_rates_bps, noises, channel_parameters={}, tolerance=vlc_receiver_tolerance, num_frames=500,
+                   payload_size_bytes=100, seed=0, jobs=None):
+    grid = [(c, r, n) for c in names for r in data_rates_bps for n in noises]
+    seeds = np.random.SeedSequence(seed).spawn(len(grid))
+    points = [(c, r, n, channel_parameters, tolerance, num_frames, payload_size_bytes, s) for (c, r, n), s in zip(grid, seeds)]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(_evaluate_point, points))
+
+
+comparison_columns = ["code", "pulse_us", "manchester_data_rate_bps", "noise", "tolerance", "frames", "air_time_ms",
+                      "line_rate_bps", "synchronized", "reliability_link", "exact", "goodput_link_bps", "edges_per_byte",
+                      "min_edge_interval_us", "table_bytes"]
+
+
+def write_comparison(results, path):
+    with open(path, 'w') as file:
+        file.write(";".join(comparison_columns) + "\n")
+        for result in results:
+            file.write(";".join(str(result[c]) for c in comparison_columns) + "\n")
+
+    print("Saved comparison in file: " + path)
+
+
+# round trip of all codes without channel
+def self_test(num_frames=200, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = [build_frame(rng.integers(0, 256, rng.integers(1, 300)).astype(np.uint8).tobytes()) for _ in range(num_frames)]
+    frames += [build_frame(bytes(100)), build_frame(bytes([0xFF] * 100))]
+    for name, code_class in line_codes.items():
+        code = code_class()
+        encoded = code.encode(frames, 16)
+        # ISR timestamps without delays
+        received = code.decode(encoded.edge_times_us, encoded.edge_offsets)
+        assert [f for f, _ in received] == frames, "round trip of " + name + " failed"
+
+        runs = np.diff(np.concatenate([encoded.frame(i)[0] for i in range(len(frames))])) // encoded.half_period_us
+        if name != "manchester":
+            assert runs[runs > 0].min() >= code.min_run and runs.max() <= code.max_run, "runs of " + name + " out of limits"
+    print(f"Round trip of {len(line_codes)} codes passed for {len(frames)} frames")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare line codes on the simulated channel")
+    parser.add_argument("-c", "--codes", nargs="+", default=list(line_codes), choices=list(line_codes), help="line codes")
+    parser.add_argument("-r", "--data-rates", type=int, nargs="+", default=[20000, 30000, 40000],
+                        help="data rates of Manchester in bit/s, the codes are compared at the same shortest pulse")
+    parser.add_argument("--noise", type=float, nargs="+", default=[0, 1, 2], help="noise levels")
+    parser.add_argument("--threshold", type=float, default=default_threshold, help="comparator threshold of the receiver")
+    parser.add_argument("--rise", type=float, help="rise delay of the receiver in us (default from the threshold)")
+    parser.add_argument("--fall", type=float, help="fall delay of the receiver in us (default from the threshold)")
+    parser.add_argument("--isr-us", type=float, default=16, help="duration of the receiver ISR in us")
+    parser.add_argument("--isr-skip-us", type=float, default=default_isr_skip_duration_us,
+                        help="ISR of a Manchester edge which does not read a bit in us")
+    parser.add_argument("--latency-jitter", type=float, default=0.2, help="mean interrupt latency jitter in us")
+    parser.add_argument("-t", "--tolerance", type=int, default=vlc_receiver_tolerance, help="receiver tolerance in percent")
+    parser.add_argument("-n", "--frames", type=int, default=500, help="frames per point")
+    parser.add_argument("-p", "--payload", type=int, default=100, help="udp payload size in bytes")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the random generators")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("-o", "--output", help="output csv file")
+    args = parser.parse_args()
+
+    self_test()
+    start = time.time()
+    channel_parameters = dict(rise_delay_us=args.rise, fall_delay_us=args.fall, threshold=args.threshold,
+                              isr_duration_us=args.isr_us, isr_skip_duration_us=args.isr_skip_us,
+                              isr_latency_jitter_us=args.latency_jitter)
+    results = run_comparison(args.codes, args.data_rates, args.noise, channel_parameters, args.tolerance, args.frames,
+                             args.payload, args.seed, args.jobs)
+    print(f"Evaluated {len(results)} points in {time.time() - start:.1f}s")
+    for r in results:
+        print(f"{r['code']:>10} pulse {r['pulse_us']:2d} us, noise {r['noise']}: air time {r['air_time_ms']:6.2f} ms, "
+              f"line rate {r['line_rate_bps'] / 1000:6.2f} kbit/s, sync {r['synchronized']:.3f}, "
+              f"reliability {r['reliability_link']:.3f}, goodput {r['goodput_link_bps'] / 1000:6.2f} kbit/s, "
+              f"{r['edges_per_byte']:.2f} edges/byte")
+    if args.output:
+        write_comparison(results, args.output)
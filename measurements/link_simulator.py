@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+
+import argparse
+import heapq
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from measurements import LatencyMeasurement, LatencyMeasurementData
+from performance_model import default_num_sync_symbols, ipv6_udp_header_bytes, load_performance_model, symbol_half_period_us
+from vlc_frame import build_frame, stuffed_bit_count
+
+# Discrete event simulator of the measurement setup: udp_latency_client -> GNRC -> vlc_netif -> light -> receiver
+#
+# Sender node:
+#   app:   udp_latency_client prints "su", calls sock_udp_send and sleeps for the interval, one loop takes
+#          interval + send_overhead_us. The packet is allocated in the pktbuf (pktbuf_size_bytes) and queued at the
+#          netif thread (netif_queue_size messages), it is dropped if either is full.
+#          udp_bulk_client (send_window) blocks while send_window packets are in the pktbuf (0: no limit).
+#   netif: _netif_send copies the packet into the send buffer (copy_us_per_byte), prints "sl" (484 us measurement
+#          block), adds the crc (crc_us_per_byte) and blocks in vlc_manchester_send for the air time of the frame
+#          (including the stuffed bits). The packet is released from the pktbuf afterwards.
+# Receiver node:
+#   the ISR disables itself after the end flag, the netif thread wakes up (recv_wakeup_us), _netif_recv prints "rl"
+#   (recv_service_us) and vlc_reset_receiver rearms the ISR. A frame which starts while the receiver is not
+#   armed is lost, as is a frame lost on the channel (frame_loss_probability). The UDP server thread prints "ru"
+#   after udp_recv_us per packet, packets wait for the server in order.
+# All queues are FIFO. The result has the format of LatencyMeasurement (times relative to the first "su").
+
+_app_send, _netif_done, _recv_done, _udp_done = range(4)
+
+
+class LinkConfig:
+    def __init__(self, data_rate_bps=30000, payload_size_bytes=100, interval_us=100000, runtime_us=60 * 1000000,
+                 send_overhead_us=None, udp_send_us=150, pktbuf_size_bytes=6144, pktbuf_overhead_bytes=64,
+                 netif_queue_size=16, copy_us_per_byte=0.02, marker_us=484, crc_us_per_byte=0.5, recv_wakeup_us=40,
+                 recv_service_us=600, udp_recv_us=600, frame_loss_probability=0.0, num_sync_symbols=default_num_sync_symbols,
+                 send_window=None):
+        self.data_rate_bps = data_rate_bps
+        self.payload_size_bytes = payload_size_bytes
+        self.interval_us = interval_us
+        self.runtime_us = runtime_us
+        if send_overhead_us == None:
+            send_overhead_us = load_performance_model().send_overhead_ms * 1000
+        self.send_overhead_us = send_overhead_us
+        self.udp_send_us = udp_send_us
+        self.pktbuf_size_bytes = pktbuf_size_bytes
+        self.pktbuf_overhead_bytes = pktbuf_overhead_bytes
+        self.netif_queue_size = netif_queue_size
+        self.copy_us_per_byte = copy_us_per_byte
+        self.marker_us = marker_us
+        self.crc_us_per_byte = crc_us_per_byte
+        self.recv_wakeup_us = recv_wakeup_us
+        self.recv_service_us = recv_service_us
+        self.udp_recv_us = udp_recv_us
+        self.frame_loss_probability = frame_loss_probability
+        self.num_sync_symbols = num_sync_symbols
+        self.send_window = send_window
+
+
+# air time of every packet in us, the payloads are random like in the measurements
+def _air_times_us(config, num_packets, rng):
+    frame_bytes = config.payload_size_bytes + ipv6_udp_header_bytes
+    frames = [build_frame(rng.integers(0, 256, frame_bytes).astype(np.uint8).tobytes()) for _ in range(num_packets)]
+    frame_bits = 8 * len(frames[0]) + stuffed_bit_count(frames) if num_packets > 0 else np.zeros(0)
+    # sync, two ticks per bit, end flag and the final tick, see vlc_frame
+    ticks = 2 * config.num_sync_symbols + 2 * frame_bits + 16 + 1
+    return ticks * symbol_half_period_us(config.data_rate_bps)
+
+
+# simulate one run, returns a list of LatencyMeasurementData
+def simulate_run(config, seed=None):
+    rng = np.random.default_rng(seed)
+    period_us = config.interval_us + config.send_overhead_us
+    num_packets = int(config.runtime_us // period_us) + 1
+    air_times_us = _air_times_us(config, num_packets, rng)
+    lost = rng.random(num_packets) < config.frame_loss_probability
+    frame_bytes = config.payload_size_bytes + ipv6_udp_header_bytes
+    packet_bytes = frame_bytes + config.pktbuf_overhead_bytes
+
+    result = [LatencyMeasurementData(i) for i in range(num_packets)]
+    su = np.zeros(num_packets)
+    sl = np.full(num_packets, -1.0)
+    rl = np.full(num_packets, -1.0)
+    ru = np.full(num_packets, -1.0)
+
+    events = []
+    sequence = 0
+
+    def schedule(t, kind, packet):
+        nonlocal sequence
+        heapq.heappush(events, (t, sequence, kind, packet))
+        sequence += 1
+
+    pktbuf_used = 0
+    netif_queue = []
+    netif_busy = False
+    receiver_armed_at = 0.0
+    udp_free_at = 0.0
+    # packets in the pktbuf, the bulk client waits for a free slot in the window
+    in_flight = 0
+    app_blocked = None
+    limit = config.send_window if config.send_window != None and config.send_window > 0 else None
+
+    def start_netif_send(t):
+        nonlocal netif_busy
+        packet = netif_queue.pop(0)
+        netif_busy = True
+        sl[packet] = t + config.copy_us_per_byte * frame_bytes + config.marker_us
+        air_start = sl[packet] + config.crc_us_per_byte * frame_bytes
+        schedule(air_start + air_times_us[packet], _netif_done, packet)
+
+    # the next send of the app loop is scheduled after every send, the last one before the end of the runtime
+    schedule(0.0, _app_send, 0)
+    num_sent = 0
+
+    while len(events) > 0:
+        t, _, kind, packet = heapq.heappop(events)
+        if kind == _app_send:
+            if limit != None and in_flight >= limit:
+                app_blocked = packet
+                continue
+            su[packet] = t
+            num_sent = packet + 1
+            if packet + 1 < num_packets and t + period_us <= config.runtime_us:
+                schedule(t + period_us, _app_send, packet + 1)
+            enqueue_time = t + config.udp_send_us
+            if pktbuf_used + packet_bytes > config.pktbuf_size_bytes or len(netif_queue) >= config.netif_queue_size:
+                # sock_udp_send fails, the packet never reaches the link layer
+                continue
+            pktbuf_used += packet_bytes
+            in_flight += 1
+            netif_queue.append(packet)
+            if not netif_busy:
+                start_netif_send(max(enqueue_time, t))
+        elif kind == _netif_done:
+            # t: end of the frame on the air, vlc_manchester_send returns
+            air_end = t
+            if not lost[packet] and air_end - air_times_us[packet] >= receiver_armed_at:
+                receiver_armed_at = air_end + config.recv_wakeup_us + config.recv_service_us
+                schedule(receiver_armed_at, _recv_done, packet)
+            pktbuf_used -= packet_bytes
+            in_flight -= 1
+            netif_busy = False
+            if app_blocked != None:
+                schedule(t, _app_send, app_blocked)
+                app_blocked = None
+            if len(netif_queue) > 0:
+                start_netif_send(air_end)
+        elif kind == _recv_done:
+            rl[packet] = t
+            udp_free_at = max(udp_free_at, t) + config.udp_recv_us
+            schedule(udp_free_at, _udp_done, packet)
+        elif kind == _udp_done:
+            ru[packet] = t
+
+    result = result[:num_sent]
+    start = su[0]
+    for i, m in enumerate(result):
+        m.udp_send_time_s = (su[i] - start) / 1e6
+        if sl[i] >= 0:
+            m.link_send_time_s = (sl[i] - start) / 1e6
+        if rl[i] >= 0:
+            m.link_latency_ms = (rl[i] - sl[i]) / 1e3
+        if ru[i] >= 0:
+            m.udp_latency_ms = (ru[i] - su[i]) / 1e3
+
+    return result
+
+
+def _measurement(config, result):
+    l = LatencyMeasurement(runtime_us=config.runtime_us, payload_size_bytes=config.payload_size_bytes, interval_us=config.interval_us,
+                           send_window=config.send_window)
+    l.set_result(result)
+    return l
+
+
+def simulated_measurement(config, seed=None):
+    return _measurement(config, simulate_run(config, seed))
+
+
+def _simulate_point(point):
+    config, seed = point
+    return simulate_run(config, seed)
+
+
+# simulate the configs in worker processes, returns (config, LatencyMeasurement)
+def run_configs(configs, seed=0, jobs=None):
+    seeds = np.random.SeedSequence(seed).spawn(len(configs))
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(_simulate_point, zip(configs, seeds)))
+    # LatencyMeasurement cannot be sent between processes (lock)
+    return [(config, _measurement(config, result)) for config, result in zip(configs, results)]
+
+
+# simulate the grid data rate x interval in worker processes, returns (config, LatencyMeasurement)
+def run_sweep(data_rates_bps, intervals_us, seed=0, jobs=None, **kwargs):
+    grid = [LinkConfig(data_rate_bps=r, interval_us=i, **kwargs) for r in data_rates_bps for i in intervals_us]
+    return run_configs(grid, seed, jobs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate latency and loss of the VLC link with queueing")
+    parser.add_argument("-r", "--data-rates", type=int, nargs="+", default=[10000], help="data rates in bit/s")
+    parser.add_argument("-i", "--intervals", type=int, nargs="+", default=list(range(0, 250000 + 25000, 25000)), help="send intervals in us")
+    parser.add_argument("-p", "--payload", type=int, default=100, help="udp payload size in bytes")
+    parser.add_argument("-t", "--runtime", type=int, default=60 * 1000000, help="runtime in us")
+    parser.add_argument("--pktbuf", type=int, default=6144, help="size of the GNRC pktbuf in bytes")
+    parser.add_argument("--queue", type=int, default=16, help="size of the netif message queue")
+    parser.add_argument("--loss", type=float, default=0.0, help="probability of a frame lost on the channel")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the random generators")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("-o", "--output", help="directory of the simulated measurement files")
+    args = parser.parse_args()
+
+    start = time.time()
+    results = run_sweep(args.data_rates, args.intervals, args.seed, args.jobs, payload_size_bytes=args.payload,
+                        runtime_us=args.runtime, pktbuf_size_bytes=args.pktbuf, netif_queue_size=args.queue,
+                        frame_loss_probability=args.loss)
+    print(f"Simulated {len(results)} runs in {time.time() - start:.1f}s")
+
+    for config, l in results:
+        print(f"{config.data_rate_bps:6d} bit/s, interval {config.interval_us / 1000:6.1f} ms: "
+              f"udp latency {l.get_average_udp_latency():8.2f} ms, link latency {l.get_average_link_latency():7.2f} ms, "
+              f"reliability udp {l.get_reliability_udp():.3f}, link {l.get_reliability_link():.3f}")
+        if args.output:
+            os.makedirs(args.output, exist_ok=True)
+            l.write_measurement_to_file(subfolder="", path=args.output,
+                                        file_name_note=f"{config.data_rate_bps}bps_{config.interval_us}us_simulated")
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+
+import argparse
+import itertools
+import re
+
+import numpy as np
+
+from measurement_files import load_measurement
+
+# Import of logic analyzer captures of the debug pins of the firmware
+#
+# The firmware drives these pins if the defines are set:
+#   interrupt_recv: DEBUG_OUT_PIN_INTERRUPT_RECV, high while _interrupt_changing_edge runs ("takes about 16us")
+#   endflag:        DEBUG_OUT_PIN_ENDFLAG, high while the end flag is signalled to the netif thread
+#   recv_link:      DEBUG_OUT_PIN_RECV_LINK, high while _netif_recv runs, the drop reason is encoded in the number
+#                   of pulses: 2 data too short, 3 wrong checksum, 1 passed or dropped later (buffer, pktbuf)
+#   send_link:      DEBUG_OUT_PIN_SEND_LINK, high while _netif_send runs (on the sender)
+#   interrupt_send: DEBUG_OUT_PIN_INTERRUPT, sender timer ISR
+# Captures are sigrok CSV (optionally with a time column) or VCD exports. Both are read in chunks of lines, so
+# captures of several GB do not have to fit in memory. The level changes of every mapped channel are decoded to
+# pulses (rise, fall) and accumulated by CaptureAnalysis.
+# The link send spans can be joined with the serial markers of a LatencyMeasurement. The capture and the
+# measurement have different time bases, the offset is estimated from the send times.
+
+pin_roles = ["interrupt_recv", "endflag", "recv_link", "send_link", "interrupt_send"]
+
+recv_link_reasons = {1: "passed", 2: "too_short", 3: "crc_error"}
+
+# claim in vlc_manchester_receive.c
+isr_claim_us = 16
+
+# pulses of _netif_recv are written back to back, a longer gap starts a new call
+recv_link_group_gap_s = 5e-6
+
+isr_histogram_bin_us = 0.5
+isr_histogram_max_us = 200
+
+_time_units = {"s": 1, "ms": 1e-3, "us": 1e-6, "ns": 1e-9, "ps": 1e-12, "fs": 1e-15}
+_frequency_units = {"Hz": 1, "kHz": 1e3, "MHz": 1e6, "GHz": 1e9}
+_samplerate_pattern = re.compile(r"Samplerate:\s*([\d.]+)\s*([kMG]?Hz)")
+_time_column_pattern = re.compile(r"^\s*Time\s*(?:\[(\w+)\])?", re.IGNORECASE)
+_timescale_pattern = re.compile(r"(\d+)\s*(s|ms|us|ns|ps|fs)")
+
+
+# level changes of the channels in a sigrok CSV export
+# yields per chunk a dict channel name -> (times in s, levels) of the samples where the level may have changed
+# samplerate_hz: needed if the export has no time column and no samplerate comment
+def read_sigrok_csv(path, channels, samplerate_hz=None, chunk_lines=1000000):
+    with open(path, 'r') as file:
+        header = None
+        for line in file:
+            if line.startswith(";"):
+                match = _samplerate_pattern.search(line)
+                if match and samplerate_hz == None:
+                    samplerate_hz = float(match.group(1)) * _frequency_units[match.group(2)]
+                continue
+            if line.strip() != "":
+                header = [c.strip() for c in line.split(",")]
+                break
+        assert header != None, "no header in capture: " + path
+
+        time_scale = None
+        match = _time_column_pattern.match(header[0])
+        if match:
+            time_scale = _time_units.get(match.group(1) or "s", 1)
+        else:
+            assert samplerate_hz != None, "capture without time column needs the samplerate: " + path
+        columns = [header.index(c) for c in channels]
+
+        sample = 0
+        last = None
+        while True:
+            lines = list(itertools.islice(file, chunk_lines))
+            if len(lines) == 0:
+                return
+            data = np.loadtxt(lines, delimiter=",", ndmin=2)
+            if time_scale != None:
+                times = data[:, 0] * time_scale
+            else:
+                times = (sample + np.arange(len(data))) / samplerate_hz
+            sample += len(data)
+
+            levels = data[:, columns].astype(np.int8)
+            previous = np.concatenate([levels[:1] if last is None else last, levels[:-1]])
+            last = levels[-1:]
+            changed = levels != previous
+            if sample == len(data):
+                # initial levels
+                changed[0] = True
+            yield {c: (times[changed[:, i]], levels[changed[:, i], i]) for i, c in enumerate(channels)}
+
+
+# level changes of the channels in a VCD export, same chunks as read_sigrok_csv
+def read_vcd(path, channels, chunk_lines=1000000):
+    with open(path, 'r') as file:
+        identifiers = {}
+        timescale_s = 1e-9
+        header = ""
+        for line in file:
+            header += line
+            if "$enddefinitions" in line:
+                break
+
+        for declaration in re.findall(r"\$(\w+)(.*?)\$end", header, re.DOTALL):
+            keyword, content = declaration
+            if keyword == "timescale":
+                match = _timescale_pattern.search(content)
+                timescale_s = int(match.group(1)) * _time_units[match.group(2)]
+            elif keyword == "var":
+                fields = content.split()
+                # type width identifier name
+                if fields[3] in channels:
+                    identifiers[fields[2]] = fields[3]
+        missing = set(channels) - set(identifiers.values())
+        assert len(missing) == 0, "channels not in capture: " + ", ".join(sorted(missing))
+
+        time = 0
+        while True:
+            lines = list(itertools.islice(file, chunk_lines))
+            if len(lines) == 0:
+                return
+            changes = {c: ([], []) for c in channels}
+            for token in " ".join(lines).split():
+                if token[0] == "#":
+                    time = int(token[1:])
+                elif token[0] in "01" and token[1:] in identifiers:
+                    times, levels = changes[identifiers[token[1:]]]
+                    times.append(time)
+                    levels.append(int(token[0]))
+            yield {c: (np.array(t, dtype=np.float64) * timescale_s, np.array(l, dtype=np.int8))
+                   for c, (t, l) in changes.items()}
+
+
+def read_capture(path, channels, samplerate_hz=None, chunk_lines=1000000):
+    if path.endswith(".vcd"):
+        return read_vcd(path, channels, chunk_lines)
+    return read_sigrok_csv(path, channels, samplerate_hz, chunk_lines)
+
+
+# level changes of one channel (e.g. the receiver input pin), yields (times in s, levels after the change) per chunk
+def channel_edges(path, channel, samplerate_hz=None, chunk_lines=1000000):
+    level = None
+    for chunk in read_capture(path, [channel], samplerate_hz, chunk_lines):
+        times, levels = chunk[channel]
+        if len(times) == 0:
+            continue
+        if level == None:
+            # initial level
+            level, times, levels = levels[0], times[1:], levels[1:]
+        previous = np.concatenate([[level], levels[:-1]])
+        changed = levels != previous
+        if len(levels) > 0:
+            level = levels[-1]
+        yield times[changed], levels[changed]
+
+
+# pulses (high phases) of one channel, fed chunk by chunk
+class PulseDecoder:
+    def __init__(self):
+        self.level = None
+        self.pending_rise = None
+
+    # returns the rise and fall times of the pulses completed in this chunk
+    def feed(self, times, levels):
+        if len(times) == 0:
+            return times, times
+        if self.level == None:
+            self.level = levels[0]
+        previous = np.concatenate([[self.level], levels[:-1]])
+        changed = levels != previous
+        times, levels = times[changed], levels[changed]
+        if len(times) == 0:
+            return times, times
+        self.level = levels[-1]
+
+        rises = times[levels == 1]
+        falls = times[levels == 0]
+        if self.pending_rise != None:
+            rises = np.concatenate([[self.pending_rise], rises])
+        # the channel was high at the start of the capture
+        if len(falls) > 0 and (len(rises) == 0 or falls[0] < rises[0]):
+            falls = falls[1:]
+        self.pending_rise = rises[len(falls)] if len(rises) > len(falls) else None
+
+        return rises[:len(falls)], falls
+
+
+# streaming statistics of pulse widths with a fixed bin histogram
+class WidthHistogram:
+    def __init__(self, bin_us=isr_histogram_bin_us, max_us=isr_histogram_max_us):
+        self.bin_us = bin_us
+        self.counts = np.zeros(int(np.ceil(max_us / bin_us)) + 1, dtype=np.int64)
+        self.count = 0
+        self.sum_us = 0.0
+        self.max_us = 0.0
+        self.over_claim = 0
+
+    def add(self, widths_us):
+        if len(widths_us) == 0:
+            return
+        bins = np.minimum((widths_us / self.bin_us).astype(np.int64), len(self.counts) - 1)
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+        self.count += len(widths_us)
+        self.sum_us += float(widths_us.sum())
+        self.max_us = max(self.max_us, float(widths_us.max()))
+        self.over_claim += int(np.count_nonzero(widths_us > isr_claim_us))
+
+    def mean_us(self):
+        return self.sum_us / self.count if self.count > 0 else None
+
+    # upper bin edge of the quantile
+    def quantile_us(self, q):
+        if self.count == 0:
+            return None
+        index = int(np.searchsorted(np.cumsum(self.counts), q * self.count))
+        return (index + 1) * self.bin_us
+
+    def summary(self):
+        return {
+            "pulses": self.count,
+            "mean_us": self.mean_us(),
+            "median_us": self.quantile_us(0.5),
+            "p99_us": self.quantile_us(0.99),
+            "max_us": self.max_us if self.count > 0 else None,
+            f"over_{isr_claim_us}us": self.over_claim / self.count if self.count > 0 else None,
+        }
+
+
+# decoded debug pins of a capture
+# roles: dict pin role (pin_roles) -> channel name in the capture
+class CaptureAnalysis:
+    def __init__(self, roles):
+        self.roles = roles
+        self.decoders = {role: PulseDecoder() for role in roles}
+        self.isr_widths = {role: WidthHistogram() for role in ("interrupt_recv", "interrupt_send") if role in roles}
+
+        self.send_spans = []        # (start s, end s)
+        self.endflags = []          # rise s
+        self.recv_calls = []        # (start s, end s, pulses)
+        self.__open_call = None
+
+    def feed(self, chunk):
+        for role, channel in self.roles.items():
+            rises, falls = self.decoders[role].feed(*chunk[channel])
+            if role in self.isr_widths:
+                self.isr_widths[role].add((falls - rises) * 1e6)
+            elif role == "send_link":
+                self.send_spans.extend(zip(rises.tolist(), falls.tolist()))
+            elif role == "endflag":
+                self.endflags.extend(rises.tolist())
+            elif role == "recv_link":
+                self.__group_recv_pulses(rises, falls)
+
+    def __group_recv_pulses(self, rises, falls):
+        for rise, fall in zip(rises.tolist(), falls.tolist()):
+            if self.__open_call != None and rise - self.__open_call[1] <= recv_link_group_gap_s:
+                self.__open_call[1] = fall
+                self.__open_call[2] += 1
+                continue
+            if self.__open_call != None:
+                self.recv_calls.append(tuple(self.__open_call))
+            self.__open_call = [rise, fall, 1]
+
+    def finish(self):
+        if self.__open_call != None:
+            self.recv_calls.append(tuple(self.__open_call))
+            self.__open_call = None
+
+    def drop_reasons(self):
+        counts = {}
+        for _, _, pulses in self.recv_calls:
+            reason = recv_link_reasons.get(pulses, "unknown")
+            counts[reason] = counts.get(reason, 0) + 1
+        return counts
+
+    # one row per _netif_recv call: duration, drop reason and delay after the end flag (netif thread wakeup)
+    def recv_frames(self):
+        endflags = np.array(self.endflags)
+        rows = []
+        for start, end, pulses in self.recv_calls:
+            i = np.searchsorted(endflags, start) - 1
+            rows.append({
+                "recv_start_s": start,
+                "recv_duration_us": (end - start) * 1e6,
+                "reason": recv_link_reasons.get(pulses, "unknown"),
+                "endflag_delay_us": (start - endflags[i]) * 1e6 if i >= 0 else None,
+            })
+        return rows
+
+
+def analyze_capture(path, roles, samplerate_hz=None, chunk_lines=1000000):
+    analysis = CaptureAnalysis(roles)
+    for chunk in read_capture(path, sorted(set(roles.values())), samplerate_hz, chunk_lines):
+        analysis.feed(chunk)
+    analysis.finish()
+    return analysis
+
+
+# offset of the capture time base to the measurement time base: capture time = measurement time + offset
+# candidates pair the first send spans with the first marker send times, the candidate matching the most sends wins
+def estimate_offset(capture_times_s, marker_times_s, tolerance_s, candidates=8):
+    capture_times_s = np.sort(capture_times_s)
+    marker_times_s = np.sort(marker_times_s)
+    if len(capture_times_s) == 0 or len(marker_times_s) == 0:
+        return None
+
+    def matches(offset):
+        shifted = marker_times_s + offset
+        right = np.minimum(np.searchsorted(capture_times_s, shifted), len(capture_times_s) - 1)
+        left = np.maximum(right - 1, 0)
+        residuals = np.where(np.abs(capture_times_s[left] - shifted) < np.abs(capture_times_s[right] - shifted),
+                             capture_times_s[left], capture_times_s[right]) - shifted
+        return np.abs(residuals) <= tolerance_s, residuals
+
+    best = None
+    for c in capture_times_s[:candidates]:
+        for m in marker_times_s[:candidates]:
+            matched, residuals = matches(c - m)
+            if best == None or matched.sum() > best[0]:
+                best = (matched.sum(), c - m + (np.median(residuals[matched]) if matched.any() else 0))
+    return best[1]
+
+
+# join the capture with the serial markers of a measurement file, one row per packet sent at link layer
+def join_measurement(analysis, measurement_path, offset_s=None, tolerance_s=None):
+    l = load_measurement(measurement_path)
+    packets = [m for m in l.get_result() if m.link_send_time_s != -1]
+    if tolerance_s == None:
+        tolerance_s = l.get_interval_us() / 1e6 / 4
+    send_starts = np.array([s for s, _ in analysis.send_spans])
+    marker_times = np.array([m.link_send_time_s for m in packets])
+    if offset_s == None:
+        offset_s = estimate_offset(send_starts, marker_times, tolerance_s)
+    if offset_s == None:
+        print("[WARNING] no send spans or markers to join")
+        return []
+
+    calls = analysis.recv_calls
+    call_starts = np.array([start for start, _, _ in calls])
+    rows = []
+    for m in packets:
+        row = {
+            "pkt_number": m.pkt_number,
+            "link_send_time_s": m.link_send_time_s,
+            "link_latency_ms": m.link_latency_ms,
+            "capture_send_s": None,
+            "send_duration_ms": None,
+            "reason": None,
+            "capture_latency_ms": None,
+        }
+        rows.append(row)
+        if len(send_starts) == 0:
+            continue
+        i = int(np.argmin(np.abs(send_starts - (m.link_send_time_s + offset_s))))
+        if abs(send_starts[i] - (m.link_send_time_s + offset_s)) > tolerance_s:
+            continue
+        start, end = analysis.send_spans[i]
+        row["capture_send_s"] = start
+        row["send_duration_ms"] = (end - start) * 1e3
+
+        # first _netif_recv call after this send and before the next one
+        next_start = send_starts[i + 1] if i + 1 < len(send_starts) else np.inf
+        j = np.searchsorted(call_starts, start)
+        if j < len(calls) and call_starts[j] < next_start:
+            row["reason"] = recv_link_reasons.get(calls[j][2], "unknown")
+            # the rl marker is printed at the end of _netif_recv
+            row["capture_latency_ms"] = (calls[j][1] - start) * 1e3
+
+    return rows
+
+
+def write_rows(rows, path):
+    if len(rows) == 0:
+        return
+    columns = list(rows[0].keys())
+    with open(path, 'w') as file:
+        file.write(";".join(columns) + "\n")
+        for row in rows:
+            file.write(";".join("" if row[c] == None else str(row[c]) for c in columns) + "\n")
+
+    print("Saved in file: " + path)
+
+
+def write_histogram(histogram, path):
+    with open(path, 'w') as file:
+        file.write("width_us;count\n")
+        for i, count in enumerate(histogram.counts):
+            file.write(f"{i * histogram.bin_us};{count}\n")
+
+    print("Saved histogram in file: " + path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze logic analyzer captures of the debug pins")
+    parser.add_argument("capture", help="sigrok CSV or VCD export")
+    parser.add_argument("-p", "--pin", action="append", default=[], metavar="ROLE=CHANNEL",
+                        help="channel of a debug pin, roles: " + ", ".join(pin_roles))
+    parser.add_argument("--samplerate", type=float, help="samplerate in Hz (CSV without time column and samplerate comment)")
+    parser.add_argument("-m", "--measurement", help="measurement file to join by time")
+    parser.add_argument("--offset", type=float, help="capture time minus measurement time in s (estimated if not set)")
+    parser.add_argument("--chunk-lines", type=int, default=1000000, help="lines read at once")
+    parser.add_argument("-o", "--output", help="prefix of the output csv files")
+    args = parser.parse_args()
+
+    roles = dict(p.split("=", 1) for p in args.pin)
+    for role in roles:
+        assert role in pin_roles, "unknown pin role: " + role
+
+    analysis = analyze_capture(args.capture, roles, args.samplerate, args.chunk_lines)
+
+    for role, histogram in analysis.isr_widths.items():
+        print(f"{role}: {histogram.summary()}")
+    if "send_link" in roles:
+        durations = [(end - start) * 1e3 for start, end in analysis.send_spans]
+        print(f"send_link: {len(durations)} spans, mean {np.mean(durations) if durations else 0:.3f} ms")
+    if "recv_link" in roles:
+        print(f"recv_link: {len(analysis.recv_calls)} calls, {analysis.drop_reasons()}")
+    if "endflag" in roles:
+        print(f"endflag: {len(analysis.endflags)} frames")
+
+    if args.output:
+        for role, histogram in analysis.isr_widths.items():
+            write_histogram(histogram, f"{args.output}_{role}.csv")
+        if "recv_link" in roles:
+            write_rows(analysis.recv_frames(), f"{args.output}_recv.csv")
+
+    if args.measurement:
+        rows = join_measurement(analysis, args.measurement, args.offset)
+        joined = [r for r in rows if r["capture_send_s"] != None]
+        print(f"joined {len(joined)} of {len(rows)} packets with the capture")
+        if args.output:
+            write_rows(rows, f"{args.output}_joined.csv")
@@ -18,6 +18,9 @@
 
 #include "periph/timer.h"
 
+// defined in vlc_netif.c, the vlc_netif.h of the RIOT tree only declares vlc_netif_init
+uint32_t vlc_netif_frames_done(void);
+
 // #define DEBUG_OUT_APP_SEND (GPIO_PIN(0,13))
 #ifdef DEBUG_OUT_APP_SEND
 #include "periph/gpio.h"
@@ -200,6 +203,309 @@ int udp_latency_server_cmd(int argc, char **argv) {
     return 0;
 }
 
+// time to wait for the echo of a package
+#define RTT_ECHO_TIMEOUT_US (1000000U)
+
+// send packages like udp_latency_client and wait for the echo of each package
+// the round trip time is measured with the timer of this node, printed as "rt <package number> <rtt us>"
+int udp_rtt_client(unsigned int runtime_us, unsigned int payload_size, unsigned int interval, unsigned int random) {
+
+    sock_udp_ep_t local = SOCK_IPV6_EP_ANY;
+    local.port = 1234;
+
+    sock_udp_ep_t remote = { .family = AF_INET6 };
+    remote.port = 1337;
+    ipv6_addr_set_all_nodes_multicast((ipv6_addr_t *)&remote.addr.ipv6,
+                                  IPV6_ADDR_MCAST_SCP_LINK_LOCAL);
+
+    sock_udp_t socket;
+    if (sock_udp_create(&socket, &local, NULL, 0) < 0) {
+        puts("Creating socket failed!");
+        return 1;
+    }
+
+    u_int8_t *payload_buffer = malloc(payload_size);
+    if (payload_buffer == NULL) {
+        printf("Memory allocation failed!\n");
+        sock_udp_close(&socket);
+        return 1;
+    }
+    if (!random) {
+        memcpy(payload_buffer, _test_payload, payload_size);
+    }
+
+    unsigned long int i = 0;
+    unsigned int start_time = timer_read(1);
+    while (timer_read(1) - start_time <= runtime_us)
+    {
+        if (random) {
+            random_bytes(payload_buffer, payload_size);
+        }
+        memcpy(payload_buffer + payload_size - (sizeof(unsigned long int) + 1), &_measurement_package_marker, 1);
+        memcpy(payload_buffer + payload_size - (sizeof(unsigned long int)), &i, sizeof(unsigned long int));
+
+        printf("su %li\n", i);
+
+        // timestamp after the serial output, the round trip does not include it
+        unsigned int send_time = timer_read(1);
+        if (sock_udp_send(&socket, payload_buffer, payload_size, &remote) < 0) {
+            puts("UDP send error");
+        }
+        else {
+            // skip late echos of previous packages
+            while (1) {
+                unsigned int waited = timer_read(1) - send_time;
+                if (waited >= RTT_ECHO_TIMEOUT_US) {
+                    break;
+                }
+                int bytes_received = sock_udp_recv(&socket, _buffer, sizeof(_buffer), RTT_ECHO_TIMEOUT_US - waited, NULL);
+                unsigned int receive_time = timer_read(1);
+                if (bytes_received < 0) {
+                    break;
+                }
+
+                // the package number is only read from an echo of the full payload
+                if ((unsigned int) bytes_received != payload_size) {
+                    continue;
+                }
+
+                unsigned long int pkt_num;
+                memcpy(&pkt_num, _buffer + bytes_received - sizeof(unsigned long int), sizeof(unsigned long int));
+                if (pkt_num == i) {
+                    printf("rt %li %u\n", i, receive_time - send_time);
+                    break;
+                }
+            }
+        }
+
+        xtimer_usleep(interval);
+
+        i ++;
+    }
+
+    free(payload_buffer);
+    sock_udp_close(&socket);
+    printf("fu\n");
+
+    return 0;
+}
+
+int udp_rtt_client_cmd(int argc, char **argv) {
+
+    if (argc < 5) {
+        printf("Not enough arguments! <runtime [us]> <payload size> <interval [us]> <random [0/1]>\n");
+        return 1;
+    }
+
+    unsigned int runtime_us = atoi(argv[1]);
+    unsigned int payload_size = atoi(argv[2]);
+    unsigned int interval = atoi(argv[3]);
+    unsigned int random = atoi(argv[4]);
+
+    if (payload_size > BUFFER_SIZE) {
+        puts("Receiver buffer size too small");
+        return 1;
+    }
+
+    if (payload_size < sizeof(unsigned long int) + 1) {
+        puts("payload size too small - not enough bytes to encode package number");
+        return 1;
+    }
+
+    if (!(random == 0 || random == 1)) {
+        puts("argument random must be 0 or 1");
+        return 1;
+    }
+
+    return udp_rtt_client(runtime_us, payload_size, interval, random);
+}
+
+// send every received package back to the sender
+// the turnaround (receive to send of the echo) is printed after the send as "eu <package number> <turnaround us>"
+int udp_rtt_server_cmd(int argc, char **argv) {
+
+    if (argc < 3) {
+        printf("Not enough arguments! <timeout [us]> <payload size>\n");
+        return 1;
+    }
+
+    unsigned int timeout = atoi(argv[1]);
+    unsigned int payload_size = atoi(argv[2]);
+
+    if (payload_size > BUFFER_SIZE) {
+        puts("Receiver buffer size too small");
+        return 1;
+    }
+
+    // the package number is read from the end of the payload
+    if (payload_size < sizeof(unsigned long int) + 1) {
+        puts("payload size too small - not enough bytes to encode package number");
+        return 1;
+    }
+
+    sock_udp_ep_t local = SOCK_IPV6_EP_ANY;
+    local.port = 1337;
+
+    sock_udp_t socket;
+    if (sock_udp_create(&socket, &local, NULL, 0) < 0) {
+        puts("Creating socket failed!");
+        return 1;
+    }
+
+    puts("rr");
+    while (1)
+    {
+        sock_udp_ep_t remote;
+        int bytes_received;
+
+        bytes_received = sock_udp_recv(&socket, _buffer, sizeof(_buffer), timeout, &remote);
+        unsigned int receive_time = timer_read(1);
+        if (bytes_received >= 0) {
+            if ((unsigned int) bytes_received != payload_size) {
+                puts("du");
+                continue;
+            }
+
+            unsigned long int pkt_num;
+            memcpy(&pkt_num, _buffer + bytes_received - sizeof(unsigned long int), sizeof(unsigned long int));
+
+            if (sock_udp_send(&socket, _buffer, bytes_received, &remote) < 0) {
+                puts("UDP send error");
+                continue;
+            }
+            printf("eu %li %u\n", pkt_num, timer_read(1) - receive_time);
+        }
+        else if (bytes_received == -ETIMEDOUT) {
+            puts("Timeout");
+            break;
+        }
+    }
+
+    sock_udp_close(&socket);
+
+    return 0;
+}
+
+// time without a frame handled by the netif after which the window of udp_bulk_client is resynchronized
+// (longer than the air time of the largest frame at the lowest data rate)
+#define BULK_WINDOW_STALL_US (2000000U)
+
+// send packages back to back for runtime_us
+// window > 0: at most window packages in the network stack (sent with sock_udp_send, not yet handled by the netif)
+// window = 0: send as fast as the network stack accepts the packages, failed sends are queue drops (su without sl)
+int udp_bulk_client(unsigned int runtime_us, unsigned int payload_size, unsigned int window, unsigned int random) {
+
+    sock_udp_ep_t local = SOCK_IPV6_EP_ANY;
+    local.port = 1234;
+
+    sock_udp_ep_t remote = { .family = AF_INET6 };
+    remote.port = 1337;
+    ipv6_addr_set_all_nodes_multicast((ipv6_addr_t *)&remote.addr.ipv6,
+                                  IPV6_ADDR_MCAST_SCP_LINK_LOCAL);
+
+    sock_udp_t socket;
+    if (sock_udp_create(&socket, &local, NULL, 0) < 0) {
+        puts("Creating socket failed!");
+        return 1;
+    }
+
+    u_int8_t *payload_buffer = malloc(payload_size);
+    if (payload_buffer == NULL) {
+        printf("Memory allocation failed!\n");
+        sock_udp_close(&socket);
+        return 1;
+    }
+    if (!random) {
+        memcpy(payload_buffer, _test_payload, payload_size);
+    }
+
+    // other frames (e.g. RPL) are counted as well, the window is then slightly larger
+    uint32_t frames_done_start = vlc_netif_frames_done();
+    uint32_t packages_accepted = 0;
+
+    unsigned long int i = 0;
+    unsigned int start_time = timer_read(1);
+    while (timer_read(1) - start_time <= runtime_us)
+    {
+        // wait for a free slot in the window
+        // a package dropped by GNRC after sock_udp_send (full netif queue or pktbuf) never reaches the netif, if no
+        // frame is handled for BULK_WINDOW_STALL_US the accepted packages are set to the handled frames
+        uint32_t frames_done = vlc_netif_frames_done();
+        unsigned int progress_time = timer_read(1);
+        while (window > 0 && packages_accepted - (frames_done - frames_done_start) >= window) {
+            if (timer_read(1) - start_time > runtime_us) {
+                break;
+            }
+            xtimer_usleep(100);
+
+            if (vlc_netif_frames_done() != frames_done) {
+                frames_done = vlc_netif_frames_done();
+                progress_time = timer_read(1);
+            }
+            else if (timer_read(1) - progress_time > BULK_WINDOW_STALL_US) {
+                packages_accepted = frames_done - frames_done_start;
+            }
+        }
+        // no package after the runtime
+        if (timer_read(1) - start_time > runtime_us) {
+            break;
+        }
+
+        if (random) {
+            random_bytes(payload_buffer, payload_size);
+        }
+        memcpy(payload_buffer + payload_size - (sizeof(unsigned long int) + 1), &_measurement_package_marker, 1);
+        memcpy(payload_buffer + payload_size - (sizeof(unsigned long int)), &i, sizeof(unsigned long int));
+
+        printf("su %li\n", i);
+
+        if (sock_udp_send(&socket, payload_buffer, payload_size, &remote) < 0) {
+            puts("UDP send error");
+        }
+        else {
+            packages_accepted++;
+        }
+
+        i ++;
+    }
+
+    free(payload_buffer);
+    sock_udp_close(&socket);
+    printf("fu\n");
+
+    return 0;
+}
+
+int udp_bulk_client_cmd(int argc, char **argv) {
+
+    if (argc < 5) {
+        printf("Not enough arguments! <runtime [us]> <payload size> <window> <random [0/1]>\n");
+        return 1;
+    }
+
+    unsigned int runtime_us = atoi(argv[1]);
+    unsigned int payload_size = atoi(argv[2]);
+    unsigned int window = atoi(argv[3]);
+    unsigned int random = atoi(argv[4]);
+
+    if (payload_size > BUFFER_SIZE) {
+        puts("Receiver buffer size too small");
+        return 1;
+    }
+
+    if (payload_size < sizeof(unsigned long int) + 1) {
+        puts("payload size too small - not enough bytes to encode package number");
+        return 1;
+    }
+
+    if (!(random == 0 || random == 1)) {
+        puts("argument random must be 0 or 1");
+        return 1;
+    }
+
+    return udp_bulk_client(runtime_us, payload_size, window, random);
+}
+
 // int udp_throughput_client_cmd(int argc, char **argv) {
 
     
@@ -210,6 +516,9 @@ int udp_latency_server_cmd(int argc, char **argv) {
 static const shell_command_t shell_commands[] = {
     { "udp_latency_client", "<runtime_us> <payload size> <interval_us> <random [0/1]>- Latency measurement client", udp_latency_client_cmd},
     { "udp_latency_server", "<timeout_us> <payload size> <random [0/1]> - Latency measurement server", udp_latency_server_cmd},
+    { "udp_rtt_client", "<runtime_us> <payload size> <interval_us> <random [0/1]> - Round trip measurement client", udp_rtt_client_cmd},
+    { "udp_rtt_server", "<timeout_us> <payload size> - Round trip measurement server (echo)", udp_rtt_server_cmd},
+    { "udp_bulk_client", "<runtime_us> <payload size> <window> <random [0/1]> - Back to back sending with a window of packages", udp_bulk_client_cmd},
     { NULL, NULL, NULL }
 };
 
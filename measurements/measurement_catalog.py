@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from measurement_files import (list_measurement_files, list_rtt_files, load_measurement, load_rtt_measurement,
+                               parse_file_name, rtt_file_prefix)
+from measurements import measurement_path
+
+# SQLite catalog of the measurement files
+#
+# One row per run with the sweep parameters of the file name (data rate, tolerance, reference voltage), the meta data
+# header (payload, interval, runtime, distance, network stack, send window, material, firmware hash) and summary
+# metrics, so runs can be selected without reading the files. write_measurement_to_file adds every new file, files
+# written before (or copied from elsewhere) are added by the scanner:
+#
+#   python3 measurement_catalog.py scan
+#   python3 measurement_catalog.py query --data-rate 30000 --payload 100 --since 2021-03-01
+#
+# The catalog is stored in the measurement path (catalog_file_name), paths are relative to it. The files stay the
+# source of the data: a changed file (size or modification time) is read again by the next scan.
+
+catalog_file_name = "catalog.sqlite"
+
+# (column, sqlite type), the order of the table
+catalog_columns = [
+    ("path", "TEXT PRIMARY KEY"),
+    ("directory", "TEXT"),
+    ("file_name", "TEXT"),
+    ("kind", "TEXT"),                   # latency or rtt
+    ("start_time", "TEXT"),             # YYYY-MM-DD HH:MM:SS
+    ("data_rate_bps", "INTEGER"),
+    ("tolerance", "INTEGER"),
+    ("ref_voltage", "REAL"),
+    ("payload_size_bytes", "INTEGER"),
+    ("interval_us", "INTEGER"),
+    ("runtime_us", "INTEGER"),
+    ("distance_cm", "REAL"),
+    ("stack", "TEXT"),
+    ("send_window", "INTEGER"),
+    ("material", "TEXT"),
+    ("firmware_hash", "TEXT"),
+    ("note", "TEXT"),
+    # summary metrics, latencies in ms and throughput in bit/s (None if not defined for the kind)
+    ("packets", "INTEGER"),
+    ("reliability_udp", "REAL"),
+    ("reliability_link", "REAL"),
+    ("queue_drop_rate", "REAL"),
+    ("average_udp_latency_ms", "REAL"),
+    ("median_udp_latency_ms", "REAL"),
+    ("p95_udp_latency_ms", "REAL"),
+    ("average_link_latency_ms", "REAL"),
+    ("throughput_udp_bps", "REAL"),
+    ("throughput_link_bps", "REAL"),
+    ("average_rtt_ms", "REAL"),
+    ("median_rtt_ms", "REAL"),
+    ("rtt_jitter_ms", "REAL"),
+    # state of the file when it was added
+    ("file_size", "INTEGER"),
+    ("file_mtime", "REAL"),
+]
+
+_column_names = [c for c, _ in catalog_columns]
+
+indexed_columns = ["start_time", "data_rate_bps", "tolerance", "ref_voltage", "payload_size_bytes", "interval_us",
+                   "distance_cm", "material", "firmware_hash", "directory"]
+
+
+# open (and create) the catalog of a measurement path
+def open_catalog(path=measurement_path):
+    connection = sqlite3.connect(os.path.join(path, catalog_file_name), timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.execute("CREATE TABLE IF NOT EXISTS runs (" + ", ".join(c + " " + t for c, t in catalog_columns) + ")")
+    for column in indexed_columns:
+        connection.execute(f"CREATE INDEX IF NOT EXISTS runs_{column} ON runs ({column})")
+    connection.execute("CREATE INDEX IF NOT EXISTS runs_data_rate_payload ON runs (data_rate_bps, payload_size_bytes)")
+    connection.commit()
+    return connection
+
+
+# -1 of the measurement methods (no packets) is stored as NULL
+def _defined(value):
+    return None if value == -1 else value
+
+
+# summary metrics of a loaded run
+def run_summary(l, kind="latency"):
+    result = l.get_result()
+    summary = {c: None for c in _column_names[_column_names.index("packets"):_column_names.index("file_size")]}
+    summary["packets"] = len(result)
+    if len(result) == 0:
+        return summary
+
+    if kind == "rtt":
+        summary["reliability_udp"] = l.get_reliability()
+        summary["average_rtt_ms"] = _defined(l.get_average_rtt())
+        summary["median_rtt_ms"] = _defined(l.get_median_rtt())
+        summary["rtt_jitter_ms"] = _defined(l.get_rtt_jitter())
+        return summary
+
+    record = l.get_summary()
+    for field in ["reliability_udp", "reliability_link", "queue_drop_rate", "average_udp_latency_ms", "median_udp_latency_ms",
+                  "p95_udp_latency_ms", "average_link_latency_ms", "throughput_udp_bps", "throughput_link_bps"]:
+        summary[field] = _defined(record[field])
+    return summary
+
+
+# catalog row of a loaded run, path is the file relative to the measurement path
+def catalog_row(l, path, root=measurement_path):
+    file_name = os.path.basename(path)
+    kind = "rtt" if file_name.startswith(rtt_file_prefix) else "latency"
+    parameters = parse_file_name(file_name)
+    stat = os.stat(os.path.join(root, path))
+
+    row = {
+        "path": path,
+        "directory": os.path.dirname(path),
+        "file_name": file_name,
+        "kind": kind,
+        "start_time": None,
+        "data_rate_bps": parameters["data_rate_bps"],
+        "tolerance": parameters["tolerance"],
+        "ref_voltage": parameters["ref_voltage"],
+        "payload_size_bytes": l.get_payload_size(),
+        "interval_us": l.get_interval_us(),
+        "runtime_us": l.get_runtime_us(),
+        "distance_cm": l.get_distance_cm(),
+        "stack": l.get_stack(),
+        "send_window": l.get_send_window() if kind == "latency" else None,
+        "material": l.get_material(),
+        "firmware_hash": l.get_firmware_hash(),
+        "note": parameters["note"],
+        "file_size": stat.st_size,
+        "file_mtime": stat.st_mtime,
+    }
+    if parameters["start_time"] != None:
+        date, time = parameters["start_time"].split("T")
+        row["start_time"] = date + " " + time.replace("-", ":")
+    row.update(run_summary(l, kind))
+    return row
+
+
+def _insert(connection, row):
+    connection.execute("INSERT OR REPLACE INTO runs (" + ", ".join(_column_names) + ") VALUES ("
+                       + ", ".join("?" * len(_column_names)) + ")", [row[c] for c in _column_names])
+
+
+# add a written measurement (LatencyMeasurement or RttMeasurement) to the catalog of its measurement path
+def register_measurement(filename, l, root=measurement_path):
+    connection = open_catalog(root)
+    with connection:
+        _insert(connection, catalog_row(l, os.path.relpath(filename, root), root))
+    connection.close()
+
+
+# load a file of the measurement path and build its row, None if the file cannot be parsed
+def _load_row(job):
+    path, root = job
+    file_name = os.path.basename(path)
+    try:
+        if file_name.startswith(rtt_file_prefix):
+            l = load_rtt_measurement(os.path.join(root, path))
+        else:
+            l = load_measurement(os.path.join(root, path))
+    except AssertionError as e:
+        print("[WARNING] " + str(e))
+        return None
+    return catalog_row(l, path, root)
+
+
+# measurement files of all directories below the measurement path, relative to it
+def measurement_file_paths(root=measurement_path):
+    paths = []
+    for directory, _, _ in os.walk(root):
+        files = list_measurement_files(directory) + list_rtt_files(directory)
+        paths += [os.path.relpath(os.path.join(directory, f), root) for f in sorted(files)]
+    return paths
+
+
+# add new and changed files of the measurement path to the catalog, remove rows of deleted files
+# returns (added or updated, unchanged, removed, failed)
+def scan_measurements(root=measurement_path, jobs=None, rescan=False):
+    connection = open_catalog(root)
+    known = {r["path"]: (r["file_size"], r["file_mtime"]) for r in connection.execute("SELECT path, file_size, file_mtime FROM runs")}
+
+    paths = measurement_file_paths(root)
+    changed = []
+    for path in paths:
+        stat = os.stat(os.path.join(root, path))
+        if rescan or known.get(path) != (stat.st_size, stat.st_mtime):
+            changed.append(path)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor, connection:
+        for row in executor.map(_load_row, [(p, root) for p in changed], chunksize=4):
+            if row == None:
+                failed += 1
+                continue
+            _insert(connection, row)
+
+        present = set(paths)
+        removed = [p for p in known if p not in present]
+        connection.executemany("DELETE FROM runs WHERE path = ?", [(p,) for p in removed])
+
+    connection.close()
+    return len(changed) - failed, len(paths) - len(changed), len(removed), failed
+
+
+# rows of the runs which match all filters, ordered by start time
+# filters: column=value, column=[values] (any of), column=(min, max) (inclusive, None for no bound)
+# since, until: start time "YYYY-MM-DD[ HH:MM:SS]" (until is inclusive for a date)
+def query_runs(connection, since=None, until=None, order_by="start_time", **filters):
+    conditions = []
+    values = []
+    for column, value in filters.items():
+        assert column in _column_names, "unknown catalog column: " + column
+        if isinstance(value, list):
+            conditions.append(column + " IN (" + ", ".join("?" * len(value)) + ")")
+            values += value
+        elif isinstance(value, tuple):
+            low, high = value
+            if low != None:
+                conditions.append(column + " >= ?")
+                values.append(low)
+            if high != None:
+                conditions.append(column + " <= ?")
+                values.append(high)
+        elif value == None:
+            conditions.append(column + " IS NULL")
+        else:
+            conditions.append(column + " = ?")
+            values.append(value)
+    if since != None:
+        conditions.append("start_time >= ?")
+        values.append(since)
+    if until != None:
+        conditions.append("start_time <= ?")
+        values.append(until if len(until) > 10 else until + " 23:59:59")
+    assert order_by in _column_names, "unknown catalog column: " + order_by
+
+    sql = "SELECT * FROM runs"
+    if len(conditions) > 0:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY " + order_by + ", path"
+    return [dict(r) for r in connection.execute(sql, values)]
+
+
+def write_rows(rows, file, columns=_column_names):
+    file.write(";".join(columns) + "\n")
+    for row in rows:
+        file.write(";".join("" if row[c] == None else str(row[c]) for c in columns) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite catalog of the measurement files")
+    parser.add_argument("command", choices=["scan", "query"], help="scan: add new and changed files, query: select runs")
+    parser.add_argument("-p", "--path", default=measurement_path, help="measurement path")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes (scan)")
+    parser.add_argument("--rescan", action="store_true", help="read all files again (scan)")
+    parser.add_argument("--kind", choices=["latency", "rtt"], help="kind of the runs")
+    parser.add_argument("-r", "--data-rate", type=int, nargs="+", help="data rates in bit/s")
+    parser.add_argument("--payload", type=int, nargs="+", help="payload sizes in bytes")
+    parser.add_argument("--interval", type=int, nargs="+", help="send intervals in us")
+    parser.add_argument("--tolerance", type=int, nargs="+", help="receiver tolerances in percent")
+    parser.add_argument("--distance", type=float, nargs=2, metavar=("MIN", "MAX"), help="range of the distance in cm")
+    parser.add_argument("--material", nargs="+", help="materials")
+    parser.add_argument("--ref-voltage", type=float, nargs="+", help="reference voltages in V")
+    parser.add_argument("--firmware", nargs="+", help="firmware hashes")
+    parser.add_argument("--directory", nargs="+", help="directories relative to the measurement path")
+    parser.add_argument("--since", help="first start time YYYY-MM-DD[ HH:MM:SS]")
+    parser.add_argument("--until", help="last start time YYYY-MM-DD[ HH:MM:SS]")
+    parser.add_argument("-c", "--columns", nargs="+", default=["path", "start_time", "data_rate_bps", "payload_size_bytes",
+                        "interval_us", "distance_cm", "reliability_udp", "average_udp_latency_ms", "throughput_udp_bps"],
+                        help="columns of the query output")
+    parser.add_argument("-o", "--output", help="output csv file of the query, default stdout")
+    args = parser.parse_args()
+
+    if args.command == "scan":
+        added, unchanged, removed, failed = scan_measurements(args.path, args.jobs, args.rescan)
+        print(f"Catalog {os.path.join(args.path, catalog_file_name)}: {added} added or updated, {unchanged} unchanged, "
+              f"{removed} removed, {failed} not parsable")
+    else:
+        filters = {}
+        for column, value in [("kind", args.kind), ("data_rate_bps", args.data_rate), ("payload_size_bytes", args.payload),
+                              ("interval_us", args.interval), ("tolerance", args.tolerance), ("material", args.material),
+                              ("ref_voltage", args.ref_voltage), ("firmware_hash", args.firmware), ("directory", args.directory)]:
+            if value != None:
+                filters[column] = value
+        if args.distance != None:
+            filters["distance_cm"] = tuple(args.distance)
+
+        connection = open_catalog(args.path)
+        rows = query_runs(connection, args.since, args.until, **filters)
+        connection.close()
+        if args.output:
+            with open(args.output, 'w') as file:
+                write_rows(rows, file, args.columns)
+            print(f"Saved {len(rows)} runs in file: " + args.output)
+        else:
+            write_rows(rows, sys.stdout, args.columns)
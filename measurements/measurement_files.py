@@ -0,0 +1,133 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from measurements import LatencyMeasurement, RttMeasurement, network_stack_header_bytes
+
+# file which may contain notes about the measurements of a directory
+measurement_notes_file = "measurement.txt"
+
+# sweep parameters encoded in the file names written by LatencyMeasurement.write_measurement_to_file
+# e.g. latency_2021-03-28T17-46-56_100b_over300s_every130ms_30kbps_0_43_V_ref.csv
+#      latency_2021-04-02T10-11-12_100b_over45s_every91ms_rtol25_0_43_V_ref_30000kbps.csv
+_start_time_pattern = re.compile(r"^(?:latency|rtt)_(\d{4}-\d{2}-\d{2}T\d{2}-\d{2}-\d{2})_")
+_data_rate_pattern = re.compile(r"_(\d+)(k?)bps")
+_tolerance_pattern = re.compile(r"rtol(\d+)")
+_ref_voltage_pattern = re.compile(r"_(\d+)_(\d+)_V_ref")
+_note_pattern = re.compile(r"_every\d+ms_?(.*)\.csv$")
+
+
+# prefix of the files written by RttMeasurement.write_measurement_to_file
+rtt_file_prefix = "rtt_"
+
+
+# sorted list of the measurement files (csv) in a directory, without round trip measurements
+def list_measurement_files(directory):
+    files = sorted(os.listdir(directory))
+
+    return [f for f in files if f.endswith(".csv") and f != measurement_notes_file and not f.startswith(rtt_file_prefix)]
+
+
+# sorted list of the round trip measurement files (csv) in a directory
+def list_rtt_files(directory):
+    return [f for f in sorted(os.listdir(directory)) if f.endswith(".csv") and f.startswith(rtt_file_prefix)]
+
+
+# parse the sweep parameters from a measurement file name, missing parameters are None
+def parse_file_name(file_name):
+    file_name = os.path.basename(file_name)
+    parameters = {
+        "start_time": None,
+        "data_rate_bps": None,
+        "tolerance": None,
+        "ref_voltage": None,
+        "note": None,
+    }
+
+    match = _start_time_pattern.search(file_name)
+    if match:
+        parameters["start_time"] = match.group(1)
+
+    match = _data_rate_pattern.search(file_name)
+    if match:
+        data_rate = int(match.group(1))
+        # some sweeps wrote the data rate in bit/s with a kbps suffix
+        if match.group(2) == "k" and data_rate < 1000:
+            data_rate *= 1000
+        parameters["data_rate_bps"] = data_rate
+
+    match = _tolerance_pattern.search(file_name)
+    if match:
+        parameters["tolerance"] = int(match.group(1))
+
+    match = _ref_voltage_pattern.search(file_name)
+    if match:
+        parameters["ref_voltage"] = float(match.group(1) + "." + match.group(2))
+
+    match = _note_pattern.search(file_name)
+    if match:
+        parameters["note"] = match.group(1)
+
+    return parameters
+
+
+# read a measurement file, asserts that the file can be parsed
+def load_measurement(path):
+    l = LatencyMeasurement()
+    result = l.read_measurement_from_file(path)
+    assert result != None, "parsing error: " + path
+
+    return l
+
+
+# read a round trip measurement file, asserts that the file can be parsed
+def load_rtt_measurement(path):
+    l = RttMeasurement()
+    result = l.read_measurement_from_file(path)
+    assert result != None, "parsing error: " + path
+
+    return l
+
+
+# all parameters of a loaded measurement: file name parameters and the meta data header
+def run_parameters(l, file_name):
+    parameters = parse_file_name(file_name)
+    parameters["file_name"] = os.path.basename(file_name)
+
+    parameters["runtime_us"] = l.get_runtime_us()
+    parameters["payload_size_bytes"] = l.get_payload_size()
+    parameters["stack"] = l.get_stack()
+    # UDP payload + UDP header (8 bytes) + IPv6 header (40 bytes), compressed with 6LoWPAN
+    parameters["link_payload_size_bytes"] = l.get_payload_size() + network_stack_header_bytes[l.get_stack()]
+    parameters["interval_us"] = l.get_interval_us()
+    parameters["interval_ms"] = l.get_interval_us() / 1000
+    parameters["distance_cm"] = l.get_distance_cm()
+    parameters["material"] = l.get_material()
+    parameters["firmware_hash"] = l.get_firmware_hash()
+
+    if parameters["data_rate_bps"] != None:
+        parameters["data_rate_kbps"] = parameters["data_rate_bps"] / 1000
+    else:
+        parameters["data_rate_kbps"] = None
+
+    if parameters["tolerance"] != None:
+        parameters["tolerance_fraction"] = parameters["tolerance"] / 100
+    else:
+        parameters["tolerance_fraction"] = None
+
+    return parameters
+
+
+# summary record of a measurement file: run parameters and LatencyMeasurement.get_summary
+def summary_record(path):
+    l = load_measurement(path)
+    record = run_parameters(l, path)
+    record.update(l.get_summary())
+    return record
+
+
+# summary records of all measurement files of a directory, the files are read in parallel
+def summary_records(directory, jobs=None):
+    paths = [os.path.join(directory, f) for f in list_measurement_files(directory)]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(summary_record, paths))
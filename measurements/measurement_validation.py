@@ -0,0 +1,136 @@
+import numpy as np
+
+# Validation of the packages of a LatencyMeasurement on whole columns
+#
+# The rules are the checks of LatencyMeasurementData.is_valid, every rule is evaluated for all packages at once and
+# a package can violate several rules. Instead of one line per package the report counts the violations per rule
+# and keeps the indices of the offending packages.
+# Policies for invalid packages:
+#   keep:   keep the packages unchanged (like is_valid, which only warns)
+#   drop:   remove the invalid packages from the result
+#   repair: set the inconsistent values to missing (-1) until the package is valid, link layer values first, so a
+#           udp package is counted as lost if its link layer data is missing or inconsistent. Packages without a
+#           package number are dropped.
+
+policies = ["keep", "drop", "repair"]
+
+# (name, description), the order of the checks in is_valid
+rules = [
+    ("undefined_package_number", "undefined package number"),
+    ("udp_received_not_sent", "udp package received but not send"),
+    ("udp_received_not_sent_link", "udp package received but not send at link layer"),
+    ("udp_received_no_link_latency", "udp package received but no link layer latency"),
+    ("link_received_no_udp_send", "link layer package received but no udp package send"),
+    ("link_received_not_sent_link", "link layer package received but not send at link layer"),
+    ("link_send_before_udp_send", "link layer send time < udp send time"),
+    ("link_latency_above_udp_latency", "link layer latency > udp latency"),
+]
+
+
+# violations per rule of one validation
+class ValidationReport:
+    def __init__(self, number_packages, violations, policy="keep", changed=None):
+        self.number_packages = number_packages
+        self.violations = violations                    # {rule: indices of the packages}
+        self.policy = policy
+        # indices (before dropping) of the packages which were dropped or repaired
+        self.changed = changed if changed is not None else np.zeros(0, dtype=int)
+
+    def count(self, rule):
+        return len(self.violations[rule])
+
+    # indices of the packages which violate at least one rule
+    def invalid_indices(self):
+        if len(self.violations) == 0:
+            return np.zeros(0, dtype=int)
+        return np.unique(np.concatenate(list(self.violations.values())))
+
+    def is_valid(self):
+        return all(len(i) == 0 for i in self.violations.values())
+
+    # one line per violated rule with the first offending packages
+    def summary(self, number_examples=5):
+        invalid = len(self.invalid_indices())
+        lines = [f"{invalid} of {self.number_packages} packages not valid"]
+        for name, description in rules:
+            indices = self.violations[name]
+            if len(indices) > 0:
+                examples = ", ".join(str(i) for i in indices[:number_examples])
+                lines.append(f"  {description}: {len(indices)} (packages {examples}{', ...' if len(indices) > number_examples else ''})")
+        if self.policy == "drop":
+            lines.append(f"  {len(self.changed)} packages dropped")
+        elif self.policy == "repair":
+            lines.append(f"  {len(self.changed)} packages repaired or dropped")
+        return "\n".join(lines)
+
+
+# indices of the violations per rule of the columns of a result (-1 marks a missing value)
+def validate_columns(pkt_number, udp_send_time_s, link_send_time_s, link_latency_ms, udp_latency_ms):
+    udp_received = udp_latency_ms != -1
+    link_received = link_latency_ms != -1
+    link_sent = link_send_time_s != -1
+    udp_sent = udp_send_time_s != -1
+
+    masks = {
+        # nan: pkt_number None
+        "undefined_package_number": ~(pkt_number >= 0),
+        "udp_received_not_sent": udp_received & ~udp_sent,
+        "udp_received_not_sent_link": udp_received & ~link_sent,
+        "udp_received_no_link_latency": udp_received & ~link_received,
+        "link_received_no_udp_send": link_received & ~udp_sent,
+        "link_received_not_sent_link": link_received & ~link_sent,
+        "link_send_before_udp_send": link_sent & (link_send_time_s < udp_send_time_s),
+        "link_latency_above_udp_latency": udp_received & (link_latency_ms > udp_latency_ms),
+    }
+    return {name: np.flatnonzero(mask) for name, mask in masks.items()}
+
+
+# columns of a list of LatencyMeasurementData as float arrays (pkt_number None is nan)
+def result_columns(result):
+    n = len(result)
+    return (np.fromiter((np.nan if m.pkt_number == None else m.pkt_number for m in result), float, n),
+            np.fromiter((m.udp_send_time_s for m in result), float, n),
+            np.fromiter((m.link_send_time_s for m in result), float, n),
+            np.fromiter((m.link_latency_ms for m in result), float, n),
+            np.fromiter((m.udp_latency_ms for m in result), float, n))
+
+
+# validate a list of LatencyMeasurementData and apply the policy
+# returns (result, ValidationReport), the report counts the violations before the policy was applied
+def validate_result(result, policy="keep"):
+    assert policy in policies, "unknown validation policy: " + str(policy)
+    columns = result_columns(result)
+    violations = validate_columns(*columns)
+    report = ValidationReport(len(result), violations, policy)
+    if policy == "keep" or report.is_valid():
+        return result, report
+
+    invalid = report.invalid_indices()
+    report.changed = invalid
+    if policy == "drop":
+        keep = np.ones(len(result), dtype=bool)
+        keep[invalid] = False
+        return [m for m, k in zip(result, keep) if k], report
+
+    # repair: only the invalid packages are touched
+    pkt_number, udp_send, link_send, link_latency, udp_latency = (c[invalid].copy() for c in columns)
+    # link layer values which are inconsistent with the udp send
+    bad_link = (link_send != -1) & (link_send < udp_send)
+    link_send[bad_link] = -1
+    link_latency[bad_link | (link_send == -1) | (udp_send == -1)] = -1
+    # udp values without a complete link layer
+    udp_received = udp_latency != -1
+    bad_udp = udp_received & ((udp_send == -1) | (link_send == -1) | (link_latency == -1) | (link_latency > udp_latency))
+    udp_latency[bad_udp] = -1
+
+    defined = pkt_number >= 0
+    for i, index in enumerate(invalid):
+        m = result[index]
+        m.link_send_time_s = float(link_send[i])
+        m.link_latency_ms = float(link_latency[i])
+        m.udp_latency_ms = float(udp_latency[i])
+
+    if np.all(defined):
+        return result, report
+    drop = set(invalid[~defined].tolist())
+    return [m for i, m in enumerate(result) if i not in drop], report
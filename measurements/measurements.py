@@ -1,8 +1,13 @@
 from serial import Serial
 from threading import Thread, Lock
 from time import time
+import os
 from datetime import datetime
 import math
+import statistics
+
+from flash_nodes import firmware_hash
+from measurement_validation import policies as validation_policies, validate_result
 
 port_sender = "/dev/ttyACM0"
 port_receiver = "/dev/ttyACM1"
@@ -10,6 +15,90 @@ port_receiver = "/dev/ttyACM1"
 # path to store measurements
 measurement_path = "/home/tim/Bachelorarbeit/Messungen/"
 
+# network stack of the nodes (vlc_netif NETTYPE): plain IPv6 or 6LoWPAN (module gnrc_sixlowpan_default)
+network_stacks = ["ipv6", "sixlowpan"]
+# IPv6 + UDP header of the measurement packets in bytes per network stack:
+# 6LoWPAN: IPHC (2) + multicast destination ff02::1 (1) + UDP NHC (1) + ports (4) + checksum (2), see sixlowpan_model
+network_stack_header_bytes = {"ipv6": 48, "sixlowpan": 10}
+
+# meta data header of the measurement files
+def _write_meta_data(file, runtime_us, payload_size_bytes, interval_us, distance_cm, stack, send_window=None, material=None,
+                     firmware=None):
+    file.write("Runtime in us;" + str(runtime_us) + "\n")
+    file.write("Payload size in byte;" + str(payload_size_bytes) + "\n")
+    file.write("Interval in us;" + str(int(interval_us)) + "\n")
+    if (distance_cm):
+        file.write("Distance in cm;" + str(float(distance_cm)) + "\n")
+    if stack != "ipv6":
+        file.write("Network stack;" + stack + "\n")
+    if send_window != None:
+        file.write("Send window;" + str(send_window) + "\n")
+    if material != None:
+        file.write("Material;" + material + "\n")
+    if firmware != None:
+        file.write("Firmware;" + firmware + "\n")
+    file.write("\n")
+
+
+# returns (runtime_us, payload_size_bytes, interval_us, distance_cm, stack, send_window, material, firmware),
+# raises an exception if not parsable
+def _read_meta_data(file):
+    runtime = int(file.readline().split(';')[-1])
+    payload_size_bytes = int(file.readline().split(';')[-1])
+    interval_us = int(file.readline().split(';')[-1])
+    # optional lines (distance, network stack) until the empty line
+    distance_cm = None
+    stack = "ipv6"
+    send_window = None
+    material = None
+    firmware = None
+    optional_line = file.readline()
+    while optional_line.strip() != "":
+        name, value = optional_line.strip().split(";")
+        if name == "Distance in cm":
+            distance_cm = float(value)
+        elif name == "Network stack":
+            assert value in network_stacks, "unknown network stack: " + value
+            stack = value
+        elif name == "Send window":
+            send_window = int(value)
+        elif name == "Material":
+            material = value
+        elif name == "Firmware":
+            firmware = value
+        else:
+            print("[WARNING] unknown meta data: " + name)
+        optional_line = file.readline()
+
+    return runtime, payload_size_bytes, interval_us, distance_cm, stack, send_window, material, firmware
+
+
+# fields of LatencyMeasurement.get_summary
+summary_fields = ["packets", "reliability_udp", "reliability_link", "queue_drop_rate", "average_udp_latency_ms",
+                  "median_udp_latency_ms", "p95_udp_latency_ms", "max_udp_latency_ms", "average_link_latency_ms",
+                  "min_link_latency_ms", "throughput_udp_bps", "throughput_link_bps"]
+
+
+# percentile of sorted values with linear interpolation (like numpy), -1 for no values
+def _percentile(sorted_values, percentile):
+    if len(sorted_values) == 0:
+        return -1
+    position = (len(sorted_values) - 1) * percentile / 100
+    below = math.floor(position)
+    above = min(below + 1, len(sorted_values) - 1)
+    return sorted_values[below] + (position - below) * (sorted_values[above] - sorted_values[below])
+
+
+# add a written measurement file to the measurement catalog, a failure does not affect the file
+def _register_in_catalog(filename, l, path):
+    # imported here, the catalog depends on measurement_files which depends on this module
+    from measurement_catalog import register_measurement
+    try:
+        register_measurement(filename, l, path)
+    except Exception as e:
+        print("[WARNING] measurement not added to the catalog: " + str(e))
+
+
 # measurement data of one packet
 # -1 marks missing value
 class LatencyMeasurementData:
@@ -88,16 +177,35 @@ class LatencyMeasurementData:
 #       rr: receiver ready (setup complete, send can be started)
 #       du: drop udp, payload does not match
 # NOTE: output serial data takes ~0.5ms on board
+# Bulk mode (send_window not None, udp_bulk_client): the sender sends back to back without interval and keeps at most
+# send_window packets in GNRC (sent with sock_udp_send, not yet sent on the link), 0 sends as fast as GNRC accepts.
+# A package with "su" but without "sl" was dropped by GNRC (pktbuf or netif queue full).
 class LatencyMeasurement():
 
     # interval is the delay between each call of send
     # if the payload is not random, the udp payload is dropped if it is not received correctly
-    def __init__(self, runtime_us=10*1000000, payload_size_bytes=100, interval_us=1000000, distance_cm=None, random_payload=True):
+    # stack is the network stack the nodes were built with, one of network_stacks
+    # send_window: packets outstanding in bulk mode, None for the paced mode with interval
+    # material: material between the LED and the photodiode, None for free space
+    # validation_policy: handling of invalid packages after run() and read_measurement_from_file, one of
+    #                    measurement_validation.policies (keep, drop, repair)
+    def __init__(self, runtime_us=10*1000000, payload_size_bytes=100, interval_us=1000000, distance_cm=None, random_payload=True, stack="ipv6",
+                 send_window=None, material=None, validation_policy="keep"):
+        assert stack in network_stacks, "unknown network stack: " + str(stack)
+        assert send_window == None or send_window >= 0, "negative send window"
+        assert validation_policy in validation_policies, "unknown validation policy: " + str(validation_policy)
+        if send_window != None:
+            interval_us = 0
         self.__runtime_us = runtime_us
         self.__payload_size_bytes = payload_size_bytes
         self.__interval_us = interval_us
         self.__distance_cm = distance_cm
         self.__random_payload = random_payload
+        self.__stack = stack
+        self.__send_window = send_window
+        self.__material = material
+        # git commit of the firmware sources at the start of run(), see flash_nodes.firmware_hash
+        self.__firmware_hash = None
 
         # make sure that server runs before client starts
         self.__init_finished_lock = Lock()
@@ -115,6 +223,10 @@ class LatencyMeasurement():
 
         # result of measurement
         self.__result = []
+        # derived metrics of the result, see __get_metrics
+        self.__metrics = None
+        self.__validation_policy = validation_policy
+        self.__validation_report = None
 
     def get_runtime_us(self):
         return self.__runtime_us
@@ -130,62 +242,130 @@ class LatencyMeasurement():
     def get_distance_cm(self):
         return self.__distance_cm
 
+    # network stack, one of network_stacks
+    def get_stack(self):
+        return self.__stack
+
+    # packets outstanding in bulk mode, None for the paced mode
+    def get_send_window(self):
+        return self.__send_window
+
+    def get_material(self):
+        return self.__material
+
+    def get_firmware_hash(self):
+        return self.__firmware_hash
+
+    # measurement_validation.ValidationReport of the last run() or read_measurement_from_file
+    def get_validation_report(self):
+        return self.__validation_report
+
+    # list of LatencyMeasurementData, one per package
+    def get_result(self):
+        return self.__result
+
+    # result of a measurement which was not run on the nodes (e.g. simulated)
+    def set_result(self, result):
+        self.__result = result
+        self.__metrics = None
+
+    # counts and latency axes of the result, computed in one pass on first use and kept until the result is replaced
+    # (run, read_measurement_from_file, set_result). Change the result only with set_result.
+    def __get_metrics(self):
+        if self.__metrics != None:
+            return self.__metrics
+
+        metrics = {
+            "number_send_udp": 0, "number_received_udp": 0, "number_send_link": 0, "number_received_link": 0,
+            "number_queue_dropped": 0, "number_udp_latency_positive": 0, "number_link_latency_positive": 0,
+            "udp_axis": ([], []), "link_axis": ([], []),
+        }
+        x_udp, y_udp = metrics["udp_axis"]
+        x_link, y_link = metrics["link_axis"]
+        for m in self.__result:
+            if m.udp_send_time_s != -1:
+                metrics["number_send_udp"] += 1
+                if m.udp_latency_ms != -1:
+                    metrics["number_received_udp"] += 1
+                if m.link_send_time_s == -1:
+                    metrics["number_queue_dropped"] += 1
+            if m.link_send_time_s != -1:
+                metrics["number_send_link"] += 1
+                if m.link_latency_ms != -1:
+                    metrics["number_received_link"] += 1
+            if m.udp_latency_ms > 0:
+                metrics["number_udp_latency_positive"] += 1
+            if m.link_latency_ms > 0:
+                metrics["number_link_latency_positive"] += 1
+            if m.udp_latency_ms != -1:
+                x_udp.append(m.udp_send_time_s)
+                y_udp.append(m.udp_latency_ms)
+            if m.link_latency_ms != -1:
+                x_link.append(m.link_send_time_s)
+                y_link.append(m.link_latency_ms)
+
+        self.__metrics = metrics
+        return metrics
+
+    # summary statistics of the run in one record (see summary_fields), -1 marks a value which is not defined
+    # (no packages sent or received), latencies in ms, throughput in bit/s with the default overhead
+    def get_summary(self):
+        metrics = self.__get_metrics()
+        if "summary" in metrics:
+            return dict(metrics["summary"])
+
+        y_udp = metrics["udp_axis"][1]
+        y_link = metrics["link_axis"][1]
+        sorted_udp = sorted(y_udp)
+        summary = {
+            "packets": len(self.__result),
+            "reliability_udp": self.get_reliability_udp() if metrics["number_send_udp"] > 0 else -1,
+            "reliability_link": self.get_reliability_link() if metrics["number_send_link"] > 0 else -1,
+            "queue_drop_rate": self.get_queue_drop_rate() if metrics["number_send_udp"] > 0 else -1,
+            "average_udp_latency_ms": self.get_average_udp_latency(),
+            "median_udp_latency_ms": statistics.median(sorted_udp) if len(sorted_udp) > 0 else -1,
+            "p95_udp_latency_ms": _percentile(sorted_udp, 95),
+            "max_udp_latency_ms": sorted_udp[-1] if len(sorted_udp) > 0 else -1,
+            "average_link_latency_ms": self.get_average_link_latency(),
+            "min_link_latency_ms": min(y_link) if len(y_link) > 0 else -1,
+            "throughput_udp_bps": self.get_average_throughput_udp(),
+            "throughput_link_bps": self.get_average_throughput_link(),
+        }
+        metrics["summary"] = summary
+        return dict(summary)
+
     # returns -1 if no packages received, ignore lost packages
     def get_average_udp_latency(self):
-        x_udp_pkt_time_s, y_udp_pkt_latency_ms = self.get_udp_latency_axis()
+        x_udp_pkt_time_s, y_udp_pkt_latency_ms = self.__get_metrics()["udp_axis"]
         if len(y_udp_pkt_latency_ms) != 0:
             return sum(y_udp_pkt_latency_ms) / len(x_udp_pkt_time_s)
         return -1
 
     # returns -1 if no packages received, ignore lost packages
     def get_average_link_latency(self):
-        x_link_pkt_time_s, y_link_pkt_latency_ms = self.get_link_latency_axis()
+        x_link_pkt_time_s, y_link_pkt_latency_ms = self.__get_metrics()["link_axis"]
         if len(y_link_pkt_latency_ms) != 0:
             return sum(y_link_pkt_latency_ms) / len(x_link_pkt_time_s)
         return -1
 
     def get_reliability_udp(self):
-        number_send = 0
-        number_received = 0
-        for m in self.__result:
-            if m.udp_send_time_s != -1:
-                number_send += 1
-
-                if m.udp_latency_ms != -1:
-                    number_received += 1
-
-        assert number_send >= number_send
-
-        return number_received/number_send
+        metrics = self.__get_metrics()
+        return metrics["number_received_udp"]/metrics["number_send_udp"]
 
     def get_reliability_link(self):
-        number_send = 0
-        number_received = 0
-        for m in self.__result:
-            if m.link_send_time_s != -1:
-                number_send += 1
-
-                if m.link_latency_ms != -1:
-                    number_received += 1
-
-        assert number_send >= number_send
+        metrics = self.__get_metrics()
+        return metrics["number_received_link"]/metrics["number_send_link"]
 
-        return number_received/number_send
-
-    # Overhead in bytes compared to the UDP payload size
+    # Overhead in bytes compared to the UDP payload size, None for the IPv6 + UDP header of the network stack
     # returns bit/s
-    def get_average_throughput_link(self, overhead=48):
+    def get_average_throughput_link(self, overhead=None):
+        if overhead == None:
+            overhead = network_stack_header_bytes[self.__stack]
 
         runtime_s = self.__runtime_us / 1000000
 
         payload_send_bits = (self.__payload_size_bytes + overhead) * 8
-        number_link_received = 0
-
-        for m in self.__result:
-            if m.link_latency_ms > 0:
-                number_link_received += 1
-
-        bits_received = number_link_received * payload_send_bits
+        bits_received = self.__get_metrics()["number_link_latency_positive"] * payload_send_bits
 
         return bits_received / runtime_s
 
@@ -195,17 +375,16 @@ class LatencyMeasurement():
         runtime_s = self.__runtime_us / 1000000
 
         payload_send_bits = (self.__payload_size_bytes + overhead) * 8
-        number_udp_received = 0
-
-        for m in self.__result:
-            if m.udp_latency_ms > 0:
-                number_udp_received += 1
-
-        bits_received = number_udp_received * payload_send_bits
+        bits_received = self.__get_metrics()["number_udp_latency_positive"] * payload_send_bits
 
         return bits_received / runtime_s
 
 
+    # fraction of the udp packages which were dropped by GNRC before the link layer (no link layer send)
+    def get_queue_drop_rate(self):
+        metrics = self.__get_metrics()
+        return metrics["number_queue_dropped"]/metrics["number_send_udp"]
+
     # get reliability per time unit to create a bin plot etc.
     # returns list of reliability per bin, index is the number of bin
     def get_reliability_udp_per_time(self, bin_size_s=5):
@@ -260,6 +439,10 @@ class LatencyMeasurement():
     # limit: only return data with a smaller link_send_time_s than limit (-1 no limit)
     # -> (x: time in s, y: latency udp in ms)
     def get_udp_latency_axis(self, limit=-1) -> (list, list):
+        if limit == -1:
+            x_udp_pkt_time_s, y_udp_pkt_latency_ms = self.__get_metrics()["udp_axis"]
+            return list(x_udp_pkt_time_s), list(y_udp_pkt_latency_ms)
+
         x_udp_pkt_time_s = []
         y_udp_pkt_latency_ms = []
 
@@ -279,6 +462,10 @@ class LatencyMeasurement():
     # limit: only return data with a smaller link_send_time_s than limit (-1 no limit)
     # -> (x: time in s, y: latency link in ms)
     def get_link_latency_axis(self, limit=-1) -> (list, list):
+        if limit == -1:
+            x_link_pkt_time_s, y_link_pkt_latency_ms = self.__get_metrics()["link_axis"]
+            return list(x_link_pkt_time_s), list(y_link_pkt_latency_ms)
+
         x_link_pkt_time_s = []
         y_link_pkt_latency_ms = []
 
@@ -308,6 +495,13 @@ class LatencyMeasurement():
                 interv=self.__interval_us,
                 random=str(int(self.__random_payload))
             )
+            if self.__send_window != None:
+                cmd = "udp_bulk_client {iter} {bytes} {window} {random}".format(
+                    iter=self.__runtime_us,
+                    bytes=self.__payload_size_bytes,
+                    window=self.__send_window,
+                    random=str(int(self.__random_payload))
+                )
             self.__init_finished_lock.acquire()
             s.write((cmd + '\n').encode('UTF-8'))
             s.flush()
@@ -432,6 +626,8 @@ class LatencyMeasurement():
     # run measurement, blocks until finished
     # return None if measurement failed
     def run(self):
+        self.__firmware_hash = firmware_hash()
+
         receive_thread = Thread(target=self.__receive_thread_function)
         receive_thread.start()
 
@@ -467,21 +663,27 @@ class LatencyMeasurement():
             if i in self.__received_packages_link_timestamps and i in self.__send_packages_link_timestamps:
                 lmd.link_latency_ms = (self.__received_packages_link_timestamps[i] - self.__send_packages_link_timestamps[i]) * 1000
 
-            if not lmd.is_valid():
-                print(f"[WARNING] Package {i} not valid")
-                # it may be that the measurement is incorrect e.g. a serial output was interrupted and not send
-                # return None
             self.__result.append(lmd)
 
+        # it may be that the measurement is incorrect e.g. a serial output was interrupted and not send
+        self.__result = self.__validate(self.__result)
+        self.__metrics = None
         return self.__result
 
-    # generate a csv file
-    def write_measurement_to_file(self, subfolder="latency", file_name_note=""):
+    # validate the packages with the validation policy, one warning with the violations per rule
+    def __validate(self, result):
+        result, self.__validation_report = validate_result(result, self.__validation_policy)
+        if not self.__validation_report.is_valid():
+            print("[WARNING] " + self.__validation_report.summary())
+        return result
+
+    # generate a csv file, returns its path
+    def write_measurement_to_file(self, subfolder="latency", file_name_note="", path=measurement_path):
         file_name_note_seperator = ""
         if file_name_note != "":
             file_name_note_seperator = "_"
 
-        filename = (measurement_path + subfolder + "/latency_" + datetime.now().strftime("%Y-%m-%dT%H-%M-%S") + "_" 
+        filename = (os.path.join(path, subfolder) + "/latency_" + datetime.now().strftime("%Y-%m-%dT%H-%M-%S") + "_" 
             + str(self.__payload_size_bytes)  + "b_over" 
             + str(int(self.__runtime_us/1000000)) + "s_every" 
             + str(int(self.__interval_us / 1000)) + "ms"
@@ -489,13 +691,8 @@ class LatencyMeasurement():
             + ".csv")
 
         with open(filename, 'w') as file:
-            # write meta data header
-            file.write("Runtime in us;" + str(self.__runtime_us) + "\n")
-            file.write("Payload size in byte;" + str(self.__payload_size_bytes) + "\n")
-            file.write("Interval in us;" + str(int(self.__interval_us)) + "\n")
-            if (self.__distance_cm):
-                file.write("Distance in cm;" + str(float(self.__distance_cm)) + "\n")
-            file.write("\n")
+            _write_meta_data(file, self.__runtime_us, self.__payload_size_bytes, self.__interval_us, self.__distance_cm, self.__stack,
+                             self.__send_window, self.__material, self.__firmware_hash)
 
             # write measurement table
             file.write("pkt number;rel. UDP pkt send time [s];rel. link pkt send time [s];Latency UDP [ms];Latency link [ms]\n")
@@ -503,24 +700,15 @@ class LatencyMeasurement():
                 file.write(m.csv_line())
 
         print("Saved measurement in file: " + filename)
+        _register_in_catalog(filename, self, path)
+
+        return filename
 
     # read csv file, returns lists of LatencyMeasurementData
     def read_measurement_from_file(self, filename) -> list:
         with open(filename, 'r') as file:
-            runtime = 0
-            payload_size_bytes = 0
-            interval_us = 0
             try:
-                # read meta data header
-                runtime = int(file.readline().split(';')[-1])
-                payload_size_bytes = int(file.readline().split(';')[-1])
-                interval_us = int(file.readline().split(';')[-1])
-                # distance line may not exists, if not exists skips new line with read
-                distance_cm = None
-                distance_line = file.readline()
-                if (distance_line != "\n"):
-                    distance_cm = float(distance_line.split(';')[-1])
-                    file.readline()  # skip new line
+                runtime, payload_size_bytes, interval_us, distance_cm, stack, send_window, material, firmware = _read_meta_data(file)
 
                 file.readline()     # skip row description
 
@@ -535,11 +723,6 @@ class LatencyMeasurement():
                     m.link_latency_ms = float(content[3])
                     m.udp_latency_ms = float(content[4])
 
-                    if not m.is_valid():
-                        print(f"[WARNING] Package {m.pkt_number} not valid")
-                        # it may be that the measurement is incorrect e.g. a serial output was interrupted and not send
-                        # return None
-
                     result.append(m)
 
             except Exception as e:
@@ -552,12 +735,386 @@ class LatencyMeasurement():
             self.__runtime_us = runtime
             self.__payload_size_bytes = payload_size_bytes
             self.__interval_us = interval_us
-            self.__result = result
+            self.__result = self.__validate(result)
+            self.__metrics = None
+            self.__stack = stack
+            self.__send_window = send_window
+            self.__material = material
+            self.__firmware_hash = firmware
             if (distance_cm):
                 self.__distance_cm = distance_cm
 
         return self.__result
 
+# round trip data of one packet, times on the timer of the nodes
+# one line per violated check with the first offending packages, None if all packages are valid
+# like measurement_validation.ValidationReport.summary
+def rtt_validation_summary(result, number_examples=5):
+    violations = {}
+    for m in result:
+        reason = m.invalid_reason()
+        if reason != None:
+            violations.setdefault(reason, []).append(m.pkt_number)
+    if len(violations) == 0:
+        return None
+
+    lines = [f"{sum(len(p) for p in violations.values())} of {len(result)} packages not valid"]
+    for reason, packages in violations.items():
+        examples = ", ".join(str(p) for p in packages[:number_examples])
+        lines.append(f"  {reason}: {len(packages)} (packages {examples}{', ...' if len(packages) > number_examples else ''})")
+    return "\n".join(lines)
+
+
+# -1 marks missing value
+class RttMeasurementData:
+    def __init__(self, pkt_number, send_time_s=-1, rtt_ms=-1, turnaround_ms=-1):
+        self.pkt_number = pkt_number
+        self.send_time_s = send_time_s          # relative time of the udp send command (host time)
+        self.rtt_ms = rtt_ms                    # time from udp send to udp receive of the echo (timer of node A)
+        self.turnaround_ms = turnaround_ms      # time from udp receive to udp send of the echo (timer of node B)
+
+    def echo_received(self):
+        return self.rtt_ms != -1
+
+    # description of the first violated check, None if the package is valid
+    def invalid_reason(self):
+        if self.pkt_number == None or self.pkt_number < 0:
+            return "undefined package number"
+
+        if self.rtt_ms != -1 and self.send_time_s == -1:
+            return "echo received but not send"
+
+        if self.rtt_ms != -1 and self.turnaround_ms > self.rtt_ms:
+            return "turnaround > round trip time"
+
+        return None
+
+    def is_valid(self):
+        reason = self.invalid_reason()
+        if reason != None:
+            print("Measurement data not valid: " + reason)
+        return reason == None
+
+    # format: pkt_number;send_time_s;rtt_ms;turnaround_ms
+    def csv_line(self):
+        return (str(self.pkt_number) + ";" + str(self.send_time_s) + ";"
+             + str(self.rtt_ms) + ";" + str(self.turnaround_ms) + "\n")
+
+
+# Round trip measurement: node A sends, node B echoes the packet over VLC, node A measures the round trip time on
+# its own timer. Unlike LatencyMeasurement the result does not depend on the serial ports of two nodes.
+# commands:
+#   node A: udp_rtt_client <runtime us> <payload bytes> <interval us> <random payload>
+#   node B: udp_rtt_server <timeout us> <payload bytes>
+# serial output markers: <marker> int [int]
+#   <marker>
+#       su: send udp (before sock_udp_send), node A
+#       rt: round trip time in us of the package, node A
+#       eu: echo udp, time in us from receive to send of the echo, node B
+#       rr: receiver ready (setup complete, send can be started), node B
+class RttMeasurement():
+
+    def __init__(self, runtime_us=10*1000000, payload_size_bytes=100, interval_us=1000000, distance_cm=None, random_payload=True, stack="ipv6",
+                 material=None):
+        assert stack in network_stacks, "unknown network stack: " + str(stack)
+        self.__runtime_us = runtime_us
+        self.__payload_size_bytes = payload_size_bytes
+        self.__interval_us = interval_us
+        self.__distance_cm = distance_cm
+        self.__random_payload = random_payload
+        self.__stack = stack
+        self.__material = material
+        self.__firmware_hash = None
+
+        # make sure that server runs before client starts
+        self.__init_finished_lock = Lock()
+        self.__init_finished_lock.acquire()    # block client
+
+        self.__send_timestamps = {}
+        self.__rtt_us = {}
+        self.__turnaround_us = {}
+        self.__receive_timeout = False
+
+        self.__result = []
+
+    def get_runtime_us(self):
+        return self.__runtime_us
+
+    def get_payload_size(self):
+        return self.__payload_size_bytes
+
+    def get_interval_us(self):
+        return self.__interval_us
+
+    def get_distance_cm(self):
+        return self.__distance_cm
+
+    def get_stack(self):
+        return self.__stack
+
+    def get_material(self):
+        return self.__material
+
+    def get_firmware_hash(self):
+        return self.__firmware_hash
+
+    # list of RttMeasurementData, one per package
+    def get_result(self):
+        return self.__result
+
+    def set_result(self, result):
+        self.__result = result
+
+    # -> (x: time in s, y: round trip time in ms), ignore lost packages
+    def get_rtt_axis(self) -> (list, list):
+        received = [m for m in self.__result if m.rtt_ms != -1]
+        return [m.send_time_s for m in received], [m.rtt_ms for m in received]
+
+    # returns -1 if no echo received
+    def get_average_rtt(self):
+        _, y_rtt_ms = self.get_rtt_axis()
+        if len(y_rtt_ms) != 0:
+            return sum(y_rtt_ms) / len(y_rtt_ms)
+        return -1
+
+    # returns -1 if no echo received
+    def get_median_rtt(self):
+        _, y_rtt_ms = self.get_rtt_axis()
+        if len(y_rtt_ms) == 0:
+            return -1
+        y_rtt_ms = sorted(y_rtt_ms)
+        middle = len(y_rtt_ms) // 2
+        if len(y_rtt_ms) % 2 == 1:
+            return y_rtt_ms[middle]
+        return (y_rtt_ms[middle - 1] + y_rtt_ms[middle]) / 2
+
+    # standard deviation of the round trip time, returns -1 if less than two echos received
+    def get_rtt_jitter(self):
+        _, y_rtt_ms = self.get_rtt_axis()
+        if len(y_rtt_ms) < 2:
+            return -1
+        average = sum(y_rtt_ms) / len(y_rtt_ms)
+        return math.sqrt(sum((y - average) ** 2 for y in y_rtt_ms) / (len(y_rtt_ms) - 1))
+
+    # returns -1 if no echo with turnaround time received
+    def get_average_turnaround(self):
+        turnarounds = [m.turnaround_ms for m in self.__result if m.turnaround_ms != -1]
+        if len(turnarounds) != 0:
+            return sum(turnarounds) / len(turnarounds)
+        return -1
+
+    # one way latency of node A to node B: (round trip time - turnaround of node B) / 2
+    # returns -1 if no echo with turnaround time received
+    def get_average_one_way_latency(self):
+        one_way = [(m.rtt_ms - m.turnaround_ms) / 2 for m in self.__result if m.rtt_ms != -1 and m.turnaround_ms != -1]
+        if len(one_way) != 0:
+            return sum(one_way) / len(one_way)
+        return -1
+
+    def get_reliability(self):
+        number_send = len([m for m in self.__result if m.send_time_s != -1])
+        number_received = len([m for m in self.__result if m.rtt_ms != -1])
+
+        return number_received/number_send
+
+    def __send_thread_function(self):
+        timeout_serial = (self.__interval_us/1000000)*40
+        if timeout_serial < 1:
+            timeout_serial = 1
+        with Serial(port=port_sender, baudrate=115200, timeout=timeout_serial) as s:
+
+            cmd = "udp_rtt_client {iter} {bytes} {interv} {random}".format(
+                iter=self.__runtime_us,
+                bytes=self.__payload_size_bytes,
+                interv=self.__interval_us,
+                random=str(int(self.__random_payload))
+            )
+            self.__init_finished_lock.acquire()
+            s.write((cmd + '\n').encode('UTF-8'))
+            s.flush()
+
+            print("Send: " + cmd + " to " + port_sender)
+
+            while not self.__receive_timeout:
+                line = s.readline()
+                if (len(line) == 0):
+                    print("[ERROR] Sender timed out!")
+                    break
+
+                receive_time = time()
+                line = line.decode('UTF-8')[:-1]
+                if len(line) >= 2 and line[0] == '>' and line[1] == ' ':
+                    line = line[2:]
+
+                print("[" + port_sender + "] " + str(receive_time) + " - " + line)
+
+                if line == "fu":
+                    break
+
+                words = line.split(' ')
+                if len(words) < 2:
+                    print("[WARNING] Cannot parse, too few words")
+                    continue
+
+                # link layer markers of vlc_netif (request and echo), the round trip is measured on the node
+                if words[0] in ("sl", "rl"):
+                    continue
+
+                try:
+                    package_number = int(words[1])
+                    # round trip time measured on the node
+                    if words[0] == "rt":
+                        self.__rtt_us[package_number] = int(words[2])
+                        continue
+                except (ValueError, IndexError):
+                    print("[WARNING] Cannot parse package number")
+                    continue
+
+                if words[0] == "su":
+                    if package_number in self.__send_timestamps:
+                        print("[ERROR] UDP package already send")
+                        break
+                    self.__send_timestamps[package_number] = receive_time
+                else:
+                    print("[WARNING] Cannot parse package number")
+
+    def __receive_thread_function(self):
+        timeout = self.__interval_us * 40
+        if timeout < 5000000:
+            timeout = 5000000
+        with Serial(port=port_receiver, baudrate=115200, timeout=timeout/1000000) as s:
+
+            cmd = "udp_rtt_server " + str(timeout) + " " + str(self.__payload_size_bytes)
+            s.write((cmd + '\n').encode('UTF-8'))
+            s.flush()
+            print("Send: " + cmd + " to " + port_receiver)
+
+            while True:
+                line = s.readline()
+                if (len(line) == 0):
+                    print("[INFO] serial timeout")
+                    self.__receive_timeout = True
+                    break
+
+                receive_time = time()
+                line = line.decode('UTF-8')[:-1]
+                print("[" + port_receiver + "] " + str(receive_time) + " - " + line)
+
+                if line == "rr":
+                    self.__init_finished_lock.release()
+                    continue
+
+                if line == "Timeout":
+                    self.__receive_timeout = True
+                    break
+
+                words = line.split(' ')
+                # link layer markers of vlc_netif (request and echo)
+                if words[0] in ("sl", "rl"):
+                    continue
+
+                if len(words) < 3 or words[0] != "eu":
+                    print("[WARNING] Cannot parse, expected eu <package number> <turnaround us>")
+                    continue
+
+                try:
+                    self.__turnaround_us[int(words[1])] = int(words[2])
+                except ValueError:
+                    print("[WARNING] Cannot parse package number")
+
+    # run measurement, blocks until finished
+    # return None if measurement failed
+    def run(self):
+        self.__firmware_hash = firmware_hash()
+
+        receive_thread = Thread(target=self.__receive_thread_function)
+        receive_thread.start()
+
+        send_thread = Thread(target=self.__send_thread_function)
+        send_thread.start()
+
+        receive_thread.join()
+        send_thread.join()
+
+        if 0 not in self.__send_timestamps:
+            print("Measurement failed: UDP package 0 not send - needed for relative time calculation")
+            return None
+
+        for i in range(max(self.__send_timestamps.keys()) + 1):
+            m = RttMeasurementData(i)
+            if i in self.__send_timestamps:
+                m.send_time_s = self.__send_timestamps[i] - self.__send_timestamps[0]
+            if i in self.__rtt_us:
+                m.rtt_ms = self.__rtt_us[i] / 1000
+            if i in self.__turnaround_us:
+                m.turnaround_ms = self.__turnaround_us[i] / 1000
+            self.__result.append(m)
+
+        summary = rtt_validation_summary(self.__result)
+        if summary != None:
+            print("[WARNING] " + summary)
+        return self.__result
+
+    # generate a csv file, same meta data header as the latency measurements, returns its path
+    def write_measurement_to_file(self, subfolder="rtt", file_name_note="", path=measurement_path):
+        file_name_note_seperator = ""
+        if file_name_note != "":
+            file_name_note_seperator = "_"
+
+        filename = (os.path.join(path, subfolder) + "/rtt_" + datetime.now().strftime("%Y-%m-%dT%H-%M-%S") + "_"
+            + str(self.__payload_size_bytes)  + "b_over"
+            + str(int(self.__runtime_us/1000000)) + "s_every"
+            + str(int(self.__interval_us / 1000)) + "ms"
+            + file_name_note_seperator + file_name_note
+            + ".csv")
+
+        with open(filename, 'w') as file:
+            _write_meta_data(file, self.__runtime_us, self.__payload_size_bytes, self.__interval_us, self.__distance_cm, self.__stack,
+                             material=self.__material, firmware=self.__firmware_hash)
+
+            file.write("pkt number;rel. UDP pkt send time [s];RTT [ms];Turnaround [ms]\n")
+            for m in self.__result:
+                file.write(m.csv_line())
+
+        print("Saved measurement in file: " + filename)
+        _register_in_catalog(filename, self, path)
+
+        return filename
+
+    # read csv file, returns lists of RttMeasurementData
+    def read_measurement_from_file(self, filename) -> list:
+        with open(filename, 'r') as file:
+            try:
+                runtime, payload_size_bytes, interval_us, distance_cm, stack, _, material, firmware = _read_meta_data(file)
+
+                file.readline()     # skip row description
+
+                result = []
+                for line in file:
+                    content = line.split(';')
+                    m = RttMeasurementData(int(content[0]), float(content[1]), float(content[2]), float(content[3]))
+                    result.append(m)
+                summary = rtt_validation_summary(result)
+                if summary != None:
+                    print("[WARNING] " + summary)
+
+            except Exception as e:
+                print("[ERROR] cannot parse file " + filename)
+                print(e)
+
+                return None
+
+            self.__runtime_us = runtime
+            self.__payload_size_bytes = payload_size_bytes
+            self.__interval_us = interval_us
+            self.__distance_cm = distance_cm
+            self.__stack = stack
+            self.__material = material
+            self.__firmware_hash = firmware
+            self.__result = result
+
+        return self.__result
+
 if __name__ == "__main__":
     m = LatencyMeasurementData(43, udp_send_time_s=12, link_send_time_s=13, link_latency_ms=13, udp_latency_ms=10)
     print(m.is_valid())
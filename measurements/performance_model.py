@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+from measurement_files import list_measurement_files, load_measurement, run_parameters
+
+# Analytical air time, latency and goodput model of the VLC link
+#
+# The framing is taken from the firmware: 4 sync symbols, 12 byte MAC header, payload, 1 byte CRC trailer,
+# the 8 bit end flag and the final timer tick which stops the sender. The sender timer runs with the half
+# symbol period truncated to whole microseconds, so the effective data rate is slightly above the configured one.
+# The remaining constants (additional overhead, processing delays) are free parameters which are fitted
+# to the measured corpus by least squares and stored in performance_model.json.
+# All functions are vectorized, parameters can be scalars or numpy arrays and are broadcast.
+
+default_model_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "performance_model.json")
+
+vlc_addr_len = 6
+vlc_mac_header_bytes = 2 * vlc_addr_len
+vlc_crc_bytes = 1
+end_flag_bits = 8
+default_num_sync_symbols = 4
+
+# UDP header (8 bytes) + IPv6 header (40 bytes)
+ipv6_udp_header_bytes = 8 + 40
+
+
+# half symbol period of the sender timer in us, truncated like in _setup_vlc_manchester_send
+def symbol_half_period_us(data_rate_bps):
+    return np.floor(1.0 / np.asarray(data_rate_bps, dtype=float) * 1000000.0 / 2.0)
+
+
+# data rate which is actually sent with the truncated timer interval
+def effective_data_rate_bps(data_rate_bps):
+    return 1000000.0 / (2 * symbol_half_period_us(data_rate_bps))
+
+
+class PerformanceModel:
+
+    # extra_overhead_bytes: overhead per frame not covered by the framing (e.g. bit stuffing)
+    # link_delay_ms: delay from link layer send to link layer receive in addition to the air time
+    # udp_delay_ms: delay of the network stack from udp send to udp receive in addition to the link latency
+    # send_overhead_ms: time of one iteration of the send loop in addition to the interval
+    # link_gap_ms: minimum time between two frames of a busy link in addition to the air time
+    def __init__(self, extra_overhead_bytes=0.0, link_delay_ms=0.0, udp_delay_ms=0.0, send_overhead_ms=0.5, link_gap_ms=0.5):
+        self.extra_overhead_bytes = extra_overhead_bytes
+        self.link_delay_ms = link_delay_ms
+        self.udp_delay_ms = udp_delay_ms
+        self.send_overhead_ms = send_overhead_ms
+        self.link_gap_ms = link_gap_ms
+
+    def parameters(self):
+        return {
+            "extra_overhead_bytes": self.extra_overhead_bytes,
+            "link_delay_ms": self.link_delay_ms,
+            "udp_delay_ms": self.udp_delay_ms,
+            "send_overhead_ms": self.send_overhead_ms,
+            "link_gap_ms": self.link_gap_ms,
+        }
+
+    def save(self, path=default_model_file):
+        with open(path, 'w') as file:
+            json.dump(self.parameters(), file, indent=4)
+            file.write("\n")
+
+    # number of sender timer ticks of a frame with the given link layer payload (IPv6 packet)
+    def frame_ticks(self, link_payload_bytes, num_sync_symbols=default_num_sync_symbols):
+        frame_bits = (np.asarray(link_payload_bytes) + vlc_mac_header_bytes + vlc_crc_bytes + self.extra_overhead_bytes) * 8
+        # two ticks per symbol, one tick to stop the timer after the end flag
+        return 2 * np.asarray(num_sync_symbols) + 2 * frame_bits + 2 * end_flag_bits + 1
+
+    def air_time_s(self, data_rate_bps, link_payload_bytes, num_sync_symbols=default_num_sync_symbols):
+        return self.frame_ticks(link_payload_bytes, num_sync_symbols) * symbol_half_period_us(data_rate_bps) / 1000000
+
+    def link_latency_ms(self, data_rate_bps, udp_payload_bytes, num_sync_symbols=default_num_sync_symbols):
+        air_time_s = self.air_time_s(data_rate_bps, np.asarray(udp_payload_bytes) + ipv6_udp_header_bytes, num_sync_symbols)
+        return air_time_s * 1000 + self.link_delay_ms
+
+    def udp_latency_ms(self, data_rate_bps, udp_payload_bytes, num_sync_symbols=default_num_sync_symbols):
+        return self.link_latency_ms(data_rate_bps, udp_payload_bytes, num_sync_symbols) + self.udp_delay_ms
+
+    # time between two packets: limited by the send interval or by the busy link
+    def packet_period_s(self, data_rate_bps, udp_payload_bytes, interval_us, num_sync_symbols=default_num_sync_symbols):
+        air_time_s = self.air_time_s(data_rate_bps, np.asarray(udp_payload_bytes) + ipv6_udp_header_bytes, num_sync_symbols)
+        return np.maximum(np.asarray(interval_us) / 1000000 + self.send_overhead_ms / 1000, air_time_s + self.link_gap_ms / 1000)
+
+    # goodput in bit/s without losses
+    # layer: "udp" counts the udp payload, "link" the link layer payload (udp payload + 48 bytes)
+    def goodput_bps(self, data_rate_bps, udp_payload_bytes, interval_us, num_sync_symbols=default_num_sync_symbols, layer="udp"):
+        payload_bytes = np.asarray(udp_payload_bytes)
+        if layer == "link":
+            payload_bytes = payload_bytes + ipv6_udp_header_bytes
+        return payload_bytes * 8 / self.packet_period_s(data_rate_bps, udp_payload_bytes, interval_us, num_sync_symbols)
+
+    # send interval of a sweep point which avoids buffering: expected udp latency + margin
+    def pacing_interval_us(self, data_rate_bps, udp_payload_bytes, margin_ms=0, num_sync_symbols=default_num_sync_symbols):
+        return np.ceil((self.udp_latency_ms(data_rate_bps, udp_payload_bytes, num_sync_symbols) + margin_ms) * 1000).astype(int)
+
+
+# model file of a payload corpus (see encoding_overhead.py), next to the default model file
+def corpus_model_file(corpus, directory=os.path.dirname(default_model_file)):
+    return os.path.join(directory, "performance_model_" + re.sub(r"[^A-Za-z0-9_.-]", "_", corpus) + ".json")
+
+
+# model stored in path, the default model if no model was fitted yet
+def load_performance_model(path=default_model_file):
+    if not os.path.exists(path):
+        return PerformanceModel()
+
+    with open(path, 'r') as file:
+        return PerformanceModel(**json.load(file))
+
+
+# fit the free constants of the model to measured runs by least squares
+# runs: list of (LatencyMeasurement, run parameters) with known data rate, see measurement_files.run_parameters
+# constants which cannot be determined by the runs keep the value of base
+def fit_performance_model(runs, base=None, num_sync_symbols=default_num_sync_symbols):
+    if base == None:
+        base = PerformanceModel()
+    fitted = PerformanceModel(**base.parameters())
+
+    data_rate = []
+    payload = []
+    interval_us = []
+    link_latency_ms = []
+    udp_delay_ms = []
+    period_s = []
+    for l, parameters in runs:
+        if parameters["data_rate_bps"] == None:
+            continue
+
+        link_latency = l.get_link_latency_axis()[1]
+        if len(link_latency) == 0:
+            continue
+
+        # difference of udp and link latency of packets received on both layers
+        delays = [m.udp_latency_ms - m.link_latency_ms for m in l.get_result() if m.udp_latency_ms != -1 and m.link_latency_ms != -1]
+        send_times = sorted(m.udp_send_time_s for m in l.get_result() if m.udp_send_time_s != -1)
+
+        data_rate.append(parameters["data_rate_bps"])
+        payload.append(l.get_payload_size())
+        interval_us.append(l.get_interval_us())
+        link_latency_ms.append(np.median(link_latency))
+        udp_delay_ms.append(np.median(delays) if len(delays) > 0 else np.nan)
+        period_s.append((send_times[-1] - send_times[0]) / (len(send_times) - 1) if len(send_times) > 1 else np.nan)
+
+    if len(data_rate) == 0:
+        print("[WARNING] no runs with known data rate, model not fitted")
+        return fitted
+
+    data_rate = np.array(data_rate, dtype=float)
+    payload = np.array(payload, dtype=float)
+    interval_us = np.array(interval_us, dtype=float)
+    link_latency_ms = np.array(link_latency_ms)
+    udp_delay_ms = np.array(udp_delay_ms)
+    period_s = np.array(period_s)
+
+    framing = PerformanceModel()
+    air_time_s = framing.air_time_s(data_rate, payload + ipv6_udp_header_bytes, num_sync_symbols)
+
+    # link latency = air time + extra overhead bits + delay, only runs without buffering
+    unbuffered = interval_us / 1000000 >= 2 * air_time_s
+    if np.count_nonzero(unbuffered) > 0:
+        y = link_latency_ms[unbuffered] - air_time_s[unbuffered] * 1000
+        bit_time_ms = 2 * symbol_half_period_us(data_rate[unbuffered]) / 1000
+        a = np.column_stack([8 * bit_time_ms, np.ones(len(y))])
+        if np.linalg.matrix_rank(a) == 2:
+            (fitted.extra_overhead_bytes, fitted.link_delay_ms), _, _, _ = np.linalg.lstsq(a, y, rcond=None)
+        else:
+            # a single data rate cannot separate overhead and delay
+            print("[WARNING] runs with one data rate only, overhead not fitted")
+            y = y - 8 * bit_time_ms * fitted.extra_overhead_bytes
+            fitted.link_delay_ms = float(np.mean(y))
+
+    valid = ~np.isnan(udp_delay_ms)
+    if np.count_nonzero(valid) > 0:
+        fitted.udp_delay_ms = float(np.mean(udp_delay_ms[valid]))
+
+    air_time_s = fitted.air_time_s(data_rate, payload + ipv6_udp_header_bytes, num_sync_symbols)
+    valid = ~np.isnan(period_s)
+    # runs paced by the interval
+    paced = valid & (interval_us / 1000000 > air_time_s + fitted.link_gap_ms / 1000)
+    if np.count_nonzero(paced) > 0:
+        fitted.send_overhead_ms = float(np.mean(period_s[paced] - interval_us[paced] / 1000000) * 1000)
+    # runs limited by the link
+    saturated = valid & (interval_us / 1000000 + fitted.send_overhead_ms / 1000 < air_time_s)
+    if np.count_nonzero(saturated) > 0:
+        fitted.link_gap_ms = float(np.mean(period_s[saturated] - air_time_s[saturated]) * 1000)
+
+    # negative overheads and delays are not physical, they indicate runs which do not fit the model
+    for name, value in fitted.parameters().items():
+        if value < 0:
+            print(f"[WARNING] fitted {name} = {value} is negative, set to 0")
+            value = 0.0
+        setattr(fitted, name, float(value))
+
+    return fitted
+
+
+# fit the model to all runs of the given measurement directories and store it
+# usage: performance_model.py <measurement directory>...
+if __name__ == "__main__":
+    runs = []
+    for directory in sys.argv[1:]:
+        for file_name in list_measurement_files(directory):
+            l = load_measurement(os.path.join(directory, file_name))
+            runs.append((l, run_parameters(l, file_name)))
+
+    model = fit_performance_model(runs, base=load_performance_model())
+    print("Fitted model: " + str(model.parameters()))
+    model.save()
+    print("Saved model in file: " + default_model_file)
@@ -0,0 +1,430 @@
+import os
+import statistics
+
+import matplotlib
+
+from measurement_catalog import open_catalog, query_runs
+from measurement_files import list_measurement_files, load_measurement, run_parameters
+from performance_model import load_performance_model
+from time_series import delivery_rate_series, latency_percentile_series, throughput_series
+
+# Declarative plotting engine for the measurement figures
+#
+# A figure is described by a FigureSpec: the measurement directories it reads (Input),
+# the run parameter on the x axis and the metrics drawn as layers (Layer).
+# All figures share the loader and aggregation below and are rendered headless into files,
+# figure_build.FigureBuild renders the stale figures in parallel worker processes.
+
+
+# measurement files of a directory (relative to the measurement path)
+# files: None for all files of the directory, a list of file names
+#        or a dict {label: file name} for categorical figures (x = "label")
+# group: label of the runs of this input, used in layer labels as {group}
+# query: filters of measurement_catalog.query_runs, selects the files of the directory ("" for all) from the catalog
+class Input:
+    def __init__(self, directory, files=None, group=None, query=None):
+        self.directory = directory
+        self.files = files
+        self.group = group
+        self.query = query
+
+
+# one metric drawn into a figure
+# kind:
+#   line:    one point per x value, runs with equal x are aggregated
+#   bar:     like line, drawn as bar chart
+#   boxplot: sample metric, samples of runs with equal x are concatenated
+#   series:  series metric, one curve per run (x is taken from the metric)
+# label: format string, can use {group} and all run parameters of the first run
+# axis: "left" or "right" (second y axis)
+# aggregate: mean, median, min or max of the runs with equal x
+# style: keyword arguments passed to matplotlib
+# args: keyword arguments passed to the metric function
+class Layer:
+    def __init__(self, metric, label=None, kind="line", axis="left", aggregate="mean", style=None, args=None):
+        self.metric = metric
+        self.label = label
+        self.kind = kind
+        self.axis = axis
+        self.aggregate = aggregate
+        self.style = style if style != None else {}
+        self.args = args if args != None else {}
+
+
+# description of one figure
+# x: run parameter on the x axis (see measurement_files.run_parameters) or "label", None for series figures
+# title: format string, can use all run parameters of the first run
+# consistent: run parameters which must be equal for all runs of the figure
+class FigureSpec:
+    def __init__(self, name, inputs, layers, x=None, xlabel="", ylabel="", ylabel_right=None, title=None,
+                 legend_loc=0, grid=True, yticks=None, ylim=None, ylim_right=None, consistent=()):
+        self.name = name
+        self.inputs = inputs
+        self.layers = layers
+        self.x = x
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.ylabel_right = ylabel_right
+        self.title = title
+        self.legend_loc = legend_loc
+        self.grid = grid
+        self.yticks = yticks
+        self.ylim = ylim
+        self.ylim_right = ylim_right
+        self.consistent = consistent
+
+
+# derived table with one row per run, written as csv file <name>.csv
+# parameters: run parameters written as columns
+# metrics: scalar metrics written as columns
+class TableSpec:
+    def __init__(self, name, inputs, parameters, metrics, consistent=()):
+        self.name = name
+        self.inputs = inputs
+        self.parameters = parameters
+        self.metrics = metrics
+        self.consistent = consistent
+
+
+# loaded measurement with its parameters
+class Run:
+    def __init__(self, measurement, parameters):
+        self.measurement = measurement
+        self.parameters = parameters
+
+
+## metrics ##
+
+# calibrated model of the expected values
+_performance_model = load_performance_model()
+
+
+# model of the expected values from a model file, e.g. the model of a payload corpus (encoding_overhead.py)
+def set_performance_model(path):
+    global _performance_model
+    _performance_model = load_performance_model(path)
+
+# scalar metrics: one value per run
+def _reliability_udp(run):
+    return run.measurement.get_reliability_udp()
+
+def _reliability_link(run):
+    return run.measurement.get_reliability_link()
+
+def _average_udp_latency(run):
+    return run.measurement.get_average_udp_latency()
+
+def _average_link_latency(run):
+    return run.measurement.get_average_link_latency()
+
+def _min_link_latency(run):
+    return min(run.measurement.get_link_latency_axis()[1])
+
+def _throughput_udp_kbps(run):
+    return run.measurement.get_average_throughput_udp() / 1000
+
+def _throughput_link_kbps(run):
+    return run.measurement.get_average_throughput_link() / 1000
+
+def _expected_throughput_udp_kbps(run):
+    p = run.parameters
+    return _performance_model.goodput_bps(p["data_rate_bps"], p["payload_size_bytes"], p["interval_us"], layer="udp") / 1000
+
+def _expected_throughput_link_kbps(run):
+    p = run.parameters
+    return _performance_model.goodput_bps(p["data_rate_bps"], p["payload_size_bytes"], p["interval_us"], layer="link") / 1000
+
+# air time of the frame
+def _expected_transmission_delay_ms(run, data_rate_bps=None):
+    p = run.parameters
+    if data_rate_bps == None:
+        data_rate_bps = p["data_rate_bps"]
+    return _performance_model.air_time_s(data_rate_bps, p["link_payload_size_bytes"]) * 1000
+
+def _expected_link_latency_ms(run):
+    p = run.parameters
+    return _performance_model.link_latency_ms(p["data_rate_bps"], p["payload_size_bytes"])
+
+def _expected_udp_latency_ms(run):
+    p = run.parameters
+    return _performance_model.udp_latency_ms(p["data_rate_bps"], p["payload_size_bytes"])
+
+scalar_metrics = {
+    "reliability_udp": _reliability_udp,
+    "reliability_link": _reliability_link,
+    "average_udp_latency": _average_udp_latency,
+    "average_link_latency": _average_link_latency,
+    "min_link_latency": _min_link_latency,
+    "throughput_udp_kbps": _throughput_udp_kbps,
+    "throughput_link_kbps": _throughput_link_kbps,
+    "expected_throughput_udp_kbps": _expected_throughput_udp_kbps,
+    "expected_throughput_link_kbps": _expected_throughput_link_kbps,
+    "expected_transmission_delay_ms": _expected_transmission_delay_ms,
+    "expected_link_latency_ms": _expected_link_latency_ms,
+    "expected_udp_latency_ms": _expected_udp_latency_ms,
+}
+
+# sample metrics: list of values per run
+def _udp_latency_samples(run):
+    return run.measurement.get_udp_latency_axis()[1]
+
+def _link_latency_samples(run):
+    return run.measurement.get_link_latency_axis()[1]
+
+sample_metrics = {
+    "udp_latency_samples": _udp_latency_samples,
+    "link_latency_samples": _link_latency_samples,
+}
+
+# series metrics: (x, y) per run
+def _udp_latency_series(run, limit=-1):
+    return run.measurement.get_udp_latency_axis(limit=limit)
+
+def _link_latency_series(run, limit=-1):
+    return run.measurement.get_link_latency_axis(limit=limit)
+
+def _reliability_udp_per_time(run, bin_size_s=5):
+    y = run.measurement.get_reliability_udp_per_time(bin_size_s=bin_size_s)
+    return [i*bin_size_s for i in range(len(y))], y
+
+def _reliability_link_per_time(run, bin_size_s=5):
+    y = run.measurement.get_reliability_link_per_time(bin_size_s=bin_size_s)
+    return [i*bin_size_s for i in range(len(y))], y
+
+# sliding or exponentially weighted windows, see time_series
+def _throughput_udp_kbps_series(run, window_s=1.0, step_s=None, mode="sliding"):
+    t, y = throughput_series(run.measurement, "udp", window_s=window_s, step_s=step_s, mode=mode)
+    return t, y / 1000
+
+def _throughput_link_kbps_series(run, window_s=1.0, step_s=None, mode="sliding"):
+    t, y = throughput_series(run.measurement, "link", window_s=window_s, step_s=step_s, mode=mode)
+    return t, y / 1000
+
+def _delivery_rate_udp_series(run, window_s=5.0, step_s=None, mode="sliding"):
+    return delivery_rate_series(run.measurement, "udp", window_s=window_s, step_s=step_s, mode=mode)
+
+def _delivery_rate_link_series(run, window_s=5.0, step_s=None, mode="sliding"):
+    return delivery_rate_series(run.measurement, "link", window_s=window_s, step_s=step_s, mode=mode)
+
+def _udp_latency_percentile_series(run, percentile=95, window_s=1.0, step_s=None):
+    t, y = latency_percentile_series(run.measurement, "udp", percentiles=(percentile,), window_s=window_s, step_s=step_s)
+    return t, y[0]
+
+series_metrics = {
+    "udp_latency_series": _udp_latency_series,
+    "link_latency_series": _link_latency_series,
+    "reliability_udp_per_time": _reliability_udp_per_time,
+    "reliability_link_per_time": _reliability_link_per_time,
+    "throughput_udp_kbps_series": _throughput_udp_kbps_series,
+    "throughput_link_kbps_series": _throughput_link_kbps_series,
+    "delivery_rate_udp_series": _delivery_rate_udp_series,
+    "delivery_rate_link_series": _delivery_rate_link_series,
+    "udp_latency_percentile_series": _udp_latency_percentile_series,
+}
+
+_aggregations = {
+    "mean": statistics.mean,
+    "median": statistics.median,
+    "min": min,
+    "max": max,
+}
+
+
+## loader and aggregation ##
+
+# files of the runs of a catalog query, relative to the directory of the input
+def _catalog_files(i, measurement_path):
+    filters = dict(i.query)
+    if i.directory != "":
+        filters["directory"] = os.path.normpath(i.directory)
+    connection = open_catalog(measurement_path)
+    rows = query_runs(connection, order_by="path", **filters)
+    connection.close()
+    return [os.path.relpath(r["path"], i.directory) if i.directory != "" else r["path"] for r in rows]
+
+
+# measurement files of a figure or table: list of (path, label, group) ordered by input and file name
+def input_files(spec, measurement_path):
+    files = []
+    for i in spec.inputs:
+        directory = os.path.join(measurement_path, i.directory)
+
+        if i.query != None:
+            files += [(os.path.join(directory, f), None, i.group) for f in _catalog_files(i, measurement_path)]
+        elif i.files == None:
+            files += [(os.path.join(directory, f), None, i.group) for f in list_measurement_files(directory)]
+        elif isinstance(i.files, dict):
+            files += [(os.path.join(directory, f), label, i.group) for label, f in i.files.items()]
+        else:
+            files += [(os.path.join(directory, f), None, i.group) for f in i.files]
+
+    return files
+
+
+# load all runs of a figure or table, the runs are ordered by input and file name
+def load_runs(spec, measurement_path):
+    runs = []
+    for path, label, group in input_files(spec, measurement_path):
+        l = load_measurement(path)
+        parameters = run_parameters(l, path)
+        parameters["label"] = label
+        parameters["group"] = group
+        runs.append(Run(l, parameters))
+
+    for name in spec.consistent:
+        values = set(r.parameters[name] for r in runs)
+        assert len(values) <= 1, "measurements with different " + name + ": " + str(values)
+
+    return runs
+
+
+# sort key of the x values, categorical labels keep the order of the inputs
+def _x_order(spec, values):
+    if spec.x == "label":
+        return values
+    return sorted(values)
+
+
+# curves of one layer: list of (label, x, y)
+# line and bar: y are the aggregated metric values per x
+# boxplot: y are the samples per x
+# series: one curve per run
+def aggregate_layer(spec, layer, runs):
+    curves = []
+
+    if layer.kind == "series":
+        metric = series_metrics[layer.metric]
+        for r in runs:
+            x, y = metric(r, **layer.args)
+            curves.append((_format(layer.label, r.parameters), x, y))
+        return curves
+
+    # one curve per input group
+    groups = []
+    for r in runs:
+        if r.parameters["group"] not in groups:
+            groups.append(r.parameters["group"])
+
+    for group in groups:
+        group_runs = [r for r in runs if r.parameters["group"] == group]
+
+        values_per_x = {}
+        for r in group_runs:
+            x = r.parameters[spec.x]
+            assert x != None, "run parameter " + spec.x + " missing: " + r.parameters["file_name"]
+
+            if layer.kind == "boxplot":
+                values_per_x.setdefault(x, []).extend(sample_metrics[layer.metric](r, **layer.args))
+            else:
+                values_per_x.setdefault(x, []).append(scalar_metrics[layer.metric](r, **layer.args))
+
+        x_values = _x_order(spec, list(values_per_x.keys()))
+        if layer.kind == "boxplot":
+            y_values = [values_per_x[x] for x in x_values]
+        else:
+            aggregate = _aggregations[layer.aggregate]
+            y_values = [aggregate(values_per_x[x]) for x in x_values]
+
+        curves.append((_format(layer.label, group_runs[0].parameters), x_values, y_values))
+
+    return curves
+
+
+def _format(template, parameters):
+    if template == None:
+        return None
+    return template.format(**parameters)
+
+
+## rendering ##
+
+# draw a figure with the given pyplot module, returns the matplotlib figure
+def draw_figure(spec, runs, plt):
+    fig, axis = plt.subplots()
+    axis_right = None
+
+    for layer in spec.layers:
+        a = axis
+        if layer.axis == "right":
+            if axis_right == None:
+                axis_right = axis.twinx()
+            a = axis_right
+
+        for label, x, y in aggregate_layer(spec, layer, runs):
+            if layer.kind == "bar":
+                a.bar(x, y, label=label, **layer.style)
+            elif layer.kind == "boxplot":
+                a.boxplot(y, positions=x, **layer.style)
+            else:
+                a.plot(x, y, label=label, **layer.style)
+
+    axis.set_xlabel(spec.xlabel)
+    axis.set_ylabel(spec.ylabel)
+    if axis_right != None and spec.ylabel_right != None:
+        axis_right.set_ylabel(spec.ylabel_right)
+    if spec.yticks != None:
+        axis.set_yticks(spec.yticks)
+    if spec.ylim != None:
+        axis.set_ylim(*spec.ylim)
+    if axis_right != None and spec.ylim_right != None:
+        axis_right.set_ylim(*spec.ylim_right)
+    if spec.title != None and len(runs) > 0:
+        axis.set_title(_format(spec.title, runs[0].parameters))
+
+    # legend of both y axes
+    if spec.legend_loc != None:
+        handles, labels = axis.get_legend_handles_labels()
+        if axis_right != None:
+            handles_right, labels_right = axis_right.get_legend_handles_labels()
+            handles += handles_right
+            labels += labels_right
+        if len(handles) > 0:
+            axis.legend(handles, labels, loc=spec.legend_loc)   # best is 0, 7 is upper right corner
+
+    if spec.grid:
+        axis.grid()
+
+    return fig
+
+
+# render one figure into output_dir/<name>.<format> for all formats, returns the written paths
+# show: open an interactive window instead of writing files
+def render_figure(spec, measurement_path, output_dir, formats=("pdf",), show=False):
+    # select the backend before pyplot is imported, worker processes render headless
+    if not show:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    runs = load_runs(spec, measurement_path)
+    fig = draw_figure(spec, runs, plt)
+
+    paths = []
+    if show:
+        plt.show()
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+        for f in formats:
+            path = os.path.join(output_dir, spec.name + "." + f)
+            fig.savefig(path, bbox_inches="tight")
+            paths.append(path)
+
+    plt.close(fig)
+
+    return paths
+
+
+# write a derived table into output_dir/<name>.csv, returns the written paths
+def render_table(spec, measurement_path, output_dir):
+    runs = load_runs(spec, measurement_path)
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, spec.name + ".csv")
+    with open(path, 'w') as file:
+        file.write(";".join(["file name"] + list(spec.parameters) + list(spec.metrics)) + "\n")
+        for r in runs:
+            row = [r.parameters["file_name"]]
+            row += [str(r.parameters[name]) for name in spec.parameters]
+            row += [str(scalar_metrics[name](r)) for name in spec.metrics]
+            file.write(";".join(row) + "\n")
+
+    return [path]
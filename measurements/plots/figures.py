@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+
+from measurements import measurement_path
+from performance_model import default_model_file
+from plot_engine import FigureSpec, Input, Layer, TableSpec, render_figure, set_performance_model
+from figure_build import FigureBuild
+
+# all figures of the measurements
+# directories and files are relative to the measurement path
+
+comperator_ref_voltage = 0.2
+bin_size_s = 5
+
+FIGURES = [
+    FigureSpec(
+        "data_rate_and_reliability",
+        inputs=[Input("datarate_and_reliability_more_runs")],
+        x="data_rate_kbps",
+        layers=[
+            Layer("reliability_link", "Link", style=dict(marker='.')),
+            Layer("reliability_udp", "UDP", style=dict(marker='.')),
+        ],
+        xlabel="Datarate [in kbit/s]",
+        ylabel="Packet Delivery Rate [0..1]",
+        yticks=[i / 10 for i in range(12)],
+        consistent=("payload_size_bytes", "distance_cm"),
+    ),
+    FigureSpec(
+        "throughput",
+        inputs=[Input("datarate_and_reliability_0_43V_better_reliability")],
+        x="data_rate_kbps",
+        layers=[
+            Layer("throughput_link_kbps", "Link", style=dict(marker='.', color='C0')),
+            Layer("expected_throughput_link_kbps", "Expected Link", style=dict(marker='', ls='dotted', color='C0')),
+            Layer("throughput_udp_kbps", "UDP", style=dict(marker='.', color='C1')),
+            Layer("expected_throughput_udp_kbps", "Expected UDP", style=dict(marker='', ls='dotted', color='C1')),
+        ],
+        xlabel="Datarate [in kbit/s]",
+        ylabel="Throughput [in kbit/s]",
+        consistent=("payload_size_bytes", "distance_cm"),
+    ),
+    FigureSpec(
+        "latency_and_payload_average",
+        inputs=[Input("latency_and_payload")],
+        x="link_payload_size_bytes",
+        layers=[
+            Layer("min_link_latency", "Measured Minimum Link Layer Latency", style=dict(marker='.', ls='')),
+            Layer("average_link_latency", "Measured Average Link Layer Latency", style=dict(marker='')),
+            Layer("expected_transmission_delay_ms", "Expected Transmission Delay", style=dict(marker=''),
+                  args=dict(data_rate_bps=30000)),
+        ],
+        xlabel="UDP Layer Payload Size [in byte]",
+        ylabel="Time [in ms]",
+        consistent=("distance_cm",),
+    ),
+    FigureSpec(
+        "latency_and_payload_boxplot",
+        inputs=[Input("latency_and_payload_long_term")],
+        x="payload_size_bytes",
+        layers=[
+            Layer("link_latency_samples", kind="boxplot",
+                  style=dict(showfliers=False, vert=False, widths=2)),
+            Layer("udp_latency_samples", kind="boxplot",
+                  style=dict(showfliers=False, vert=False, widths=2,
+                             boxprops=dict(color="blue"), capprops=dict(color="blue"),
+                             whiskerprops=dict(color="blue"), flierprops=dict(color="blue"))),
+        ],
+        xlabel="Latency [in ms]",
+        ylabel="UDP Layer Payload Size [in byte]",
+        legend_loc=None,
+        consistent=("distance_cm",),
+    ),
+    FigureSpec(
+        "latency_and_reliability",
+        inputs=[Input("latency", files=["latency_2021-03-28T17-46-56_100b_over300s_every130ms_30kbps_0_43_V_ref.csv"])],
+        layers=[
+            Layer("udp_latency_series", "Latency UDP", kind="series", style=dict(marker='.', color='C0')),
+            Layer("reliability_udp_per_time", "Reliability UDP", kind="series", axis="right",
+                  style=dict(color='C1'), args=dict(bin_size_s=bin_size_s)),
+            Layer("reliability_link_per_time", "Reliability Link Layer", kind="series", axis="right",
+                  style=dict(color='C1', ls='--'), args=dict(bin_size_s=bin_size_s)),
+        ],
+        xlabel="Package Send Time [in s]",
+        ylabel="Latency [in ms]",
+        ylabel_right=f"Reliability in time intervals of {bin_size_s}s [0..1]",
+        ylim_right=(0, 1.05),   # leave some space in case of 100% reliability
+        title="VLC Latency and Reliability\nPackages with size of {payload_size_bytes} byte every {interval_ms:.0f} ms",
+    ),
+    FigureSpec(
+        "latency_over_time",
+        inputs=[Input("latency", files=["latency_2021-03-30T09-58-03_100b_over300s_every200ms_30kbps_0_43_V_ref.csv"])],
+        layers=[
+            Layer("udp_latency_series", "UDP", kind="series", args=dict(limit=150)),
+            Layer("link_latency_series", "Link Layer", kind="series", args=dict(limit=150)),
+        ],
+        xlabel="time in s",
+        ylabel="latency in ms",
+    ),
+    FigureSpec(
+        "reliability_and_distance",
+        inputs=[
+            Input(f"distance_{comperator_ref_voltage}V_15degree", group="15 degree"),
+            Input(f"distance_{comperator_ref_voltage}V_120degree", group="120 degree"),
+        ],
+        x="distance_cm",
+        layers=[Layer("reliability_udp", "{group}", style=dict(marker='.'))],
+        xlabel="Distance [in cm]",
+        ylabel="Packet Delivery Rate [0..1]",
+        title="UDP Packet Delivery Rate for different distances and LED emitting angles\n"
+              "at an interval of {interval_ms} ms, {payload_size_bytes} bytes payload and "
+              + f"{comperator_ref_voltage} V comperator referenz voltage",
+        consistent=("payload_size_bytes", "interval_us"),
+    ),
+    FigureSpec(
+        "reliability_and_light_conditions",
+        inputs=[Input("disturbing_light", files={
+            "Open\n Window": "latency_2021-03-31T15-04-18_100b_over120s_every100ms_30kbps_0_43_V_ref_open_window.csv",
+            "Closed\n Window": "latency_2021-03-31T15-15-34_100b_over120s_every100ms_30kbps_0_43_V_ref_closed_window.csv",
+            "Half Covered\n Window": "latency_2021-03-31T15-21-27_100b_over120s_every100ms_30kbps_0_43_V_ref_half_covered_window.csv",
+            "Darkness": "latency_2021-03-31T15-27-17_100b_over120s_every100ms_30kbps_0_43_V_ref_darkness.csv",
+            "No Sunlight,\n LED Ceiling Light": "latency_2021-03-31T15-30-47_100b_over120s_every100ms_30kbps_0_43_V_ref_no_sunlight_led_deckenlampe.csv",
+        })],
+        x="label",
+        layers=[Layer("reliability_link", "Link Layer", kind="bar")],
+        xlabel="Light Condition",
+        ylabel="Packet Delivery Rate [0..1]",
+        grid=False,
+        consistent=("payload_size_bytes", "interval_us", "distance_cm"),
+    ),
+    FigureSpec(
+        "reliability_and_materials",
+        inputs=[Input("reliability_and_materials", files={
+            "no material": "latency_2021-03-22T21-05-18_100b_over120s_every150ms_10kbps_0_layer_plexiglas.csv",
+            "2 mm plexiglas": "latency_2021-03-22T21-08-55_100b_over120s_every150ms_10kbps_1_layer_plexiglas.csv",
+            "4 mm plexiglas": "latency_2021-03-22T21-12-33_100b_over120s_every150ms_10kbps_2_layer_plexiglas.csv",
+            "6 mm plexiglas": "latency_2021-03-22T21-17-22_100b_over120s_every150ms_10kbps_3_layer_plexiglas.csv",
+            "8 mm plexiglas": "latency_2021-03-22T21-19-13_100b_over120s_every150ms_10kbps_4_layer_plexiglas.csv",
+            "paper": "latency_2021-03-22T21-26-06_100b_over120s_every150ms_10kbps_paper.csv",
+        })],
+        x="label",
+        layers=[Layer("reliability_link", "Link Layer", kind="bar")],
+        xlabel="Material",
+        ylabel="Packet Delivery Rate [0..1]",
+        grid=False,
+        consistent=("payload_size_bytes", "interval_us", "distance_cm"),
+    ),
+    FigureSpec(
+        "reliability_and_payload",
+        inputs=[Input("reliability_and_payload")],
+        x="payload_size_bytes",
+        layers=[
+            Layer("reliability_link", "Link"),
+            Layer("reliability_udp", "UDP"),
+        ],
+        xlabel="UDP Payload Size [in byte]",
+        ylabel="Package Delivery Rate [0..1]",
+        consistent=("distance_cm",),
+    ),
+    FigureSpec(
+        "reliability_bin_plot_link",
+        inputs=[Input("latency", files=["latency_2021-03-25T09-09-19_100b_over30s_every0ms_30kbps_0_43_V_ref.csv"])],
+        layers=[Layer("reliability_link_per_time", "Link Layer, send interval of {interval_ms:.0f}ms", kind="series",
+                      args=dict(bin_size_s=bin_size_s))],
+        xlabel="time [in s]",
+        ylabel="Packet Delivery Rate [0..1]",
+        title="Link Layer Packet Delivery Rate (UDP {payload_size_bytes} byte payload) with binsize of "
+              + f"{bin_size_s} s and 0.5cm distance",
+        legend_loc=7,
+        consistent=("payload_size_bytes",),
+    ),
+    FigureSpec(
+        "reliability_bin_plot_udp",
+        inputs=[Input("latency_interval_10kbps_crc")],
+        layers=[Layer("reliability_udp_per_time", "UDP, send interval of {interval_ms:.0f}ms", kind="series",
+                      args=dict(bin_size_s=bin_size_s))],
+        xlabel="time [in s]",
+        ylabel="Packet Delivery Rate [0..1]",
+        legend_loc=7,
+        consistent=("payload_size_bytes",),
+    ),
+    FigureSpec(
+        "reliability_interval_30kbps",
+        inputs=[Input("latency_interval_30kbps_crc")],
+        x="interval_ms",
+        layers=[
+            Layer("reliability_link", "30 kbit/s Link Layer", style=dict(marker='.')),
+            Layer("reliability_udp", "30 kbit/s UDP Layer", style=dict(marker='.')),
+        ],
+        xlabel="Interval [in ms]",
+        ylabel="Packet Delivery Rate [0..1]",
+        title="Data rate of 30 kbit/s",
+        consistent=("payload_size_bytes", "distance_cm"),
+    ),
+    FigureSpec(
+        "reliability_receiver_tolerance",
+        inputs=[Input("receiver_tolerance_crc")],
+        x="tolerance_fraction",
+        layers=[
+            Layer("reliability_link", "Link Layer", style=dict(marker='.')),
+            Layer("reliability_udp", "UDP", style=dict(marker='.')),
+        ],
+        xlabel="Tolerance [0 .. 1]",
+        ylabel="Packet Delivery Rate [0..1]",
+        consistent=("payload_size_bytes", "interval_us", "distance_cm"),
+    ),
+]
+
+
+# derived tables with the summary of each run of a sweep
+summary_metrics = ["reliability_udp", "reliability_link", "average_udp_latency", "average_link_latency",
+                   "throughput_udp_kbps", "throughput_link_kbps"]
+
+TABLES = [
+    TableSpec(
+        "data_rate_summary",
+        inputs=[Input("datarate_and_reliability_more_runs")],
+        parameters=["data_rate_bps", "payload_size_bytes", "interval_us", "distance_cm"],
+        metrics=summary_metrics,
+    ),
+    TableSpec(
+        "payload_summary",
+        inputs=[Input("reliability_and_payload")],
+        parameters=["payload_size_bytes", "interval_us", "distance_cm"],
+        metrics=summary_metrics,
+    ),
+    TableSpec(
+        "interval_summary",
+        inputs=[Input("latency_interval_10kbps_crc", group="10 kbit/s"), Input("latency_interval_30kbps_crc", group="30 kbit/s")],
+        parameters=["group", "data_rate_bps", "interval_us", "payload_size_bytes"],
+        metrics=summary_metrics,
+    ),
+    TableSpec(
+        "tolerance_summary",
+        inputs=[Input("receiver_tolerance_crc")],
+        parameters=["tolerance", "data_rate_bps", "payload_size_bytes", "interval_us"],
+        metrics=summary_metrics,
+    ),
+]
+
+
+def get_figure(name):
+    for spec in FIGURES + TABLES:
+        if spec.name == name:
+            return spec
+    raise KeyError("unknown figure: " + name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the measurement figures and tables, only outputs with changed inputs are rendered again")
+    parser.add_argument("figures", nargs="*", help="names of the figures and tables to render, all if empty")
+    parser.add_argument("-m", "--measurements", default=measurement_path, help="path of the measurement directories")
+    parser.add_argument("-o", "--output", default="figures", help="output directory")
+    parser.add_argument("-f", "--format", nargs="+", default=["pdf", "png"], help="output file formats")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--force", action="store_true", help="render all selected outputs even if they are up to date")
+    parser.add_argument("--show", action="store_true", help="show the figures interactively instead of writing files")
+    parser.add_argument("--model", default=default_model_file,
+                        help="performance model of the expected values, e.g. performance_model_<corpus>.json of encoding_overhead.py")
+    args = parser.parse_args()
+    assert args.model == default_model_file or os.path.exists(args.model), "no performance model file: " + args.model
+
+    specs = FIGURES + TABLES
+    if len(args.figures) > 0:
+        specs = [get_figure(name) for name in args.figures]
+
+    if args.show:
+        set_performance_model(args.model)
+        for spec in specs:
+            if isinstance(spec, FigureSpec):
+                render_figure(spec, args.measurements, args.output, show=True)
+    else:
+        build = FigureBuild(specs, args.measurements, args.output, formats=args.format, model_file=args.model)
+        rebuilt, failed, up_to_date = build.build(jobs=args.jobs, force=args.force)
+        print(f"Rendered {len(rebuilt)} outputs into {args.output}, {len(up_to_date)} up to date")
+        if len(failed) > 0:
+            print("[ERROR] failed figures: " + ", ".join(failed))
+            exit(1)
@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from performance_model import default_num_sync_symbols
+from vlc_decoder import ManchesterReceiver, timeout_while_syncing_us, vlc_buffer_size, vlc_receiver_tolerance
+from vlc_frame import build_frame, encode_frames
+from vlc_host import VlcHost, host_library_path
+
+# Coverage guided fuzzer of the receiver state machine (_interrupt_changing_edge)
+#
+# An input is a sequence of ISR timestamps (first timestamp and gaps in us). Inputs are mutated with
+# near tolerance gaps, wraps of the 32 bit timer, truncated end flags, runs of stuffed bits, dropped and
+# spurious edges, and executed by the transliteration of the ISR (vlc_decoder.ManchesterReceiver) and by the
+# host build of the firmware (vlc_host). Coverage is the set of line transitions of ManchesterReceiver.edge with
+# bucketed hit counts, plus buckets of received frames, timeouts, overflows and firmware messages.
+#
+# Oracles:
+#   exception: the model raised an exception
+#   mismatch:  the firmware received other frames than the model
+#   assert:    an assertion of the firmware failed (the host build counts them instead of a panic)
+#   stall:     a clean probe frame which starts probe_gap_us after the last edge of the input is not received
+# Inputs with findings are minimised (ddmin over the edges) and stored with the other corpus entries.
+# Every corpus entry records the result of its last run, the regression run replays the corpus in parallel
+# and reports entries whose oracles fail or whose result changed.
+
+finding_kinds = ["exception", "mismatch", "assert", "stall"]
+
+probe_data_rate_bps = 30000
+probe_payload = b"\x5a"
+
+max_gap_us = 2 ** 32 - 1
+timer_wrap_us = 2 ** 32
+
+# bytes of the stuffing runs: ones at the end and the beginning of a byte, the end flag
+_stuffing_bytes = [0xFF, 0xFE, 0x7F, 0x7E, 0x3F, 0xFC, 0xFD]
+
+
+class FuzzConfig:
+    def __init__(self, tolerance=vlc_receiver_tolerance, num_sync_symbols=default_num_sync_symbols,
+                 probe_gap_us=2 * timeout_while_syncing_us, max_edges=20000, use_host=True):
+        self.tolerance = tolerance
+        self.num_sync_symbols = num_sync_symbols
+        self.probe_gap_us = probe_gap_us
+        self.max_edges = max_edges
+        self.use_host = use_host
+
+    def key(self):
+        return self.tolerance, self.num_sync_symbols, self.probe_gap_us
+
+
+# fuzz input, the timestamps are first_time_us + cumsum(gaps_us), the ISR reads them modulo 2^32
+class EdgeSequence:
+    def __init__(self, first_time_us, gaps_us):
+        self.first_time_us = int(first_time_us) % timer_wrap_us
+        self.gaps_us = np.clip(np.asarray(gaps_us, dtype=np.int64), 0, max_gap_us)
+
+    @staticmethod
+    def from_times(times_us):
+        times_us = np.asarray(times_us, dtype=np.int64)
+        if len(times_us) == 0:
+            return EdgeSequence(0, [])
+        return EdgeSequence(times_us[0], np.concatenate([[0], np.diff(times_us)]))
+
+    def __len__(self):
+        return len(self.gaps_us)
+
+    def times(self):
+        return self.first_time_us + np.cumsum(self.gaps_us)
+
+    def digest(self):
+        return hashlib.sha1(str(self.first_time_us).encode() + self.gaps_us.tobytes()).hexdigest()[:16]
+
+
+# result of one execution
+# frames: frames received from the input (end time, data), the frame of the probe is not included
+class Execution:
+    def __init__(self):
+        self.frames = []
+        self.probe_received = False
+        self.timeouts = 0
+        self.overflows = 0
+        self.messages = 0
+        self.findings = []
+        self.detail = ""
+        self.features = set()
+
+    # result stored in the corpus
+    def expectation(self):
+        return {
+            "frames": [data.hex() for _, data in self.frames],
+            "end_times_us": [int(t) for t, _ in self.frames],
+            "probe_received": self.probe_received,
+            "timeouts": self.timeouts,
+            "overflows": self.overflows,
+            "findings": sorted(set(self.findings)),
+        }
+
+
+def _bucket(count):
+    return min(int(count).bit_length(), 8)
+
+
+_edge_code = ManchesterReceiver.edge.__code__
+
+
+# run the model on the timestamps and collect the line transitions of ManchesterReceiver.edge
+def _run_traced(receiver, times):
+    counts = {}
+    previous = [0]
+
+    def local_trace(frame, event, arg):
+        if event == "line":
+            key = (previous[0], frame.f_lineno)
+            counts[key] = counts.get(key, 0) + 1
+            previous[0] = frame.f_lineno
+        return local_trace
+
+    def global_trace(frame, event, arg):
+        if frame.f_code is _edge_code:
+            previous[0] = 0
+            return local_trace
+        return None
+
+    sys.settrace(global_trace)
+    try:
+        for t in times:
+            receiver.edge(int(t))
+    finally:
+        sys.settrace(None)
+
+    return counts
+
+
+_probe_cache = {}
+
+
+# gaps of a clean probe frame, the first gap is 0
+def _probe_gaps(num_sync_symbols):
+    if num_sync_symbols not in _probe_cache:
+        encoded = encode_frames([build_frame(probe_payload)], probe_data_rate_bps, num_sync_symbols)
+        times, _ = encoded.frame(0)
+        _probe_cache[num_sync_symbols] = (np.concatenate([[0], np.diff(times)]), build_frame(probe_payload))
+    return _probe_cache[num_sync_symbols]
+
+
+_host = None
+_host_key = None
+
+
+def _get_host(config):
+    global _host, _host_key
+    if not config.use_host:
+        return None
+    if _host_key != (config.tolerance, config.num_sync_symbols):
+        _host = VlcHost(config.tolerance, config.num_sync_symbols)
+        _host_key = (config.tolerance, config.num_sync_symbols)
+    return _host
+
+
+# execute an input on the model and the firmware and evaluate the oracles
+def execute(sequence, config, trace=True):
+    result = Execution()
+    probe_gaps, probe_frame = _probe_gaps(config.num_sync_symbols)
+    input_times = sequence.times()
+    last_time = int(input_times[-1]) if len(input_times) > 0 else sequence.first_time_us
+    probe_times = last_time + config.probe_gap_us + np.cumsum(probe_gaps)
+
+    receiver = ManchesterReceiver(config.tolerance, config.num_sync_symbols, vlc_buffer_size)
+    counts = {}
+    try:
+        if trace:
+            counts = _run_traced(receiver, input_times)
+        else:
+            for t in input_times:
+                receiver.edge(int(t))
+        num_input_frames = len(receiver.frames)
+        for t in probe_times:
+            receiver.edge(int(t))
+    except Exception:
+        result.findings.append("exception")
+        result.detail = traceback.format_exc(limit=3)
+        num_input_frames = len(receiver.frames)
+
+    model_frames = list(receiver.frames)
+    result.frames = model_frames[:num_input_frames]
+    result.probe_received = any(data == probe_frame for _, data in model_frames[num_input_frames:])
+    result.timeouts = receiver.timeouts
+    result.overflows = receiver.overflows
+    if "exception" not in result.findings and not result.probe_received:
+        result.findings.append("stall")
+        result.detail = f"probe frame {config.probe_gap_us}us after the input not received"
+
+    host = _get_host(config)
+    if host != None:
+        messages = host.messages()
+        assert_failures = host.assert_failures()
+        times = np.concatenate([input_times, probe_times])
+        received = host.receive(times, [0, len(times)])
+        host_frames = [(int(t), data) for t, data in zip(received.end_times_us, received.data)]
+        result.messages = host.messages() - messages
+
+        if host.assert_failures() != assert_failures:
+            result.findings.append("assert")
+            result.detail = f"{host.assert_failures() - assert_failures} assertions failed"
+        if "exception" not in result.findings and host_frames != [(t & 0xFFFFFFFF, data) for t, data in model_frames]:
+            result.findings.append("mismatch")
+            result.detail = f"firmware received {len(host_frames)} frames, model {len(model_frames)}"
+
+    result.features = {("line", a, b, _bucket(c)) for (a, b), c in counts.items()}
+    result.features |= {
+        ("frames", _bucket(len(result.frames))),
+        ("timeouts", _bucket(result.timeouts)),
+        ("overflows", _bucket(result.overflows)),
+        ("messages", _bucket(result.messages)),
+        ("probe", result.probe_received),
+    }
+    result.features |= {("finding", kind) for kind in result.findings}
+
+    return result
+
+
+# signature of a finding for deduplication: kind and the covered line transitions
+def _finding_signature(kind, result):
+    return kind, frozenset(f[1:3] for f in result.features if f[0] == "line")
+
+
+# delta debugging over the edges: smallest subsequence for which the finding still occurs
+def minimize(sequence, kind, config, max_tests=2000):
+    times = sequence.times()
+    tests = 0
+
+    def reproduces(candidate):
+        return kind in execute(EdgeSequence.from_times(candidate), config, trace=False).findings
+
+    n = 2
+    while len(times) >= 2 and tests < max_tests:
+        chunk = int(np.ceil(len(times) / n))
+        reduced = False
+        for i in range(n):
+            complement = np.concatenate([times[:i * chunk], times[(i + 1) * chunk:]])
+            tests += 1
+            if len(complement) < len(times) and reproduces(complement):
+                times = complement
+                n = max(n - 1, 2)
+                reduced = True
+                break
+            if tests >= max_tests:
+                break
+        if not reduced:
+            if n >= len(times):
+                break
+            n = min(2 * n, len(times))
+
+    return EdgeSequence.from_times(times)
+
+
+# typical gap of an input (half symbol), used by the mutators
+def _typical_gap(gaps):
+    positive = gaps[gaps > 0]
+    return int(np.median(positive)) if len(positive) > 0 else 17
+
+
+def _mutate_near_tolerance(gaps, rng, config, corpus):
+    reference = _typical_gap(gaps)
+    for _ in range(rng.integers(1, 8)):
+        i = rng.integers(0, len(gaps))
+        symbol = reference * rng.choice([1, 2])
+        deviation = config.tolerance / 100 * rng.choice([-1, 1]) * rng.uniform(0.9, 1.1)
+        gaps[i] = max(int(round(symbol * (1 + deviation))) + rng.integers(-1, 2), 0)
+    return gaps
+
+
+def _mutate_extreme_gap(gaps, rng, config, corpus):
+    reference = _typical_gap(gaps)
+    values = [0, 1, 2 * reference - 1, 2 * reference, 2 * reference + 1, timeout_while_syncing_us - 1,
+              timeout_while_syncing_us, 2 ** 31, max_gap_us]
+    gaps[rng.integers(0, len(gaps))] = rng.choice(values)
+    return gaps
+
+
+def _mutate_truncate_flag(gaps, rng, config, corpus):
+    tail = min(len(gaps), 18)
+    if rng.random() < 0.5:
+        return gaps[:len(gaps) - rng.integers(1, tail + 1)]
+    i = len(gaps) - rng.integers(1, tail + 1)
+    if i + 1 < len(gaps):
+        gaps[i + 1] += gaps[i]
+    return np.delete(gaps, i)
+
+
+def _mutate_stuffing_run(gaps, rng, config, corpus):
+    reference = _typical_gap(gaps)
+    data_rate_bps = int(np.clip(1000000 / (2 * max(reference, 1)), 1000, 50000))
+    payload = bytes(rng.choice(_stuffing_bytes, rng.integers(1, 12)))
+    encoded = encode_frames([payload], data_rate_bps, config.num_sync_symbols)
+    times, _ = encoded.frame(0)
+    run = np.diff(times)[2 * config.num_sync_symbols:]
+    if rng.random() < 0.5:
+        # without the end flag
+        run = run[:-16]
+    i = rng.integers(0, len(gaps) + 1)
+    return np.concatenate([gaps[:i], run, gaps[i:]])
+
+
+def _mutate_drop(gaps, rng, config, corpus):
+    for _ in range(rng.integers(1, 5)):
+        if len(gaps) < 2:
+            break
+        i = rng.integers(0, len(gaps) - 1)
+        gaps[i + 1] += gaps[i]
+        gaps = np.delete(gaps, i)
+    return gaps
+
+
+def _mutate_insert_pulse(gaps, rng, config, corpus):
+    i = rng.integers(0, len(gaps))
+    gap = int(gaps[i])
+    start = rng.integers(0, gap + 1)
+    width = min(rng.integers(0, 8), gap - start)
+    return np.concatenate([gaps[:i], [start, width, gap - start - width], gaps[i + 1:]])
+
+
+def _mutate_jitter(gaps, rng, config, corpus):
+    start = rng.integers(0, len(gaps))
+    end = min(len(gaps), start + rng.integers(1, 64))
+    gaps[start:end] += rng.integers(-3, 4, end - start)
+    return gaps
+
+
+def _mutate_scale(gaps, rng, config, corpus):
+    start = rng.integers(0, len(gaps))
+    end = min(len(gaps), start + rng.integers(1, 256))
+    gaps[start:end] = np.round(gaps[start:end] * rng.uniform(0.5, 2.0))
+    return gaps
+
+
+def _mutate_duplicate(gaps, rng, config, corpus):
+    start = rng.integers(0, len(gaps))
+    end = min(len(gaps), start + rng.integers(1, 64))
+    return np.concatenate([gaps[:end], gaps[start:end], gaps[end:]])
+
+
+def _mutate_splice(gaps, rng, config, corpus):
+    other = corpus[rng.integers(0, len(corpus))].gaps_us
+    if len(other) == 0:
+        return gaps
+    return np.concatenate([gaps[:rng.integers(0, len(gaps) + 1)], other[rng.integers(0, len(other)):]])
+
+
+_mutators = [_mutate_near_tolerance, _mutate_extreme_gap, _mutate_truncate_flag, _mutate_stuffing_run, _mutate_drop,
+             _mutate_insert_pulse, _mutate_jitter, _mutate_scale, _mutate_duplicate, _mutate_splice]
+
+
+def mutate(sequence, rng, config, corpus):
+    gaps = sequence.gaps_us.copy()
+    first_time_us = sequence.first_time_us
+    for _ in range(rng.integers(1, 5)):
+        if rng.random() < 0.05:
+            # timer wrap during the input
+            first_time_us = timer_wrap_us - rng.integers(0, max(int(gaps.sum()), 1) + 1)
+            continue
+        if len(gaps) == 0:
+            gaps = np.array([rng.integers(0, 100)], dtype=np.int64)
+        gaps = np.clip(rng.choice(_mutators)(gaps, rng, config, corpus), 0, max_gap_us).astype(np.int64)
+    return EdgeSequence(first_time_us, gaps[:config.max_edges])
+
+
+# initial inputs: clean frames of several data rates and payloads with many stuffed bits
+def seed_inputs(config, rng):
+    payloads = [b"", bytes(1), bytes([0xFF] * 8), bytes([0x7E, 0xFE, 0x3F, 0xFC]), rng.integers(0, 256, 48).astype(np.uint8).tobytes()]
+    frames = [build_frame(p) for p in payloads] + [bytes()]
+    seeds = []
+    for data_rate_bps in (10000, 20000, 30000, 35000):
+        encoded = encode_frames(frames, data_rate_bps, config.num_sync_symbols)
+        for i in range(len(frames)):
+            times, _ = encoded.frame(i)
+            seeds.append(EdgeSequence.from_times(times + 1000))
+    return seeds
+
+
+# fuzz iterations of one worker
+# returns the inputs with new coverage (sequence, features) and the minimised findings (kind, sequence, execution)
+def _fuzz_worker(task):
+    corpus, known_features, known_signatures, iterations, seed, config = task
+    rng = np.random.default_rng(seed)
+    features = set(known_features)
+    signatures = set(known_signatures)
+    new_inputs = []
+    findings = []
+
+    for _ in range(iterations):
+        sequence = mutate(corpus[rng.integers(0, len(corpus))], rng, config, corpus)
+        result = execute(sequence, config)
+        if not result.features <= features:
+            features |= result.features
+            new_inputs.append((sequence, result.features))
+            corpus = corpus + [sequence]
+
+        for kind in result.findings:
+            signature = _finding_signature(kind, result)
+            if signature in signatures:
+                continue
+            signatures.add(signature)
+            minimized = minimize(sequence, kind, config)
+            findings.append((kind, minimized, execute(minimized, config)))
+
+    return new_inputs, findings
+
+
+def _entry_path(directory, sequence):
+    return os.path.join(directory, sequence.digest() + ".json")
+
+
+def save_entry(directory, sequence, config, result, kind="coverage"):
+    entry = {
+        "kind": kind,
+        "tolerance": config.tolerance,
+        "num_sync_symbols": config.num_sync_symbols,
+        "probe_gap_us": config.probe_gap_us,
+        "first_time_us": sequence.first_time_us,
+        "gaps_us": [int(g) for g in sequence.gaps_us],
+        "detail": result.detail,
+        "expected": result.expectation(),
+    }
+    path = _entry_path(directory, sequence)
+    with open(path, 'w') as file:
+        json.dump(entry, file, indent=1)
+    return path
+
+
+def load_corpus(directory):
+    entries = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, 'r') as file:
+            entries.append((path, json.load(file)))
+    return entries
+
+
+def _entry_sequence_and_config(entry, use_host):
+    config = FuzzConfig(entry["tolerance"], entry["num_sync_symbols"], entry["probe_gap_us"], use_host=use_host)
+    return EdgeSequence(entry["first_time_us"], entry["gaps_us"]), config
+
+
+# coverage guided fuzzing in rounds, the workers share the coverage and the corpus after every round
+def run_campaign(directory, config, rounds, iterations, seed=0, jobs=None):
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    jobs = jobs or os.cpu_count()
+
+    corpus = []
+    features = set()
+    signatures = set()
+    for path, entry in load_corpus(directory):
+        sequence, entry_config = _entry_sequence_and_config(entry, config.use_host)
+        if entry_config.key() != config.key():
+            continue
+        result = execute(sequence, config)
+        corpus.append(sequence)
+        features |= result.features
+        for kind in result.findings:
+            signatures.add(_finding_signature(kind, result))
+    for sequence in seed_inputs(config, rng):
+        result = execute(sequence, config)
+        if not result.features <= features:
+            features |= result.features
+            corpus.append(sequence)
+            save_entry(directory, sequence, config, result)
+    print(f"[INFO] {len(corpus)} corpus entries, {len(features)} features")
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for round_index in range(rounds):
+            start = time.time()
+            seeds = np.random.SeedSequence([seed, round_index]).spawn(jobs)
+            tasks = [(corpus, features, signatures, iterations, s, config) for s in seeds]
+            num_findings = {kind: 0 for kind in finding_kinds}
+            for new_inputs, findings in executor.map(_fuzz_worker, tasks):
+                for sequence, input_features in new_inputs:
+                    if not input_features <= features:
+                        features |= input_features
+                        corpus.append(sequence)
+                        save_entry(directory, sequence, config, execute(sequence, config))
+                for kind, sequence, result in findings:
+                    signature = _finding_signature(kind, result)
+                    if signature in signatures:
+                        continue
+                    signatures.add(signature)
+                    num_findings[kind] += 1
+                    corpus.append(sequence)
+                    path = save_entry(directory, sequence, config, result, kind)
+                    print(f"[WARNING] {kind} with {len(sequence)} edges: {result.detail.strip()} ({path})")
+
+            executions = jobs * iterations / (time.time() - start)
+            print(f"[INFO] round {round_index + 1}/{rounds}: {len(corpus)} corpus entries, {len(features)} features, "
+                  f"findings {num_findings}, {executions:.0f} executions/s")
+
+
+def _replay_entry(task):
+    path, entry, use_host = task
+    sequence, config = _entry_sequence_and_config(entry, use_host)
+    result = execute(sequence, config, trace=False)
+    return path, result.expectation(), result.detail
+
+
+# replay the corpus, an entry fails if its result changed or if the model or the firmware broke
+# update: store the new results instead
+def run_regression(directory, use_host=True, update=False, jobs=None):
+    entries = load_corpus(directory)
+    failures = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        tasks = [(path, entry, use_host) for path, entry in entries]
+        for (path, entry), (_, expectation, detail) in zip(entries, executor.map(_replay_entry, tasks, chunksize=8)):
+            broken = [k for k in expectation["findings"] if k in ("exception", "mismatch", "assert")]
+            # without the firmware only the results of the model can be compared
+            expected = dict(entry["expected"])
+            if not use_host:
+                expected["findings"] = [k for k in expected["findings"] if k not in ("mismatch", "assert")]
+            if expectation == expected and len(broken) == 0:
+                continue
+            if update:
+                entry["expected"] = expectation
+                entry["detail"] = detail
+                with open(path, 'w') as file:
+                    json.dump(entry, file, indent=1)
+                print(f"[INFO] updated {path}")
+                continue
+
+            failures += 1
+            changed = [k for k in expectation if expectation[k] != expected[k]]
+            print(f"[ERROR] {path}: changed {changed}, findings {expectation['findings']} {detail.strip()}")
+
+    print(f"{len(entries) - failures} of {len(entries)} corpus entries passed")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fuzz the receiver state machine with edge timings")
+    parser.add_argument("mode", choices=["fuzz", "regress"], help="fuzz: extend the corpus, regress: replay the corpus")
+    parser.add_argument("-c", "--corpus", default="receiver_corpus", help="corpus directory")
+    parser.add_argument("-t", "--tolerance", type=int, default=vlc_receiver_tolerance, help="receiver tolerance in percent")
+    parser.add_argument("--sync-symbols", type=int, default=default_num_sync_symbols, help="number of sync symbols")
+    parser.add_argument("--probe-gap", type=int, default=2 * timeout_while_syncing_us, help="gap before the probe frame in us")
+    parser.add_argument("-r", "--rounds", type=int, default=5, help="fuzzing rounds")
+    parser.add_argument("-i", "--iterations", type=int, default=200, help="inputs per worker and round")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the random generators")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--model-only", action="store_true", help="do not run the host build of the firmware")
+    parser.add_argument("--update", action="store_true", help="regress: store the new results of changed entries")
+    args = parser.parse_args()
+
+    use_host = not args.model_only
+    if use_host and not os.path.exists(host_library_path):
+        print("[WARNING] host library not found, only the model is fuzzed (make -C vlc_physical_layer/host)")
+        use_host = False
+
+    if args.mode == "fuzz":
+        config = FuzzConfig(args.tolerance, args.sync_symbols, args.probe_gap, use_host=use_host)
+        run_campaign(args.corpus, config, args.rounds, args.iterations, args.seed, args.jobs)
+    else:
+        sys.exit(1 if run_regression(args.corpus, use_host, args.update, args.jobs) > 0 else 0)
@@ -3,8 +3,9 @@
 from flash_nodes import build_source, flash_all_nodes
 from code_parameters import overwrite_datarate
 from measurements import LatencyMeasurement, LatencyMeasurementData
+from performance_model import load_performance_model
+from sweep_journal import SweepJournal
 import time
-import math
 
 min_data_rate = 30000
 steps = 1000
@@ -12,11 +13,13 @@ max_data_rate = 35000
 
 number_packages_per_run = 1000
 
-for data_rate in range(min_data_rate, max_data_rate + steps, steps):
-    print("-------------")
-    print(f"Run data rate test with data rate of {data_rate} bits/s")
-    print("-------------")
+subfolder = "datarate_and_reliability_more_runs"
+
+# completed data rates are skipped when the sweep is started again
+journal = SweepJournal(subfolder, "run_datarate_measurement")
 
+
+def measure(data_rate):
     overwrite_datarate(data_rate)
 
     build_source()
@@ -30,8 +33,9 @@ for data_rate in range(min_data_rate, max_data_rate + steps, steps):
     distance = 0.5    #cm
 
     # avoid buffering effects
-    expected_ping_ms = ((payload_size_bytes + 62.5) * 8 / data_rate * 1000) + 30
-    interval_us = math.ceil(expected_ping_ms* 1000)
+    model = load_performance_model()
+    expected_ping_ms = float(model.udp_latency_ms(data_rate, payload_size_bytes))
+    interval_us = int(model.pacing_interval_us(data_rate, payload_size_bytes, margin_ms=30))
     total_run_time_us = number_packages_per_run * interval_us
 
     print(expected_ping_ms)
@@ -49,9 +53,18 @@ for data_rate in range(min_data_rate, max_data_rate + steps, steps):
     measurements_list = l.run()
     assert measurements_list != None, "measurement failed"
 
-    l.write_measurement_to_file(
-        subfolder="datarate_and_reliability_more_runs",
+    return l.write_measurement_to_file(
+        subfolder=subfolder,
         file_name_note=str(data_rate) + "bps_" + ref_voltage + "_V_ref"
     )
 
-print("Measurement finished!")
+
+points = [{"data_rate": data_rate} for data_rate in range(min_data_rate, max_data_rate + steps, steps)]
+for point in points:
+    print("-------------")
+    print(f"Run data rate test with data rate of {point['data_rate']} bits/s")
+    print("-------------")
+
+    journal.run_point(point, lambda: measure(point["data_rate"]))
+
+print(f"Measurement finished! {journal.summary(points)}")
@@ -3,6 +3,8 @@
 from flash_nodes import build_source, flash_all_nodes
 from code_parameters import overwrite_datarate
 from measurements import LatencyMeasurement, LatencyMeasurementData
+from performance_model import load_performance_model
+from sweep_journal import SweepJournal
 import time
 import math
 
@@ -16,20 +18,21 @@ min_interval_us = 0 * 1000
 steps = 25 * 1000
 max_interval_us = 0 * 1000
 
+subfolder = "latency_interval_10kbps_crc"
+
+# completed intervals are skipped when the sweep is started again
+journal = SweepJournal(subfolder, "run_latency_and_interval")
+
 overwrite_datarate(data_rate)
 build_source()
 
-for interval_us in range(min_interval_us, max_interval_us + steps, steps):
-    print("-------------")
-    print(f"Run data rate test with interval of {interval_us/1000} ms")
-    print()
-    print("-------------")
 
+def measure(interval_us):
     flash_all_nodes()
     time.sleep(3)
 
     # avoid buffering overhead, udp latency = interval
-    expected_ping_ms = ((payload_size_bytes + 61) * 8 / data_rate * 1000)
+    expected_ping_ms = float(load_performance_model().udp_latency_ms(data_rate, payload_size_bytes))
 
     print(f"expected_ping_ms: {expected_ping_ms}ms")
     print(f"interval_us: {interval_us}us ({interval_us/1000}ms)")
@@ -46,9 +49,19 @@ for interval_us in range(min_interval_us, max_interval_us + steps, steps):
     measurements_list = l.run()
     assert measurements_list != None, "measurement failed"
 
-    l.write_measurement_to_file(
-        subfolder="latency_interval_10kbps_crc",
+    return l.write_measurement_to_file(
+        subfolder=subfolder,
         file_name_note=str(data_rate) + "bps_" + ref_voltage + "_V_ref_every" + str(interval_us/1000) + "ms"
     )
 
-print("Measurement finished!")
+
+points = [{"data_rate": data_rate, "interval_us": interval_us} for interval_us in range(min_interval_us, max_interval_us + steps, steps)]
+for point in points:
+    print("-------------")
+    print(f"Run data rate test with interval of {point['interval_us']/1000} ms")
+    print()
+    print("-------------")
+
+    journal.run_point(point, lambda: measure(point["interval_us"]))
+
+print(f"Measurement finished! {journal.summary(points)}")
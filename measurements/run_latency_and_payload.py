@@ -3,8 +3,9 @@
 from flash_nodes import build_source, flash_all_nodes
 from code_parameters import overwrite_datarate
 from measurements import LatencyMeasurement, LatencyMeasurementData
+from performance_model import load_performance_model
+from sweep_journal import SweepJournal
 import time
-import math
 
 min_payload = 50 # lowest payload to encode package number
 steps = 50
@@ -13,24 +14,32 @@ max_payload = 1200  # highest payload - UDP header - IP header
 number_packages_per_run = 1000
 data_rate = 30000
 
+subfolder = "reliability_and_payload"
+
+
+def flash_and_wait():
+    flash_all_nodes()
+
+    # wait until RIOT is initialized
+    time.sleep(3)
+
+
+# completed payload sizes are skipped when the sweep is started again, the nodes are flashed again before a retry
+journal = SweepJournal(subfolder, "run_latency_and_payload", recover=flash_and_wait)
+
 overwrite_datarate(data_rate)
 build_source()
-flash_all_nodes()
-
-# wait until RIOT is initialized
-time.sleep(3)
+flash_and_wait()
 
-for payload_size_bytes in range(min_payload, max_payload + steps, steps):
-    print("-------------")
-    print(f"Run payload and latency test with payload of {payload_size_bytes} bytes")
-    print("-------------")
 
+def measure(payload_size_bytes):
     ref_voltage = "0_43"
     distance = 0.5    #cm
 
     # avoid buffering effects
-    expected_ping_ms = ((payload_size_bytes + 62.5) * 8 / data_rate * 1000) + 25
-    interval_us = math.ceil(expected_ping_ms* 1000)
+    model = load_performance_model()
+    expected_ping_ms = float(model.udp_latency_ms(data_rate, payload_size_bytes))
+    interval_us = int(model.pacing_interval_us(data_rate, payload_size_bytes, margin_ms=25))
     total_run_time_us = number_packages_per_run * interval_us
 
     print(expected_ping_ms)
@@ -48,9 +57,19 @@ for payload_size_bytes in range(min_payload, max_payload + steps, steps):
     measurements_list = l.run()
     assert measurements_list != None, "measurement failed"
 
-    l.write_measurement_to_file(
-        subfolder="reliability_and_payload",
+    return l.write_measurement_to_file(
+        subfolder=subfolder,
         file_name_note=str(data_rate) + "bps_" + ref_voltage + "_V_ref" + str(payload_size_bytes) + "bytes_payload"
     )
 
-print("Measurement finished!")
+
+points = [{"data_rate": data_rate, "payload_size_bytes": payload_size_bytes}
+          for payload_size_bytes in range(min_payload, max_payload + steps, steps)]
+for point in points:
+    print("-------------")
+    print(f"Run payload and latency test with payload of {point['payload_size_bytes']} bytes")
+    print("-------------")
+
+    journal.run_point(point, lambda: measure(point["payload_size_bytes"]))
+
+print(f"Measurement finished! {journal.summary(points)}")
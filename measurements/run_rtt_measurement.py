@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+from flash_nodes import build_source, flash_all_nodes
+from code_parameters import overwrite_datarate
+from measurement_files import load_rtt_measurement
+from measurements import RttMeasurement
+from performance_model import load_performance_model
+from sweep_journal import SweepJournal
+import time
+
+min_payload = 10
+steps = 50
+max_payload = 510
+
+number_packages_per_run = 500
+data_rate = 30000
+
+
+def flash_and_wait():
+    flash_all_nodes()
+
+    # wait until RIOT is initialized
+    time.sleep(3)
+
+
+# completed payload sizes are skipped when the sweep is started again, the nodes are flashed again before a retry
+journal = SweepJournal("rtt", "run_rtt_measurement", recover=flash_and_wait)
+
+overwrite_datarate(data_rate)
+build_source()
+flash_and_wait()
+
+
+def measure(payload_size_bytes):
+    ref_voltage = "0_43"
+    distance = 0.5    #cm
+
+    # one package in flight: request and echo on the half duplex link
+    model = load_performance_model()
+    expected_rtt_ms = 2 * float(model.udp_latency_ms(data_rate, payload_size_bytes))
+    interval_us = int(2 * model.pacing_interval_us(data_rate, payload_size_bytes, margin_ms=25))
+    total_run_time_us = number_packages_per_run * interval_us
+
+    print(f"expected_rtt_ms: {expected_rtt_ms}ms")
+    print(f"interval_us: {interval_us}us ({interval_us/1000}ms)")
+
+    l = RttMeasurement(
+        runtime_us=total_run_time_us,
+        payload_size_bytes=payload_size_bytes,
+        interval_us=interval_us,
+        distance_cm=distance,
+        random_payload=True
+    )
+
+    measurements_list = l.run()
+    assert measurements_list != None, "measurement failed"
+
+    return l.write_measurement_to_file(
+        file_name_note=str(data_rate) + "bps_" + ref_voltage + "_V_ref"
+    )
+
+
+points = [{"data_rate": data_rate, "payload_size_bytes": payload_size_bytes}
+          for payload_size_bytes in range(min_payload, max_payload + steps, steps)]
+for point in points:
+    print("-------------")
+    print(f"Run round trip test with payload of {point['payload_size_bytes']} bytes")
+    print("-------------")
+
+    file = journal.run_point(point, lambda: measure(point["payload_size_bytes"]))
+    if file == None:
+        continue
+
+    l = load_rtt_measurement(file)
+    print(f"RTT: average {l.get_average_rtt():.2f} ms, median {l.get_median_rtt():.2f} ms, jitter {l.get_rtt_jitter():.2f} ms")
+    print(f"Turnaround: {l.get_average_turnaround():.2f} ms, one way latency: {l.get_average_one_way_latency():.2f} ms")
+    print(f"Reliability: {l.get_reliability()}")
+
+print(f"Measurement finished! {journal.summary(points)}")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+from flash_nodes import build_source, flash_all_nodes
+from code_parameters import overwrite_datarate
+from measurement_files import load_measurement
+from measurements import LatencyMeasurement
+from saturation import find_knee, saturation_summary
+from sweep_journal import SweepJournal
+import time
+
+# send windows of the bulk client, 0 sends as fast as GNRC accepts the packets
+send_windows = [1, 2, 3, 4, 6, 8, 12, 16, 0]
+
+data_rate = 30000
+payload_size_bytes = 100
+total_run_time_us = 30 * 1000000
+ref_voltage = "0_43"
+distance = 0.5    #cm
+
+
+def flash_and_wait():
+    flash_all_nodes()
+
+    # wait until RIOT is initialized
+    time.sleep(3)
+
+
+# completed send windows are skipped when the sweep is started again, the nodes are flashed again before a retry
+journal = SweepJournal("saturation", "run_saturation_measurement", recover=flash_and_wait)
+
+overwrite_datarate(data_rate)
+build_source()
+flash_and_wait()
+
+
+def measure(send_window):
+    l = LatencyMeasurement(
+        runtime_us=total_run_time_us,
+        payload_size_bytes=payload_size_bytes,
+        distance_cm=distance,
+        random_payload=True,
+        send_window=send_window
+    )
+
+    measurements_list = l.run()
+    assert measurements_list != None, "measurement failed"
+
+    return l.write_measurement_to_file(
+        subfolder="saturation",
+        file_name_note=str(data_rate) + "bps_" + ref_voltage + "_V_ref_window" + str(send_window)
+    )
+
+
+points = [{"data_rate": data_rate, "payload_size_bytes": payload_size_bytes, "send_window": send_window}
+          for send_window in send_windows]
+summaries = []
+for point in points:
+    print("-------------")
+    print(f"Run saturation test with send window {point['send_window']}")
+    print("-------------")
+
+    file = journal.run_point(point, lambda: measure(point["send_window"]))
+    if file != None:
+        summaries.append(saturation_summary(load_measurement(file)))
+
+summaries, knee = find_knee(summaries)
+for s in summaries:
+    print(f"window {s['send_window']}: goodput {s['goodput_bps']} bit/s, queue drops {s['queue_drop_rate']}, "
+          f"median latency {s['median_latency_ms']} ms")
+if knee != None:
+    print(f"Knee at send window {knee['send_window']}")
+
+print(f"Measurement finished! {journal.summary(points)}")
@@ -3,6 +3,8 @@
 from flash_nodes import build_source, flash_all_nodes
 from code_parameters import overwrite_datarate
 from measurements import LatencyMeasurement, LatencyMeasurementData
+from performance_model import load_performance_model
+from sweep_journal import SweepJournal
 import time
 import math
 
@@ -10,11 +12,13 @@ min_data_rate = 18000
 steps = 1000
 max_data_rate = 40000
 
-for data_rate in range(min_data_rate, max_data_rate + steps, steps):
-    print("-------------")
-    print(f"Run data rate test with data rate of {data_rate} bits/s")
-    print("-------------")
+subfolder = "datarate_and_throughput_latency_equals_interval"
+
+# completed data rates are skipped when the sweep is started again
+journal = SweepJournal(subfolder, "run_throughput_measurement")
 
+
+def measure(data_rate):
     overwrite_datarate(data_rate)
 
     build_source()
@@ -28,7 +32,7 @@ for data_rate in range(min_data_rate, max_data_rate + steps, steps):
     distance = 0.5    #cm
 
     # avoid buffering overhead, udp latency = interval
-    expected_ping_ms = ((payload_size_bytes + 61) * 8 / data_rate * 1000)
+    expected_ping_ms = float(load_performance_model().udp_latency_ms(data_rate, payload_size_bytes))
     interval_us = math.floor(expected_ping_ms* 1000)
     # interval_us = 0
     total_run_time_us = 30 * 1000000
@@ -48,9 +52,18 @@ for data_rate in range(min_data_rate, max_data_rate + steps, steps):
     measurements_list = l.run()
     assert measurements_list != None, "measurement failed"
 
-    l.write_measurement_to_file(
-        subfolder="datarate_and_throughput_latency_equals_interval",
+    return l.write_measurement_to_file(
+        subfolder=subfolder,
         file_name_note=str(data_rate) + "bps_" + ref_voltage + "_V_ref"
     )
 
-print("Measurement finished!")
+
+points = [{"data_rate": data_rate} for data_rate in range(min_data_rate, max_data_rate + steps, steps)]
+for point in points:
+    print("-------------")
+    print(f"Run data rate test with data rate of {point['data_rate']} bits/s")
+    print("-------------")
+
+    journal.run_point(point, lambda: measure(point["data_rate"]))
+
+print(f"Measurement finished! {journal.summary(points)}")
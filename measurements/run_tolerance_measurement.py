@@ -3,6 +3,7 @@
 from flash_nodes import build_source, flash_all_nodes
 from code_parameters import overwrite_tolerance, overwrite_datarate
 from measurements import LatencyMeasurement, LatencyMeasurementData
+from sweep_journal import SweepJournal
 import time
 
 datarate = 30000
@@ -13,14 +14,15 @@ max_tolerance = 50
 
 number_packages_per_run = 500
 
+subfolder = "receiver_tolerance_crc"
+
+# completed tolerances are skipped when the sweep is started again
+journal = SweepJournal(subfolder, "run_tolerance_measurement")
+
 overwrite_datarate(datarate)
 
-for tolerance in range(min_tolerance, max_tolerance + steps, steps):
-    print("-------------")
-    print(f"Run tolerance measurement with tolerance value of {tolerance}")
-    print(f"The datarate was set to {datarate}")
-    print("-------------")
 
+def measure(tolerance):
     overwrite_tolerance(tolerance)
 
     build_source()
@@ -53,9 +55,19 @@ for tolerance in range(min_tolerance, max_tolerance + steps, steps):
     measurements_list = l.run()
     assert measurements_list != None, "measurement failed"
 
-    l.write_measurement_to_file(
-        subfolder="receiver_tolerance_crc",
+    return l.write_measurement_to_file(
+        subfolder=subfolder,
         file_name_note="rtol" + str(tolerance) + "_" + ref_voltage + "_V_ref_" + str(datarate) + "kbps"
     )
 
-print("Measurement finished!")
+
+points = [{"data_rate": datarate, "tolerance": tolerance} for tolerance in range(min_tolerance, max_tolerance + steps, steps)]
+for point in points:
+    print("-------------")
+    print(f"Run tolerance measurement with tolerance value of {point['tolerance']}")
+    print(f"The datarate was set to {datarate}")
+    print("-------------")
+
+    journal.run_point(point, lambda: measure(point["tolerance"]))
+
+print(f"Measurement finished! {journal.summary(points)}")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from link_simulator import LinkConfig, run_configs
+from measurement_files import list_measurement_files, load_measurement
+from time_series import packet_arrays, throughput_series
+
+# Saturation goodput of bulk runs (LatencyMeasurement with send_window, udp_bulk_client)
+#
+# The goodput is counted over sliding windows of the receive time (udp send time + udp latency), the steady state
+# goodput of a run is the median over the windows which lie completely in the span of the received packets.
+# The queue drop rate is the fraction of packets dropped by GNRC before the link layer.
+# The knee of a sweep over the send window is the point of maximum power (goodput / median udp latency): below it
+# a larger window increases the goodput, above it the goodput saturates and the packets only queue longer.
+
+
+# goodput in bit/s over sliding windows of window_s seconds every step_s seconds which lie completely in the span of
+# the received packets, see time_series.throughput_series
+# returns (start of the window in s, goodput in bit/s)
+def sliding_goodput_bps(l, window_s=1.0, step_s=None):
+    p = packet_arrays(l)
+    receive_times_s = p.layer_times("udp")[1]
+    if np.all(np.isnan(receive_times_s)):
+        return np.zeros(0), np.zeros(0)
+
+    first, last = np.nanmin(receive_times_s), np.nanmax(receive_times_s)
+    if step_s == None:
+        step_s = window_s / 4
+    ends, goodput_bps = throughput_series(p, "udp", "receive", window_s, step_s, start_s=first)
+    starts = ends - window_s
+    complete = starts <= max(last - window_s, first) + step_s / 2
+    return starts[complete], goodput_bps[complete]
+
+
+# summary of one bulk run, goodput in bit/s and latencies in ms
+def saturation_summary(l, window_s=1.0):
+    _, goodput_bps = sliding_goodput_bps(l, window_s)
+    latencies = np.array(l.get_udp_latency_axis()[1])
+    send_times = [m.udp_send_time_s for m in l.get_result() if m.udp_send_time_s != -1]
+    span_s = max(send_times) - min(send_times) if len(send_times) > 1 else np.nan
+
+    summary = {
+        "send_window": l.get_send_window(),
+        "interval_us": l.get_interval_us(),
+        "payload_size_bytes": l.get_payload_size(),
+        "packets": len(send_times),
+        "offered_pps": (len(send_times) - 1) / span_s if span_s > 0 else np.nan,
+        "goodput_bps": float(np.median(goodput_bps)) if len(goodput_bps) > 0 else 0.0,
+        "peak_goodput_bps": float(np.max(goodput_bps)) if len(goodput_bps) > 0 else 0.0,
+        "queue_drop_rate": l.get_queue_drop_rate(),
+        "reliability_udp": l.get_reliability_udp(),
+        "median_latency_ms": float(np.median(latencies)) if len(latencies) > 0 else np.nan,
+        "p95_latency_ms": float(np.percentile(latencies, 95)) if len(latencies) > 0 else np.nan,
+    }
+    summary["power"] = summary["goodput_bps"] / summary["median_latency_ms"] if len(latencies) > 0 else 0.0
+    return summary
+
+
+# order of the offered load: paced runs by decreasing interval, then bulk runs by window, unlimited window (0) last
+def _load_order(summary):
+    window = summary["send_window"]
+    if window == None:
+        return (0, -summary["interval_us"])
+    return (1, window if window > 0 else np.inf)
+
+
+# the summaries sorted by offered load and the summary at the knee (maximum power)
+def find_knee(summaries):
+    ordered = sorted(summaries, key=_load_order)
+    if len(ordered) == 0:
+        return ordered, None
+    knee = max(ordered, key=lambda s: s["power"])
+    return ordered, knee
+
+
+saturation_columns = ["send_window", "interval_us", "payload_size_bytes", "packets", "offered_pps", "goodput_bps", "peak_goodput_bps",
+                      "queue_drop_rate", "reliability_udp", "median_latency_ms", "p95_latency_ms", "power"]
+
+
+def write_saturation(summaries, path):
+    with open(path, 'w') as file:
+        file.write(";".join(saturation_columns) + "\n")
+        for summary in summaries:
+            file.write(";".join(str(summary[c]) for c in saturation_columns) + "\n")
+
+    print("Saved saturation summary in file: " + path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Saturation goodput, queue drops and latency knee of bulk runs")
+    parser.add_argument("-m", "--measurements", nargs="+", default=[], help="measurement directories of bulk runs")
+    parser.add_argument("--simulate", action="store_true", help="simulate the send windows with the link simulator")
+    parser.add_argument("-w", "--windows", type=int, nargs="+", default=[1, 2, 3, 4, 6, 8, 12, 16, 0],
+                        help="send windows to simulate, 0 for as fast as GNRC accepts")
+    parser.add_argument("-r", "--data-rate", type=int, default=30000, help="data rate in bit/s")
+    parser.add_argument("-p", "--payload", type=int, default=100, help="udp payload size in bytes")
+    parser.add_argument("-t", "--runtime", type=int, default=60 * 1000000, help="runtime in us")
+    parser.add_argument("--goodput-window", type=float, default=1.0, help="width of the sliding goodput window in s")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the random generators")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("-o", "--output", help="output csv file")
+    args = parser.parse_args()
+
+    runs = []
+    for directory in args.measurements:
+        runs += [load_measurement(os.path.join(directory, f)) for f in list_measurement_files(directory)]
+    if args.simulate:
+        start = time.time()
+        configs = [LinkConfig(data_rate_bps=args.data_rate, payload_size_bytes=args.payload, interval_us=0,
+                              runtime_us=args.runtime, send_window=w) for w in args.windows]
+        runs += [l for _, l in run_configs(configs, args.seed, args.jobs)]
+        print(f"Simulated {len(configs)} runs in {time.time() - start:.1f}s")
+
+    summaries, knee = find_knee([saturation_summary(l, args.goodput_window) for l in runs])
+    for s in summaries:
+        window = "paced" if s["send_window"] == None else ("unlimited" if s["send_window"] == 0 else str(s["send_window"]))
+        print(f"window {window:>9}: goodput {s['goodput_bps'] / 1000:6.2f} kbit/s (peak {s['peak_goodput_bps'] / 1000:6.2f}), "
+              f"queue drops {s['queue_drop_rate']:.3f}, reliability {s['reliability_udp']:.3f}, latency median {s['median_latency_ms']:8.1f} ms "
+              f"p95 {s['p95_latency_ms']:8.1f} ms{'  <- knee' if s is knee else ''}")
+    if args.output:
+        write_saturation(summaries, args.output)
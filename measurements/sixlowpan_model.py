@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import struct
+import sys
+
+import numpy as np
+
+from measurement_files import list_measurement_files, load_measurement, run_parameters
+from measurements import network_stack_header_bytes, network_stacks
+from performance_model import default_model_file, default_num_sync_symbols, load_performance_model
+from vlc_pcap import all_nodes_multicast, ipv6_udp_packet, link_local_address, measurement_destination_port, measurement_source_port
+
+# Air time and goodput of the VLC frames with plain IPv6 and with 6LoWPAN (vlc_netif NETTYPE)
+#
+# Plain IPv6: the IPv6 packet is the link layer payload, up to MTU_SIZE (1280) bytes after the 12 byte MAC header.
+# 6LoWPAN: the IPv6 packet is compressed with IPHC (RFC 6282) and fragmented into link frames of at most link_mtu_bytes
+# (RFC 4944, FRAG1 4 bytes, FRAGN 5 bytes, fragments cover multiples of 8 bytes of the uncompressed packet).
+# The compression is stateless like in RIOT without context entries: link local addresses derived from the MAC address
+# are elided, other unicast addresses are sent inline, multicast addresses are compressed to 1, 4 or 6 bytes.
+# The UDP header is compressed with NHC (ports 0xF0Bx / 0xF0xx, checksum inline).
+# The IPv6 MTU is 1280 with both stacks, larger packets are fragmented by IPv6 (fragment header of 8 bytes, the
+# fragments are compressed without UDP NHC). A link MTU below 1280 is only possible with 6LoWPAN.
+# The packets are built and compressed byte by byte, the air time of the frames is taken from the performance model.
+
+ipv6_mtu_bytes = 1280
+link_mtu_bytes = 1280
+ipv6_header_bytes = 40
+udp_header_bytes = 8
+ipv6_fragment_header_bytes = 8
+
+frag1_header_bytes = 4
+fragn_header_bytes = 5
+# 6LoWPAN datagram_size is an 11 bit field
+max_datagram_bytes = 2047
+
+dispatch_ipv6 = 0x41
+dispatch_iphc = 0x60
+dispatch_frag1 = 0xC0
+dispatch_fragn = 0xE0
+nhc_udp = 0xF0
+
+_next_header_udp = 17
+_next_header_fragment = 44
+_link_local_prefix = bytes.fromhex("fe80000000000000")
+
+# MAC addresses of the measurement nodes, see vlc_pcap.measurement_frames
+measurement_source_mac = bytes([2, 0, 0, 0, 0, 1])
+measurement_destination_mac = bytes(6)
+
+
+# inline bytes and the address mode of a unicast address (SAM / DAM with SAC / DAC = 0)
+def _unicast_address(address, mac):
+    if address[:8] != _link_local_prefix:
+        return 0b00, address
+    if mac != None and address == link_local_address(mac):
+        return 0b11, b""
+    if address[8:14] == bytes.fromhex("000000fffe00"):
+        return 0b10, address[14:]
+    return 0b01, address[8:]
+
+
+# inline bytes and the address mode of a multicast address (DAM with M = 1)
+def _multicast_address(address):
+    if address[1] == 0x02 and address[2:15] == bytes(13):
+        return 0b11, address[15:]
+    if address[2:13] == bytes(11):
+        return 0b10, address[1:2] + address[13:]
+    if address[2:11] == bytes(9):
+        return 0b01, address[1:2] + address[11:]
+    return 0b00, address
+
+
+# traffic class and flow label field (TF) in the ECN, DSCP order of RFC 6282
+def _traffic_class_flow_label(version_class_flow):
+    traffic_class = (version_class_flow >> 20) & 0xFF
+    flow_label = version_class_flow & 0xFFFFF
+    ecn_dscp = ((traffic_class & 0x03) << 6) | (traffic_class >> 2)
+    if traffic_class == 0 and flow_label == 0:
+        return 0b11, b""
+    if flow_label == 0:
+        return 0b10, bytes([ecn_dscp])
+    if traffic_class >> 2 == 0:
+        return 0b01, struct.pack(">I", ((traffic_class & 0x03) << 30) | flow_label)[1:]
+    return 0b00, bytes([ecn_dscp]) + struct.pack(">I", flow_label)[1:]
+
+
+def _udp_ports(source_port, destination_port):
+    if source_port >> 4 == 0xF0B and destination_port >> 4 == 0xF0B:
+        return 0b11, bytes([((source_port & 0x0F) << 4) | (destination_port & 0x0F)])
+    if source_port >> 8 == 0xF0:
+        return 0b10, bytes([source_port & 0xFF]) + struct.pack(">H", destination_port)
+    if destination_port >> 8 == 0xF0:
+        return 0b01, struct.pack(">H", source_port) + bytes([destination_port & 0xFF])
+    return 0b00, struct.pack(">HH", source_port, destination_port)
+
+
+# IPHC compression of an IPv6 packet, returns (compressed headers, uncompressed header length)
+# the compressed datagram is the compressed headers followed by packet[uncompressed header length:]
+def iphc_compress(packet, source_mac=None, destination_mac=None):
+    version_class_flow, _, next_header, hop_limit = struct.unpack(">IHBB", packet[:8])
+    source = packet[8:24]
+    destination = packet[24:40]
+
+    tf, inline = _traffic_class_flow_label(version_class_flow)
+    udp = next_header == _next_header_udp and len(packet) >= ipv6_header_bytes + udp_header_bytes
+    if not udp:
+        inline += bytes([next_header])
+    hlim = {1: 0b01, 64: 0b10, 255: 0b11}.get(hop_limit, 0b00)
+    if hlim == 0b00:
+        inline += bytes([hop_limit])
+
+    sam, source_inline = _unicast_address(source, source_mac)
+    multicast = destination[0] == 0xFF
+    if multicast:
+        dam, destination_inline = _multicast_address(destination)
+    else:
+        dam, destination_inline = _unicast_address(destination, destination_mac)
+
+    compressed = bytes([dispatch_iphc | (tf << 3) | (int(udp) << 2) | hlim, (sam << 4) | (int(multicast) << 3) | dam])
+    compressed += inline + source_inline + destination_inline
+    if not udp:
+        return compressed, ipv6_header_bytes
+
+    # UDP NHC, the length is elided (taken from the IPv6 payload length)
+    source_port, destination_port, _, checksum = struct.unpack(">HHHH", packet[40:48])
+    pp, ports = _udp_ports(source_port, destination_port)
+    compressed += bytes([nhc_udp | pp]) + ports + struct.pack(">H", checksum)
+    return compressed, ipv6_header_bytes + udp_header_bytes
+
+
+# IPv6 packets of an IPv6 packet with UDP payload, fragmented (RFC 8200) if it exceeds the IPv6 MTU
+def ipv6_fragments(packet, mtu_bytes=ipv6_mtu_bytes, identification=1):
+    if len(packet) <= mtu_bytes:
+        return [packet]
+
+    header = bytearray(packet[:ipv6_header_bytes])
+    next_header = header[6]
+    header[6] = _next_header_fragment
+    fragmentable = packet[ipv6_header_bytes:]
+    # fragment data is a multiple of 8 bytes except for the last fragment
+    data_bytes = (mtu_bytes - ipv6_header_bytes - ipv6_fragment_header_bytes) // 8 * 8
+
+    fragments = []
+    for offset in range(0, len(fragmentable), data_bytes):
+        data = fragmentable[offset:offset + data_bytes]
+        more = int(offset + data_bytes < len(fragmentable))
+        header[4:6] = struct.pack(">H", ipv6_fragment_header_bytes + len(data))
+        fragment_header = struct.pack(">BxHI", next_header, offset | more, identification)
+        fragments.append(bytes(header) + fragment_header + data)
+    return fragments
+
+
+# 6LoWPAN frames (link layer payloads without MAC header) of an IPv6 packet
+# compression: IPHC, otherwise the packet is sent with the IPv6 dispatch
+def sixlowpan_frames(packet, mtu_bytes=link_mtu_bytes, source_mac=None, destination_mac=None, compression=True, tag=1):
+    if compression:
+        headers, uncompressed_bytes = iphc_compress(packet, source_mac, destination_mac)
+    else:
+        headers, uncompressed_bytes = bytes([dispatch_ipv6]), 0
+    payload = packet[uncompressed_bytes:]
+    if len(headers) + len(payload) <= mtu_bytes:
+        return [headers + payload]
+
+    assert len(packet) <= max_datagram_bytes, "datagram too large for 6LoWPAN fragmentation"
+    # the first fragment carries the compressed headers, the offsets are in 8 byte units of the uncompressed packet
+    first_bytes = (uncompressed_bytes + mtu_bytes - frag1_header_bytes - len(headers)) // 8 * 8 - uncompressed_bytes
+    assert first_bytes > 0, "link MTU too small for the compressed headers"
+    frames = [struct.pack(">HH", (dispatch_frag1 << 8) | len(packet), tag) + headers + payload[:first_bytes]]
+
+    data_bytes = (mtu_bytes - fragn_header_bytes) // 8 * 8
+    for offset in range(first_bytes, len(payload), data_bytes):
+        fragment_header = struct.pack(">HHB", (dispatch_fragn << 8) | len(packet), tag, (uncompressed_bytes + offset) // 8)
+        frames.append(fragment_header + payload[offset:offset + data_bytes])
+    return frames
+
+
+# measurement packet: link local source, all nodes multicast destination, ports of udp_latency_client
+def measurement_packet(udp_payload_bytes, source_mac=measurement_source_mac):
+    return ipv6_udp_packet(bytes(int(udp_payload_bytes)), link_local_address(source_mac), all_nodes_multicast,
+                           measurement_source_port, measurement_destination_port)
+
+
+class StackModel:
+
+    # stack: one of measurements.network_stacks
+    # link_mtu_bytes: maximum link layer payload of a frame (MTU_SIZE of vlc_netif), below 1280 only with 6LoWPAN
+    # packet: function udp payload size -> IPv6 packet (bytes), the measurement packets by default
+    def __init__(self, stack="ipv6", link_mtu_bytes=link_mtu_bytes, compression=True, packet=measurement_packet,
+                 source_mac=measurement_source_mac, destination_mac=measurement_destination_mac):
+        assert stack in network_stacks, "unknown network stack: " + str(stack)
+        assert stack == "sixlowpan" or link_mtu_bytes >= ipv6_mtu_bytes, "IPv6 needs a link MTU of at least 1280 bytes"
+        self.stack = stack
+        self.link_mtu_bytes = link_mtu_bytes
+        self.compression = compression
+        self.packet = packet
+        self.source_mac = source_mac
+        self.destination_mac = destination_mac
+        self.__frames = {}
+
+    # link layer payload sizes of the frames of one UDP datagram
+    def frame_sizes(self, udp_payload_bytes):
+        udp_payload_bytes = int(udp_payload_bytes)
+        if udp_payload_bytes not in self.__frames:
+            sizes = []
+            for packet in ipv6_fragments(self.packet(udp_payload_bytes)):
+                if self.stack == "ipv6":
+                    sizes.append(len(packet))
+                else:
+                    frames = sixlowpan_frames(packet, self.link_mtu_bytes, self.source_mac, self.destination_mac, self.compression)
+                    sizes += [len(f) for f in frames]
+            self.__frames[udp_payload_bytes] = sizes
+        return self.__frames[udp_payload_bytes]
+
+    # number of frames and link layer bytes of all frames, vectorized over the payload size
+    def frames(self, udp_payload_bytes):
+        payloads = np.asarray(udp_payload_bytes)
+        sizes = [self.frame_sizes(p) for p in payloads.ravel()]
+        num_frames = np.array([len(s) for s in sizes], dtype=int).reshape(payloads.shape)
+        link_bytes = np.array([sum(s) for s in sizes], dtype=int).reshape(payloads.shape)
+        return num_frames, link_bytes
+
+    # the frame ticks are linear in the payload, n frames with b bytes in total take n frames with b / n bytes each
+    def air_time_s(self, model, data_rate_bps, udp_payload_bytes, num_sync_symbols=default_num_sync_symbols):
+        num_frames, link_bytes = self.frames(udp_payload_bytes)
+        return num_frames * model.air_time_s(data_rate_bps, link_bytes / num_frames, num_sync_symbols)
+
+    # the datagram is received after the last frame
+    def udp_latency_ms(self, model, data_rate_bps, udp_payload_bytes, num_sync_symbols=default_num_sync_symbols):
+        num_frames, _ = self.frames(udp_payload_bytes)
+        air_time_s = self.air_time_s(model, data_rate_bps, udp_payload_bytes, num_sync_symbols)
+        return air_time_s * 1000 + (num_frames - 1) * model.link_gap_ms + model.link_delay_ms + model.udp_delay_ms
+
+    # time between two datagrams: limited by the send interval or by the busy link (gap after every frame)
+    def packet_period_s(self, model, data_rate_bps, udp_payload_bytes, interval_us, num_sync_symbols=default_num_sync_symbols):
+        num_frames, _ = self.frames(udp_payload_bytes)
+        air_time_s = self.air_time_s(model, data_rate_bps, udp_payload_bytes, num_sync_symbols)
+        return np.maximum(np.asarray(interval_us) / 1000000 + model.send_overhead_ms / 1000,
+                          air_time_s + num_frames * model.link_gap_ms / 1000)
+
+    # UDP goodput in bit/s without losses
+    def goodput_bps(self, model, data_rate_bps, udp_payload_bytes, interval_us, num_sync_symbols=default_num_sync_symbols):
+        period_s = self.packet_period_s(model, data_rate_bps, udp_payload_bytes, interval_us, num_sync_symbols)
+        return np.asarray(udp_payload_bytes) * 8 / period_s
+
+
+# both stacks for every data rate and payload size, returns a list of dicts (stack_columns)
+def compare_stacks(data_rates_bps, payloads_bytes, interval_us=0, model=None, link_mtu=link_mtu_bytes,
+                   num_sync_symbols=default_num_sync_symbols):
+    if model == None:
+        model = load_performance_model()
+    stacks = {"ipv6": StackModel("ipv6"), "sixlowpan": StackModel("sixlowpan", link_mtu)}
+
+    rates, payloads = np.meshgrid(np.asarray(data_rates_bps), np.asarray(payloads_bytes), indexing="ij")
+    rates = rates.ravel()
+    payloads = payloads.ravel()
+    columns = {"data_rate_bps": rates, "udp_payload_bytes": payloads}
+    for name, stack in stacks.items():
+        num_frames, link_bytes = stack.frames(payloads)
+        columns[name + "_frames"] = num_frames
+        columns[name + "_link_bytes"] = link_bytes
+        columns[name + "_air_time_ms"] = stack.air_time_s(model, rates, payloads, num_sync_symbols) * 1000
+        columns[name + "_goodput_bps"] = stack.goodput_bps(model, rates, payloads, interval_us, num_sync_symbols)
+    columns["goodput_gain"] = columns["sixlowpan_goodput_bps"] / columns["ipv6_goodput_bps"]
+
+    return [{c: columns[c][i].item() for c in columns} for i in range(len(rates))]
+
+
+# measured and predicted goodput of measured runs per stack, data rate and payload size
+# runs: list of (LatencyMeasurement, run parameters), the gain is the ratio 6LoWPAN / IPv6 where both were measured
+def measured_gains(runs, model=None, link_mtu=link_mtu_bytes, num_sync_symbols=default_num_sync_symbols):
+    if model == None:
+        model = load_performance_model()
+    stacks = {"ipv6": StackModel("ipv6"), "sixlowpan": StackModel("sixlowpan", link_mtu)}
+
+    points = {}
+    for l, parameters in runs:
+        if parameters["data_rate_bps"] == None:
+            continue
+        key = (parameters["data_rate_bps"], parameters["payload_size_bytes"])
+        point = points.setdefault(key, {s: [] for s in network_stacks})
+        predicted = stacks[parameters["stack"]].goodput_bps(model, key[0], key[1], parameters["interval_us"], num_sync_symbols)
+        point[parameters["stack"]].append((l.get_average_throughput_udp(), float(predicted)))
+
+    results = []
+    for (rate, payload), point in sorted(points.items()):
+        result = {"data_rate_bps": rate, "udp_payload_bytes": payload}
+        for stack in network_stacks:
+            measured = [m for m, _ in point[stack]]
+            predicted = [p for _, p in point[stack]]
+            result[stack + "_runs"] = len(measured)
+            result[stack + "_measured_bps"] = float(np.mean(measured)) if len(measured) > 0 else np.nan
+            result[stack + "_predicted_bps"] = float(np.mean(predicted)) if len(predicted) > 0 else np.nan
+        result["measured_gain"] = result["sixlowpan_measured_bps"] / result["ipv6_measured_bps"]
+        result["predicted_gain"] = result["sixlowpan_predicted_bps"] / result["ipv6_predicted_bps"]
+        results.append(result)
+    return results
+
+
+stack_columns = ["data_rate_bps", "udp_payload_bytes", "ipv6_frames", "ipv6_link_bytes", "ipv6_air_time_ms", "ipv6_goodput_bps",
+                 "sixlowpan_frames", "sixlowpan_link_bytes", "sixlowpan_air_time_ms", "sixlowpan_goodput_bps", "goodput_gain"]
+gain_columns = ["data_rate_bps", "udp_payload_bytes", "ipv6_runs", "ipv6_measured_bps", "ipv6_predicted_bps", "sixlowpan_runs",
+                "sixlowpan_measured_bps", "sixlowpan_predicted_bps", "measured_gain", "predicted_gain"]
+
+
+def write_results(results, columns, path):
+    with open(path, 'w') as file:
+        file.write(";".join(columns) + "\n")
+        for result in results:
+            file.write(";".join(str(result[c]) for c in columns) + "\n")
+
+    print("Saved stack comparison in file: " + path)
+
+
+# frames of the measurement packets against the header sizes of the measurement harness and RFC 4944 offsets
+def self_test():
+    for stack in network_stacks:
+        sizes = StackModel(stack).frame_sizes(100)
+        assert sizes == [100 + network_stack_header_bytes[stack]], f"{stack}: {sizes}"
+
+    packet = measurement_packet(1000)
+    frames = sixlowpan_frames(packet, 127, measurement_source_mac)
+    assert all(len(f) <= 127 for f in frames)
+    # offsets continue the data of the previous fragment, payloads of all fragments add up to the packet
+    offset = (len(frames[0]) - frag1_header_bytes - 10 + 48) // 8
+    for frame in frames[1:]:
+        assert frame[4] == offset, f"offset {frame[4]} != {offset}"
+        offset += (len(frame) - fragn_header_bytes) // 8
+    data = len(frames[0]) - frag1_header_bytes - 10 + sum(len(f) - fragn_header_bytes for f in frames[1:])
+    assert data + 48 == len(packet)
+
+    fragments = ipv6_fragments(measurement_packet(2000))
+    assert all(len(f) <= ipv6_mtu_bytes for f in fragments)
+    assert sum(len(f) - 48 for f in fragments) == 2008
+    print("6LoWPAN frames match the measurement headers and the fragment offsets")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Air time and goodput with plain IPv6 and with 6LoWPAN")
+    parser.add_argument("-r", "--data-rates", type=int, nargs="+", default=[10000, 20000, 30000, 35000], help="data rates in bit/s")
+    parser.add_argument("-p", "--payloads", type=int, nargs="+", default=[10, 50, 100, 200, 500, 1000, 1232, 1500],
+                        help="udp payload sizes in bytes")
+    parser.add_argument("-i", "--interval", type=int, default=0, help="send interval in us, 0 for a saturated link")
+    parser.add_argument("--mtu", type=int, default=link_mtu_bytes, help="link MTU of the 6LoWPAN frames in bytes")
+    parser.add_argument("--sync", type=int, default=default_num_sync_symbols, help="number of sync symbols")
+    parser.add_argument("-m", "--measurements", nargs="+", default=[], help="measurement directories to compare")
+    parser.add_argument("--model", default=default_model_file,
+                        help="performance model file, e.g. performance_model_<corpus>.json of encoding_overhead.py")
+    parser.add_argument("--self-test", action="store_true", help="check the frames and exit")
+    parser.add_argument("-o", "--output", help="output csv file")
+    args = parser.parse_args()
+
+    self_test()
+    if args.self_test:
+        sys.exit(0)
+
+    assert args.model == default_model_file or os.path.exists(args.model), "no performance model file: " + args.model
+    model = load_performance_model(args.model)
+    results = compare_stacks(args.data_rates, args.payloads, args.interval, model, args.mtu, args.sync)
+    for r in results:
+        print(f"{r['data_rate_bps']:6d} bit/s, {r['udp_payload_bytes']:5d} bytes: "
+              f"IPv6 {r['ipv6_frames']} frame(s) {r['ipv6_link_bytes']:5d} bytes {r['ipv6_air_time_ms']:7.1f} ms "
+              f"{r['ipv6_goodput_bps'] / 1000:6.2f} kbit/s, "
+              f"6LoWPAN {r['sixlowpan_frames']} frame(s) {r['sixlowpan_link_bytes']:5d} bytes {r['sixlowpan_air_time_ms']:7.1f} ms "
+              f"{r['sixlowpan_goodput_bps'] / 1000:6.2f} kbit/s, gain {r['goodput_gain']:.3f}")
+    if args.output:
+        write_results(results, stack_columns, args.output)
+
+    if len(args.measurements) > 0:
+        runs = []
+        for directory in args.measurements:
+            for file_name in list_measurement_files(directory):
+                l = load_measurement(os.path.join(directory, file_name))
+                runs.append((l, run_parameters(l, file_name)))
+
+        gains = measured_gains(runs, model, args.mtu, args.sync)
+        for g in gains:
+            print(f"{g['data_rate_bps']:6d} bit/s, {g['udp_payload_bytes']:5d} bytes: "
+                  f"measured gain {g['measured_gain']:.3f} ({g['ipv6_runs']} IPv6, {g['sixlowpan_runs']} 6LoWPAN runs), "
+                  f"predicted gain {g['predicted_gain']:.3f}")
+        if args.output:
+            root, extension = os.path.splitext(args.output)
+            write_results(gains, gain_columns, root + "_measured" + extension)
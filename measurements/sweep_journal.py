@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import time
+import traceback
+from datetime import datetime
+
+from measurements import measurement_path
+
+# Journal of a measurement sweep, the sweep can be restarted after a failure or a crash
+#
+# Every point of a sweep (its parameters, e.g. {"data_rate": 30000}) is run with SweepJournal.run_point. The journal
+# appends one json line per event and syncs it to disk before the sweep continues:
+#   start:       an attempt of the point started
+#   done:        the point finished, file is the measurement file
+#   failed:      the attempt raised an exception (error), e.g. "measurement failed"
+#   interrupted: the sweep was stopped with Ctrl-C during the attempt
+#   missing:     the file of a done point was deleted, the point is measured again with max_attempts new attempts
+# On a restart done points are skipped (unless their file was deleted) and failed points are run again. A point is
+# given up after max_attempts attempts, a start without an end (crash of the host) counts as an attempt, an
+# interruption does not. Raise max_attempts to retry given up points.
+
+journal_suffix = ".journal"
+
+
+class SweepJournal:
+
+    # journal <name>.journal in the subfolder of the measurement path the sweep writes to
+    # recover: called before a retry of a failed point (e.g. flash the nodes again)
+    def __init__(self, subfolder, name, path=measurement_path, max_attempts=3, retry_delay_s=30, recover=None):
+        assert max_attempts >= 1, "at least one attempt per point"
+        self.file = os.path.join(path, subfolder, name + journal_suffix)
+        self.max_attempts = max_attempts
+        self.retry_delay_s = retry_delay_s
+        self.recover = recover
+        self.__events = read_journal(self.file)
+
+        # a line cut off by a crash is completed, the next event starts on a new line
+        if os.path.exists(self.file) and os.path.getsize(self.file) > 0:
+            with open(self.file, 'rb+') as file:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    file.write(b"\n")
+
+    # events of a point in the order of the journal
+    def events(self, parameters):
+        key = _point_key(parameters)
+        return [e for e in self.__events if _point_key(e["point"]) == key]
+
+    # parameters of the points in the journal, in the order of their first event
+    def points(self):
+        points = []
+        for e in self.__events:
+            if e["point"] not in points:
+                points.append(e["point"])
+        return points
+
+    # done, failed, given up or None (not run yet)
+    def status(self, parameters):
+        state = _point_state(self.events(parameters))
+        if state["file"] != None and os.path.exists(state["file"]):
+            return "done"
+        if state["file"] != None:
+            return None
+        if state["attempts"] >= self.max_attempts:
+            return "given up"
+        if state["attempts"] > 0:
+            return "failed"
+        return None
+
+    # file of a done point, None otherwise
+    def file_of(self, parameters):
+        return _point_state(self.events(parameters))["file"]
+
+    # run one point of the sweep: measure() runs the measurement and returns the written file
+    # returns the file, None if the point was given up
+    def run_point(self, parameters, measure):
+        state = _point_state(self.events(parameters))
+        if state["file"] != None:
+            if os.path.exists(state["file"]):
+                print(f"Skip {_describe(parameters)}: done in {state['file']}")
+                return state["file"]
+            print(f"[WARNING] file of {_describe(parameters)} was deleted, measure again")
+            self.__append({"event": "missing", "point": parameters, "file": state["file"]})
+            state = _point_state(self.events(parameters))
+        attempts = state["attempts"]
+        while attempts < self.max_attempts:
+            if attempts > 0:
+                print(f"Retry {_describe(parameters)} ({attempts + 1}/{self.max_attempts}) in {self.retry_delay_s}s")
+                time.sleep(self.retry_delay_s)
+                if self.recover != None:
+                    self.recover()
+
+            attempts += 1
+            self.__append({"event": "start", "point": parameters, "attempt": attempts})
+            try:
+                file = measure()
+                assert file != None, "no measurement file written"
+            except KeyboardInterrupt:
+                self.__append({"event": "interrupted", "point": parameters, "attempt": attempts})
+                raise
+            except Exception as e:
+                print(f"[ERROR] {_describe(parameters)} failed: {e!r}")
+                traceback.print_exc()
+                self.__append({"event": "failed", "point": parameters, "attempt": attempts, "error": repr(e)})
+                continue
+
+            self.__append({"event": "done", "point": parameters, "attempt": attempts, "file": file})
+            return file
+
+        print(f"[ERROR] give up {_describe(parameters)} after {attempts} attempts")
+        return None
+
+    # number of points per status, for the points of the sweep
+    def summary(self, points):
+        counts = {"done": 0, "failed": 0, "given up": 0, None: 0}
+        for parameters in points:
+            counts[self.status(parameters)] += 1
+        return counts
+
+    def __append(self, event):
+        event["time"] = datetime.now().isoformat(timespec="seconds")
+        os.makedirs(os.path.dirname(self.file), exist_ok=True)
+        with open(self.file, 'a') as file:
+            file.write(json.dumps(event, sort_keys=True) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self.__events.append(event)
+
+
+# events of a journal file, a line cut off by a crash is ignored
+def read_journal(file_name):
+    events = []
+    if not os.path.exists(file_name):
+        return events
+
+    with open(file_name, 'r') as file:
+        for number, line in enumerate(file):
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"[WARNING] {file_name}:{number + 1}: incomplete journal entry ignored")
+    return events
+
+
+def _point_key(parameters):
+    return json.dumps(parameters, sort_keys=True)
+
+
+def _describe(parameters):
+    return "point " + ", ".join(f"{k}={v}" for k, v in parameters.items())
+
+
+# attempts (starts which were not interrupted) and file of the last done event of a point
+# a missing event starts the point over
+def _point_state(events):
+    state = {"attempts": 0, "file": None}
+    for e in events:
+        if e["event"] == "start":
+            state["attempts"] += 1
+        elif e["event"] == "interrupted":
+            state["attempts"] -= 1
+        elif e["event"] == "done":
+            state["file"] = e["file"]
+        elif e["event"] == "missing":
+            state = {"attempts": 0, "file": None}
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Status of the points of a sweep journal")
+    parser.add_argument("journal", help="journal file")
+    parser.add_argument("-a", "--max-attempts", type=int, default=3, help="attempts per point of the sweep")
+    args = parser.parse_args()
+
+    directory, file_name = os.path.split(os.path.abspath(args.journal))
+    assert file_name.endswith(journal_suffix), "not a journal file: " + args.journal
+    journal = SweepJournal(os.path.basename(directory), file_name[:-len(journal_suffix)], os.path.dirname(directory),
+                           max_attempts=args.max_attempts)
+
+    points = journal.points()
+    for parameters in points:
+        errors = [e["error"] for e in journal.events(parameters) if e["event"] == "failed"]
+        file = journal.file_of(parameters)
+        print(f"{_describe(parameters)}: {journal.status(parameters)}, {_point_state(journal.events(parameters))['attempts']} attempts"
+              + (f", {file}" if file != None else "")
+              + (f", last error {errors[-1]}" if len(errors) > 0 else ""))
+    print(journal.summary(points))
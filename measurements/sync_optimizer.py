@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from channel_simulator import (default_isr_skip_duration_us, default_threshold, edge_delays_us, noise_channel,
+                               simulate_channel)
+from logic_capture import channel_edges
+from performance_model import default_num_sync_symbols, ipv6_udp_header_bytes, load_performance_model, symbol_half_period_us
+from vlc_decoder import decode_edges, vlc_receiver_tolerance
+from vlc_frame import build_frame, check_frame, encode_frames
+
+# Length of the sync preamble (num_sync_symbols of vlc_manchester_send and of the receiver configuration)
+#
+# The receiver estimates symbol_rate_us from the 2 * n - 1 intervals of the 2 * n sync edges in fixed point: every
+# interval is divided by 2 * n - 1 and truncated, the sum is doubled and truncated to whole us. The estimate is off by
+#   - the jitter of the edges, averaged over 2 * n - 1 intervals
+#   - the asymmetric delay of the receiver circuit: n high and n - 1 low intervals, a bias of (fall - rise) / (2 * n - 1)
+#   - the truncation, up to 1 us below the symbol time even for exact edges
+# Every sync symbol costs two ticks of air time. For every operating point (data rate, payload, channel) and sync
+# length the same ISR timestamps are decoded twice: with the estimate and with the exact symbol time
+# (fixed_symbol_rate_us of vlc_decoder). The difference of the frame loss is the loss caused by the estimate, it is
+# negative where an estimate above the symbol time widens the tolerance window enough to absorb the asymmetric delay.
+# The reported estimate is the symbol time the receiver decoded the frames with, taken from the frames received with a
+# valid CRC (estimate_frames), lanes which synchronized on spurious or missed edges would only show the noise.
+# Goodput = (1 - frame loss) * UDP payload / packet period of the performance model with the sync length,
+# the recommended length of an operating point has the highest goodput. An operating point where every length loses
+# all frames has no recommendation, the channel does not work there.
+# The jitter and the asymmetric delay can be measured from a capture of the receiver input pin (measured_channel).
+
+
+# channel parameters of a logic analyzer capture of the receiver input pin (frames sent with data_rate_bps)
+# Intervals of the Manchester edges are one or two half symbols, high intervals are stretched and low intervals
+# shortened by fall - rise. The shortest cluster of each gives the asymmetry, its spread the jitter of an edge.
+# rise_delay_us: delay of the rising edge, the crossing of the default threshold if None
+def measured_channel(path, channel, data_rate_bps, samplerate_hz=None, rise_delay_us=None):
+    if rise_delay_us == None:
+        rise_delay_us = edge_delays_us()[0]
+    half_us = float(symbol_half_period_us(data_rate_bps))
+    high = []
+    low = []
+    last = None
+    for times, levels in channel_edges(path, channel, samplerate_hz):
+        times = times * 1e6
+        if last != None:
+            times = np.concatenate([[last[0]], times])
+            levels = np.concatenate([[last[1]], levels])
+        if len(times) == 0:
+            continue
+        intervals = np.diff(times)
+        high.append(intervals[levels[:-1] == 1])
+        low.append(intervals[levels[:-1] == 0])
+        last = (times[-1], levels[-1])
+
+    centers = []
+    deviations = []
+    for intervals in (np.concatenate(high), np.concatenate(low)):
+        intervals = intervals[intervals < 3 * half_us]
+        assert len(intervals) > 0, "no edges of frames in " + path
+        shortest = intervals[intervals < np.percentile(intervals, 1) + half_us / 2]
+        centers.append(np.median(shortest))
+        deviations.append(shortest - centers[-1])
+
+    # the interval of two edges has the jitter of both
+    jitter_us = float(np.std(np.concatenate(deviations)) / np.sqrt(2))
+    asymmetry_us = float(centers[0] - centers[1]) / 2
+    return {"rise_delay_us": rise_delay_us, "fall_delay_us": rise_delay_us + asymmetry_us, "jitter_us": jitter_us}
+
+
+def _channel(noise, channel_parameters):
+    parameters = dict(channel_parameters)
+    jitter_us = parameters.pop("jitter_us", None)
+    channel = noise_channel(noise, **parameters)
+    if jitter_us != None:
+        channel.jitter_us = jitter_us
+    return channel
+
+
+# symbol time estimate of the receiver for every lane whose first frame was received with a valid CRC
+# lanes which synchronized on spurious pulses or missed sync edges lose the frame and have no estimate
+def sync_estimates(decoded):
+    _, first = np.unique(decoded.lanes, return_index=True)
+    valid = np.array([check_frame(decoded.data[i]) for i in first], dtype=bool)
+    return decoded.symbol_rates_us[first[valid]] if len(first) > 0 else np.zeros(0, dtype=np.int64)
+
+
+# frame loss and goodput of one sync length at one operating point
+def evaluate_sync_length(data_rate_bps, payload_size_bytes, num_sync_symbols, channel, tolerance=vlc_receiver_tolerance,
+                         num_frames=500, interval_us=0, model=None, seed=None, chunk_size=1000):
+    if model == None:
+        model = load_performance_model()
+    rng = np.random.default_rng(seed)
+    symbol_us = 2 * int(symbol_half_period_us(data_rate_bps))
+
+    delivered = 0
+    delivered_exact_estimate = 0
+    estimates = []
+    for start in range(0, num_frames, chunk_size):
+        count = min(chunk_size, num_frames - start)
+        frames = [build_frame(rng.integers(0, 256, payload_size_bytes + ipv6_udp_header_bytes).astype(np.uint8).tobytes())
+                  for _ in range(count)]
+        encoded = encode_frames(frames, data_rate_bps, num_sync_symbols)
+        times, offsets = simulate_channel(encoded, channel, rng)
+
+        decoded = decode_edges(times, offsets, tolerance, num_sync_symbols)
+        estimates.append(sync_estimates(decoded))
+        delivered += len(estimates[-1])
+        received = decode_edges(times, offsets, tolerance, num_sync_symbols, fixed_symbol_rate_us=symbol_us).first_frames(count)
+        delivered_exact_estimate += sum(1 for f in received if f != None and check_frame(f))
+
+    estimates = np.concatenate(estimates)
+    frame_loss = 1 - delivered / num_frames
+    period_s = float(model.packet_period_s(data_rate_bps, payload_size_bytes, interval_us, num_sync_symbols))
+    return {
+        "data_rate_bps": data_rate_bps,
+        "payload_size_bytes": payload_size_bytes,
+        "num_sync_symbols": num_sync_symbols,
+        "frames": num_frames,
+        "symbol_us": symbol_us,
+        "estimate_frames": len(estimates),
+        "estimate_mean_us": float(estimates.mean()) if len(estimates) > 0 else np.nan,
+        "estimate_exact": float(np.mean(estimates == symbol_us)) if len(estimates) > 0 else np.nan,
+        "frame_loss": frame_loss,
+        "frame_loss_exact_estimate": 1 - delivered_exact_estimate / num_frames,
+        "estimation_loss": frame_loss - (1 - delivered_exact_estimate / num_frames),
+        "sync_air_time_ms": num_sync_symbols * symbol_us / 1000,
+        "goodput_udp_bps": (1 - frame_loss) * payload_size_bytes * 8 / period_s,
+    }
+
+
+def _evaluate_point(point):
+    data_rate_bps, payload_size_bytes, num_sync_symbols, noise, channel_parameters, tolerance, num_frames, interval_us, seed = point
+    result = evaluate_sync_length(data_rate_bps, payload_size_bytes, num_sync_symbols, _channel(noise, channel_parameters), tolerance,
+                                  num_frames, interval_us, seed=seed)
+    result["noise"] = noise
+    return result
+
+
+# grid data rate x payload x sync length in worker processes, the sync lengths of an operating point share the seed
+def run_optimizer(data_rates_bps, payload_sizes_bytes, sync_lengths, noise=1, channel_parameters={}, tolerance=vlc_receiver_tolerance,
+                  num_frames=500, interval_us=0, seed=0, jobs=None):
+    operating_points = [(r, p) for r in data_rates_bps for p in payload_sizes_bytes]
+    seeds = np.random.SeedSequence(seed).spawn(len(operating_points))
+    points = [(r, p, n, noise, channel_parameters, tolerance, num_frames, interval_us, s)
+              for (r, p), s in zip(operating_points, seeds) for n in sync_lengths]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(_evaluate_point, points))
+
+
+# sync length with the highest goodput of every operating point: {(data rate, payload): result}
+# None if every sync length of the operating point loses all frames
+def recommend(results):
+    best = {}
+    for r in results:
+        key = (r["data_rate_bps"], r["payload_size_bytes"])
+        if r["frame_loss"] >= 1:
+            best.setdefault(key, None)
+        elif best.get(key) == None or r["goodput_udp_bps"] > best[key]["goodput_udp_bps"]:
+            best[key] = r
+    return best
+
+
+sync_columns = ["data_rate_bps", "payload_size_bytes", "num_sync_symbols", "noise", "frames", "symbol_us", "estimate_frames",
+                "estimate_mean_us", "estimate_exact", "frame_loss", "frame_loss_exact_estimate", "estimation_loss", "sync_air_time_ms", "goodput_udp_bps"]
+
+
+def write_sync(results, path):
+    with open(path, 'w') as file:
+        file.write(";".join(sync_columns) + "\n")
+        for result in results:
+            file.write(";".join(str(result[c]) for c in sync_columns) + "\n")
+
+    print("Saved sync lengths in file: " + path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Goodput optimal length of the sync preamble")
+    parser.add_argument("-r", "--data-rates", type=int, nargs="+", default=[20000, 30000, 35000], help="data rates in bit/s")
+    parser.add_argument("-p", "--payloads", type=int, nargs="+", default=[20, 100, 500], help="udp payload sizes in bytes")
+    parser.add_argument("--sync", type=int, nargs="+", default=[1, 2, 3, 4, 6, 8, 12, 16], help="sync lengths in symbols")
+    parser.add_argument("--noise", type=float, default=1, help="noise level")
+    parser.add_argument("--capture", help="capture of the receiver input pin for the jitter and the asymmetric delay")
+    parser.add_argument("--pin", default="D0", help="channel of the receiver input pin in the capture")
+    parser.add_argument("--capture-rate", type=int, default=30000, help="data rate of the frames in the capture in bit/s")
+    parser.add_argument("--samplerate", type=float, help="samplerate of the capture in Hz")
+    parser.add_argument("--threshold", type=float, default=default_threshold, help="comparator threshold of the receiver")
+    parser.add_argument("--rise", type=float, help="rise delay of the receiver in us (default from the threshold)")
+    parser.add_argument("--fall", type=float, help="fall delay of the receiver in us (default from the threshold)")
+    parser.add_argument("--isr-us", type=float, default=16, help="duration of the receiver ISR in us")
+    parser.add_argument("--isr-skip-us", type=float, default=default_isr_skip_duration_us, help="ISR of an edge which does not read a bit in us")
+    parser.add_argument("-t", "--tolerance", type=int, default=vlc_receiver_tolerance, help="receiver tolerance in percent")
+    parser.add_argument("-i", "--interval", type=int, default=0, help="send interval in us, 0 for a saturated link")
+    parser.add_argument("-n", "--frames", type=int, default=500, help="frames per point")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the random generators")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("-o", "--output", help="output csv file")
+    args = parser.parse_args()
+
+    channel_parameters = {"rise_delay_us": args.rise, "fall_delay_us": args.fall, "threshold": args.threshold,
+                          "isr_duration_us": args.isr_us, "isr_skip_duration_us": args.isr_skip_us}
+    if args.capture:
+        rise_delay_us = args.rise if args.rise != None else edge_delays_us(args.threshold)[0]
+        channel_parameters.update(measured_channel(args.capture, args.pin, args.capture_rate, args.samplerate, rise_delay_us))
+        print(f"measured: fall - rise {channel_parameters['fall_delay_us'] - channel_parameters['rise_delay_us']:.2f} us, "
+              f"jitter {channel_parameters['jitter_us']:.2f} us")
+
+    start = time.time()
+    results = run_optimizer(args.data_rates, args.payloads, args.sync, args.noise, channel_parameters, args.tolerance,
+                            args.frames, args.interval, args.seed, args.jobs)
+    print(f"Evaluated {len(results)} points in {time.time() - start:.1f}s")
+    for r in results:
+        print(f"{r['data_rate_bps']:6d} bit/s, {r['payload_size_bytes']:4d} bytes, {r['num_sync_symbols']:2d} sync symbols: "
+              f"estimate {r['estimate_mean_us']:6.2f} us ({r['estimate_exact'] * 100:5.1f}% exact of {r['estimate_frames']} frames, "
+              f"symbol {r['symbol_us']} us), "
+              f"frame loss {r['frame_loss']:.3f} ({r['estimation_loss']:+.3f} by the estimate), "
+              f"goodput {r['goodput_udp_bps'] / 1000:6.2f} kbit/s")
+
+    for (rate, payload), r in sorted(recommend(results).items()):
+        if r == None:
+            print(f"{rate:6d} bit/s, {payload:4d} bytes: no operating point, every sync length loses all frames")
+            continue
+        current = [c for c in results if c["data_rate_bps"] == rate and c["payload_size_bytes"] == payload
+                   and c["num_sync_symbols"] == default_num_sync_symbols]
+        compared = f", {current[0]['goodput_udp_bps'] / 1000:.2f} kbit/s with {default_num_sync_symbols}" if len(current) > 0 else ""
+        print(f"{rate:6d} bit/s, {payload:4d} bytes: {r['num_sync_symbols']} sync symbols, "
+              f"goodput {r['goodput_udp_bps'] / 1000:.2f} kbit/s{compared}")
+    if args.output:
+        write_sync(results, args.output)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+
+import numpy as np
+
+from measurement_files import load_measurement
+from measurements import network_stack_header_bytes
+
+# Time series of throughput, delivery rate and latency of a LatencyMeasurement
+#
+# The packets of a run are converted once into numpy arrays (PacketArrays), all series are computed on them without
+# python loops over the packets. A series is keyed by the send time or the receive time (send time + latency) of the
+# packets at the udp or the link layer, times are relative to the first "su" like in the measurement files.
+# Modes:
+#   sliding: windows [t - window_s, t) for t = start + window_s, start + window_s + step_s, ... until the last packet,
+#            the windows overlap if step_s < window_s. With step_s = window_s the windows are the bins of
+#            get_reliability_udp_per_time.
+#   ewma:    the packets are binned into steps of step_s and averaged with exponential weights (time constant
+#            window_s). Rates are the ratio of two weighted sums, the weights of the first steps are normalised
+#            (no bias towards 0 at the start).
+# The value at t only depends on packets before t, a live view can recompute the series on the packets received so far.
+#
+# The averages of LatencyMeasurement divide by the configured runtime, average_throughput_bps divides by the span in
+# which the packets were actually received.
+
+layers = ["udp", "link"]
+keys = ["send", "receive"]
+modes = ["sliding", "ewma"]
+
+
+# columns of the packets of one run, -1 marks a missing value (see LatencyMeasurementData)
+class PacketArrays:
+    def __init__(self, udp_send_time_s, udp_latency_ms, link_send_time_s, link_latency_ms, payload_size_bytes,
+                 stack="ipv6"):
+        self.udp_send_time_s = np.asarray(udp_send_time_s, dtype=float)
+        self.udp_latency_ms = np.asarray(udp_latency_ms, dtype=float)
+        self.link_send_time_s = np.asarray(link_send_time_s, dtype=float)
+        self.link_latency_ms = np.asarray(link_latency_ms, dtype=float)
+        self.payload_size_bytes = payload_size_bytes
+        self.stack = stack
+
+    def __len__(self):
+        return len(self.udp_send_time_s)
+
+    # send time, receive time (nan if lost) and sent mask of the packets at the layer
+    def layer_times(self, layer):
+        assert layer in layers, "unknown layer: " + str(layer)
+        if layer == "udp":
+            send_s, latency_ms = self.udp_send_time_s, self.udp_latency_ms
+        else:
+            send_s, latency_ms = self.link_send_time_s, self.link_latency_ms
+        sent = send_s != -1
+        received = sent & (latency_ms != -1)
+        receive_s = np.where(received, send_s + latency_ms / 1000, np.nan)
+        return send_s, receive_s, sent
+
+    # latency in ms (nan if lost) of the packets at the layer
+    def layer_latency_ms(self, layer):
+        latency_ms = self.udp_latency_ms if layer == "udp" else self.link_latency_ms
+        return np.where(latency_ms != -1, latency_ms, np.nan)
+
+    # bits of one packet at the layer, overhead in bytes compared to the udp payload
+    # None: no overhead at the udp layer, the IPv6 + UDP header of the network stack at the link layer
+    def packet_bits(self, layer, overhead=None):
+        if overhead == None:
+            overhead = 0 if layer == "udp" else network_stack_header_bytes[self.stack]
+        return (self.payload_size_bytes + overhead) * 8
+
+
+# PacketArrays of a LatencyMeasurement (or PacketArrays, returned unchanged)
+def packet_arrays(l):
+    if isinstance(l, PacketArrays):
+        return l
+    result = l.get_result()
+    n = len(result)
+    return PacketArrays(np.fromiter((m.udp_send_time_s for m in result), float, n),
+                        np.fromiter((m.udp_latency_ms for m in result), float, n),
+                        np.fromiter((m.link_send_time_s for m in result), float, n),
+                        np.fromiter((m.link_latency_ms for m in result), float, n),
+                        l.get_payload_size(), l.get_stack())
+
+
+# start of the windows (sliding) or steps (ewma), the last window contains end_s
+# start and end default to 0 and the last time stamp, the series are reported at the end of the windows
+def window_starts(times_s, window_s, step_s, mode="sliding", start_s=None, end_s=None):
+    assert mode in modes, "unknown mode: " + str(mode)
+    assert window_s > 0 and step_s > 0, "window and step must be positive"
+    times_s = times_s[~np.isnan(times_s)]
+    if start_s == None:
+        start_s = 0.0
+    if end_s == None:
+        end_s = float(np.max(times_s)) if len(times_s) > 0 else start_s
+    width = _width(window_s, step_s, mode)
+    number = max(int(np.floor((end_s - start_s - width) / step_s)) + 2, 1)
+    return start_s + step_s * np.arange(number)
+
+
+# width of the windows (sliding) or of the steps (ewma)
+def _width(window_s, step_s, mode):
+    return window_s if mode == "sliding" else step_s
+
+
+# sum of the weights of the events in the windows [start, start + window_s) (sliding)
+# or the exponentially weighted sum of the steps [start, start + step_s) (ewma)
+def _window_sums(times_s, weights, starts_s, window_s, step_s, mode):
+    valid = ~np.isnan(times_s)
+    times_s = times_s[valid]
+    weights = np.broadcast_to(weights, valid.shape)[valid]
+    order = np.argsort(times_s, kind="stable")
+    times_s = times_s[order]
+    cumulative = np.concatenate(([0.0], np.cumsum(weights[order])))
+
+    lo = np.searchsorted(times_s, starts_s)
+    hi = np.searchsorted(times_s, starts_s + _width(window_s, step_s, mode))
+    if mode == "sliding":
+        return cumulative[hi] - cumulative[lo]
+    return _ewma(cumulative[hi] - cumulative[lo], np.exp(-step_s / window_s))
+
+
+# y[k] = a * y[k-1] + x[k], vectorized in blocks in which a^-k does not overflow (a^-block <= e^600)
+# a is 0 if the step is much longer than the window (exp underflows), then every step stands alone
+def _ewma(x, a, block=512):
+    assert 0 <= a <= 1, "ewma factor out of range: " + str(a)
+    if a == 0:
+        return np.asarray(x, dtype=float).copy()
+    if a < 1:
+        block = max(1, min(block, int(600 / -np.log(a))))
+    y = np.empty(len(x))
+    carry = 0.0
+    for b in range(0, len(x), block):
+        chunk = x[b:b + block]
+        powers = a ** np.arange(len(chunk))
+        y[b:b + len(chunk)] = powers * (carry + np.cumsum(chunk / powers))
+        carry = y[b + len(chunk) - 1] * a if len(chunk) > 0 else carry
+    return y
+
+
+# normalisation of the ewma sums: weighted sum of 1 per step, equals window_s / step_s in the steady state
+def _ewma_norm(starts_s, window_s, step_s):
+    return _ewma(np.ones(len(starts_s)), np.exp(-step_s / window_s))
+
+
+def _arguments(l, window_s, step_s, mode):
+    assert mode in modes, "unknown mode: " + str(mode)
+    if step_s == None:
+        step_s = window_s / 4
+    return packet_arrays(l), step_s
+
+
+# throughput in bit/s of the received packets, keyed by receive (default) or send time
+# -> (t in s, throughput in bit/s)
+def throughput_series(l, layer="udp", key="receive", window_s=1.0, step_s=None, mode="sliding", overhead=None,
+                      start_s=None, end_s=None):
+    assert key in keys, "unknown key: " + str(key)
+    p, step_s = _arguments(l, window_s, step_s, mode)
+    send_s, receive_s, _ = p.layer_times(layer)
+    times_s = receive_s if key == "receive" else np.where(np.isnan(receive_s), np.nan, send_s)
+    starts_s = window_starts(times_s, window_s, step_s, mode, start_s, end_s)
+    ends_s = starts_s + _width(window_s, step_s, mode)
+    bits = _window_sums(times_s, float(p.packet_bits(layer, overhead)), starts_s, window_s, step_s, mode)
+    if mode == "sliding":
+        return ends_s, bits / window_s
+    return ends_s, bits / (_ewma_norm(starts_s, window_s, step_s) * step_s)
+
+
+# fraction of the packets sent in the window which were received (nan for windows without packets)
+# -> (t in s, delivery rate)
+def delivery_rate_series(l, layer="udp", window_s=5.0, step_s=None, mode="sliding", start_s=None, end_s=None):
+    p, step_s = _arguments(l, window_s, step_s, mode)
+    send_s, receive_s, sent = p.layer_times(layer)
+    times_s = np.where(sent, send_s, np.nan)
+    starts_s = window_starts(times_s, window_s, step_s, mode, start_s, end_s)
+    ends_s = starts_s + _width(window_s, step_s, mode)
+    number_sent = _window_sums(times_s, 1.0, starts_s, window_s, step_s, mode)
+    number_received = _window_sums(times_s, (~np.isnan(receive_s)).astype(float), starts_s, window_s, step_s, mode)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return ends_s, np.where(number_sent > 0, number_received / number_sent, np.nan)
+
+
+# mean latency in ms of the received packets, keyed by send (default) or receive time (nan for empty windows)
+# -> (t in s, latency in ms)
+def latency_mean_series(l, layer="udp", key="send", window_s=1.0, step_s=None, mode="sliding", start_s=None, end_s=None):
+    assert key in keys, "unknown key: " + str(key)
+    p, step_s = _arguments(l, window_s, step_s, mode)
+    send_s, receive_s, _ = p.layer_times(layer)
+    latency_ms = p.layer_latency_ms(layer)
+    times_s = receive_s if key == "receive" else np.where(np.isnan(receive_s), np.nan, send_s)
+    starts_s = window_starts(times_s, window_s, step_s, mode, start_s, end_s)
+    ends_s = starts_s + _width(window_s, step_s, mode)
+    count = _window_sums(times_s, 1.0, starts_s, window_s, step_s, mode)
+    total = _window_sums(times_s, np.nan_to_num(latency_ms), starts_s, window_s, step_s, mode)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return ends_s, np.where(count > 0, total / count, np.nan)
+
+
+# latency percentiles in ms of the received packets in sliding windows (linear interpolation like np.percentile)
+# the windows are sorted in chunks of about max_elements latencies
+# -> (t in s, array of shape (len(percentiles), len(t)), nan for empty windows)
+def latency_percentile_series(l, layer="udp", key="send", percentiles=(50, 95, 99), window_s=1.0, step_s=None,
+                              start_s=None, end_s=None, max_elements=4000000):
+    assert key in keys, "unknown key: " + str(key)
+    p, step_s = _arguments(l, window_s, step_s, "sliding")
+    send_s, receive_s, _ = p.layer_times(layer)
+    times_s = receive_s if key == "receive" else np.where(np.isnan(receive_s), np.nan, send_s)
+    starts_s = window_starts(times_s, window_s, step_s, "sliding", start_s, end_s)
+    ends_s = starts_s + window_s
+
+    valid = ~np.isnan(times_s)
+    order = np.argsort(times_s[valid], kind="stable")
+    times_s = times_s[valid][order]
+    latency_ms = np.append(p.layer_latency_ms(layer)[valid][order], np.inf)
+    lo = np.searchsorted(times_s, starts_s)
+    hi = np.searchsorted(times_s, ends_s)
+    count = hi - lo
+
+    q = np.asarray(percentiles, dtype=float)[:, None] / 100
+    result = np.full((len(q), len(ends_s)), np.nan)
+    rows_per_chunk = max(max_elements // max(int(np.max(count, initial=0)), 1), 1)
+    for first in range(0, len(ends_s), rows_per_chunk):
+        rows = slice(first, first + rows_per_chunk)
+        c = count[rows]
+        width = max(int(np.max(c)), 1)
+        # latencies of the windows, padded with inf (sorted to the end)
+        index = np.minimum(lo[rows, None] + np.arange(width), len(latency_ms) - 1)
+        window = np.sort(np.where(index < hi[rows, None], latency_ms[index], np.inf), axis=1)
+        position = q * np.maximum(c - 1, 0)
+        below = np.floor(position).astype(int)
+        above = np.minimum(below + 1, np.maximum(c - 1, 0))
+        row = np.arange(len(c))
+        lower = window[row, below]
+        with np.errstate(invalid="ignore"):
+            values = lower + (position - below) * (window[row, above] - lower)
+        result[:, rows] = np.where(c > 0, values, np.nan)
+
+    return ends_s, result
+
+
+# average throughput in bit/s over the span from the first send to the last receive at the layer
+def average_throughput_bps(l, layer="udp", overhead=None):
+    p = packet_arrays(l)
+    send_s, receive_s, sent = p.layer_times(layer)
+    received = ~np.isnan(receive_s)
+    if not np.any(received):
+        return 0.0
+    span_s = np.max(receive_s[received]) - np.min(send_s[sent])
+    return np.count_nonzero(received) * p.packet_bits(layer, overhead) / span_s
+
+
+time_series_columns = ["time_s", "throughput_bps", "delivery_rate", "latency_mean_ms"]
+
+
+# throughput (keyed by receive time), delivery rate and mean latency (keyed by send time) on a common grid
+def run_time_series(l, layer="udp", window_s=1.0, step_s=None, mode="sliding", percentiles=()):
+    p = packet_arrays(l)
+    send_s, receive_s, sent = p.layer_times(layer)
+    end_s = float(np.nanmax(np.concatenate((receive_s, np.where(sent, send_s, np.nan), [0.0]))))
+    arguments = dict(layer=layer, window_s=window_s, step_s=step_s, mode=mode, end_s=end_s)
+    t, throughput_bps = throughput_series(p, **arguments)
+    series = {
+        "time_s": t,
+        "throughput_bps": throughput_bps,
+        "delivery_rate": delivery_rate_series(p, **arguments)[1],
+        "latency_mean_ms": latency_mean_series(p, **arguments)[1],
+    }
+    if len(percentiles) > 0:
+        assert mode == "sliding", "latency percentiles only in sliding windows"
+        del arguments["mode"]
+        values = latency_percentile_series(p, percentiles=percentiles, **arguments)[1]
+        for percentile, v in zip(percentiles, values):
+            series[f"latency_p{percentile:g}_ms"] = v
+    return series
+
+
+def write_time_series(series, path):
+    columns = list(series.keys())
+    with open(path, 'w') as file:
+        file.write(";".join(columns) + "\n")
+        for i in range(len(series["time_s"])):
+            file.write(";".join(str(series[c][i]) for c in columns) + "\n")
+
+    print("Saved time series in file: " + path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sliding window or exponentially weighted time series of a latency measurement")
+    parser.add_argument("measurement", help="latency measurement file")
+    parser.add_argument("-l", "--layer", choices=layers, default="udp", help="udp or link layer")
+    parser.add_argument("--mode", choices=modes, default="sliding", help="sliding windows or exponentially weighted")
+    parser.add_argument("-w", "--window", type=float, default=1.0, help="window width (sliding) or time constant (ewma) in s")
+    parser.add_argument("-s", "--step", type=float, help="step in s, default a quarter of the window")
+    parser.add_argument("-p", "--percentiles", type=float, nargs="*", default=[50, 95, 99],
+                        help="latency percentiles (sliding mode)")
+    parser.add_argument("-o", "--output", help="output csv file")
+    args = parser.parse_args()
+
+    l = load_measurement(args.measurement)
+    percentiles = args.percentiles if args.mode == "sliding" else ()
+    series = run_time_series(l, args.layer, args.window, args.step, args.mode, percentiles)
+    print(f"{os.path.basename(args.measurement)}: {len(series['time_s'])} windows, average throughput "
+          f"{average_throughput_bps(l, args.layer) / 1000:.2f} kbit/s over the observed span "
+          f"({l.get_average_throughput_udp() / 1000 if args.layer == 'udp' else l.get_average_throughput_link() / 1000:.2f} "
+          f"kbit/s over the runtime)")
+    if args.output:
+        write_time_series(series, args.output)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+import ctypes
+import os
+import sys
+import time
+
+import numpy as np
+
+# CRC-8 of the VLC frame trailer, compatible with RIOT's crc8 (sys/checksum/crc8.c) as called by vlc_netif:
+# crc8(data, len, VLC_CRC_POLYNOM, VLC_CRC_INIT), MSB first, no reflection, no final xor.
+#
+# crc8 processes one byte per lookup in a 256 entry table. The CRC is linear, so N bytes can be processed
+# with N tables at once (slicing by N): table k maps a byte to its CRC followed by k zero bytes.
+# crc8_batch computes the CRC of many frames in one call, the frames are the columns of a matrix aligned to the end
+# and the lookups are done for one byte position (slicing: N positions) of all frames at a time.
+# Slicing only shortens the dependency chain of the register, in NumPy every table still costs one gather over all
+# frames, so it does not pay off (the benchmark below shows it) and the default is one byte per step.
+
+vlc_crc_polynom = 0xAB
+vlc_crc_init = 0xCD
+
+_tables = {}
+_table_lists = {}
+
+
+# bitwise crc8 of RIOT, reference of the table driven implementation
+def reference_crc8(data, polynom=vlc_crc_polynom, crc=vlc_crc_init):
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ polynom) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+# slicing tables of a polynom, row k: CRC (init 0) of a byte followed by k zero bytes
+def crc8_tables(polynom=vlc_crc_polynom, slices=1):
+    if len(_tables.get(polynom, [])) < slices:
+        table = np.array([reference_crc8([value], polynom, 0) for value in range(256)], dtype=np.uint8)
+        tables = [table]
+        for _ in range(1, slices):
+            tables.append(table[tables[-1]])
+        _tables[polynom] = np.array(tables)
+    return _tables[polynom][:slices]
+
+
+# CRC register of a single bit error at distance d (in bits) from the end of the frame including the trailer,
+# for d = 0 .. num_bits - 1. The CRC is linear: an error pattern is undetected if the syndromes of its bits xor to 0.
+def bit_syndromes(num_bits, polynom=vlc_crc_polynom):
+    syndromes = np.empty(num_bits, dtype=np.uint8)
+    value = 1
+    for d in range(num_bits):
+        syndromes[d] = value
+        value = ((value << 1) ^ polynom) & 0xFF if value & 0x80 else value << 1
+    return syndromes
+
+
+def crc8(data, polynom=vlc_crc_polynom, crc=vlc_crc_init):
+    if polynom not in _table_lists:
+        _table_lists[polynom] = crc8_tables(polynom)[0].tolist()
+    table = _table_lists[polynom]
+    for byte in bytes(data):
+        crc = table[crc ^ byte]
+    return crc
+
+
+# CRCs of many frames (bytes like, or the rows of a 2D uint8 array for frames of equal length), returns a uint8 array
+def crc8_batch(frames, polynom=vlc_crc_polynom, crc=vlc_crc_init, slices=1, chunk_size=10000):
+    result = np.empty(len(frames), dtype=np.uint8)
+    for start in range(0, len(frames), chunk_size):
+        result[start:start + chunk_size] = _crc8_chunk(frames[start:start + chunk_size], polynom, crc, slices)
+    return result
+
+
+def _crc8_chunk(frames, polynom, init, slices):
+    tables = crc8_tables(polynom, slices)
+    if isinstance(frames, np.ndarray):
+        lengths = np.full(len(frames), frames.shape[1], dtype=np.int64)
+    else:
+        lengths = np.array([len(f) for f in frames], dtype=np.int64)
+    # whole blocks of slices bytes
+    width = -(-int(lengths.max()) // slices) * slices if len(frames) > 0 else 0
+    # one row per frame, aligned to the end, leading zeros keep the register at 0
+    padded = np.zeros((len(frames), width), dtype=np.uint8)
+    if isinstance(frames, np.ndarray):
+        padded[:, width - frames.shape[1]:] = frames
+    elif width > 0:
+        # row major order of the mask is the order of the joined bytes
+        padded[np.arange(width) >= (width - lengths)[:, None]] = np.frombuffer(b"".join(bytes(f) for f in frames), dtype=np.uint8)
+    # the register is 0 before the first byte: xor the init into it, frames without bytes keep the init
+    first = width - lengths[lengths > 0]
+    padded[np.flatnonzero(lengths > 0), first] ^= np.uint8(init)
+    # one column per frame, so the bytes at one position of all frames are contiguous
+    matrix = np.ascontiguousarray(padded.T)
+
+    crc = np.zeros(len(frames), dtype=np.uint8)
+    for b in range(0, width, slices):
+        value = tables[slices - 1][crc ^ matrix[b]]
+        for k in range(1, slices):
+            value ^= tables[slices - 1 - k][matrix[b + k]]
+        crc = value
+    crc[lengths == 0] = init
+    return crc
+
+
+# check the table driven engine against the bitwise crc8 and the host build of the firmware, throughput benchmark
+# usage: vlc_crc.py [number of frames]
+if __name__ == "__main__":
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = np.random.default_rng(3)
+
+    frames = [rng.integers(0, 256, rng.integers(0, 300)).astype(np.uint8).tobytes() for _ in range(2000)]
+    reference = [reference_crc8(f) for f in frames]
+    assert [crc8(f) for f in frames] == reference, "table crc differs"
+    for slices in (1, 2, 4, 8):
+        assert crc8_batch(frames, slices=slices, chunk_size=700).tolist() == reference, f"batch crc (slicing by {slices}) differs"
+    assert crc8_batch(frames, 0x07, 0).tolist() == [reference_crc8(f, 0x07, 0) for f in frames], "other polynom differs"
+    matrix = rng.integers(0, 256, (500, 61)).astype(np.uint8)
+    assert crc8_batch(matrix, chunk_size=200).tolist() == [reference_crc8(row) for row in matrix], "batch crc of a matrix differs"
+
+    from vlc_host import host_library_path
+    if os.path.exists(host_library_path):
+        library = ctypes.CDLL(host_library_path)
+        library.crc8.restype = ctypes.c_uint8
+        library.crc8.argtypes = [ctypes.c_char_p, ctypes.c_size_t, ctypes.c_uint8, ctypes.c_uint8]
+        assert [library.crc8(f, len(f), vlc_crc_polynom, vlc_crc_init) for f in frames] == reference, "firmware crc differs"
+        print("crc8 matches the firmware")
+    print(f"crc8 and crc8_batch match the reference for {len(frames)} frames")
+
+    frames = [rng.integers(0, 256, 161).astype(np.uint8).tobytes() for _ in range(num_frames)]
+    megabytes = num_frames * 161 / 1e6
+
+    start = time.time()
+    for f in frames[:num_frames // 10]:
+        reference_crc8(f)
+    print(f"bitwise:           {megabytes / 10 / (time.time() - start):8.2f} MB/s")
+    start = time.time()
+    for f in frames:
+        crc8(f)
+    print(f"table:             {megabytes / (time.time() - start):8.2f} MB/s")
+    for slices in (1, 2, 4, 8):
+        start = time.time()
+        crc8_batch(frames, slices=slices)
+        print(f"batch slicing by {slices}: {megabytes / (time.time() - start):8.2f} MB/s")
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+
+import numpy as np
+
+from performance_model import default_num_sync_symbols, vlc_crc_bytes, vlc_mac_header_bytes
+from vlc_frame import build_frame, encode_frames
+
+# Host side model of the Manchester receiver (_interrupt_changing_edge in vlc_manchester_receive.c)
+#
+# The receiver only sees the timestamps of its edge interrupts (rising and falling), the level of the pin is not read.
+# All time arithmetic is done in uint32 like on the MCU, including the fixed point division with _precision_int_div.
+# Edge times must be the timer values read by the ISR (edge time + interrupt latency), in us.
+# After the end flag the interrupt is disabled until vlc_netif has read the frame and calls vlc_reset_receiver,
+# edges during this time are lost (rearm_delay_us).
+# fixed_symbol_rate_us replaces the estimate of the sync edges by a fixed symbol time (analysis of the estimator,
+# see sync_optimizer.py), the sync edges are still consumed.
+
+vlc_mtu_size = 1280
+vlc_buffer_size = vlc_mtu_size + vlc_mac_header_bytes + vlc_crc_bytes
+vlc_receiver_tolerance = 30
+
+precision_int_div = 10000
+timeout_while_syncing_us = 5000
+
+_uint32_mask = 0xFFFFFFFF
+
+
+# frames received by the decoder
+# lanes: edge sequence of the frame, end_times_us: time of the last edge of the end flag, data: list of bytes
+# timeouts, overflows: number of receiver resets per lane by timeout and by a full buffer
+# symbol_rates_us: symbol time the frame was decoded with (estimate of its sync edges), None if not known
+class DecodedFrames:
+    def __init__(self, lanes, end_times_us, data, timeouts, overflows, symbol_rates_us=None):
+        self.lanes = lanes
+        self.end_times_us = end_times_us
+        self.data = data
+        self.timeouts = timeouts
+        self.overflows = overflows
+        self.symbol_rates_us = symbol_rates_us
+
+    def __len__(self):
+        return len(self.data)
+
+    # first frame of every lane, None if nothing was received
+    def first_frames(self, num_lanes):
+        frames = [None] * num_lanes
+        for lane, data in reversed(list(zip(self.lanes, self.data))):
+            frames[lane] = data
+        return frames
+
+
+# transliteration of the receiver ISR, one edge at a time
+class ManchesterReceiver:
+    def __init__(self, tolerance=vlc_receiver_tolerance, num_sync_symbols=default_num_sync_symbols,
+                 buffer_size=vlc_buffer_size, rearm_delay_us=0, fixed_symbol_rate_us=None):
+        self.__tolerance = tolerance
+        self.__fixed_symbol_rate_us = fixed_symbol_rate_us
+        self.__num_sync_symbols = num_sync_symbols
+        self.__buffer_size = buffer_size
+        self.__rearm_delay_us = rearm_delay_us
+
+        self.__buffer = bytearray(buffer_size)
+        self.__last_symbol_time = 0
+        self.__irq_enabled = True
+        self.__end_time = 0
+        self.__reset()
+
+        # received frames: list of (end time, data) and the symbol time of each frame
+        self.frames = []
+        self.symbol_rates_us = []
+        self.timeouts = 0
+        self.overflows = 0
+
+    # _reset_manchester_receive
+    def __reset(self):
+        self.remaining_sync_edges = 2 * self.__num_sync_symbols
+        self.symbol_rate_us = 0
+        self.received_byte = 0
+        self.current_bit_count = 0
+        self.timeout_us = 0
+        self.byte_count = 0
+        self.bit_stuffing_count = 0
+        self.last_edge = 0
+
+    def edge(self, current_edge_time):
+        current_edge_time &= _uint32_mask
+
+        # vlc_reset_receiver of the netif thread
+        if not self.__irq_enabled:
+            if (current_edge_time - self.__end_time) & _uint32_mask < self.__rearm_delay_us:
+                return
+            self.__reset()
+            self.__irq_enabled = True
+
+        time_diff_last_symbol = (current_edge_time - self.__last_symbol_time) & _uint32_mask
+
+        if (self.timeout_us != 0 and time_diff_last_symbol >= self.timeout_us) or \
+                (self.timeout_us == 0 and time_diff_last_symbol >= timeout_while_syncing_us):
+            if self.remaining_sync_edges < 2 * self.__num_sync_symbols or self.current_bit_count != 0 or self.byte_count != 0:
+                self.timeouts += 1
+            self.__reset()
+
+        if self.remaining_sync_edges > 0:
+            if self.remaining_sync_edges < 2 * self.__num_sync_symbols:
+                self.symbol_rate_us += ((precision_int_div * time_diff_last_symbol) & _uint32_mask) // (2 * self.__num_sync_symbols - 1)
+                self.symbol_rate_us &= _uint32_mask
+
+            if self.remaining_sync_edges == 1:
+                self.symbol_rate_us = ((self.symbol_rate_us * 2) & _uint32_mask) // precision_int_div
+                if self.__fixed_symbol_rate_us != None:
+                    self.symbol_rate_us = self.__fixed_symbol_rate_us
+                self.timeout_us = (2 * self.symbol_rate_us) & _uint32_mask
+
+            self.__last_symbol_time = current_edge_time
+            self.remaining_sync_edges -= 1
+            return
+
+        self.last_edge ^= 1
+
+        # division by 0 is caught by the ISR
+        if self.symbol_rate_us == 0:
+            return
+
+        ratio = ((precision_int_div * time_diff_last_symbol) & _uint32_mask) // self.symbol_rate_us
+        if not ((time_diff_last_symbol <= self.symbol_rate_us and
+                 ((100 * precision_int_div - ratio * 100) & _uint32_mask) <= self.__tolerance * precision_int_div) or
+                (time_diff_last_symbol > self.symbol_rate_us and
+                 ((ratio * 100) & _uint32_mask) <= (100 + self.__tolerance) * precision_int_div)):
+            return
+
+        if self.bit_stuffing_count >= 6:
+            if self.bit_stuffing_count == 6 and self.last_edge == 0:
+                self.bit_stuffing_count = 0
+            elif self.bit_stuffing_count == 6 and self.last_edge == 1:
+                self.bit_stuffing_count += 1
+            elif self.bit_stuffing_count == 7:
+                self.current_bit_count = 0
+                if self.last_edge == 0:
+                    self.__irq_enabled = False
+                    self.__end_time = current_edge_time
+                    self.frames.append((current_edge_time, bytes(self.__buffer[:self.byte_count])))
+                    self.symbol_rates_us.append(self.symbol_rate_us)
+
+            self.__last_symbol_time = current_edge_time
+            return
+
+        if self.last_edge == 1:
+            self.bit_stuffing_count += 1
+        else:
+            self.bit_stuffing_count = 0
+
+        self.received_byte |= self.last_edge << (7 - self.current_bit_count)
+
+        complete = self.current_bit_count >= 7
+        self.current_bit_count += 1
+        if complete:
+            if self.byte_count < self.__buffer_size:
+                self.__buffer[self.byte_count] = self.received_byte
+            else:
+                self.overflows += 1
+                self.__reset()
+                return
+
+            self.byte_count += 1
+            self.current_bit_count = 0
+            self.bit_stuffing_count = 0
+            self.received_byte = 0
+
+        self.__last_symbol_time = current_edge_time
+
+
+# decode edge sequences in lockstep: the ISR is applied to edge j of all lanes at once
+# edge_times_us: edge times of all lanes, lane i are the edges [edge_offsets[i], edge_offsets[i + 1])
+# every lane starts with a reset receiver, lanes are processed in chunks of chunk_size lanes
+def decode_edges(edge_times_us, edge_offsets, tolerance=vlc_receiver_tolerance, num_sync_symbols=default_num_sync_symbols,
+                 buffer_size=vlc_buffer_size, rearm_delay_us=0, chunk_size=8192, fixed_symbol_rate_us=None):
+    edge_times_us = np.asarray(edge_times_us)
+    edge_offsets = np.asarray(edge_offsets)
+    num_lanes = len(edge_offsets) - 1
+
+    lanes = []
+    end_times_us = []
+    data = []
+    symbol_rates_us = []
+    timeouts = np.zeros(num_lanes, dtype=np.int64)
+    overflows = np.zeros(num_lanes, dtype=np.int64)
+    for start in range(0, num_lanes, chunk_size):
+        end = min(start + chunk_size, num_lanes)
+        chunk = _decode_chunk(edge_times_us, edge_offsets[start:end + 1], tolerance, num_sync_symbols, buffer_size, rearm_delay_us,
+                              fixed_symbol_rate_us)
+        for lane, end_time, frame, symbol_rate in zip(*chunk[:3], chunk[5]):
+            lanes.append(start + lane)
+            end_times_us.append(end_time)
+            data.append(frame)
+            symbol_rates_us.append(symbol_rate)
+        timeouts[start:end] = chunk[3]
+        overflows[start:end] = chunk[4]
+
+    return DecodedFrames(np.array(lanes, dtype=np.int64), np.array(end_times_us, dtype=np.int64), data, timeouts, overflows,
+                         np.array(symbol_rates_us, dtype=np.int64))
+
+
+def _decode_chunk(edge_times_us, edge_offsets, tolerance, num_sync_symbols, buffer_size, rearm_delay_us, fixed_symbol_rate_us):
+    u32 = np.uint32
+    n = len(edge_offsets) - 1
+    lengths = np.diff(edge_offsets)
+    max_length = int(lengths.max()) if n > 0 else 0
+
+    # padded matrix of edge times (uint32 like the timer values)
+    times = np.zeros((n, max_length), dtype=u32)
+    lane_index = np.repeat(np.arange(n), lengths)
+    column = np.arange(len(lane_index)) - np.repeat(edge_offsets[:-1] - edge_offsets[0], lengths)
+    times[lane_index, column] = (edge_times_us[edge_offsets[0]:edge_offsets[-1]].astype(np.int64) & _uint32_mask).astype(u32)
+
+    num_sync_edges = 2 * num_sync_symbols
+    sync_divisor = u32(2 * num_sync_symbols - 1)
+    precision = u32(precision_int_div)
+    lower_bound = u32(tolerance * precision_int_div)
+    upper_bound = u32((100 + tolerance) * precision_int_div)
+
+    remaining_sync_edges = np.full(n, num_sync_edges, dtype=np.int64)
+    symbol_rate_us = np.zeros(n, dtype=u32)
+    received_byte = np.zeros(n, dtype=np.uint8)
+    current_bit_count = np.zeros(n, dtype=np.int64)
+    timeout_us = np.zeros(n, dtype=u32)
+    byte_count = np.zeros(n, dtype=np.int64)
+    bit_stuffing_count = np.zeros(n, dtype=np.int64)
+    last_edge = np.zeros(n, dtype=np.uint8)
+    last_symbol_time = np.zeros(n, dtype=u32)
+    irq_enabled = np.ones(n, dtype=bool)
+    end_time = np.zeros(n, dtype=u32)
+    buffer = np.zeros((n, buffer_size), dtype=np.uint8)
+    timeouts = np.zeros(n, dtype=np.int64)
+    overflows = np.zeros(n, dtype=np.int64)
+
+    def reset(mask):
+        remaining_sync_edges[mask] = num_sync_edges
+        symbol_rate_us[mask] = 0
+        received_byte[mask] = 0
+        current_bit_count[mask] = 0
+        timeout_us[mask] = 0
+        byte_count[mask] = 0
+        bit_stuffing_count[mask] = 0
+        last_edge[mask] = 0
+
+    lanes = []
+    end_times_us = []
+    data = []
+    symbol_rates = []
+    for j in range(max_length):
+        t = times[:, j]
+        active = lengths > j
+
+        # vlc_reset_receiver before the edge if the netif thread had time to read the last frame
+        disabled = active & ~irq_enabled
+        rearmed = disabled & ((t - end_time) >= u32(rearm_delay_us))
+        reset(rearmed)
+        irq_enabled |= rearmed
+        active &= irq_enabled
+
+        diff = t - last_symbol_time
+        expired = active & (((timeout_us != 0) & (diff >= timeout_us)) | ((timeout_us == 0) & (diff >= u32(timeout_while_syncing_us))))
+        timeouts += expired & ((remaining_sync_edges < num_sync_edges) | (current_bit_count != 0) | (byte_count != 0))
+        reset(expired)
+
+        # sync edges
+        sync = active & (remaining_sync_edges > 0)
+        add = sync & (remaining_sync_edges < num_sync_edges)
+        symbol_rate_us[add] += (precision * diff[add]) // sync_divisor
+        last_sync = sync & (remaining_sync_edges == 1)
+        symbol_rate_us[last_sync] = (symbol_rate_us[last_sync] * u32(2)) // precision
+        if fixed_symbol_rate_us != None:
+            symbol_rate_us[last_sync] = u32(fixed_symbol_rate_us)
+        timeout_us[last_sync] = u32(2) * symbol_rate_us[last_sync]
+        last_symbol_time[sync] = t[sync]
+        remaining_sync_edges[sync] -= 1
+
+        # data edges
+        data_edge = active & ~sync
+        last_edge[data_edge] ^= 1
+        data_edge &= symbol_rate_us != 0
+
+        rate = np.where(data_edge, symbol_rate_us, u32(1))
+        ratio = (precision * diff) // rate
+        accepted = data_edge & (((diff <= rate) & ((u32(100) * precision - ratio * u32(100)) <= lower_bound)) |
+                                ((diff > rate) & ((ratio * u32(100)) <= upper_bound)))
+
+        # stuffed bit or end flag
+        flag = accepted & (bit_stuffing_count >= 6)
+        stuffed_bit = flag & (bit_stuffing_count == 6) & (last_edge == 0)
+        penultimate_flag_bit = flag & (bit_stuffing_count == 6) & (last_edge == 1)
+        last_flag_bit = flag & (bit_stuffing_count == 7)
+        bit_stuffing_count[stuffed_bit] = 0
+        bit_stuffing_count[penultimate_flag_bit] = 7
+        current_bit_count[last_flag_bit] = 0
+        finished = np.flatnonzero(last_flag_bit & (last_edge == 0))
+        for lane in finished:
+            lanes.append(lane)
+            end_times_us.append(int(t[lane]))
+            data.append(buffer[lane, :byte_count[lane]].tobytes())
+            symbol_rates.append(int(symbol_rate_us[lane]))
+        irq_enabled[finished] = False
+        end_time[finished] = t[finished]
+        last_symbol_time[flag] = t[flag]
+
+        # data bit
+        bit = accepted & ~flag
+        one = bit & (last_edge == 1)
+        bit_stuffing_count[one] += 1
+        bit_stuffing_count[bit & (last_edge == 0)] = 0
+        received_byte[bit] |= (last_edge[bit] << (7 - current_bit_count[bit])).astype(np.uint8)
+        complete = bit & (current_bit_count >= 7)
+        current_bit_count[bit] += 1
+
+        overflow = complete & (byte_count >= buffer_size)
+        overflows += overflow
+        reset(overflow)
+        stored = np.flatnonzero(complete & ~overflow)
+        buffer[stored, byte_count[stored]] = received_byte[stored]
+        byte_count[stored] += 1
+        current_bit_count[stored] = 0
+        bit_stuffing_count[stored] = 0
+        received_byte[stored] = 0
+
+        updated = bit & ~overflow
+        last_symbol_time[updated] = t[updated]
+
+    # frames in order of the lanes, frames of one lane in order of reception
+    order = np.argsort(np.array(lanes, dtype=np.int64), kind='stable')
+    lanes = [lanes[i] for i in order]
+    end_times_us = [end_times_us[i] for i in order]
+    data = [data[i] for i in order]
+    symbol_rates = [symbol_rates[i] for i in order]
+
+    return lanes, end_times_us, data, timeouts, overflows, symbol_rates
+
+
+# decode edge sequences one edge at a time with ManchesterReceiver
+def reference_decode_edges(edge_times_us, edge_offsets, tolerance=vlc_receiver_tolerance, num_sync_symbols=default_num_sync_symbols,
+                           buffer_size=vlc_buffer_size, rearm_delay_us=0, fixed_symbol_rate_us=None):
+    lanes = []
+    end_times_us = []
+    data = []
+    symbol_rates_us = []
+    timeouts = []
+    overflows = []
+    for i in range(len(edge_offsets) - 1):
+        receiver = ManchesterReceiver(tolerance, num_sync_symbols, buffer_size, rearm_delay_us, fixed_symbol_rate_us)
+        for t in edge_times_us[edge_offsets[i]:edge_offsets[i + 1]]:
+            receiver.edge(int(t))
+        for (end_time, frame), symbol_rate in zip(receiver.frames, receiver.symbol_rates_us):
+            lanes.append(i)
+            end_times_us.append(end_time)
+            data.append(frame)
+            symbol_rates_us.append(symbol_rate)
+        timeouts.append(receiver.timeouts)
+        overflows.append(receiver.overflows)
+
+    return DecodedFrames(np.array(lanes, dtype=np.int64), np.array(end_times_us, dtype=np.int64), data,
+                         np.array(timeouts, dtype=np.int64), np.array(overflows, dtype=np.int64),
+                         np.array(symbol_rates_us, dtype=np.int64))
+
+
+def _assert_decoded_equal(a, b):
+    assert np.array_equal(a.lanes, b.lanes), "received lanes differ"
+    assert np.array_equal(a.end_times_us, b.end_times_us), "end times differ"
+    assert a.data == b.data, "received data differs"
+    assert np.array_equal(a.timeouts, b.timeouts), "timeouts differ"
+    assert np.array_equal(a.overflows, b.overflows), "overflows differ"
+    assert np.array_equal(a.symbol_rates_us, b.symbol_rates_us), "symbol rates differ"
+
+
+# compare the lockstep decoder with the transliteration of the ISR and decode encoded frames
+# usage: vlc_decoder.py [number of frames]
+if __name__ == "__main__":
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rng = np.random.default_rng(2)
+
+    payloads = [rng.integers(0, 256, rng.integers(0, 200)).astype(np.uint8).tobytes() for _ in range(num_frames)]
+    frames = [build_frame(p) for p in payloads]
+    encoded = encode_frames(frames, 30000)
+
+    # noiseless edges are decoded to the sent frames
+    decoded = decode_edges(encoded.edge_times_us, encoded.edge_offsets)
+    assert decoded.first_frames(len(frames)) == frames, "noiseless frames not decoded"
+
+    # jittered, dropped and spurious edges, two frames per lane with a short gap, small buffer
+    times = []
+    offsets = [0]
+    for i in range(len(frames) // 2):
+        first, _ = encoded.frame(2 * i)
+        second, _ = encoded.frame(2 * i + 1)
+        lane = np.concatenate([first, second + first[-1] + rng.integers(0, 8000)]).astype(np.int64)
+        lane = lane + rng.normal(0, rng.uniform(0, 12), len(lane)).round().astype(np.int64)
+        lane = lane[rng.random(len(lane)) > rng.uniform(0, 0.002)]
+        lane = np.sort(np.concatenate([lane, rng.integers(0, lane[-1], rng.integers(0, 3))]))
+        # wrap of the 32 bit timer
+        lane = lane + rng.choice([0, 2 ** 32 - 20000])
+        times.append(lane)
+        offsets.append(offsets[-1] + len(lane))
+    times = np.concatenate(times)
+
+    for tolerance, buffer_size, rearm_delay_us in ((30, vlc_buffer_size, 0), (10, 100, 2000), (60, vlc_buffer_size, 500)):
+        reference = reference_decode_edges(times, offsets, tolerance, buffer_size=buffer_size, rearm_delay_us=rearm_delay_us)
+        decoded = decode_edges(times, offsets, tolerance, buffer_size=buffer_size, rearm_delay_us=rearm_delay_us, chunk_size=64)
+        _assert_decoded_equal(decoded, reference)
+        print(f"tolerance {tolerance}%: {len(decoded)} frames received, {decoded.timeouts.sum()} timeouts, "
+              f"{decoded.overflows.sum()} overflows, equal to the reference")
+    reference = reference_decode_edges(times, offsets, fixed_symbol_rate_us=2 * encoded.half_period_us)
+    _assert_decoded_equal(decode_edges(times, offsets, fixed_symbol_rate_us=2 * encoded.half_period_us, chunk_size=64), reference)
+    print(f"fixed symbol rate: {len(reference)} frames received, equal to the reference")
+
+    frames = [build_frame(rng.integers(0, 256, 100 + 48).astype(np.uint8).tobytes()) for _ in range(20000)]
+    encoded = encode_frames(frames, 30000)
+    start = time.time()
+    decoded = decode_edges(encoded.edge_times_us, encoded.edge_offsets, chunk_size=20000)
+    duration = time.time() - start
+    assert decoded.first_frames(len(frames)) == frames, "noiseless frames not decoded"
+    print(f"Decoded {len(frames)} frames ({len(encoded.edge_times_us)} edges) in {duration:.3f}s")
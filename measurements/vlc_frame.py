@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+
+import numpy as np
+
+from performance_model import default_num_sync_symbols, symbol_half_period_us, vlc_addr_len, vlc_crc_bytes, vlc_mac_header_bytes
+from vlc_crc import crc8
+
+# Bit exact model of the VLC link layer frame and the Manchester sender (vlc_manchester_send.c)
+#
+# A frame is the buffer which vlc_netif passes to vlc_manchester_send:
+#   source address (6 bytes) | destination address (6 bytes) | payload | crc8 (1 byte)
+# The sender timer fires every half symbol and writes one level per tick:
+#   - 2 * num_sync_symbols sync levels 1, 0, 1, 0, ...
+#   - two levels per bit, MSB first: the inverted bit, then the bit (rising edge = 1, falling edge = 0)
+#   - a 0 is stuffed after six ones in a row, the count of ones is reset at every byte boundary
+#   - the end flag 0b11111110 without bit stuffing
+#   - level 0 when the timer is stopped
+# The LED is switched off before the timer is started, so the level before the first tick is 0.
+# Times are in us relative to the start of the sender timer, tick k is written at (k + 1) * half period.
+
+end_flag = 0b11111110
+
+# ticks of the end flag and the final tick which stops the timer
+_end_flag_levels = np.array([l for i in range(7, -1, -1) for l in ((end_flag >> i & 1) ^ 1, end_flag >> i & 1)], dtype=np.uint8)
+
+
+# link layer frame as sent by vlc_netif: mac header, payload and crc trailer
+def build_frame(payload, source=bytes(vlc_addr_len), destination=bytes(vlc_addr_len)):
+    assert len(source) == vlc_addr_len and len(destination) == vlc_addr_len, "invalid address length"
+
+    frame = bytes(source) + bytes(destination) + bytes(payload)
+    return frame + bytes([crc8(frame)])
+
+
+# check of a received frame in vlc_netif: header, payload and crc trailer present and checksum correct
+def check_frame(frame):
+    if len(frame) <= vlc_mac_header_bytes + vlc_crc_bytes:
+        return False
+    return crc8(frame[:-vlc_crc_bytes]) == frame[-1]
+
+
+# bits of one byte as sent, including the stuffed 0
+# the count of ones starts at 0 for every byte, so the stuffing only depends on the byte value
+def _stuff_byte(value):
+    bits = []
+    count = 0
+    for i in range(7, -1, -1):
+        if count >= 6:
+            bits.append(0)
+            count = 0
+        bit = value >> i & 1
+        bits.append(bit)
+        count = count + 1 if bit == 1 else 0
+    return bits
+
+
+# lookup tables of the sent bits per byte value, padded to 9 bits
+_stuffed_bits = np.zeros((256, 9), dtype=np.uint8)
+_stuffed_mask = np.zeros((256, 9), dtype=bool)
+for _value in range(256):
+    _bits = _stuff_byte(_value)
+    _stuffed_bits[_value, :len(_bits)] = _bits
+    _stuffed_mask[_value, :len(_bits)] = True
+_stuffed_length = _stuffed_mask.sum(axis=1)
+# stuffed bits per byte value (0 or 1), the stuffed bits of a frame are the sum over its bytes
+stuffed_bits_per_byte = (_stuffed_length - 8).astype(np.uint8)
+
+
+# number of stuffed bits of each frame
+def stuffed_bit_count(frames):
+    return np.array([stuffed_bits_per_byte[np.frombuffer(bytes(f), dtype=np.uint8)].sum(dtype=np.int64) for f in frames], dtype=np.int64)
+
+
+# edges of a batch of frames
+# edge_times_us, edge_levels: edges of all frames, edges of frame i are [edge_offsets[i], edge_offsets[i + 1])
+# edge_levels: level after the edge (1 rising, 0 falling)
+# num_ticks: number of sender timer ticks per frame
+# air_time_us: time from the start of the sender timer until it is stopped
+class EncodedFrames:
+    def __init__(self, edge_times_us, edge_levels, edge_offsets, num_ticks, stuffed_bits, half_period_us):
+        self.edge_times_us = edge_times_us
+        self.edge_levels = edge_levels
+        self.edge_offsets = edge_offsets
+        self.num_ticks = num_ticks
+        self.stuffed_bits = stuffed_bits
+        self.half_period_us = half_period_us
+        self.air_time_us = num_ticks * half_period_us
+
+    def __len__(self):
+        return len(self.num_ticks)
+
+    # edge times and levels of one frame
+    def frame(self, i):
+        start, end = self.edge_offsets[i], self.edge_offsets[i + 1]
+        return self.edge_times_us[start:end], self.edge_levels[start:end]
+
+
+# output level of every sender tick of a batch of frames
+# returns (levels of all frames, first tick of each frame, number of ticks, number of stuffed bits)
+def _tick_levels(frames, num_sync_symbols):
+    data = [np.frombuffer(bytes(f), dtype=np.uint8) for f in frames]
+    num_frames = len(data)
+    byte_frame = np.repeat(np.arange(num_frames), [len(d) for d in data])
+    data = np.concatenate(data) if num_frames > 0 else np.zeros(0, dtype=np.uint8)
+
+    # sent bits of all frames, in order
+    bits = _stuffed_bits[data][_stuffed_mask[data]]
+    bit_frame = np.repeat(byte_frame, _stuffed_length[data])
+    num_bits = np.bincount(bit_frame, minlength=num_frames)
+    stuffed = num_bits - 8 * np.bincount(byte_frame, minlength=num_frames)
+
+    num_sync_ticks = 2 * num_sync_symbols
+    num_ticks = num_sync_ticks + 2 * num_bits + len(_end_flag_levels) + 1
+    tick_offsets = np.zeros(num_frames + 1, dtype=np.int64)
+    np.cumsum(num_ticks, out=tick_offsets[1:])
+
+    levels = np.zeros(tick_offsets[-1], dtype=np.uint8)
+
+    # sync: 1, 0, 1, 0, ...
+    sync = (np.arange(num_sync_ticks) % 2 == 0).astype(np.uint8)
+    levels[(tick_offsets[:-1, None] + np.arange(num_sync_ticks)).ravel()] = np.tile(sync, num_frames)
+
+    # data: inverted bit, bit
+    bit_offsets = np.zeros(num_frames + 1, dtype=np.int64)
+    np.cumsum(num_bits, out=bit_offsets[1:])
+    data_levels = np.column_stack([bits ^ 1, bits]).ravel()
+    level_frame = np.repeat(bit_frame, 2)
+    data_ticks = np.arange(len(data_levels)) - 2 * bit_offsets[level_frame] + tick_offsets[level_frame] + num_sync_ticks
+    levels[data_ticks] = data_levels
+
+    # end flag, the last tick stays 0
+    end_ticks = tick_offsets[:-1, None] + num_sync_ticks + 2 * num_bits[:, None] + np.arange(len(_end_flag_levels))
+    levels[end_ticks.ravel()] = np.tile(_end_flag_levels, num_frames)
+
+    return levels, tick_offsets, num_ticks, stuffed
+
+
+# edges of the tick levels of a batch of frames, ticks of frame i are [tick_offsets[i], tick_offsets[i + 1])
+# also used by the line codes of line_codes.py, tick_us is the duration of one tick
+def encode_levels(levels, tick_offsets, tick_us, stuffed=None):
+    num_frames = len(tick_offsets) - 1
+    num_ticks = np.diff(tick_offsets)
+    if stuffed is None:
+        stuffed = np.zeros(num_frames, dtype=np.int64)
+
+    # the level before the first tick of every frame is 0
+    previous = np.concatenate([[0], levels[:-1]]).astype(np.uint8)
+    previous[tick_offsets[:-1][num_ticks > 0]] = 0
+    edge_ticks = np.flatnonzero(levels != previous)
+
+    edge_frame = np.searchsorted(tick_offsets, edge_ticks, side='right') - 1
+    edge_times_us = (edge_ticks - tick_offsets[edge_frame] + 1) * tick_us
+
+    edge_offsets = np.zeros(num_frames + 1, dtype=np.int64)
+    np.cumsum(np.bincount(edge_frame, minlength=num_frames), out=edge_offsets[1:])
+
+    return EncodedFrames(edge_times_us, levels[edge_ticks], edge_offsets, num_ticks, stuffed, tick_us)
+
+
+# encode a batch of frames (bytes like, see build_frame) into edges
+def encode_frames(frames, data_rate_bps, num_sync_symbols=default_num_sync_symbols):
+    half_period_us = int(symbol_half_period_us(data_rate_bps))
+    assert half_period_us > 0, "data rate too high for timer clocked at 1MHz"
+
+    levels, tick_offsets, _, stuffed = _tick_levels(frames, num_sync_symbols)
+    return encode_levels(levels, tick_offsets, half_period_us, stuffed)
+
+
+# levels of all ticks of one frame, transliteration of _send_callback
+def reference_tick_levels(frame, num_sync_symbols=default_num_sync_symbols):
+    levels = []
+    buffer = bytes(frame)
+    length = len(buffer)
+    position = 0
+    is_data_edge = 0
+    current_bit = 0
+    remaining_sync_signals = 2 * num_sync_symbols
+    last_sync_signal = 1
+    payload_transmitted = 0
+    bit_stuffing_count = 0
+
+    while True:
+        if position >= 8 * length:
+            if payload_transmitted == 0:
+                position = 0
+                length = 1
+                buffer = bytes([end_flag])
+                payload_transmitted = 1
+            else:
+                levels.append(0)
+                return levels
+
+        if remaining_sync_signals > 0:
+            levels.append(last_sync_signal)
+            last_sync_signal ^= 1
+            remaining_sync_signals -= 1
+            continue
+
+        if is_data_edge == 0:
+            string_index = position // 8
+            char_index = position % 8
+            current_bit = (buffer[string_index] >> (7 - char_index)) & 1
+
+            if char_index == 0:
+                bit_stuffing_count = 0
+            if bit_stuffing_count >= 6:
+                current_bit = 0
+            if (current_bit == 0 and bit_stuffing_count < 6) or payload_transmitted == 1:
+                bit_stuffing_count = 0
+            else:
+                bit_stuffing_count += 1
+
+            levels.append(current_bit ^ 1)
+            is_data_edge = 1
+        else:
+            levels.append(current_bit)
+            if bit_stuffing_count >= 7:
+                bit_stuffing_count = 0
+            else:
+                position += 1
+            is_data_edge = 0
+
+
+# compare the vectorized encoder with the transliteration of _send_callback
+# usage: vlc_frame.py [number of frames]
+if __name__ == "__main__":
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rng = np.random.default_rng(1)
+
+    # random payloads, payloads with many ones and the bytes around the stuffing patterns
+    frames = [build_frame(rng.integers(0, 256, rng.integers(0, 200)).astype(np.uint8).tobytes()) for _ in range(num_frames)]
+    frames += [build_frame(rng.choice([0x3F, 0x7E, 0x7F, 0xFC, 0xFE, 0xFF], rng.integers(1, 50)).astype(np.uint8).tobytes()) for _ in range(100)]
+    frames += [build_frame(bytes([value])) for value in range(256)]
+    frames += [bytes(), build_frame(bytes(1280))]
+
+    for num_sync_symbols in (1, default_num_sync_symbols):
+        encoded = encode_frames(frames, 30000, num_sync_symbols)
+        for i, frame in enumerate(frames):
+            levels = np.array(reference_tick_levels(frame, num_sync_symbols), dtype=np.uint8)
+            changes = np.flatnonzero(levels != np.concatenate([[0], levels[:-1]]))
+            edge_times_us, edge_levels = encoded.frame(i)
+
+            assert encoded.num_ticks[i] == len(levels), f"tick count differs for frame {i}"
+            assert np.array_equal(edge_times_us, (changes + 1) * encoded.half_period_us), f"edge times differ for frame {i}"
+            assert np.array_equal(edge_levels, levels[changes]), f"edge levels differ for frame {i}"
+    print(f"Encoder matches the reference for {len(frames)} frames")
+
+    frames = [build_frame(rng.integers(0, 256, 100 + 48).astype(np.uint8).tobytes()) for _ in range(10000)]
+    start = time.time()
+    encoded = encode_frames(frames, 30000)
+    print(f"Encoded {len(frames)} frames ({len(encoded.edge_times_us)} edges) in {time.time() - start:.3f}s")
+    print(f"Air time: {encoded.air_time_us.mean() / 1000:.3f}ms, stuffed bits per frame: {encoded.stuffed_bits.mean():.2f}")
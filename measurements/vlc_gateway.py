@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+
+import argparse
+import fcntl
+import os
+import re
+import selectors
+import socket
+import struct
+import sys
+import threading
+import time
+import tty
+
+import numpy as np
+
+from measurements import LatencyMeasurement, LatencyMeasurementData
+from performance_model import default_num_sync_symbols, load_performance_model
+
+# Gateway between a Linux TUN interface and a RIOT border node on the USB serial port
+#
+#   host IPv6 stack <-> TUN (one IPv6 packet per read / write) <-> gateway <-> serial (SLIP or length prefix) <-> node
+#
+# Framing: SLIP (RFC 1055, like RIOT slipdev) or a 2 byte big endian length before every packet. Frames are written
+# as lists of memoryview slices of the packets with os.writev, escapes are the only new buffers. Up to batch_size
+# packets are read from the TUN device and written to the serial port with one system call.
+# Backpressure: every packet occupies the VLC link for its air time (performance model, the IPv6 packet is the link
+# layer payload). The gateway keeps a virtual clock of the link and stops reading the TUN device while more than
+# max_backlog_ms of air time is queued at the node, further packets queue (and are dropped) in the kernel.
+# Latency accounting in the marker format of the nodes (measurements.LatencyMeasurement):
+#   su: packet read from TUN, sl: packet written to the serial port, rl: packet read from the serial port,
+#   ru: packet written to TUN
+# A packet from the node is matched with a sent packet (ICMPv6 echo reply with the echo request, otherwise the same
+# bytes, e.g. a node in loopback), the result has the format of LatencyMeasurement.
+
+slip_end = 0xC0
+slip_esc = 0xDB
+slip_esc_end = 0xDC
+slip_esc_esc = 0xDD
+
+framings = ["slip", "length"]
+
+_tunsetiff = 0x400454CA
+_iff_tun = 0x0001
+_iff_no_pi = 0x1000
+
+_slip_special = re.compile(b"[\xc0\xdb]")
+_slip_escapes = {slip_end: bytes([slip_esc, slip_esc_end]), slip_esc: bytes([slip_esc, slip_esc_esc])}
+_end = bytes([slip_end])
+_icmpv6 = 58
+_echo_request = 128
+_echo_reply = 129
+
+
+class SlipFraming:
+    def __init__(self):
+        self.__buffer = bytearray()
+
+    # buffers of one frame: slices of the packet between the special bytes and their escapes
+    def encode(self, packet):
+        view = memoryview(packet)
+        buffers = [_end]
+        start = 0
+        for match in _slip_special.finditer(packet):
+            if match.start() > start:
+                buffers.append(view[start:match.start()])
+            buffers.append(_slip_escapes[packet[match.start()]])
+            start = match.start() + 1
+        if start < len(packet):
+            buffers.append(view[start:])
+        buffers.append(_end)
+        return buffers
+
+    # complete packets of the received data, empty frames (double END) are skipped
+    def decode(self, data):
+        self.__buffer += data
+        frames = self.__buffer.split(_end)
+        self.__buffer = frames.pop()
+        # ESC ESC_END first: an escaped ESC cannot produce a new ESC ESC_END
+        return [bytes(f.replace(b"\xdb\xdc", b"\xc0").replace(b"\xdb\xdd", b"\xdb")) for f in frames if len(f) > 0]
+
+
+class LengthFraming:
+    def __init__(self):
+        self.__buffer = bytearray()
+
+    def encode(self, packet):
+        return [struct.pack(">H", len(packet)), memoryview(packet)]
+
+    def decode(self, data):
+        self.__buffer += data
+        packets = []
+        start = 0
+        while len(self.__buffer) - start >= 2:
+            length = struct.unpack_from(">H", self.__buffer, start)[0]
+            if len(self.__buffer) - start - 2 < length:
+                break
+            packets.append(bytes(self.__buffer[start + 2:start + 2 + length]))
+            start += 2 + length
+        del self.__buffer[:start]
+        return packets
+
+
+def framing(name):
+    assert name in framings, "unknown framing: " + str(name)
+    return SlipFraming() if name == "slip" else LengthFraming()
+
+
+# open a TUN interface without packet information, returns the file descriptor
+def open_tun(name):
+    fd = os.open("/dev/net/tun", os.O_RDWR)
+    fcntl.ioctl(fd, _tunsetiff, struct.pack("16sH", name.encode(), _iff_tun | _iff_no_pi))
+    return fd
+
+
+# serial port of the border node in raw mode, returns the file descriptor
+def open_serial(port):
+    fd = os.open(port, os.O_RDWR | os.O_NOCTTY)
+    tty.setraw(fd)
+    return fd
+
+
+# virtual clock of the VLC link: air time of the admitted packets
+class AirTimeBudget:
+    def __init__(self, data_rate_bps, max_backlog_ms=200, model=None, num_sync_symbols=default_num_sync_symbols):
+        if model == None:
+            model = load_performance_model()
+        self.data_rate_bps = data_rate_bps
+        self.max_backlog_s = max_backlog_ms / 1000
+        self.model = model
+        self.num_sync_symbols = num_sync_symbols
+        self.busy_until = 0.0
+
+    def link_time_s(self, packet_bytes):
+        air_time_s = self.model.air_time_s(self.data_rate_bps, packet_bytes, self.num_sync_symbols)
+        return float(air_time_s) + self.model.link_gap_ms / 1000
+
+    # seconds until the link accepts another packet, 0 if it accepts one now
+    def wait_s(self, now):
+        return max(self.busy_until - now - self.max_backlog_s, 0.0)
+
+    def admit(self, packet_bytes, now):
+        self.busy_until = max(self.busy_until, now) + self.link_time_s(packet_bytes)
+
+
+# key which matches a packet from the node with a sent packet
+def _packet_key(packet):
+    if len(packet) >= 48 and packet[6] == _icmpv6 and packet[40] in (_echo_request, _echo_reply):
+        return ("echo", packet[8:24], packet[24:40], packet[44:48]) if packet[40] == _echo_request else \
+               ("echo", packet[24:40], packet[8:24], packet[44:48])
+    return packet
+
+
+# write the buffers, returns the buffers which were not written (non blocking file descriptor)
+def _write_buffers(fd, buffers):
+    while len(buffers) > 0:
+        try:
+            written = os.writev(fd, buffers[:os.sysconf("SC_IOV_MAX")])
+        except BlockingIOError:
+            return buffers
+        while written > 0:
+            if len(buffers[0]) <= written:
+                written -= len(buffers[0])
+                buffers = buffers[1:]
+            else:
+                buffers = [memoryview(buffers[0])[written:]] + buffers[1:]
+                written = 0
+    return buffers
+
+
+class Gateway:
+
+    # tun_fd: TUN device (or any descriptor with one packet per read), serial_fd: serial port of the border node
+    # budget: AirTimeBudget, None for no backpressure
+    # markers: file for the su/sl/rl/ru lines, None for no output
+    def __init__(self, tun_fd, serial_fd, framing_name="slip", budget=None, batch_size=16, mtu=1280, markers=None):
+        self.tun_fd = tun_fd
+        self.serial_fd = serial_fd
+        self.framing = framing(framing_name)
+        self.budget = budget
+        self.batch_size = batch_size
+        self.mtu = mtu
+        self.markers = markers
+
+        self.start_time = None
+        self.packets_to_node = 0
+        self.packets_from_node = 0
+        self.unmatched_from_node = 0
+        self.dropped_to_host = 0
+        self.__pending = []
+        self.__sent = {}
+        self.__result = []
+
+    def __time(self):
+        return time.monotonic() - self.start_time
+
+    def __marker(self, marker, pkt_number, t):
+        if self.markers != None:
+            self.markers.write(f"{marker} {pkt_number} {t:.6f}\n")
+
+    # read up to batch_size packets and write them to the serial port with one system call
+    # returns the time until the budget admits the next packet (0 if not limited)
+    def __forward_to_node(self):
+        buffers = []
+        batch = []
+        for _ in range(self.batch_size):
+            if self.budget != None and self.budget.wait_s(self.__time()) > 0:
+                break
+            try:
+                packet = os.read(self.tun_fd, self.mtu)
+            except BlockingIOError:
+                break
+            read_time = self.__time()
+            if self.budget != None:
+                self.budget.admit(len(packet), read_time)
+            buffers += self.framing.encode(packet)
+            batch.append((packet, read_time))
+
+        if len(buffers) > 0:
+            self.__pending = _write_buffers(self.serial_fd, self.__pending + buffers)
+        write_time = self.__time()
+        for packet, read_time in batch:
+            m = LatencyMeasurementData(len(self.__result), udp_send_time_s=read_time, link_send_time_s=write_time)
+            self.__result.append(m)
+            self.__sent.setdefault(_packet_key(packet), []).append(m)
+            self.__marker("su", m.pkt_number, read_time)
+            self.__marker("sl", m.pkt_number, write_time)
+        self.packets_to_node += len(batch)
+
+        return self.budget.wait_s(self.__time()) if self.budget != None else 0.0
+
+    def __forward_to_host(self):
+        try:
+            data = os.read(self.serial_fd, 65536)
+        except BlockingIOError:
+            return
+        read_time = self.__time()
+        for packet in self.framing.decode(data):
+            try:
+                os.write(self.tun_fd, packet)
+            except BlockingIOError:
+                self.dropped_to_host += 1
+                continue
+            write_time = self.__time()
+            self.packets_from_node += 1
+            sent = self.__sent.get(_packet_key(packet))
+            if sent == None or len(sent) == 0:
+                self.unmatched_from_node += 1
+                continue
+            m = sent.pop(0)
+            m.link_latency_ms = (read_time - m.link_send_time_s) * 1000
+            m.udp_latency_ms = (write_time - m.udp_send_time_s) * 1000
+            self.__marker("rl", m.pkt_number, read_time)
+            self.__marker("ru", m.pkt_number, write_time)
+
+    # forward packets for runtime_s seconds (None: until stop is set)
+    def run(self, runtime_s=None, stop=None):
+        for fd in (self.tun_fd, self.serial_fd):
+            os.set_blocking(fd, False)
+        self.start_time = time.monotonic()
+
+        selector = selectors.DefaultSelector()
+        selector.register(self.tun_fd, selectors.EVENT_READ, "tun")
+        selector.register(self.serial_fd, selectors.EVENT_READ, "serial")
+        tun_paused = False
+        timeout_s = 0.1
+        while (runtime_s == None or self.__time() < runtime_s) and (stop == None or not stop.is_set()):
+            for key, events in selector.select(timeout_s):
+                if key.data == "serial" and events & selectors.EVENT_READ:
+                    self.__forward_to_host()
+                if key.data == "serial" and events & selectors.EVENT_WRITE:
+                    self.__pending = _write_buffers(self.serial_fd, self.__pending)
+
+            # the TUN device is not read while the budget is exhausted, the kernel queues the packets
+            wait_s = self.__forward_to_node()
+            timeout_s = min(max(wait_s, 0.001), 0.1) if wait_s > 0 else 0.1
+            if (wait_s > 0) != tun_paused:
+                tun_paused = wait_s > 0
+                if tun_paused:
+                    selector.unregister(self.tun_fd)
+                else:
+                    selector.register(self.tun_fd, selectors.EVENT_READ, "tun")
+            serial_events = selectors.EVENT_READ | (selectors.EVENT_WRITE if len(self.__pending) > 0 else 0)
+            selector.modify(self.serial_fd, serial_events, "serial")
+        selector.close()
+
+    # send times relative to the first packet like LatencyMeasurement.run
+    def get_result(self):
+        if len(self.__result) == 0:
+            return []
+        start = self.__result[0].udp_send_time_s
+        result = []
+        for m in self.__result:
+            result.append(LatencyMeasurementData(m.pkt_number, m.udp_send_time_s - start, m.udp_latency_ms,
+                                                 m.link_send_time_s - start, m.link_latency_ms))
+        return result
+
+
+# border node in loopback on the master side of a pty: decodes the frames and sends them back
+def _loopback_node(master_fd, framing_name, stop, delay_s=0.0):
+    node_framing = framing(framing_name)
+    os.set_blocking(master_fd, False)
+    while not stop.is_set():
+        try:
+            data = os.read(master_fd, 65536)
+        except (BlockingIOError, OSError):
+            time.sleep(0.001)
+            continue
+        for packet in node_framing.decode(data):
+            time.sleep(delay_s)
+            buffers = node_framing.encode(packet)
+            while len(buffers) > 0:
+                buffers = _write_buffers(master_fd, buffers)
+
+
+# gateway against a pty loopback, packets are sent through a socket pair instead of the TUN device
+def self_test(framing_name, num_packets=500, data_rate_bps=None, seed=0):
+    rng = np.random.default_rng(seed)
+    # worst case for SLIP: every byte needs an escape
+    packets = [bytes([slip_end, slip_esc] * 100), bytes([slip_esc, slip_esc_end, slip_esc, slip_esc_esc]), bytes(1)]
+    packets += [rng.integers(0, 256, int(n)).astype(np.uint8).tobytes() for n in rng.integers(1, 1281, num_packets - 3)]
+    packets = [struct.pack(">I", i) + p for i, p in enumerate(packets)]
+
+    host, tun = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    master_fd, slave_fd = os.openpty()
+    tty.setraw(slave_fd)
+    stop = threading.Event()
+    node = threading.Thread(target=_loopback_node, args=(master_fd, framing_name, stop))
+    node.start()
+
+    budget = AirTimeBudget(data_rate_bps, max_backlog_ms=50) if data_rate_bps != None else None
+    gateway = Gateway(tun.fileno(), slave_fd, framing_name, budget, mtu=1284 + 4)
+    gateway_thread = threading.Thread(target=gateway.run, kwargs={"stop": stop})
+    gateway_thread.start()
+
+    start = time.monotonic()
+    received = []
+    host.settimeout(10)
+    sender = threading.Thread(target=lambda: [host.send(p) for p in packets])
+    sender.start()
+    while len(received) < len(packets):
+        received.append(host.recv(2048))
+    sender.join()
+    duration_s = time.monotonic() - start
+    stop.set()
+    gateway_thread.join()
+    node.join()
+    for fd in (master_fd, slave_fd):
+        os.close(fd)
+    host.close()
+    tun.close()
+
+    assert sorted(received) == sorted(packets), "packets changed in the loopback"
+    result = gateway.get_result()
+    assert all(m.udp_latency_ms != -1 for m in result), "packets without latency"
+    l = LatencyMeasurement(runtime_us=int(duration_s * 1000000), payload_size_bytes=0, interval_us=0)
+    l.set_result(result)
+    print(f"{framing_name}: {len(packets)} packets through the pty loopback in {duration_s:.2f}s, "
+          f"udp latency {l.get_average_udp_latency():.2f} ms, link latency {l.get_average_link_latency():.2f} ms")
+    if budget != None:
+        # the last packet is admitted (and echoed) at most max_backlog_s before the link would be free
+        air_time_s = sum(budget.link_time_s(len(p)) for p in packets)
+        assert duration_s >= air_time_s - budget.link_time_s(len(packets[-1])) - budget.max_backlog_s, "budget exceeded"
+        print(f"  paced to {data_rate_bps} bit/s: {air_time_s:.2f}s of air time")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gateway between a TUN interface and a VLC border node on the serial port")
+    parser.add_argument("--tun", default="vlc0", help="name of the TUN interface")
+    parser.add_argument("--port", default="/dev/ttyACM0", help="serial port of the border node")
+    parser.add_argument("--framing", choices=framings, default="slip", help="framing on the serial port")
+    parser.add_argument("-r", "--data-rate", type=int, default=35000, help="data rate of the VLC link in bit/s, 0 for no backpressure")
+    parser.add_argument("--backlog", type=float, default=200, help="maximum air time queued at the node in ms")
+    parser.add_argument("--batch", type=int, default=16, help="maximum number of packets per serial write")
+    parser.add_argument("-t", "--runtime", type=float, help="runtime in s, until interrupted if not given")
+    parser.add_argument("--markers", help="file for the su/sl/rl/ru markers")
+    parser.add_argument("-o", "--output", help="directory of the latency measurement file")
+    parser.add_argument("--self-test", action="store_true", help="run the gateway against a pty loopback and exit")
+    args = parser.parse_args()
+
+    if args.self_test:
+        for name in framings:
+            self_test(name)
+        self_test("slip", num_packets=50, data_rate_bps=args.data_rate if args.data_rate > 0 else None)
+        sys.exit(0)
+
+    budget = AirTimeBudget(args.data_rate, args.backlog) if args.data_rate > 0 else None
+    markers = open(args.markers, 'w') if args.markers else None
+    tun_fd = open_tun(args.tun)
+    serial_fd = open_serial(args.port)
+    print(f"Forwarding {args.tun} <-> {args.port} ({args.framing})")
+
+    gateway = Gateway(tun_fd, serial_fd, args.framing, budget, args.batch, markers=markers)
+    try:
+        gateway.run(args.runtime)
+    except KeyboardInterrupt:
+        pass
+    print(f"{gateway.packets_to_node} packets to the node, {gateway.packets_from_node} from the node "
+          f"({gateway.unmatched_from_node} unmatched)")
+    if markers != None:
+        markers.close()
+
+    result = gateway.get_result()
+    if args.output and len(result) > 0:
+        runtime_us = int((result[-1].udp_send_time_s) * 1000000) + 1
+        l = LatencyMeasurement(runtime_us=runtime_us, payload_size_bytes=0, interval_us=0)
+        l.set_result(result)
+        l.write_measurement_to_file(subfolder="", path=args.output, file_name_note=f"gateway_{args.data_rate}bps")
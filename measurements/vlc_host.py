@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+import ctypes
+import os
+import sys
+import time
+
+import numpy as np
+
+from performance_model import default_num_sync_symbols, vlc_addr_len
+from vlc_decoder import DecodedFrames, decode_edges, vlc_buffer_size, vlc_receiver_tolerance
+from vlc_frame import build_frame, encode_frames
+
+# Python interface of the host build of the firmware (vlc_physical_layer/host)
+#
+# The shared library contains the unchanged vlc_manchester_send.c, vlc_manchester_receive.c and vlc_netif.c
+# with stubbed RIOT modules. Build it with:
+#   make -C vlc_physical_layer/host
+# The firmware has global state, so there is one VlcHost per process.
+
+host_library_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "vlc_physical_layer", "host", "libvlc_host.so")
+
+# pulses on the RECV_LINK debug pin of _netif_recv
+recv_link_delivered = 1
+recv_link_too_short = 2
+recv_link_crc_error = 3
+
+
+class _HostFrame(ctypes.Structure):
+    _fields_ = [
+        ("lane", ctypes.c_uint32),
+        ("end_time_us", ctypes.c_uint32),
+        ("num_bytes_read", ctypes.c_int32),
+        ("delivered", ctypes.c_int32),
+        ("pulses", ctypes.c_uint32),
+        ("data_offset", ctypes.c_uint32),
+    ]
+
+
+def _pointer(array, ctype):
+    return array.ctypes.data_as(ctypes.POINTER(ctype))
+
+
+# frames received by the firmware, like vlc_decoder.DecodedFrames
+# delivered: 1 if _netif_recv passed the frame to the network stack
+# pulses: drop reason signaled on the RECV_LINK debug pin (recv_link_*)
+class HostDecodedFrames(DecodedFrames):
+    def __init__(self, lanes, end_times_us, data, delivered, pulses):
+        super().__init__(lanes, end_times_us, data, None, None)
+        self.delivered = delivered
+        self.pulses = pulses
+
+
+class VlcHost:
+    def __init__(self, tolerance=vlc_receiver_tolerance, num_sync_symbols=default_num_sync_symbols,
+                 path=host_library_path, verbose=False):
+        if not os.path.exists(path):
+            print("[ERROR] host library not found: " + path)
+            print("Build it with: make -C vlc_physical_layer/host")
+            raise FileNotFoundError(path)
+
+        self.__lib = ctypes.CDLL(path)
+        self.__lib.vlc_host_messages.restype = ctypes.c_ulong
+        self.__lib.vlc_host_assert_failures.restype = ctypes.c_ulong
+        self.__lib.vlc_host_send.restype = ctypes.c_size_t
+        self.__lib.vlc_host_send.argtypes = [
+            ctypes.c_char_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int,
+            ctypes.POINTER(ctypes.c_uint32), ctypes.POINTER(ctypes.c_uint8), ctypes.c_size_t, ctypes.POINTER(ctypes.c_uint32)
+        ]
+        self.__lib.vlc_host_netif_send.restype = ctypes.c_int
+        self.__lib.vlc_host_netif_send.argtypes = [
+            ctypes.c_char_p, ctypes.c_size_t, ctypes.c_char_p, ctypes.POINTER(ctypes.c_uint8),
+            ctypes.POINTER(ctypes.c_uint32), ctypes.POINTER(ctypes.c_uint8), ctypes.c_size_t, ctypes.POINTER(ctypes.c_size_t)
+        ]
+        self.__lib.vlc_host_receive.restype = ctypes.c_size_t
+        self.__lib.vlc_host_receive.argtypes = [
+            ctypes.POINTER(ctypes.c_uint32), ctypes.POINTER(ctypes.c_uint64), ctypes.c_size_t, ctypes.c_uint32,
+            ctypes.POINTER(_HostFrame), ctypes.c_size_t, ctypes.POINTER(ctypes.c_uint8), ctypes.c_size_t,
+            ctypes.POINTER(ctypes.c_size_t)
+        ]
+
+        self.__num_sync_symbols = num_sync_symbols
+        self.__lib.vlc_host_set_verbose(int(verbose))
+        assert self.__lib.vlc_host_init(tolerance, num_sync_symbols) == 0, "host init failed"
+
+    def set_address(self, address):
+        assert len(address) == vlc_addr_len, "invalid address length"
+        self.__lib.vlc_host_set_address(ctypes.c_char_p(bytes(address)))
+
+    # number of messages printed by the firmware (printf, puts)
+    def messages(self):
+        return self.__lib.vlc_host_messages()
+
+    # number of failed assertions, the host build continues instead of a panic
+    def assert_failures(self):
+        return self.__lib.vlc_host_assert_failures()
+
+    # vlc_receiver_run_unit_tests, exits the process if a test fails
+    def run_unit_tests(self):
+        self.__lib.vlc_host_run_unit_tests()
+
+    # edges of a frame sent by vlc_manchester_send
+    # returns (edge times in us, edge levels, air time in us)
+    def send(self, frame, data_rate_bps, num_sync_symbols=None):
+        if num_sync_symbols == None:
+            num_sync_symbols = self.__num_sync_symbols
+        max_edges = 2 * num_sync_symbols + 18 * len(frame) + 32
+        times = np.zeros(max_edges, dtype=np.uint32)
+        levels = np.zeros(max_edges, dtype=np.uint8)
+        air_time_us = ctypes.c_uint32(0)
+
+        num_edges = self.__lib.vlc_host_send(bytes(frame), len(frame), data_rate_bps, num_sync_symbols,
+                                             _pointer(times, ctypes.c_uint32), _pointer(levels, ctypes.c_uint8),
+                                             max_edges, ctypes.byref(air_time_us))
+        assert num_edges <= max_edges, "edge buffer too small"
+
+        return times[:num_edges], levels[:num_edges], air_time_us.value
+
+    # frame built by _netif_send for a payload (IPv6 packet), sent with the data rate of vlc_netif.c
+    # returns (frame, edge times in us, edge levels), the frame is None if _netif_send returned an error
+    def netif_send(self, payload, destination=bytes(vlc_addr_len)):
+        frame = np.zeros(vlc_buffer_size, dtype=np.uint8)
+        max_edges = 2 * self.__num_sync_symbols + 18 * vlc_buffer_size + 32
+        times = np.zeros(max_edges, dtype=np.uint32)
+        levels = np.zeros(max_edges, dtype=np.uint8)
+        num_edges = ctypes.c_size_t(0)
+
+        result = self.__lib.vlc_host_netif_send(bytes(payload), len(payload), bytes(destination), _pointer(frame, ctypes.c_uint8),
+                                                _pointer(times, ctypes.c_uint32), _pointer(levels, ctypes.c_uint8),
+                                                max_edges, ctypes.byref(num_edges))
+        if result <= 0:
+            return None, times[:0], levels[:0]
+
+        return frame[:result].tobytes(), times[:num_edges.value], levels[:num_edges.value]
+
+    # push edge sequences through the receiver ISR and _netif_recv
+    # edge_times_us, edge_offsets: like vlc_decoder.decode_edges, times are truncated to uint32
+    def receive(self, edge_times_us, edge_offsets, rearm_delay_us=0):
+        times = np.ascontiguousarray((np.asarray(edge_times_us, dtype=np.int64) & 0xFFFFFFFF).astype(np.uint32))
+        offsets = np.ascontiguousarray(np.asarray(edge_offsets, dtype=np.uint64))
+        num_lanes = len(offsets) - 1
+
+        max_frames = 4 * num_lanes + 16
+        frames = (_HostFrame * max_frames)()
+        data = np.zeros(max_frames * vlc_buffer_size // 4 + vlc_buffer_size, dtype=np.uint8)
+        lanes_done = ctypes.c_size_t(0)
+
+        lanes = []
+        end_times_us = []
+        received = []
+        delivered = []
+        pulses = []
+        first_lane = 0
+        while first_lane < num_lanes:
+            lane_offsets = offsets[first_lane:]
+            num_frames = self.__lib.vlc_host_receive(_pointer(times, ctypes.c_uint32), _pointer(lane_offsets, ctypes.c_uint64),
+                                                     num_lanes - first_lane, rearm_delay_us, frames, max_frames,
+                                                     _pointer(data, ctypes.c_uint8), len(data), ctypes.byref(lanes_done))
+            for frame in frames[:num_frames]:
+                num_bytes = min(max(frame.num_bytes_read, 0), vlc_buffer_size)
+                lanes.append(first_lane + frame.lane)
+                end_times_us.append(frame.end_time_us)
+                received.append(data[frame.data_offset:frame.data_offset + num_bytes].tobytes())
+                delivered.append(frame.delivered)
+                pulses.append(frame.pulses)
+
+            assert lanes_done.value > 0 or num_frames > 0, "receive buffer too small for one lane"
+            first_lane += lanes_done.value
+
+        return HostDecodedFrames(np.array(lanes, dtype=np.int64), np.array(end_times_us, dtype=np.int64), received,
+                                 np.array(delivered, dtype=np.int64), np.array(pulses, dtype=np.int64))
+
+
+# differential test of the firmware against the Python models and benchmark of the receiver ISR
+# usage: vlc_host.py [number of frames]
+if __name__ == "__main__":
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rng = np.random.default_rng(3)
+    host = VlcHost()
+    host.run_unit_tests()
+
+    # sender: vlc_manchester_send against vlc_frame.encode_frames
+    frames = [build_frame(rng.integers(0, 256, rng.integers(0, 200)).astype(np.uint8).tobytes()) for _ in range(num_frames)]
+    frames += [build_frame(bytes([value] * 3)) for value in range(256)]
+    for data_rate in (10000, 30000, 35000):
+        encoded = encode_frames(frames, data_rate)
+        for i, frame in enumerate(frames):
+            times, levels, air_time_us = host.send(frame, data_rate)
+            edge_times_us, edge_levels = encoded.frame(i)
+            assert np.array_equal(times, edge_times_us) and np.array_equal(levels, edge_levels), f"edges of frame {i} differ"
+            assert air_time_us == encoded.air_time_us[i], f"air time of frame {i} differs"
+    print(f"vlc_manchester_send matches the encoder for {len(frames)} frames")
+
+    # netif framing: mac header and crc trailer
+    address = bytes([2, 0, 0, 0, 0, 1])
+    destination = bytes([2, 0, 0, 0, 0, 2])
+    host.set_address(address)
+    for _ in range(100):
+        payload = rng.integers(0, 256, rng.integers(1, 1280)).astype(np.uint8).tobytes()
+        frame, _, _ = host.netif_send(payload, destination)
+        assert frame == build_frame(payload, address, destination), "netif frame differs"
+    print("_netif_send matches build_frame")
+
+    # receiver: ISR and _netif_recv against vlc_decoder.decode_edges on perturbed edges
+    encoded = encode_frames(frames, 30000)
+    times = []
+    offsets = [0]
+    for i in range(len(frames)):
+        lane, _ = encoded.frame(i)
+        lane = lane.astype(np.int64) + rng.normal(0, rng.uniform(0, 6), len(lane)).round().astype(np.int64)
+        lane = np.sort(lane[rng.random(len(lane)) > rng.uniform(0, 0.001)])
+        times.append(lane)
+        offsets.append(offsets[-1] + len(lane))
+    times = np.concatenate(times)
+    reference = decode_edges(times, offsets)
+    received = host.receive(times, offsets)
+    assert np.array_equal(received.lanes, reference.lanes) and received.data == reference.data, "received frames differ"
+    assert np.array_equal(received.end_times_us, reference.end_times_us), "end times differ"
+    print(f"receiver matches the decoder: {len(received)} of {len(frames)} frames received, {received.delivered.sum()} delivered")
+
+    frames = [build_frame(rng.integers(0, 256, 148).astype(np.uint8).tobytes()) for _ in range(5000)]
+    encoded = encode_frames(frames, 30000)
+    start = time.time()
+    received = host.receive(encoded.edge_times_us, encoded.edge_offsets)
+    duration = time.time() - start
+    assert received.delivered.sum() == len(frames), "noiseless frames not delivered"
+    print(f"{len(encoded.edge_times_us) / duration / 1e6:.1f} million edges per second through the receiver ISR")
+    print(f"{host.messages()} firmware messages, {host.assert_failures()} failed assertions")
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+
+import argparse
+import heapq
+import struct
+from datetime import datetime
+
+import numpy as np
+
+from logic_capture import channel_edges
+from measurement_files import load_measurement, parse_file_name
+from performance_model import vlc_addr_len, vlc_crc_bytes, vlc_mac_header_bytes
+from vlc_decoder import decode_edges, timeout_while_syncing_us
+from vlc_frame import build_frame, check_frame, encode_frames
+
+# pcapng export of VLC frames for Wireshark and other tools
+#
+# Frames have the layout of vlc_netif: source address (6 bytes) | destination address (6 bytes) | IPv6 packet | crc8.
+# They are written with the link type USER0 (147) unchanged, or rewrapped as Ethernet (1): destination, source,
+# ethertype IPv6 and the IPv6 packet without the CRC trailer, so Wireshark dissects the IPv6 and UDP headers.
+# Sources:
+#   model:       random frames of vlc_frame sent back to back
+#   capture:     frames decoded (vlc_decoder) from a logic analyzer capture of the receiver input pin
+#   measurement: the UDP packets of a LatencyMeasurement synthesized like measurements.c sends them, on the
+#                interface "sender" at the link send marker and on "receiver" at the link receive marker
+# The writer buffers the blocks and writes them in large chunks, nothing else is kept in memory.
+# read_ipv6_packets reads the IPv6 packets of a pcap or pcapng file (e.g. captured traffic of a Linux host)
+# of the link types Ethernet, raw IPv6 and USER0 (frames of this module).
+
+linktype_ethernet = 1
+linktype_raw = 101
+linktype_user0 = 147
+linktype_ipv6 = 229
+
+_ethertype_ipv6 = 0x86DD
+_byte_order_magic = 0x1A2B3C4D
+_option_comment = 1
+_option_if_name = 2
+
+# UDP ports and destination of udp_latency_client (measurements.c)
+measurement_source_port = 1234
+measurement_destination_port = 1337
+all_nodes_multicast = bytes.fromhex("ff020000000000000000000000000001")
+
+
+def _option(code, value):
+    return struct.pack("<HH", code, len(value)) + value + bytes(-len(value) % 4)
+
+
+def _options(options):
+    if len(options) == 0:
+        return b""
+    return b"".join(_option(code, value) for code, value in options) + struct.pack("<HH", 0, 0)
+
+
+def _block(block_type, body):
+    length = 12 + len(body)
+    return struct.pack("<II", block_type, length) + body + struct.pack("<I", length)
+
+
+class PcapngWriter:
+    # interfaces: names of the interfaces, frames are written with the index of their interface
+    # ethernet: rewrap the frames as Ethernet instead of the raw vlc_netif layout
+    def __init__(self, path, interfaces=("vlc",), ethernet=False, buffer_size=4 * 1024 * 1024):
+        self.ethernet = ethernet
+        self.buffer_size = buffer_size
+        self.frames = 0
+        self.__buffer = bytearray()
+        self.__file = open(path, 'wb')
+
+        # section header: byte order magic, version 1.0, unknown section length
+        self.__buffer += _block(0x0A0D0D0A, struct.pack("<IHHq", _byte_order_magic, 1, 0, -1))
+        linktype = linktype_ethernet if ethernet else linktype_user0
+        for name in interfaces:
+            # time stamps in us (default resolution)
+            body = struct.pack("<HHI", linktype, 0, 0) + _options([(_option_if_name, name.encode())])
+            self.__buffer += _block(1, body)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # frame: vlc_netif layout including the CRC trailer
+    def write(self, time_us, frame, interface=0, comment=None):
+        if self.ethernet:
+            frame = (frame[vlc_addr_len:vlc_mac_header_bytes] + frame[:vlc_addr_len] + struct.pack(">H", _ethertype_ipv6)
+                     + frame[vlc_mac_header_bytes:-vlc_crc_bytes])
+        time_us = int(time_us)
+        options = _options([(_option_comment, comment.encode())] if comment != None else [])
+        body = (struct.pack("<IIIII", interface, time_us >> 32, time_us & 0xFFFFFFFF, len(frame), len(frame))
+                + frame + bytes(-len(frame) % 4) + options)
+        self.__buffer += _block(6, body)
+        self.frames += 1
+        if len(self.__buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.__file.write(self.__buffer)
+        self.__buffer = bytearray()
+
+    def close(self):
+        if not self.__file.closed:
+            self.flush()
+            self.__file.close()
+
+
+def _checksum(data):
+    if len(data) % 2 == 1:
+        data += b"\x00"
+    total = int(np.frombuffer(data, dtype=">u2").sum(dtype=np.uint64))
+    while total > 0xFFFF:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF or 0xFFFF
+
+
+# IPv6 packet of a captured frame, None for other protocols and link types
+def _ipv6_packet(linktype, data):
+    if linktype == linktype_ethernet:
+        if len(data) < 14 or struct.unpack(">H", data[12:14])[0] != _ethertype_ipv6:
+            return None
+        data = data[14:]
+    elif linktype == linktype_user0:
+        data = data[vlc_mac_header_bytes:-vlc_crc_bytes]
+    elif linktype not in (linktype_raw, linktype_ipv6):
+        return None
+    return data if len(data) >= 40 and data[0] >> 4 == 6 else None
+
+
+def _read_pcap(file, header):
+    magic = struct.unpack("<I", header[:4])[0]
+    order = "<" if magic in (0xA1B2C3D4, 0xA1B23C4D) else ">"
+    header += file.read(16)
+    linktype = struct.unpack(order + "I", header[20:24])[0] & 0xFFFF
+    while True:
+        record = file.read(16)
+        if len(record) < 16:
+            return
+        captured = struct.unpack(order + "IIII", record)[2]
+        packet = _ipv6_packet(linktype, file.read(captured))
+        if packet != None:
+            yield packet
+
+
+def _read_pcapng(file, header):
+    order = "<"
+    linktypes = []
+    while len(header) == 8:
+        block_type = struct.unpack(order + "I", header[:4])[0]
+        if block_type == 0x0A0D0D0A:
+            # section header: the byte order magic follows the length
+            magic = file.read(4)
+            order = "<" if struct.unpack("<I", magic)[0] == _byte_order_magic else ">"
+            body = magic + file.read(struct.unpack(order + "I", header[4:])[0] - 16)
+            linktypes = []
+        else:
+            body = file.read(struct.unpack(order + "I", header[4:])[0] - 12)
+        file.read(4)
+
+        if block_type == 1:
+            linktypes.append(struct.unpack(order + "H", body[:2])[0])
+        elif block_type == 6:
+            interface, _, _, captured = struct.unpack(order + "IIII", body[:16])
+            packet = _ipv6_packet(linktypes[interface], body[20:20 + captured])
+            if packet != None:
+                yield packet
+        elif block_type == 3:
+            packet = _ipv6_packet(linktypes[0], body[4:4 + struct.unpack(order + "I", body[:4])[0]])
+            if packet != None:
+                yield packet
+        header = file.read(8)
+
+
+# IPv6 packets of a pcap or pcapng file
+def read_ipv6_packets(path):
+    with open(path, 'rb') as file:
+        header = file.read(8)
+        assert len(header) == 8, "not a pcap file: " + path
+        if struct.unpack("<I", header[:4])[0] == 0x0A0D0D0A:
+            yield from _read_pcapng(file, header)
+        else:
+            assert struct.unpack("<I", header[:4])[0] in (0xA1B2C3D4, 0xD4C3B2A1, 0xA1B23C4D, 0x4D3CB2A1), "not a pcap file: " + path
+            yield from _read_pcap(file, header)
+
+
+# link local address of a 6 byte MAC address (EUI-64)
+def link_local_address(mac):
+    return bytes.fromhex("fe80000000000000") + bytes([mac[0] ^ 0x02]) + mac[1:3] + b"\xff\xfe" + mac[3:6]
+
+
+# IPv6 packet with UDP header and payload
+def ipv6_udp_packet(payload, source, destination, source_port, destination_port, hop_limit=64):
+    length = 8 + len(payload)
+    pseudo_header = source + destination + struct.pack(">IxxxB", length, 17)
+    udp = struct.pack(">HHHH", source_port, destination_port, length, 0) + payload
+    udp = udp[:6] + struct.pack(">H", _checksum(pseudo_header + udp)) + udp[8:]
+    return struct.pack(">IHBB", 6 << 28, length, 17, hop_limit) + source + destination + udp
+
+
+# payload of udp_latency_client: random bytes, the marker 'M' and the package number (4 bytes, little endian)
+def measurement_payload(pkt_number, payload_size_bytes, rng):
+    payload = bytearray(rng.integers(0, 256, payload_size_bytes).astype(np.uint8).tobytes())
+    payload[-5:] = b"M" + struct.pack("<I", pkt_number & 0xFFFFFFFF)
+    return bytes(payload)
+
+
+# frames of a measurement file: (time us, interface, frame), interface 0 sender and 1 receiver, in order of time
+def measurement_frames(path, source=bytes([2, 0, 0, 0, 0, 1]), destination=bytes(vlc_addr_len), seed=0):
+    l = load_measurement(path)
+    start_time = parse_file_name(path)["start_time"]
+    start_us = int(datetime.strptime(start_time, "%Y-%m-%dT%H-%M-%S").timestamp() * 1e6) if start_time != None else 0
+
+    # the sends and the receptions iterate over the packets separately, both synthesize the same payloads
+    def frames():
+        rng = np.random.default_rng(seed)
+        for m in l.get_result():
+            if m.link_send_time_s == -1:
+                continue
+            payload = measurement_payload(m.pkt_number, l.get_payload_size(), rng)
+            packet = ipv6_udp_packet(payload, link_local_address(source), all_nodes_multicast,
+                                     measurement_source_port, measurement_destination_port)
+            frame = build_frame(packet, source, destination)
+            yield m.link_send_time_s, m.link_latency_ms, frame
+
+    # the receptions are delayed by the latency, merge them with the sends in order of time
+    sends = ((start_us + int(t * 1e6), 0, f) for t, _, f in frames())
+    receptions = ((start_us + int(t * 1e6 + latency * 1e3), 1, f) for t, latency, f in frames() if latency != -1)
+    return heapq.merge(sends, receptions, key=lambda x: x[0])
+
+
+# frames decoded from the receiver input pin of a capture: (time us, frame), in order of time
+# the edges are split at gaps of at least timeout_while_syncing_us, the receiver is reset there anyway,
+# and the parts are decoded in batches as lanes of decode_edges
+def capture_frames(path, channel, samplerate_hz=None, batch_edges=1000000):
+    pending = []
+    current = []
+
+    def decode(parts):
+        lengths = [len(p) for p in parts]
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        starts = np.array([p[0] for p in parts])
+        times = np.concatenate([p - p[0] for p in parts])
+        decoded = decode_edges(times, offsets)
+        for lane, end_time, frame in zip(decoded.lanes, decoded.end_times_us, decoded.data):
+            yield int(starts[lane] + end_time), frame
+
+    for times, _ in channel_edges(path, channel, samplerate_hz):
+        times = np.floor(np.concatenate(current + [times * 1e6])).astype(np.int64)
+        splits = np.flatnonzero(np.diff(times) >= timeout_while_syncing_us) + 1
+        parts = np.split(times, splits)
+        pending.extend(p for p in parts[:-1] if len(p) > 0)
+        current = [parts[-1].astype(np.float64)]
+        if sum(len(p) for p in pending) >= batch_edges:
+            yield from decode(pending)
+            pending = []
+
+    pending.extend(p.astype(np.int64) for p in current if len(p) > 0)
+    if len(pending) > 0:
+        yield from decode(pending)
+
+
+# random frames of the frame model, sent back to back with gap_us between them: (time us, frame)
+def model_frames(num_frames, payload_size_bytes, data_rate_bps, gap_us=1000, seed=0, batch_size=10000):
+    rng = np.random.default_rng(seed)
+    time_us = 0
+    for start in range(0, num_frames, batch_size):
+        count = min(batch_size, num_frames - start)
+        frames = [build_frame(rng.integers(0, 256, payload_size_bytes).astype(np.uint8).tobytes()) for _ in range(count)]
+        encoded = encode_frames(frames, data_rate_bps)
+        for frame, air_time_us in zip(frames, encoded.air_time_us):
+            time_us += int(air_time_us)
+            yield time_us, frame
+            time_us += gap_us
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export VLC frames as pcapng")
+    parser.add_argument("source", choices=["model", "capture", "measurement"], help="source of the frames")
+    parser.add_argument("input", nargs="?", help="capture or measurement file")
+    parser.add_argument("-o", "--output", default="vlc.pcapng", help="output pcapng file")
+    parser.add_argument("--ethernet", action="store_true", help="rewrap the frames as Ethernet")
+    parser.add_argument("--pin", default="D0", help="capture: channel of the receiver input pin")
+    parser.add_argument("--samplerate", type=float, help="capture: samplerate in Hz")
+    parser.add_argument("-n", "--frames", type=int, default=1000, help="model: number of frames")
+    parser.add_argument("-p", "--payload", type=int, default=148, help="model: link layer payload size in bytes")
+    parser.add_argument("-r", "--data-rate", type=int, default=30000, help="model: data rate in bit/s")
+    args = parser.parse_args()
+
+    if args.source == "measurement":
+        assert args.input != None, "measurement file missing"
+        with PcapngWriter(args.output, ["sender", "receiver"], args.ethernet) as writer:
+            for time_us, interface, frame in measurement_frames(args.input):
+                writer.write(time_us, frame, interface)
+    elif args.source == "capture":
+        assert args.input != None, "capture file missing"
+        with PcapngWriter(args.output, ["receiver"], args.ethernet) as writer:
+            for time_us, frame in capture_frames(args.input, args.pin, args.samplerate):
+                # frames failing the netif check are exported with a comment (no Ethernet rewrap of short frames)
+                if check_frame(frame):
+                    writer.write(time_us, frame)
+                elif not args.ethernet or len(frame) > vlc_mac_header_bytes + vlc_crc_bytes:
+                    writer.write(time_us, frame, comment="dropped by _netif_recv (length or crc)")
+    else:
+        with PcapngWriter(args.output, ["vlc"], args.ethernet) as writer:
+            for time_us, frame in model_frames(args.frames, args.payload, args.data_rate):
+                writer.write(time_us, frame)
+
+    print(f"Saved {writer.frames} frames in file: {args.output}")
@@ -72,6 +72,8 @@ static char _receive_buffer[VLC_BUFFER_SIZE];
 static struct receive_result_meta_t _receive_meta_data;
 static eui48_t _vlc_mac_address;
 static char _send_buffer[VLC_BUFFER_SIZE];
+// frames handled by _netif_send (sent or failed), the packages are released from the pktbuf
+static volatile uint32_t _num_frames_done = 0;
 
 // TODO: pass input pin to driver, duplicated code...
 #ifndef INPUT_PIN
@@ -220,6 +222,7 @@ static int _netif_send(gnrc_netif_t *netif, gnrc_pktsnip_t *pkt)
 
 end:
     gnrc_pktbuf_release(pkt);
+    _num_frames_done++;
 
 #ifdef DEBUG_OUT_PIN_SEND_LINK
     gpio_write(DEBUG_OUT_PIN_SEND_LINK, 0);
@@ -350,7 +353,7 @@ static gnrc_pktsnip_t *_netif_recv(gnrc_netif_t *netif)
 
     gnrc_pktsnip_t *received_data_pkt;
 
-    received_data_pkt = gnrc_pktbuf_add(netif_header, _receive_buffer + (2 * VLC_ADDR_LEN), _receive_meta_data.num_bytes_read - (2 * VLC_ADDR_LEN), GNRC_NETTYPE_IPV6);
+    received_data_pkt = gnrc_pktbuf_add(netif_header, _receive_buffer + (2 * VLC_ADDR_LEN), _receive_meta_data.num_bytes_read - (2 * VLC_ADDR_LEN), _nettype);
     if (received_data_pkt == NULL) {
         DEBUG("ERROR: failed to allocate package for received data!\n");
         gnrc_pktbuf_release(netif_header);
@@ -524,6 +527,12 @@ static netdev_t _vlc_netdev_dummy = {
     .driver = &_vlc_netdev_driver,
 };
 
+// number of frames handled by the send function since the start, used to limit the packages in the network stack
+uint32_t vlc_netif_frames_done(void)
+{
+    return _num_frames_done;
+}
+
 // no interface
 void vlc_netif_init(void)
 {
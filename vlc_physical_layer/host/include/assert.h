@@ -0,0 +1,12 @@
+/*
+ * Host version of assert: a failed assertion is counted (vlc_host_assert_failures) instead of a panic,
+ * so that fuzzed input does not abort the process. The firmware continues like a build with NDEBUG.
+ */
+#ifndef HOST_ASSERT_H
+#define HOST_ASSERT_H
+
+void vlc_host_assert_failed(const char *condition, const char *file, int line);
+
+#define assert(condition) ((condition) ? (void) 0 : vlc_host_assert_failed(#condition, __FILE__, __LINE__))
+
+#endif
@@ -0,0 +1,9 @@
+#ifndef HOST_CHECKSUM_CRC8_H
+#define HOST_CHECKSUM_CRC8_H
+
+#include <stddef.h>
+#include <stdint.h>
+
+uint8_t crc8(const uint8_t *data, size_t len, uint8_t g_polynom, uint8_t crc);
+
+#endif
@@ -0,0 +1,12 @@
+#ifndef HOST_DEBUG_H
+#define HOST_DEBUG_H
+
+#if ENABLE_DEBUG
+#define DEBUG(...) printf(__VA_ARGS__)
+#else
+#define DEBUG(...)
+#endif
+
+#define DEBUG_POS(...) DEBUG(__VA_ARGS__)
+
+#endif
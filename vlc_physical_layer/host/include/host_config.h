@@ -0,0 +1,20 @@
+/*
+ * Included before every source file of the host build (-include host_config.h)
+ *
+ * Messages of the firmware are counted and only printed if enabled (vlc_host_set_verbose).
+ */
+#ifndef HOST_CONFIG_H
+#define HOST_CONFIG_H
+
+#include <stdio.h>
+#include <stdint.h>
+#include <string.h>
+#include <sys/types.h>
+
+int vlc_host_printf(const char *format, ...);
+int vlc_host_puts(const char *message);
+
+#define printf vlc_host_printf
+#define puts vlc_host_puts
+
+#endif
@@ -0,0 +1,13 @@
+#ifndef HOST_LUID_H
+#define HOST_LUID_H
+
+#include <stdint.h>
+
+typedef struct {
+    uint8_t uint8[6];
+} eui48_t;
+
+// address set by vlc_host_set_address
+void luid_get_eui48(eui48_t *addr);
+
+#endif
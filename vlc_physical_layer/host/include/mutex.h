@@ -0,0 +1,18 @@
+/*
+ * Host mutex: the firmware is single threaded on the host. Locking a locked mutex runs the
+ * periodic timer until the timer callback unlocks it (vlc_manchester_send waits for the transmission this way).
+ */
+#ifndef HOST_MUTEX_H
+#define HOST_MUTEX_H
+
+typedef struct {
+    int locked;
+} mutex_t;
+
+#define MUTEX_INIT { 0 }
+
+void mutex_init(mutex_t *mutex);
+void mutex_lock(mutex_t *mutex);
+void mutex_unlock(mutex_t *mutex);
+
+#endif
@@ -0,0 +1,31 @@
+#ifndef HOST_NET_GNRC_NETIF_H
+#define HOST_NET_GNRC_NETIF_H
+
+#include "net/netdev.h"
+#include "net/gnrc/pktbuf.h"
+
+#define GNRC_NETIF_PRIO (2)
+
+typedef struct gnrc_netif {
+    netdev_t *dev;
+    int pid;
+} gnrc_netif_t;
+
+typedef struct gnrc_netapi_opt gnrc_netapi_opt_t;
+
+typedef struct {
+    void (*init)(gnrc_netif_t *netif);
+    int (*send)(gnrc_netif_t *netif, gnrc_pktsnip_t *pkt);
+    gnrc_pktsnip_t *(*recv)(gnrc_netif_t *netif);
+    int (*get)(gnrc_netif_t *netif, gnrc_netapi_opt_t *opt);
+    int (*set)(gnrc_netif_t *netif, const gnrc_netapi_opt_t *opt);
+    void (*msg_handler)(gnrc_netif_t *netif, void *msg);
+} gnrc_netif_ops_t;
+
+void gnrc_netif_default_init(gnrc_netif_t *netif);
+int gnrc_netif_get_from_netdev(gnrc_netif_t *netif, gnrc_netapi_opt_t *opt);
+int gnrc_netif_set_from_netdev(gnrc_netif_t *netif, const gnrc_netapi_opt_t *opt);
+int gnrc_netif_create(gnrc_netif_t *netif, char *stack, int stacksize, char priority, const char *name,
+                      netdev_t *dev, const gnrc_netif_ops_t *ops);
+
+#endif
@@ -0,0 +1,25 @@
+#ifndef HOST_NET_GNRC_NETIF_HDR_H
+#define HOST_NET_GNRC_NETIF_HDR_H
+
+#include <stdint.h>
+
+#include "net/gnrc/pktbuf.h"
+
+typedef struct {
+    uint8_t src_l2addr_len;
+    uint8_t dst_l2addr_len;
+    int16_t if_pid;
+} gnrc_netif_hdr_t;
+
+struct gnrc_netif;
+
+// addresses follow the header: source, destination
+static inline uint8_t *gnrc_netif_hdr_get_dst_addr(const gnrc_netif_hdr_t *hdr)
+{
+    return ((uint8_t *) (hdr + 1)) + hdr->src_l2addr_len;
+}
+
+gnrc_pktsnip_t *gnrc_netif_hdr_build(const uint8_t *src, uint8_t src_len, const uint8_t *dst, uint8_t dst_len);
+void gnrc_netif_hdr_set_netif(gnrc_netif_hdr_t *hdr, const struct gnrc_netif *netif);
+
+#endif
@@ -0,0 +1,4 @@
+#ifndef HOST_NET_GNRC_NETREG_H
+#define HOST_NET_GNRC_NETREG_H
+
+#endif
@@ -0,0 +1,11 @@
+#ifndef HOST_NET_GNRC_NETTYPE_H
+#define HOST_NET_GNRC_NETTYPE_H
+
+typedef enum {
+    GNRC_NETTYPE_UNDEF,
+    GNRC_NETTYPE_NETIF,
+    GNRC_NETTYPE_SIXLOWPAN,
+    GNRC_NETTYPE_IPV6,
+} gnrc_nettype_t;
+
+#endif
@@ -0,0 +1,22 @@
+/*
+ * Host packet buffer: packets are allocated from a static pool which is freed by vlc_host.c
+ */
+#ifndef HOST_NET_GNRC_PKTBUF_H
+#define HOST_NET_GNRC_PKTBUF_H
+
+#include <stddef.h>
+
+#include "net/gnrc/nettype.h"
+
+typedef struct gnrc_pktsnip {
+    struct gnrc_pktsnip *next;
+    void *data;
+    size_t size;
+    unsigned int users;
+    gnrc_nettype_t type;
+} gnrc_pktsnip_t;
+
+gnrc_pktsnip_t *gnrc_pktbuf_add(gnrc_pktsnip_t *next, const void *data, size_t size, gnrc_nettype_t type);
+void gnrc_pktbuf_release(gnrc_pktsnip_t *pkt);
+
+#endif
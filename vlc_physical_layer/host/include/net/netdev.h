@@ -0,0 +1,42 @@
+#ifndef HOST_NET_NETDEV_H
+#define HOST_NET_NETDEV_H
+
+#include <stddef.h>
+
+typedef enum {
+    NETDEV_EVENT_ISR,
+    NETDEV_EVENT_RX_STARTED,
+    NETDEV_EVENT_RX_COMPLETE,
+    NETDEV_EVENT_TX_COMPLETE,
+} netdev_event_t;
+
+typedef enum {
+    NETOPT_ADDRESS,
+    NETOPT_ADDR_LEN,
+    NETOPT_SRC_LEN,
+    NETOPT_MAX_PDU_SIZE,
+    NETOPT_PROTO,
+    NETOPT_DEVICE_TYPE,
+} netopt_t;
+
+#define NETDEV_TYPE_VLC (42)
+
+typedef struct netdev netdev_t;
+typedef void (*netdev_event_cb_t)(netdev_t *dev, netdev_event_t event);
+
+typedef struct netdev_driver {
+    int (*send)(netdev_t *dev, const void *iolist);
+    int (*recv)(netdev_t *dev, void *buf, size_t len, void *info);
+    int (*init)(netdev_t *dev);
+    void (*isr)(netdev_t *dev);
+    int (*get)(netdev_t *dev, netopt_t opt, void *value, size_t max_len);
+    int (*set)(netdev_t *dev, netopt_t opt, const void *value, size_t value_len);
+} netdev_driver_t;
+
+struct netdev {
+    const struct netdev_driver *driver;
+    netdev_event_cb_t event_callback;
+    void *context;
+};
+
+#endif
@@ -0,0 +1,29 @@
+/*
+ * Host gpio: outputs are recorded by the host driver, the interrupt callback is called for pushed edges
+ */
+#ifndef HOST_PERIPH_GPIO_H
+#define HOST_PERIPH_GPIO_H
+
+typedef unsigned int gpio_t;
+typedef void (*gpio_cb_t)(void *arg);
+
+typedef enum {
+    GPIO_IN,
+    GPIO_OUT,
+} gpio_mode_t;
+
+typedef enum {
+    GPIO_FALLING,
+    GPIO_RISING,
+    GPIO_BOTH,
+} gpio_flank_t;
+
+#define GPIO_PIN(port, pin) ((gpio_t) (((port) << 5) | (pin)))
+
+int gpio_init(gpio_t pin, gpio_mode_t mode);
+int gpio_init_int(gpio_t pin, gpio_mode_t mode, gpio_flank_t flank, gpio_cb_t cb, void *arg);
+void gpio_irq_enable(gpio_t pin);
+void gpio_irq_disable(gpio_t pin);
+void gpio_write(gpio_t pin, int value);
+
+#endif
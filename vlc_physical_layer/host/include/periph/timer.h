@@ -0,0 +1,21 @@
+/*
+ * Host timer clocked at 1MHz, the time is set by the host driver (vlc_host.c)
+ */
+#ifndef HOST_PERIPH_TIMER_H
+#define HOST_PERIPH_TIMER_H
+
+#include <stdint.h>
+
+typedef unsigned int tim_t;
+typedef void (*timer_cb_t)(void *arg, int channel);
+
+#define TIMER_DEV(x) ((tim_t) (x))
+#define TIM_FLAG_RESET_ON_MATCH (0x01)
+
+int timer_init(tim_t dev, uint32_t freq, timer_cb_t cb, void *arg);
+int timer_set_periodic(tim_t dev, int channel, unsigned int value, uint8_t flags);
+unsigned int timer_read(tim_t dev);
+void timer_start(tim_t dev);
+void timer_stop(tim_t dev);
+
+#endif
@@ -0,0 +1,12 @@
+#ifndef HOST_THREAD_H
+#define HOST_THREAD_H
+
+#define THREAD_STACKSIZE_DEFAULT (1024)
+
+typedef struct {
+    int pid;
+} thread_t;
+
+thread_t *thread_get_active(void);
+
+#endif
@@ -0,0 +1,6 @@
+#ifndef HOST_THREAD_FLAGS_H
+#define HOST_THREAD_FLAGS_H
+
+#include "thread.h"
+
+#endif
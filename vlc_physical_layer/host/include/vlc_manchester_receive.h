@@ -0,0 +1,38 @@
+/*
+ * Declarations of the Manchester receiver as used by vlc_netif, host build
+ */
+#ifndef VLC_MANCHESTER_RECEIVE_H
+#define VLC_MANCHESTER_RECEIVE_H
+
+#include "net/netdev.h"
+
+enum edge {
+    FALLING = 0,
+    RISING = 1,
+};
+
+enum receive_state {
+    COMPLETE,
+    INCOMPLETE,
+};
+
+struct receive_configuration_t {
+    unsigned int tolerance;             // tolerance of the symbol rate in percent
+    unsigned int num_sync_symbols;
+    unsigned int synchronous;           // 1 if manchester_read blocks
+    netdev_t *netdev;                   // device which is notified at the end of a frame
+    unsigned int buffer_size;
+};
+
+struct receive_result_meta_t {
+    int num_bytes_read;
+    int data_rate;
+    enum receive_state state;
+};
+
+void vlc_init_receiver(void *buffer, struct receive_configuration_t config, struct receive_result_meta_t *result_meta);
+void vlc_reset_receiver(void);
+void manchester_read(struct receive_result_meta_t *result_meta);
+void vlc_receiver_run_unit_tests(void);
+
+#endif
@@ -0,0 +1,10 @@
+/*
+ * Declarations of the Manchester sender as used by vlc_netif, host build
+ */
+#ifndef VLC_MANCHESTER_SEND_H
+#define VLC_MANCHESTER_SEND_H
+
+int vlc_manchester_send(void *message, int length, int bitrate, int num_sync_symbols);
+int vlc_mancheser_init(void);
+
+#endif
@@ -0,0 +1,9 @@
+#ifndef VLC_NETIF_H
+#define VLC_NETIF_H
+
+#include <stdint.h>
+
+void vlc_netif_init(void);
+uint32_t vlc_netif_frames_done(void);
+
+#endif
@@ -0,0 +1,14 @@
+#ifndef HOST_XTIMER_H
+#define HOST_XTIMER_H
+
+#include <stdint.h>
+
+#include "mutex.h"
+#include "periph/timer.h"
+
+int xtimer_mutex_lock_timeout(mutex_t *mutex, uint64_t us);
+
+unsigned irq_disable(void);
+void irq_restore(unsigned state);
+
+#endif
@@ -0,0 +1,557 @@
+/*
+ * Host build of the VLC firmware
+ *
+ * vlc_netif.c, vlc_manchester_send.c and vlc_manchester_receive.c are compiled unchanged against the stub
+ * headers in include/. This file implements the stubs (timer, gpio, mutex, netdev callback, gnrc packet buffer)
+ * and the interface of the shared library which is used by measurements/vlc_host.py.
+ *
+ * Time is simulated: the sender runs its periodic timer until the transmission is complete,
+ * the receiver ISR is called for every pushed edge timestamp with timer_read returning that timestamp.
+ */
+
+#include <stdarg.h>
+#include <stdlib.h>
+
+#include "periph/gpio.h"
+#include "periph/timer.h"
+#include "mutex.h"
+#include "xtimer.h"
+
+// include the netif to access its static send and receive functions and buffers
+#include "../../vlc_netif/vlc_netif.c"
+
+#define HOST_LED_PIN GPIO_PIN(0, 15)
+#define HOST_NUM_PINS 64
+
+// frame received by vlc_host_receive
+struct vlc_host_frame {
+    uint32_t lane;              // edge sequence of the frame
+    uint32_t end_time_us;       // time of the end flag
+    int32_t num_bytes_read;     // received bytes including the crc trailer
+    int32_t delivered;          // 1 if _netif_recv passed the frame to the network stack
+    uint32_t pulses;            // pulses on DEBUG_OUT_PIN_RECV_LINK (1: delivered, 2: too short, 3: crc error)
+    uint32_t data_offset;       // received bytes are data[data_offset:data_offset + num_bytes_read]
+};
+
+// host state
+static uint32_t _host_time_us = 0;
+static int _verbose = 0;
+static unsigned long _messages = 0;
+static unsigned long _assert_failures = 0;
+
+static timer_cb_t _timer_cb = NULL;
+static void *_timer_arg = NULL;
+static unsigned int _timer_period_us = 0;
+static int _timer_running = 0;
+
+static gpio_cb_t _irq_cb = NULL;
+static void *_irq_arg = NULL;
+static gpio_t _irq_pin = 0;
+static int _irq_enabled = 0;
+static int _pin_levels[HOST_NUM_PINS];
+
+// edges written to the LED
+static uint32_t *_send_times = NULL;
+static uint8_t *_send_levels = NULL;
+static size_t _send_max_edges = 0;
+static size_t _send_num_edges = 0;
+
+static unsigned int _recv_link_pulses = 0;
+static int _frame_complete = 0;
+static uint32_t _frame_end_time_us = 0;
+static int _frame_delivered = 0;
+
+static struct receive_configuration_t _host_receive_conf;
+static thread_t _host_thread;
+
+
+/* messages and assertions */
+
+int vlc_host_printf(const char *format, ...)
+{
+    _messages++;
+    if (!_verbose) {
+        return 0;
+    }
+
+    va_list args;
+    va_start(args, format);
+    int res = vprintf(format, args);
+    va_end(args);
+    return res;
+}
+
+int vlc_host_puts(const char *message)
+{
+    _messages++;
+    if (!_verbose) {
+        return 0;
+    }
+
+    fputs(message, stdout);
+    return fputc('\n', stdout);
+}
+
+void vlc_host_assert_failed(const char *condition, const char *file, int line)
+{
+    _assert_failures++;
+    if (_verbose) {
+        fprintf(stderr, "[WARNING] assertion failed: %s (%s:%i)\n", condition, file, line);
+    }
+}
+
+
+/* timer */
+
+int timer_init(tim_t dev, uint32_t freq, timer_cb_t cb, void *arg)
+{
+    (void) dev;
+    if (freq != 1000000) {
+        return -1;
+    }
+    _timer_cb = cb;
+    _timer_arg = arg;
+    return 0;
+}
+
+int timer_set_periodic(tim_t dev, int channel, unsigned int value, uint8_t flags)
+{
+    (void) dev;
+    (void) channel;
+    (void) flags;
+    if (value == 0) {
+        return -1;
+    }
+    _timer_period_us = value;
+    _timer_running = 1;
+    return 1;
+}
+
+unsigned int timer_read(tim_t dev)
+{
+    (void) dev;
+    return _host_time_us;
+}
+
+void timer_start(tim_t dev)
+{
+    (void) dev;
+}
+
+void timer_stop(tim_t dev)
+{
+    (void) dev;
+    _timer_running = 0;
+}
+
+
+/* gpio */
+
+int gpio_init(gpio_t pin, gpio_mode_t mode)
+{
+    (void) mode;
+    if (pin >= HOST_NUM_PINS) {
+        return -1;
+    }
+    return 0;
+}
+
+int gpio_init_int(gpio_t pin, gpio_mode_t mode, gpio_flank_t flank, gpio_cb_t cb, void *arg)
+{
+    (void) mode;
+    (void) flank;
+    _irq_pin = pin;
+    _irq_cb = cb;
+    _irq_arg = arg;
+    _irq_enabled = 1;
+    return 0;
+}
+
+void gpio_irq_enable(gpio_t pin)
+{
+    if (pin == _irq_pin) {
+        _irq_enabled = 1;
+    }
+}
+
+void gpio_irq_disable(gpio_t pin)
+{
+    if (pin == _irq_pin) {
+        _irq_enabled = 0;
+    }
+}
+
+void gpio_write(gpio_t pin, int value)
+{
+    value = (value != 0);
+    if (pin >= HOST_NUM_PINS) {
+        return;
+    }
+
+    if (pin == HOST_LED_PIN && value != _pin_levels[pin]) {
+        if (_send_num_edges < _send_max_edges) {
+            _send_times[_send_num_edges] = _host_time_us;
+            _send_levels[_send_num_edges] = value;
+        }
+        _send_num_edges++;
+    }
+#ifdef DEBUG_OUT_PIN_RECV_LINK
+    if (pin == DEBUG_OUT_PIN_RECV_LINK && value == 1 && _pin_levels[pin] == 0) {
+        _recv_link_pulses++;
+    }
+#endif
+
+    _pin_levels[pin] = value;
+}
+
+
+/* mutex and xtimer, single threaded */
+
+void mutex_init(mutex_t *mutex)
+{
+    mutex->locked = 0;
+}
+
+// a locked mutex is released by the timer callback, run the timer until then
+void mutex_lock(mutex_t *mutex)
+{
+    while (mutex->locked) {
+        if (!_timer_running || _timer_cb == NULL) {
+            fprintf(stderr, "[ERROR] mutex locked and no timer running, deadlock\n");
+            abort();
+        }
+        _host_time_us += _timer_period_us;
+        _timer_cb(_timer_arg, 0);
+    }
+    mutex->locked = 1;
+}
+
+void mutex_unlock(mutex_t *mutex)
+{
+    mutex->locked = 0;
+}
+
+int xtimer_mutex_lock_timeout(mutex_t *mutex, uint64_t us)
+{
+    (void) mutex;
+    (void) us;
+    return 0;
+}
+
+unsigned irq_disable(void)
+{
+    return 0;
+}
+
+void irq_restore(unsigned state)
+{
+    (void) state;
+}
+
+
+/* RIOT modules */
+
+uint8_t crc8(const uint8_t *data, size_t len, uint8_t g_polynom, uint8_t crc)
+{
+    while (len--) {
+        crc ^= *data++;
+        for (unsigned i = 0; i < 8; i++) {
+            crc = (crc & 0x80) ? (crc << 1) ^ g_polynom : crc << 1;
+        }
+    }
+    return crc;
+}
+
+void luid_get_eui48(eui48_t *addr)
+{
+    memset(addr, 0, sizeof(*addr));
+}
+
+thread_t *thread_get_active(void)
+{
+    return &_host_thread;
+}
+
+void gnrc_netif_default_init(gnrc_netif_t *netif)
+{
+    (void) netif;
+}
+
+int gnrc_netif_get_from_netdev(gnrc_netif_t *netif, gnrc_netapi_opt_t *opt)
+{
+    (void) netif;
+    (void) opt;
+    return -ENOTSUP;
+}
+
+int gnrc_netif_set_from_netdev(gnrc_netif_t *netif, const gnrc_netapi_opt_t *opt)
+{
+    (void) netif;
+    (void) opt;
+    return -ENOTSUP;
+}
+
+int gnrc_netif_create(gnrc_netif_t *netif, char *stack, int stacksize, char priority, const char *name,
+                      netdev_t *dev, const gnrc_netif_ops_t *ops)
+{
+    (void) stack;
+    (void) stacksize;
+    (void) priority;
+    (void) name;
+    (void) ops;
+    netif->dev = dev;
+    return 0;
+}
+
+// snip and data in one allocation, freed by _free_pkt
+gnrc_pktsnip_t *gnrc_pktbuf_add(gnrc_pktsnip_t *next, const void *data, size_t size, gnrc_nettype_t type)
+{
+    gnrc_pktsnip_t *pkt = malloc(sizeof(gnrc_pktsnip_t) + size);
+    if (pkt == NULL) {
+        return NULL;
+    }
+    pkt->next = next;
+    pkt->data = pkt + 1;
+    pkt->size = size;
+    pkt->users = 1;
+    pkt->type = type;
+    if (data != NULL) {
+        memcpy(pkt->data, data, size);
+    }
+    return pkt;
+}
+
+// packets of the host are owned by the caller
+void gnrc_pktbuf_release(gnrc_pktsnip_t *pkt)
+{
+    (void) pkt;
+}
+
+gnrc_pktsnip_t *gnrc_netif_hdr_build(const uint8_t *src, uint8_t src_len, const uint8_t *dst, uint8_t dst_len)
+{
+    gnrc_pktsnip_t *pkt = gnrc_pktbuf_add(NULL, NULL, sizeof(gnrc_netif_hdr_t) + src_len + dst_len, GNRC_NETTYPE_NETIF);
+    if (pkt == NULL) {
+        return NULL;
+    }
+    gnrc_netif_hdr_t *hdr = pkt->data;
+    hdr->src_l2addr_len = src_len;
+    hdr->dst_l2addr_len = dst_len;
+    hdr->if_pid = 0;
+    memcpy(hdr + 1, src, src_len);
+    memcpy(((uint8_t *) (hdr + 1)) + src_len, dst, dst_len);
+    return pkt;
+}
+
+void gnrc_netif_hdr_set_netif(gnrc_netif_hdr_t *hdr, const struct gnrc_netif *netif)
+{
+    hdr->if_pid = (int16_t) netif->pid;
+}
+
+static void _free_pkt(gnrc_pktsnip_t *pkt)
+{
+    while (pkt != NULL) {
+        gnrc_pktsnip_t *next = pkt->next;
+        free(pkt);
+        pkt = next;
+    }
+}
+
+
+/* netdev events */
+
+static void _host_event_callback(netdev_t *dev, netdev_event_t event)
+{
+    if (event == NETDEV_EVENT_ISR) {
+        // end flag received, gnrc_netif would wake up its thread now
+        _frame_complete = 1;
+        _frame_end_time_us = _host_time_us;
+    }
+    else if (event == NETDEV_EVENT_RX_COMPLETE) {
+        gnrc_pktsnip_t *pkt = _vlc_netif_ops.recv(&_netif);
+        _frame_delivered = (pkt != NULL);
+        _free_pkt(pkt);
+    }
+    (void) dev;
+}
+
+
+/* interface of the shared library */
+
+void vlc_host_set_verbose(int verbose)
+{
+    _verbose = verbose;
+}
+
+unsigned long vlc_host_messages(void)
+{
+    return _messages;
+}
+
+unsigned long vlc_host_assert_failures(void)
+{
+    return _assert_failures;
+}
+
+void vlc_host_set_address(const uint8_t *address)
+{
+    memcpy(_vlc_mac_address.uint8, address, VLC_ADDR_LEN);
+}
+
+// initialization of the netdev like gnrc_netif, afterwards the receiver is configured with the given values
+int vlc_host_init(unsigned int tolerance, unsigned int num_sync_symbols)
+{
+    memset(_pin_levels, 0, sizeof(_pin_levels));
+    _netif.pid = 1;
+    _netif.dev = &_vlc_netdev_dummy;
+    _vlc_netdev_dummy.event_callback = _host_event_callback;
+    _vlc_netif_ops.init(&_netif);
+
+    if (_vlc_netdev_driver.init(&_vlc_netdev_dummy) != 0) {
+        return -1;
+    }
+
+    _host_receive_conf = _dev_receive_conf;
+    _host_receive_conf.tolerance = tolerance;
+    _host_receive_conf.num_sync_symbols = num_sync_symbols;
+    vlc_init_receiver(_receive_buffer, _host_receive_conf, &_receive_meta_data);
+
+    return 0;
+}
+
+// unit tests of the receiver, exits the process if a test fails
+void vlc_host_run_unit_tests(void)
+{
+    int verbose = _verbose;
+    _verbose = 1;
+    vlc_receiver_run_unit_tests();
+    fflush(stdout);
+    _verbose = verbose;
+
+    // the tests change the configuration of the receiver
+    vlc_init_receiver(_receive_buffer, _host_receive_conf, &_receive_meta_data);
+}
+
+static void _record_send(uint32_t *times, uint8_t *levels, size_t max_edges)
+{
+    _host_time_us = 0;
+    _send_times = times;
+    _send_levels = levels;
+    _send_max_edges = max_edges;
+    _send_num_edges = 0;
+    _pin_levels[HOST_LED_PIN] = 0;
+}
+
+// send a frame with vlc_manchester_send, the edges are written to times and levels
+// returns the number of edges (can be larger than max_edges), air_time_us: time until the timer was stopped
+size_t vlc_host_send(const uint8_t *frame, size_t length, int bitrate, int num_sync_symbols,
+                     uint32_t *times, uint8_t *levels, size_t max_edges, uint32_t *air_time_us)
+{
+    _record_send(times, levels, max_edges);
+
+    if (vlc_manchester_send((void *) frame, (int) length, bitrate, num_sync_symbols) != 0) {
+        return 0;
+    }
+
+    *air_time_us = _host_time_us;
+    _send_max_edges = 0;
+    return _send_num_edges;
+}
+
+// send a payload (IPv6 packet) through _netif_send, the sent frame is copied to frame (VLC_BUFFER_SIZE bytes)
+// returns the result of _netif_send (bytes sent or negative error), num_edges: number of edges
+int vlc_host_netif_send(const uint8_t *payload, size_t length, const uint8_t *destination, uint8_t *frame,
+                        uint32_t *times, uint8_t *levels, size_t max_edges, size_t *num_edges)
+{
+    gnrc_pktsnip_t *hdr = gnrc_netif_hdr_build(_vlc_mac_address.uint8, VLC_ADDR_LEN, destination, VLC_ADDR_LEN);
+    gnrc_pktsnip_t *pkt = gnrc_pktbuf_add(NULL, payload, length, GNRC_NETTYPE_IPV6);
+    if (hdr == NULL || pkt == NULL) {
+        _free_pkt(hdr);
+        _free_pkt(pkt);
+        return -ENOMEM;
+    }
+    hdr->next = pkt;
+
+    _record_send(times, levels, max_edges);
+    int res = _vlc_netif_ops.send(&_netif, hdr);
+    if (res > 0) {
+        memcpy(frame, _send_buffer, res);
+    }
+
+    _free_pkt(hdr);
+    *num_edges = _send_num_edges;
+    _send_max_edges = 0;
+    return res;
+}
+
+// netif thread handles the received frame: copy the raw frame, then _on_isr and _netif_recv
+static int _deliver(uint32_t lane, struct vlc_host_frame *frame, uint8_t *data, size_t data_size, size_t *data_used)
+{
+    int num_bytes = _receive_meta_data.num_bytes_read;
+    size_t copied = num_bytes > 0 ? (size_t) num_bytes : 0;
+    if (copied > VLC_BUFFER_SIZE) {
+        copied = VLC_BUFFER_SIZE;
+    }
+    if (*data_used + copied > data_size) {
+        return -1;
+    }
+
+    frame->lane = lane;
+    frame->end_time_us = _frame_end_time_us;
+    frame->num_bytes_read = num_bytes;
+    frame->data_offset = *data_used;
+    memcpy(data + *data_used, _receive_buffer, copied);
+    *data_used += copied;
+
+    _recv_link_pulses = 0;
+    _frame_delivered = 0;
+    _frame_complete = 0;
+    _vlc_netdev_driver.isr(&_vlc_netdev_dummy);
+
+    frame->delivered = _frame_delivered;
+    frame->pulses = _recv_link_pulses;
+    return 0;
+}
+
+// push edge timestamps through the receiver ISR, lane i are the edges times[offsets[i]:offsets[i + 1]]
+// the receiver is reset before every lane, after an end flag the interrupt is enabled again
+// by the netif after rearm_delay_us
+// returns the number of received frames, lanes_done: number of completely processed lanes
+// (less than num_lanes if frames or data is full)
+size_t vlc_host_receive(const uint32_t *times, const uint64_t *offsets, size_t num_lanes, uint32_t rearm_delay_us,
+                        struct vlc_host_frame *frames, size_t max_frames, uint8_t *data, size_t data_size,
+                        size_t *lanes_done)
+{
+    size_t num_frames = 0;
+    size_t data_used = 0;
+
+    for (size_t lane = 0; lane < num_lanes; lane++) {
+        vlc_reset_receiver();
+        _frame_complete = 0;
+
+        for (uint64_t i = offsets[lane]; i <= offsets[lane + 1]; i++) {
+            int end_of_lane = (i == offsets[lane + 1]);
+            uint32_t t = end_of_lane ? 0 : times[i];
+
+            if (_frame_complete && (end_of_lane || (uint32_t) (t - _frame_end_time_us) >= rearm_delay_us)) {
+                if (num_frames >= max_frames ||
+                        _deliver(lane, &frames[num_frames], data, data_size, &data_used) != 0) {
+                    *lanes_done = lane;
+                    return num_frames;
+                }
+                num_frames++;
+            }
+
+            if (end_of_lane) {
+                break;
+            }
+
+            _host_time_us = t;
+            if (_irq_enabled && _irq_cb != NULL) {
+                _irq_cb(_irq_arg);
+            }
+        }
+    }
+
+    *lanes_done = num_lanes;
+    return num_frames;
+}